@@ -5,19 +5,126 @@ FastAPI应用模块 (app.py)
 - 创建FastAPI应用实例
 - 配置静态文件服务，用于提供图像文件的访问
 - 设置图像路由，使前端可以通过HTTP访问生成的图像
+- 在应用生命周期内运行图像目录的后台清理任务
+- 为图像响应设置长期缓存头、强 ETag，并为 SVG 提供预压缩版本
+- 以 Prometheus 文本格式暴露工具、沙箱和模型调用的性能指标（/metrics）
 
 注意：本模块主要用于图像文件的静态服务，LangGraph的API路由由LangGraph框架自动处理。
 """
 
 # mypy: 禁用错误代码 - "no-untyped-def,misc"
+import os
 import pathlib
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI, Response
 from fastapi.staticfiles import StaticFiles
+from starlette.background import BackgroundTask
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse
+from starlette.staticfiles import NotModifiedResponse
+from starlette.types import Scope
+
+from src_agent.image_lifecycle import (
+    compressed_svg,
+    file_etag,
+    get_image_manager,
+    precompress_svg,
+)
+from src_agent.instrumentation import (
+    PROMETHEUS_CONTENT_TYPE,
+    get_instrumentation_config,
+    get_metrics_registry,
+)
 # from fastapi.middleware.cors import CORSMiddleware
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """应用生命周期：启动时开启图像后台清理（并按需预热模型连接），关闭时停止"""
+    image_manager = get_image_manager()
+    image_manager.start_background_sweeper()
+    if os.getenv("MODEL_PREWARM", "false").lower() == "true":
+        # 加载代理以在注册表中构建模型，再预先建立到模型提供方的 keep-alive 连接
+        import src_agent.graph  # noqa: F401
+        from src_agent.model import aprewarm_models
+
+        await aprewarm_models()
+    try:
+        yield
+    finally:
+        image_manager.stop_background_sweeper()
+
+
 # 定义FastAPI应用实例
 # 这是整个Web应用的核心对象，用于注册路由和中间件
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
+
+
+# 生成的图像文件名包含时间戳和UUID，内容永不改变，可以被浏览器长期缓存
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+
+class LifecycleStaticFiles(StaticFiles):
+    """
+    图像静态文件服务
+
+    - 每次成功访问图像时通知图像生命周期管理器，用于 LRU 淘汰
+    - 响应携带 `Cache-Control: immutable` 和基于文件元数据的强 ETag，支持 304 条件请求
+    - 范围请求由 FileResponse 处理（If-Range 使用同一个强 ETag）
+    - 客户端接受 gzip 时，SVG 使用预压缩的 .svg.gz 返回；缺少压缩文件时先返回原图，
+      响应发送后在线程池中生成压缩文件，不阻塞事件循环
+    """
+
+    async def get_response(self, path: str, scope: Scope) -> Response:
+        response = await super().get_response(path, scope)
+        if response.status_code in (200, 206, 304):
+            get_image_manager().touch(path)
+        return response
+
+    def file_response(
+        self,
+        full_path,
+        stat_result: os.stat_result,
+        scope: Scope,
+        status_code: int = 200,
+    ) -> Response:
+        request_headers = Headers(scope=scope)
+        headers = {
+            "cache-control": IMMUTABLE_CACHE_CONTROL,
+            "etag": file_etag(stat_result),
+        }
+        media_type = None
+        background = None
+
+        if os.fspath(full_path).endswith(".svg"):
+            headers["vary"] = "Accept-Encoding"
+            # 范围请求针对原始字节，此时不使用压缩版本
+            accepts_gzip = "gzip" in request_headers.get("accept-encoding", "")
+            if accepts_gzip and "range" not in request_headers:
+                compressed_path = compressed_svg(full_path)
+                if compressed_path is None:
+                    # 后台任务中的同步函数在线程池中执行（anyio.to_thread.run_sync）
+                    background = BackgroundTask(precompress_svg, full_path)
+                else:
+                    full_path = compressed_path
+                    stat_result = os.stat(compressed_path)
+                    media_type = "image/svg+xml"
+                    headers["content-encoding"] = "gzip"
+                    # 不同编码的表示使用不同的强 ETag
+                    headers["etag"] = headers["etag"][:-1] + '-gzip"'
+
+        response = FileResponse(
+            full_path,
+            status_code=status_code,
+            headers=headers,
+            media_type=media_type,
+            stat_result=stat_result,
+            background=background,
+        )
+        if self.is_not_modified(response.headers, request_headers):
+            return NotModifiedResponse(response.headers)
+        return response
 
 
 def create_images_router(build_dir="images/"):
@@ -32,7 +139,7 @@ def create_images_router(build_dir="images/"):
         
     Returns:
         StaticFiles或Route: 
-            - 如果图像目录存在，返回StaticFiles对象用于提供静态文件服务
+            - 如果图像目录存在，返回LifecycleStaticFiles对象用于提供静态文件服务
             - 如果图像目录不存在，返回一个虚拟路由，返回503错误提示
     """
     # 构建图像目录的绝对路径（相对于当前文件所在目录）
@@ -62,7 +169,7 @@ def create_images_router(build_dir="images/"):
 
     # 如果目录存在，返回StaticFiles对象用于提供静态文件服务
     # html=True 允许直接访问HTML文件（虽然这里主要用于图像文件）
-    return StaticFiles(directory=build_path, html=True)
+    return LifecycleStaticFiles(directory=build_path, html=True)
 
 # ==================== CORS配置（已注释） ====================
 # 如果需要跨域资源共享，可以取消注释以下代码
@@ -81,6 +188,17 @@ def create_images_router(build_dir="images/"):
 # )
 
 # ==================== 路由配置 ====================
+# 性能指标：供 Prometheus 抓取（指标保存在进程内，多工作进程部署时需要分别抓取）
+if get_instrumentation_config().metrics_endpoint_enabled:
+
+    @app.get("/metrics", include_in_schema=False)
+    async def metrics() -> Response:
+        """返回 Prometheus 文本格式的性能指标"""
+        return Response(
+            get_metrics_registry().render(), media_type=PROMETHEUS_CONTENT_TYPE
+        )
+
+
 # 将图像静态文件服务挂载到 /images 路径下
 # 这样前端可以通过 http://host:port/images/filename.png 访问生成的图像
 # 注意：此路径不会与LangGraph API路由冲突，因为LangGraph使用不同的路径前缀
@@ -0,0 +1,270 @@
+"""
+工具输出存储模块 (artifact store)
+
+sql_inter 的 JSON 结果、python_inter 打印的 DataFrame、search_tool 的网页内容动辄数万字符，
+直接写进 ToolMessage 会让检查点和每轮发送给模型的上下文持续膨胀。本模块：
+- 超过阈值的工具输出写入磁盘，消息中只保留句柄和预览
+- 按 LangGraph 线程（configurable.thread_id）分目录存储，只能读取当前线程写入的 artifact
+- JSON 数组（如 SQL 查询结果）按“一行一条记录”存储，便于按行分页
+- 提供按行分页和子串过滤读取，供 read_artifact 工具按需查看
+- 超过保留时长的 artifact 在写入新 artifact 时顺带清理
+"""
+
+from __future__ import annotations
+
+import hashlib
+import itertools
+import json
+import logging
+import os
+import re
+import threading
+import time
+import uuid
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from typing import Any
+
+from src_agent.config.artifact_config import ArtifactConfig
+
+logger = logging.getLogger(__name__)
+
+# artifact 句柄格式，同时用于防止路径穿越
+_ARTIFACT_ID_PATTERN = re.compile(r"^art_\d{8}_\d{6}_[0-9a-f]{8}$")
+
+# 过期清理的最小间隔（秒），避免每次写入都扫描目录
+_PRUNE_INTERVAL_SECONDS = 300
+
+
+class ArtifactNotFoundError(KeyError):
+    """artifact 不存在、句柄无效或不属于当前线程"""
+
+
+def _current_thread_id() -> str:
+    from src_agent.sandbox_sessions import current_thread_id
+
+    return current_thread_id()
+
+
+def _thread_dir_name(thread_id: str) -> str:
+    """线程 ID 可能包含任意字符，目录名使用其哈希"""
+    return "t_" + hashlib.sha256(thread_id.encode("utf-8")).hexdigest()[:32]
+
+
+@dataclass
+class ArtifactInfo:
+    """artifact 元数据"""
+
+    artifact_id: str
+    tool: str  # 产生该输出的工具名
+    kind: str  # "rows"（JSON 数组，一行一条记录）或 "text"
+    chars: int  # 原始输出字符数
+    lines: int  # 存储的行数（rows 时即记录数）
+    created_at: str
+    columns: list[str] | None = None  # 列式 SQL 结果的列名（每行存储为值数组）
+
+
+def _to_lines(content: str) -> tuple[str, list[str], list[str] | None]:
+    """将工具输出转换为按行存储的形式，返回 (类型, 行列表, 列名)"""
+    stripped = content.lstrip()
+    if stripped.startswith(("[", "{")):
+        try:
+            data = json.loads(content)
+        except ValueError:
+            data = None
+        if isinstance(data, list):
+            return "rows", [json.dumps(row, ensure_ascii=False, default=str) for row in data], None
+        # 列式 SQL 结果 {"columns": [...], "rows": [[...], ...]}：列名记入元数据，每行一条记录
+        if isinstance(data, dict) and isinstance(data.get("rows"), list) and isinstance(
+            data.get("columns"), list
+        ):
+            lines = [json.dumps(row, ensure_ascii=False, default=str) for row in data["rows"]]
+            return "rows", lines, [str(name) for name in data["columns"]]
+    return "text", content.splitlines(), None
+
+
+class ArtifactStore:
+    """基于本地磁盘的工具输出存储"""
+
+    def __init__(self, config: ArtifactConfig | None = None):
+        """
+        Args:
+            config: 存储配置，如果为None则从环境变量读取
+        """
+        self.config = config or ArtifactConfig.from_env()
+        self.config.validate()
+        self._lock = threading.Lock()
+        self._last_prune = 0.0
+
+    def _thread_dir(self, thread_id: str | None) -> str:
+        """线程的存储目录（thread_id 为 None 时使用当前工具调用所属的线程）"""
+        if thread_id is None:
+            thread_id = _current_thread_id()
+        return os.path.join(self.config.artifacts_dir, _thread_dir_name(thread_id))
+
+    def _paths(self, artifact_id: str, thread_id: str | None = None) -> tuple[str, str]:
+        """返回 (内容文件, 元数据文件) 路径"""
+        if not _ARTIFACT_ID_PATTERN.match(artifact_id or ""):
+            raise ArtifactNotFoundError(f"无效的 artifact 句柄: {artifact_id}")
+        base = os.path.join(self._thread_dir(thread_id), artifact_id)
+        return f"{base}.txt", f"{base}.json"
+
+    def put(self, content: str, tool: str, thread_id: str | None = None) -> ArtifactInfo:
+        """写入一段工具输出并返回元数据（存入 thread_id 对应线程，默认为当前线程）"""
+        kind, lines, columns = _to_lines(content)
+        now = datetime.now()
+        artifact_id = f"art_{now.strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}"
+        info = ArtifactInfo(
+            artifact_id=artifact_id,
+            tool=tool,
+            kind=kind,
+            chars=len(content),
+            lines=len(lines),
+            created_at=now.isoformat(timespec="seconds"),
+            columns=columns,
+        )
+        content_path, meta_path = self._paths(artifact_id, thread_id)
+        os.makedirs(os.path.dirname(content_path), exist_ok=True)
+        with open(content_path, "w", encoding="utf-8") as f:
+            f.write("\n".join(lines))
+        with open(meta_path, "w", encoding="utf-8") as f:
+            json.dump(asdict(info), f, ensure_ascii=False)
+        self._maybe_prune()
+        return info
+
+    def info(self, artifact_id: str, thread_id: str | None = None) -> ArtifactInfo:
+        """读取 artifact 元数据（只查找 thread_id 对应线程，默认为当前线程）"""
+        _, meta_path = self._paths(artifact_id, thread_id)
+        try:
+            with open(meta_path, encoding="utf-8") as f:
+                return ArtifactInfo(**json.load(f))
+        except FileNotFoundError:
+            raise ArtifactNotFoundError(f"artifact '{artifact_id}' 不存在或已过期") from None
+
+    def read(
+        self,
+        artifact_id: str,
+        offset: int = 0,
+        limit: int = 50,
+        pattern: str | None = None,
+        thread_id: str | None = None,
+    ) -> tuple[ArtifactInfo, list[tuple[int, str]]]:
+        """按行读取 artifact。
+
+        Args:
+            artifact_id: artifact 句柄
+            offset: 起始行号（从 0 开始）；指定 pattern 时为匹配结果的偏移
+            limit: 最多返回的行数（不超过 max_page_lines）
+            pattern: 可选的过滤文本，只返回包含该文本的行（普通子串匹配，不是正则）
+            thread_id: artifact 所属线程，默认为当前线程
+
+        Returns:
+            (元数据, [(行号, 行内容), ...])
+        """
+        info = self.info(artifact_id, thread_id)
+        content_path, _ = self._paths(artifact_id, thread_id)
+        limit = max(1, min(limit, self.config.max_page_lines))
+        offset = max(0, offset)
+
+        with open(content_path, encoding="utf-8") as f:
+            numbered = ((number, line.rstrip("\n")) for number, line in enumerate(f))
+            if pattern:
+                numbered = (item for item in numbered if pattern in item[1])
+            page = list(itertools.islice(numbered, offset, offset + limit))
+        return info, page
+
+    def offload(self, content: str, tool: str, thread_id: str | None = None) -> str:
+        """工具输出过大时写入存储并返回句柄与预览，否则原样返回"""
+        if not self.config.enabled or len(content) <= self.config.inline_max_chars:
+            return content
+        try:
+            info = self.put(content, tool, thread_id)
+        except OSError as e:
+            logger.warning(f"写入 artifact 失败，返回完整输出: {e}")
+            return content
+
+        unit = "条记录" if info.kind == "rows" else "行"
+        preview = content[: self.config.preview_chars]
+        return (
+            f"📦 输出较大（{info.chars:,} 字符，{info.lines:,} {unit}），"
+            f"完整结果已保存为 artifact `{info.artifact_id}`。\n"
+            f"预览（前 {len(preview):,} 字符）:\n{preview}…\n"
+            f"如需查看更多内容，请调用 read_artifact(artifact_id=\"{info.artifact_id}\", "
+            f"offset=..., limit=..., pattern=...) 分页读取或按文本过滤。"
+        )
+
+    def _maybe_prune(self) -> None:
+        """清理过期 artifact（限制频率）"""
+        now = time.time()
+        with self._lock:
+            if now - self._last_prune < _PRUNE_INTERVAL_SECONDS:
+                return
+            self._last_prune = now
+        self.prune(now)
+
+    def prune(self, now: float | None = None) -> int:
+        """删除所有线程中超过保留时长的 artifact，返回删除的文件数"""
+        now = now or time.time()
+        removed = 0
+        try:
+            thread_dirs = [entry.path for entry in os.scandir(self.config.artifacts_dir) if entry.is_dir()]
+        except FileNotFoundError:
+            return 0
+        for thread_dir in thread_dirs:
+            try:
+                entries = list(os.scandir(thread_dir))
+            except FileNotFoundError:
+                continue
+            for entry in entries:
+                if not entry.is_file() or not entry.name.startswith("art_"):
+                    continue
+                try:
+                    if now - entry.stat().st_mtime > self.config.max_age_seconds:
+                        os.remove(entry.path)
+                        removed += 1
+                except OSError:
+                    continue
+        if removed:
+            logger.info(f"已清理 {removed} 个过期 artifact 文件")
+        return removed
+
+
+def format_page(info: ArtifactInfo, page: list[tuple[int, str]], pattern: str | None) -> str:
+    """将分页读取结果格式化为工具返回内容"""
+    unit = "条记录" if info.kind == "rows" else "行"
+    header = (
+        f"artifact `{info.artifact_id}`（来自 {info.tool}，共 {info.lines:,} {unit}）"
+    )
+    if info.columns:
+        header += f"，列: {json.dumps(info.columns, ensure_ascii=False)}"
+    if pattern:
+        header += f"，包含 `{pattern}` 的行"
+    if not page:
+        return f"{header}：没有更多内容。"
+    body = "\n".join(f"{number}: {line}" for number, line in page)
+    return f"{header}，第 {page[0][0]}–{page[-1][0]} 行：\n{body}"
+
+
+# 全局 artifact 存储实例（在工具间共享）
+_artifact_store: ArtifactStore | None = None
+
+
+def get_artifact_store() -> ArtifactStore:
+    """获取全局 artifact 存储实例"""
+    global _artifact_store
+    if _artifact_store is None:
+        _artifact_store = ArtifactStore()
+    return _artifact_store
+
+
+def offload(content: Any, tool: str) -> Any:
+    """工具层便捷函数：字符串以外的返回值先序列化为 JSON 再判断是否需要写入存储"""
+    store = get_artifact_store()
+    if isinstance(content, str):
+        return store.offload(content, tool)
+    if not store.config.enabled:
+        return content
+    text = json.dumps(content, ensure_ascii=False, default=str)
+    if len(text) <= store.config.inline_max_chars:
+        return content
+    return store.offload(text, tool)
@@ -0,0 +1,72 @@
+"""
+工具输出存储配置模块
+
+定义大体积工具输出写入 artifact 存储的阈值、预览长度和保留策略。
+"""
+
+import os
+from dataclasses import dataclass, field
+
+
+@dataclass
+class ArtifactConfig:
+    """工具输出存储配置类"""
+
+    # artifact 存储目录，每个 LangGraph 线程一个子目录；不放在沙箱工作目录下，
+    # 避免 python_inter 读取其他对话的工具输出
+    artifacts_dir: str = field(
+        default_factory=lambda: os.path.join(
+            os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+            ".data",
+            "artifacts",
+        )
+    )
+
+    # 工具输出超过该字符数时写入存储，消息中只保留句柄和预览
+    inline_max_chars: int = 4_000
+
+    # 消息中保留的预览字符数
+    preview_chars: int = 1_000
+
+    # read_artifact 单次最多返回的行数
+    max_page_lines: int = 200
+
+    # 最长保留时间（小时），按最后修改时间计算
+    max_age_hours: float = 24 * 7
+
+    # 是否启用 artifact 存储
+    enabled: bool = True
+
+    @classmethod
+    def from_env(cls) -> "ArtifactConfig":
+        """从环境变量读取配置"""
+        config = cls(
+            inline_max_chars=int(os.getenv("ARTIFACT_INLINE_MAX_CHARS", "4000")),
+            preview_chars=int(os.getenv("ARTIFACT_PREVIEW_CHARS", "1000")),
+            max_page_lines=int(os.getenv("ARTIFACT_MAX_PAGE_LINES", "200")),
+            max_age_hours=float(os.getenv("ARTIFACT_MAX_AGE_HOURS", str(24 * 7))),
+            enabled=os.getenv("ENABLE_ARTIFACT_STORE", "true").lower() == "true",
+        )
+        if os.getenv("ARTIFACTS_DIR"):
+            config.artifacts_dir = os.getenv("ARTIFACTS_DIR")
+        return config
+
+    @property
+    def max_age_seconds(self) -> float:
+        """最长保留时间（秒）"""
+        return self.max_age_hours * 3600
+
+    def validate(self) -> None:
+        """验证配置有效性"""
+        if self.inline_max_chars <= 0:
+            raise ValueError("inline_max_chars must be positive")
+        if not 0 <= self.preview_chars < self.inline_max_chars:
+            raise ValueError("preview_chars must be in [0, inline_max_chars)")
+        if self.max_page_lines <= 0:
+            raise ValueError("max_page_lines must be positive")
+        if self.max_age_hours <= 0:
+            raise ValueError("max_age_hours must be positive")
+
+        # 确保存储目录存在
+        if not os.path.exists(self.artifacts_dir):
+            os.makedirs(self.artifacts_dir, exist_ok=True)
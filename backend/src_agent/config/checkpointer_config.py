@@ -0,0 +1,69 @@
+"""
+检查点持久化配置模块
+
+定义对话检查点的存储后端（Postgres 连接池 / SQLite）和连接池参数。
+"""
+
+import os
+from dataclasses import dataclass
+
+# 支持的检查点存储后端
+SUPPORTED_CHECKPOINTER_BACKENDS = {"postgres", "sqlite", "none"}
+
+
+@dataclass
+class CheckpointerConfig:
+    """检查点持久化配置类"""
+
+    # 存储后端：postgres（生产）、sqlite（本地开发/测试替身）、none（不启用）
+    backend: str = "none"
+
+    # 连接串：postgres 为 DSN，sqlite 为文件路径（或 ":memory:"）
+    uri: str | None = None
+
+    # Postgres 连接池大小
+    pool_min_size: int = 2
+    pool_max_size: int = 20
+
+    # 等待空闲连接的超时时间（秒）
+    pool_timeout: float = 30.0
+
+    # 空闲连接保留时间（秒），超过后关闭到 pool_min_size
+    pool_max_idle: float = 300.0
+
+    # 启动时是否创建/迁移检查点表
+    setup_on_startup: bool = True
+
+    @classmethod
+    def from_env(cls) -> "CheckpointerConfig":
+        """从环境变量读取配置"""
+        # 兼容旧的（拼写有误的）CHECKERPOINTER_URI 变量
+        uri = os.getenv("CHECKPOINTER_URI") or os.getenv("CHECKERPOINTER_URI")
+        default_backend = "postgres" if uri else "none"
+        return cls(
+            backend=os.getenv("CHECKPOINTER_BACKEND", default_backend).lower(),
+            uri=uri,
+            pool_min_size=int(os.getenv("CHECKPOINTER_POOL_MIN_SIZE", "2")),
+            pool_max_size=int(os.getenv("CHECKPOINTER_POOL_MAX_SIZE", "20")),
+            pool_timeout=float(os.getenv("CHECKPOINTER_POOL_TIMEOUT", "30")),
+            pool_max_idle=float(os.getenv("CHECKPOINTER_POOL_MAX_IDLE", "300")),
+            setup_on_startup=os.getenv("CHECKPOINTER_SETUP", "true").lower()
+            == "true",
+        )
+
+    def validate(self) -> None:
+        """验证配置有效性"""
+        if self.backend not in SUPPORTED_CHECKPOINTER_BACKENDS:
+            raise ValueError(
+                f"backend must be one of {sorted(SUPPORTED_CHECKPOINTER_BACKENDS)}"
+            )
+        if self.backend != "none" and not self.uri:
+            raise ValueError(f"uri is required for the {self.backend} backend")
+        if self.pool_min_size < 0:
+            raise ValueError("pool_min_size must not be negative")
+        if self.pool_max_size <= 0 or self.pool_max_size < self.pool_min_size:
+            raise ValueError("pool_max_size must be positive and >= pool_min_size")
+        if self.pool_timeout <= 0:
+            raise ValueError("pool_timeout must be positive")
+        if self.pool_max_idle <= 0:
+            raise ValueError("pool_max_idle must be positive")
@@ -0,0 +1,50 @@
+"""
+上下文压缩配置模块
+
+定义发送给模型前压缩历史工具结果的阈值。
+"""
+
+import os
+from dataclasses import dataclass
+
+
+@dataclass
+class CompactionConfig:
+    """上下文压缩配置类"""
+
+    # 消息总量（近似 token 数）超过该值才开始压缩
+    trigger_tokens: int = 8_000
+
+    # 最近保留原文的工具结果条数（当前轮次的工具结果始终保留原文）
+    keep_recent_tool_results: int = 4
+
+    # 长度不超过该字符数的工具结果不压缩
+    min_chars: int = 1_000
+
+    # 压缩后保留的开头预览字符数
+    preview_chars: int = 300
+
+    # 是否启用上下文压缩
+    enabled: bool = True
+
+    @classmethod
+    def from_env(cls) -> "CompactionConfig":
+        """从环境变量读取配置"""
+        return cls(
+            trigger_tokens=int(os.getenv("COMPACTION_TRIGGER_TOKENS", "8000")),
+            keep_recent_tool_results=int(os.getenv("COMPACTION_KEEP_RECENT", "4")),
+            min_chars=int(os.getenv("COMPACTION_MIN_CHARS", "1000")),
+            preview_chars=int(os.getenv("COMPACTION_PREVIEW_CHARS", "300")),
+            enabled=os.getenv("ENABLE_CONTEXT_COMPACTION", "true").lower() == "true",
+        )
+
+    def validate(self) -> None:
+        """验证配置有效性"""
+        if self.trigger_tokens < 0:
+            raise ValueError("trigger_tokens must not be negative")
+        if self.keep_recent_tool_results < 0:
+            raise ValueError("keep_recent_tool_results must not be negative")
+        if self.preview_chars < 0:
+            raise ValueError("preview_chars must not be negative")
+        if self.min_chars <= self.preview_chars:
+            raise ValueError("min_chars must be greater than preview_chars")
@@ -0,0 +1,137 @@
+"""
+MySQL 数据源路由配置模块
+
+定义 sql_inter / extract_data 可用的命名数据源（主库 + 只读副本）以及每个实例的连接池参数。
+"""
+
+import os
+from dataclasses import dataclass, field
+
+# 未配置 MYSQL_DATASOURCES 时，由 MYSQL_HOST 等变量组成的数据源名称
+DEFAULT_DATASOURCE = "default"
+
+
+@dataclass(frozen=True)
+class Endpoint:
+    """一个 MySQL 实例的地址"""
+
+    host: str
+    port: int = 3306
+
+    def __str__(self) -> str:
+        return f"{self.host}:{self.port}"
+
+
+def parse_endpoints(value: str | None, default_port: int = 3306) -> list[Endpoint]:
+    """解析逗号分隔的 host[:port] 列表"""
+    endpoints = []
+    for item in (value or "").split(","):
+        item = item.strip()
+        if not item:
+            continue
+        host, _, port = item.rpartition(":") if ":" in item else (item, "", "")
+        endpoints.append(Endpoint(host=host, port=int(port) if port else default_port))
+    return endpoints
+
+
+@dataclass
+class DataSourceConfig:
+    """一个命名数据源：一个主库和若干只读副本，共用账号和数据库名"""
+
+    name: str
+    primary: Endpoint
+    user: str | None = None
+    password: str | None = None
+    database: str | None = None
+
+    # 只读副本：只读查询在其中轮询，全部不可用时回退到主库
+    replicas: list[Endpoint] = field(default_factory=list)
+
+    # 数据源说明，展示给模型以便按名称选择
+    description: str = ""
+
+    @classmethod
+    def from_env(cls, name: str, fallback: "DataSourceConfig | None" = None) -> "DataSourceConfig":
+        """从环境变量读取数据源配置
+
+        默认数据源读取 MYSQL_HOST、MYSQL_REPLICAS 等变量；名为 sales 的数据源读取 MYSQL_SALES_HOST、
+        MYSQL_SALES_REPLICAS 等变量，未设置的账号和数据库名沿用默认数据源。
+        """
+        prefix = "MYSQL_" if name == DEFAULT_DATASOURCE else f"MYSQL_{name.upper()}_"
+
+        def env(key: str, inherited: str | None = None) -> str | None:
+            return os.getenv(prefix + key) or inherited
+
+        port = int(env("PORT") or "3306")
+        return cls(
+            name=name,
+            primary=Endpoint(host=env("HOST") or "127.0.0.1", port=port),
+            user=env("USER", fallback.user if fallback else None),
+            password=env("PASSWORD", fallback.password if fallback else None),
+            database=env("DATABASE", fallback.database if fallback else None),
+            replicas=parse_endpoints(env("REPLICAS"), default_port=port),
+            description=env("DESCRIPTION") or "",
+        )
+
+
+@dataclass
+class DataSourceRoutingConfig:
+    """数据源路由配置类"""
+
+    # 数据源名称 -> 配置
+    sources: dict[str, DataSourceConfig] = field(default_factory=dict)
+
+    # 未指定数据源时使用的数据源
+    default_source: str = DEFAULT_DATASOURCE
+
+    # 每个实例的最大连接数（活跃 + 空闲）
+    pool_size: int = 4
+
+    # 连接池已满时等待空闲连接的超时时间（秒）
+    pool_timeout: float = 10.0
+
+    # 空闲连接超过该时间后借出前先 ping 检查（秒）
+    pool_recycle_seconds: float = 60.0
+
+    # 实例连接失败后暂停路由的时间（秒），到期后重新尝试
+    failover_cooldown_seconds: float = 30.0
+
+    # 建立连接的超时时间（秒），超时视为实例不可用
+    connect_timeout: float = 5.0
+
+    @classmethod
+    def from_env(cls) -> "DataSourceRoutingConfig":
+        """从环境变量读取配置
+
+        MYSQL_DATASOURCES 为逗号分隔的额外数据源名称；MYSQL_HOST 等变量始终组成 default 数据源。
+        """
+        default = DataSourceConfig.from_env(DEFAULT_DATASOURCE)
+        sources = {DEFAULT_DATASOURCE: default}
+        for name in (os.getenv("MYSQL_DATASOURCES") or "").split(","):
+            name = name.strip().lower()
+            if name and name != DEFAULT_DATASOURCE:
+                sources[name] = DataSourceConfig.from_env(name, fallback=default)
+        return cls(
+            sources=sources,
+            default_source=(os.getenv("MYSQL_DEFAULT_SOURCE") or DEFAULT_DATASOURCE).lower(),
+            pool_size=int(os.getenv("MYSQL_POOL_SIZE", "4")),
+            pool_timeout=float(os.getenv("MYSQL_POOL_TIMEOUT", "10")),
+            pool_recycle_seconds=float(os.getenv("MYSQL_POOL_RECYCLE_SECONDS", "60")),
+            failover_cooldown_seconds=float(os.getenv("MYSQL_FAILOVER_COOLDOWN_SECONDS", "30")),
+            connect_timeout=float(os.getenv("MYSQL_CONNECT_TIMEOUT", "5")),
+        )
+
+    def validate(self) -> None:
+        """验证配置有效性"""
+        if self.default_source not in self.sources:
+            raise ValueError(f"default_source {self.default_source!r} is not a configured data source")
+        if self.pool_size <= 0:
+            raise ValueError("pool_size must be positive")
+        if self.pool_timeout <= 0:
+            raise ValueError("pool_timeout must be positive")
+        if self.pool_recycle_seconds < 0:
+            raise ValueError("pool_recycle_seconds must not be negative")
+        if self.failover_cooldown_seconds < 0:
+            raise ValueError("failover_cooldown_seconds must not be negative")
+        if self.connect_timeout <= 0:
+            raise ValueError("connect_timeout must be positive")
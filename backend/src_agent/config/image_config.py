@@ -0,0 +1,96 @@
+"""
+图像生命周期配置模块
+
+定义 images/ 目录的容量上限、保留时长以及后台清理任务的配置。
+"""
+
+import os
+from dataclasses import dataclass, field
+
+# fig_inter 支持的图像输出格式
+SUPPORTED_IMAGE_FORMATS = {"png", "svg"}
+
+
+@dataclass
+class ImageLifecycleConfig:
+    """图像生命周期配置类"""
+
+    # 图像目录（fig_inter 写入，/images 路由读取）
+    images_dir: str = field(
+        default_factory=lambda: os.path.join(
+            os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+            "images",
+        )
+    )
+
+    # 图像输出格式（png 或 svg，svg 会额外生成预压缩的 .svg.gz）
+    image_format: str = "png"
+
+    # 容量与保留策略
+    max_total_mb: int = 512  # 目录总大小上限（MB），超出后按 LRU 淘汰
+    max_age_hours: float = 24 * 7  # 最长保留时间（小时），以最后访问时间计算
+
+    # 后台清理任务
+    sweep_interval_seconds: int = 600  # 清理间隔（秒）
+
+    # 最近检查点保护：扫描最近 N 个检查点，其中引用的图像不会被删除
+    protected_checkpoints: int = 50
+
+    # 未注册检查点保存器（无法判断引用关系）时，最近该时长内访问过的图像不会被删除（小时）
+    unreferenced_grace_hours: float = 24
+
+    # 是否启用生命周期管理
+    enabled: bool = True
+
+    @classmethod
+    def from_env(cls) -> "ImageLifecycleConfig":
+        """从环境变量读取配置"""
+        return cls(
+            image_format=os.getenv("IMAGES_FORMAT", "png").lower(),
+            max_total_mb=int(os.getenv("IMAGES_MAX_TOTAL_MB", "512")),
+            max_age_hours=float(os.getenv("IMAGES_MAX_AGE_HOURS", str(24 * 7))),
+            sweep_interval_seconds=int(
+                os.getenv("IMAGES_SWEEP_INTERVAL_SECONDS", "600")
+            ),
+            protected_checkpoints=int(
+                os.getenv("IMAGES_PROTECTED_CHECKPOINTS", "50")
+            ),
+            unreferenced_grace_hours=float(os.getenv("IMAGES_GRACE_HOURS", "24")),
+            enabled=os.getenv("ENABLE_IMAGE_LIFECYCLE", "true").lower() == "true",
+        )
+
+    @property
+    def max_total_bytes(self) -> int:
+        """目录总大小上限（字节）"""
+        return self.max_total_mb * 1024 * 1024
+
+    @property
+    def max_age_seconds(self) -> float:
+        """最长保留时间（秒）"""
+        return self.max_age_hours * 3600
+
+    @property
+    def unreferenced_grace_seconds(self) -> float:
+        """无检查点时的访问保护时长（秒）"""
+        return self.unreferenced_grace_hours * 3600
+
+    def validate(self) -> None:
+        """验证配置有效性"""
+        if self.image_format not in SUPPORTED_IMAGE_FORMATS:
+            raise ValueError(
+                f"image_format must be one of {sorted(SUPPORTED_IMAGE_FORMATS)}"
+            )
+        if self.max_total_mb <= 0:
+            raise ValueError("max_total_mb must be positive")
+        if self.max_age_hours <= 0:
+            raise ValueError("max_age_hours must be positive")
+        if self.sweep_interval_seconds <= 0:
+            raise ValueError("sweep_interval_seconds must be positive")
+        if self.protected_checkpoints < 0:
+            raise ValueError("protected_checkpoints must not be negative")
+        if self.unreferenced_grace_hours < 0:
+            raise ValueError("unreferenced_grace_hours must not be negative")
+
+        # 确保图像目录存在
+        if not os.path.exists(self.images_dir):
+            os.makedirs(self.images_dir, exist_ok=True)
@@ -0,0 +1,67 @@
+"""
+性能埋点配置模块
+
+定义工具调用、沙箱执行和模型调用的耗时/资源埋点开关与直方图分桶。
+"""
+
+import os
+from dataclasses import dataclass, field
+
+# 默认的耗时直方图分桶（秒），覆盖从毫秒级的缓存命中到分钟级的模型调用
+DEFAULT_LATENCY_BUCKETS: tuple[float, ...] = (
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+    60.0,
+)
+
+
+@dataclass
+class InstrumentationConfig:
+    """性能埋点配置类"""
+
+    # 是否启用埋点（关闭后 instrument() 只执行被包裹的代码）
+    enabled: bool = True
+
+    # 是否输出 OpenTelemetry span（需要安装 opentelemetry-api；未配置 SDK 时 span 为空操作）
+    otel_enabled: bool = True
+
+    # 是否在 FastAPI 应用上暴露 Prometheus 文本格式的 /metrics 路由
+    metrics_endpoint_enabled: bool = True
+
+    # 耗时直方图分桶（秒）
+    latency_buckets: tuple[float, ...] = field(default=DEFAULT_LATENCY_BUCKETS)
+
+    @classmethod
+    def from_env(cls) -> "InstrumentationConfig":
+        """从环境变量读取配置"""
+        config = cls(
+            enabled=os.getenv("ENABLE_INSTRUMENTATION", "true").lower() == "true",
+            otel_enabled=os.getenv("ENABLE_OTEL_SPANS", "true").lower() == "true",
+            metrics_endpoint_enabled=os.getenv("ENABLE_METRICS_ENDPOINT", "true").lower()
+            == "true",
+        )
+        buckets = os.getenv("METRICS_LATENCY_BUCKETS")
+        if buckets:
+            config.latency_buckets = tuple(
+                float(value) for value in buckets.split(",") if value.strip()
+            )
+        return config
+
+    def validate(self) -> None:
+        """验证配置有效性"""
+        if not self.latency_buckets:
+            raise ValueError("latency_buckets must not be empty")
+        if any(b <= 0 for b in self.latency_buckets):
+            raise ValueError("latency_buckets must be positive")
+        if list(self.latency_buckets) != sorted(set(self.latency_buckets)):
+            raise ValueError("latency_buckets must be strictly increasing")
@@ -0,0 +1,77 @@
+"""
+本地 SQL 引擎配置模块
+
+定义 local_sql 工具使用的嵌入式 DuckDB 引擎的数据目录、资源上限和返回行数。
+"""
+
+import os
+from dataclasses import dataclass, field
+
+
+@dataclass
+class LocalSQLConfig:
+    """本地 SQL 引擎配置类"""
+
+    # 共享数据目录：其中每个 CSV / Parquet / JSON / Excel 文件都作为一张表（与沙箱的 data/ 相同）
+    data_dir: str = field(
+        default_factory=lambda: os.path.join(
+            os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+            "data",
+        )
+    )
+
+    # 溢出目录：超出内存上限的排序、聚合和连接会写入这里（out-of-core）
+    temp_dir: str = field(
+        default_factory=lambda: os.path.join(
+            os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+            ".data",
+            "duckdb_tmp",
+        )
+    )
+
+    # 引擎内存上限（MB）
+    memory_limit_mb: int = 1024
+
+    # 执行线程数，0 表示使用全部 CPU 核
+    threads: int = 0
+
+    # 查询超时（秒），超时后中断查询
+    timeout_seconds: float = 60.0
+
+    # 工具直接返回给模型的最大行数（保存为 DataFrame 时不受限制）
+    max_result_rows: int = 500
+
+    # 是否启用本地 SQL 引擎
+    enabled: bool = True
+
+    @classmethod
+    def from_env(cls) -> "LocalSQLConfig":
+        """从环境变量读取配置"""
+        config = cls(
+            memory_limit_mb=int(os.getenv("LOCAL_SQL_MEMORY_LIMIT_MB", "1024")),
+            threads=int(os.getenv("LOCAL_SQL_THREADS", "0")),
+            timeout_seconds=float(os.getenv("LOCAL_SQL_TIMEOUT_SECONDS", "60")),
+            max_result_rows=int(os.getenv("LOCAL_SQL_MAX_ROWS", "500")),
+            enabled=os.getenv("ENABLE_LOCAL_SQL", "true").lower() == "true",
+        )
+        if os.getenv("LOCAL_SQL_DATA_DIR"):
+            config.data_dir = os.getenv("LOCAL_SQL_DATA_DIR")
+        if os.getenv("LOCAL_SQL_TEMP_DIR"):
+            config.temp_dir = os.getenv("LOCAL_SQL_TEMP_DIR")
+        return config
+
+    def validate(self) -> None:
+        """验证配置有效性"""
+        if self.memory_limit_mb <= 0:
+            raise ValueError("memory_limit_mb must be positive")
+        if self.threads < 0:
+            raise ValueError("threads must not be negative")
+        if self.timeout_seconds <= 0:
+            raise ValueError("timeout_seconds must be positive")
+        if self.max_result_rows <= 0:
+            raise ValueError("max_result_rows must be positive")
+
+        # 确保目录存在
+        for directory in (self.data_dir, self.temp_dir):
+            if not os.path.exists(directory):
+                os.makedirs(directory, exist_ok=True)
@@ -0,0 +1,45 @@
+"""
+图像渲染配置模块
+
+定义 fig_inter 渲染大数据量图表时的降采样阈值。
+"""
+
+import os
+from dataclasses import dataclass
+
+
+@dataclass
+class RenderConfig:
+    """图像渲染配置类"""
+
+    # 单条折线保留的最大点数，超出后使用 LTTB 降采样
+    max_line_points: int = 5_000
+
+    # 单个散点集合保留的最大点数，超出后聚合为 hexbin 或随机抽样
+    max_scatter_points: int = 20_000
+
+    # hexbin 聚合的网格大小
+    hexbin_gridsize: int = 100
+
+    # 未显式指定时是否默认启用降采样
+    auto_downsample: bool = False
+
+    @classmethod
+    def from_env(cls) -> "RenderConfig":
+        """从环境变量读取配置"""
+        return cls(
+            max_line_points=int(os.getenv("FIG_MAX_LINE_POINTS", "5000")),
+            max_scatter_points=int(os.getenv("FIG_MAX_SCATTER_POINTS", "20000")),
+            hexbin_gridsize=int(os.getenv("FIG_HEXBIN_GRIDSIZE", "100")),
+            auto_downsample=os.getenv("FIG_AUTO_DOWNSAMPLE", "false").lower()
+            == "true",
+        )
+
+    def validate(self) -> None:
+        """验证配置有效性"""
+        if self.max_line_points < 3:
+            raise ValueError("max_line_points must be at least 3")
+        if self.max_scatter_points <= 0:
+            raise ValueError("max_scatter_points must be positive")
+        if self.hexbin_gridsize <= 0:
+            raise ValueError("hexbin_gridsize must be positive")
@@ -113,6 +113,39 @@ class SandboxConfig:
         )
     )
 
+    # 会话数量上限：每个 LangGraph 线程一个沙箱，超出后按 LRU 淘汰（淘汰前写入快照）
+    max_sessions: int = 32
+
+    # 命名空间快照目录：用户变量按线程持久化，服务重启或线程切换到其他工作进程后按需恢复
+    snapshot_dir: str = field(
+        default_factory=lambda: os.path.join(
+            os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+            ".data",
+            "sandbox_snapshots",
+        )
+    )
+
+    # 是否启用命名空间快照
+    snapshot_enabled: bool = True
+
+    # 单个变量的快照大小上限（MB），超出的变量不写入快照
+    snapshot_max_variable_mb: int = 512
+
+    # 快照最长保留时间（小时），以最后写入时间计算
+    snapshot_max_age_hours: float = 24 * 7
+
+    # 单个会话用户变量的内存预算（MB），超出后按淘汰策略释放变量
+    memory_budget_mb: int = 1024
+
+    # 内存淘汰策略：lru（最近最少使用优先）、largest（占用最大优先）、none（只报告不淘汰）
+    memory_eviction_policy: str = "lru"
+
+    # 性能分析抽样比例（0~1）：按该比例随机对沙箱执行启用 cProfile，0 表示只在调用方显式要求时分析
+    profile_sample_rate: float = 0.0
+
+    # 性能分析报告保留的热点函数条数
+    profile_top_n: int = 25
+
     # 日志级别
     log_level: str = "INFO"
 
@@ -122,15 +155,33 @@ class SandboxConfig:
     @classmethod
     def from_env(cls) -> "SandboxConfig":
         """从环境变量读取配置"""
-        return cls(
+        config = cls(
             max_execution_time=int(
                 os.getenv("SANDBOX_MAX_EXECUTION_TIME", "30")
             ),
             max_memory_mb=int(os.getenv("SANDBOX_MAX_MEMORY_MB", "512")),
             max_output_size=int(os.getenv("SANDBOX_MAX_OUTPUT_SIZE", "10000")),
             log_level=os.getenv("SANDBOX_LOG_LEVEL", "INFO"),
+            max_sessions=int(os.getenv("SANDBOX_MAX_SESSIONS", "32")),
+            snapshot_enabled=os.getenv("ENABLE_SANDBOX_SNAPSHOTS", "true").lower()
+            == "true",
+            snapshot_max_variable_mb=int(
+                os.getenv("SANDBOX_SNAPSHOT_MAX_VARIABLE_MB", "512")
+            ),
+            snapshot_max_age_hours=float(
+                os.getenv("SANDBOX_SNAPSHOT_MAX_AGE_HOURS", str(24 * 7))
+            ),
+            memory_budget_mb=int(os.getenv("SANDBOX_MEMORY_BUDGET_MB", "1024")),
+            memory_eviction_policy=os.getenv(
+                "SANDBOX_MEMORY_EVICTION_POLICY", "lru"
+            ).lower(),
+            profile_sample_rate=float(os.getenv("SANDBOX_PROFILE_SAMPLE_RATE", "0")),
+            profile_top_n=int(os.getenv("SANDBOX_PROFILE_TOP_N", "25")),
             enabled=os.getenv("ENABLE_SANDBOX", "true").lower() == "true",
         )
+        if os.getenv("SANDBOX_SNAPSHOT_DIR"):
+            config.snapshot_dir = os.getenv("SANDBOX_SNAPSHOT_DIR")
+        return config
 
     def validate(self) -> None:
         """验证配置有效性"""
@@ -140,6 +191,20 @@ class SandboxConfig:
             raise ValueError("max_memory_mb must be positive")
         if self.max_output_size <= 0:
             raise ValueError("max_output_size must be positive")
+        if self.max_sessions <= 0:
+            raise ValueError("max_sessions must be positive")
+        if self.snapshot_max_variable_mb <= 0:
+            raise ValueError("snapshot_max_variable_mb must be positive")
+        if self.snapshot_max_age_hours <= 0:
+            raise ValueError("snapshot_max_age_hours must be positive")
+        if self.memory_budget_mb <= 0:
+            raise ValueError("memory_budget_mb must be positive")
+        if self.memory_eviction_policy not in ("lru", "largest", "none"):
+            raise ValueError("memory_eviction_policy must be one of: lru, largest, none")
+        if not 0 <= self.profile_sample_rate <= 1:
+            raise ValueError("profile_sample_rate must be between 0 and 1")
+        if self.profile_top_n <= 0:
+            raise ValueError("profile_top_n must be positive")
 
         # 确保沙箱工作目录存在
         if not os.path.exists(self.sandbox_workspace):
@@ -0,0 +1,38 @@
+"""
+数据库结构缓存配置模块
+
+定义 describe_schema 工具使用的表结构缓存的有效期和概览大小。
+"""
+
+import os
+from dataclasses import dataclass
+
+
+@dataclass
+class SchemaCacheConfig:
+    """数据库结构缓存配置类"""
+
+    # 缓存有效期（秒）：过期后先返回旧结构，同时在后台刷新
+    ttl_seconds: float = 600
+
+    # 概览中最多列出的表数量（按预估行数从大到小），其余只列出表名
+    max_overview_tables: int = 50
+
+    # 是否启用缓存（关闭后每次调用都查询 information_schema）
+    enabled: bool = True
+
+    @classmethod
+    def from_env(cls) -> "SchemaCacheConfig":
+        """从环境变量读取配置"""
+        return cls(
+            ttl_seconds=float(os.getenv("SCHEMA_CACHE_TTL_SECONDS", "600")),
+            max_overview_tables=int(os.getenv("SCHEMA_CACHE_MAX_OVERVIEW_TABLES", "50")),
+            enabled=os.getenv("ENABLE_SCHEMA_CACHE", "true").lower() == "true",
+        )
+
+    def validate(self) -> None:
+        """验证配置有效性"""
+        if self.ttl_seconds <= 0:
+            raise ValueError("ttl_seconds must be positive")
+        if self.max_overview_tables <= 0:
+            raise ValueError("max_overview_tables must be positive")
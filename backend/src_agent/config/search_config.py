@@ -0,0 +1,38 @@
+"""
+搜索结果缓存配置模块
+
+定义 search_tool 结果缓存的有效期和容量。
+"""
+
+import os
+from dataclasses import dataclass
+
+
+@dataclass
+class SearchCacheConfig:
+    """搜索结果缓存配置类"""
+
+    # 结果有效期（秒），过期后重新搜索；时效性强的问题应通过 time_range 限定范围
+    ttl_seconds: float = 900
+
+    # 最多缓存的查询数，超出后按 LRU 淘汰
+    max_entries: int = 256
+
+    # 是否启用缓存（关闭后仍合并并发的相同查询）
+    enabled: bool = True
+
+    @classmethod
+    def from_env(cls) -> "SearchCacheConfig":
+        """从环境变量读取配置"""
+        return cls(
+            ttl_seconds=float(os.getenv("SEARCH_CACHE_TTL_SECONDS", "900")),
+            max_entries=int(os.getenv("SEARCH_CACHE_MAX_ENTRIES", "256")),
+            enabled=os.getenv("ENABLE_SEARCH_CACHE", "true").lower() == "true",
+        )
+
+    def validate(self) -> None:
+        """验证配置有效性"""
+        if self.ttl_seconds <= 0:
+            raise ValueError("ttl_seconds must be positive")
+        if self.max_entries <= 0:
+            raise ValueError("max_entries must be positive")
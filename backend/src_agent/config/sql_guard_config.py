@@ -0,0 +1,44 @@
+"""
+SQL 查询成本防护配置模块
+
+定义 sql_inter / extract_data 预检（EXPLAIN）的扫描行数预算、自动添加的 LIMIT 和服务端执行超时。
+"""
+
+import os
+from dataclasses import dataclass
+
+
+@dataclass
+class SQLGuardConfig:
+    """SQL 查询成本防护配置类"""
+
+    # 单条查询预估扫描行数的上限（按 EXPLAIN 的 rows × filtered 估算），超出后改写或拒绝
+    max_examined_rows: int = 1_000_000
+
+    # 超出预算的简单查询（无排序、分组、聚合）自动添加的 LIMIT 行数
+    default_limit: int = 1000
+
+    # 服务端单条查询执行超时（秒），0 表示不设置
+    execution_timeout_seconds: float = 30.0
+
+    # 是否启用 EXPLAIN 预检（关闭后仍设置执行超时）
+    enabled: bool = True
+
+    @classmethod
+    def from_env(cls) -> "SQLGuardConfig":
+        """从环境变量读取配置"""
+        return cls(
+            max_examined_rows=int(os.getenv("SQL_GUARD_MAX_EXAMINED_ROWS", "1000000")),
+            default_limit=int(os.getenv("SQL_GUARD_DEFAULT_LIMIT", "1000")),
+            execution_timeout_seconds=float(os.getenv("SQL_MAX_EXECUTION_SECONDS", "30")),
+            enabled=os.getenv("ENABLE_SQL_GUARD", "true").lower() == "true",
+        )
+
+    def validate(self) -> None:
+        """验证配置有效性"""
+        if self.max_examined_rows <= 0:
+            raise ValueError("max_examined_rows must be positive")
+        if self.default_limit <= 0:
+            raise ValueError("default_limit must be positive")
+        if self.execution_timeout_seconds < 0:
+            raise ValueError("execution_timeout_seconds must not be negative")
@@ -0,0 +1,316 @@
+"""
+MySQL 数据源路由模块
+
+sql_inter / extract_data 过去每次调用都按 MYSQL_HOST / MYSQL_DATABASE 新建一个连接，所有查询都落在同一台服务器上。
+本模块提供连接路由层：
+- 多个命名数据源（MYSQL_DATASOURCES），模型可以按名称选择，未指定时使用默认数据源
+- 每个数据源一个主库和若干只读副本：只读查询在健康的副本间轮询，写语句始终发往主库
+- 故障转移：实例连接失败后在冷却期内不再路由，依次尝试下一个副本，全部不可用时回退到主库
+- 每个实例一个连接池：限制并发连接数，复用空闲连接（空闲较久的连接借出前先 ping），出错的连接直接丢弃
+
+注意：
+- 连接不使用 autocommit，归还前回滚：写语句不会被提交（与过去每次新建连接、关闭时隐式回滚的行为一致，
+  但 MySQL 的 DDL 会隐式提交），池中连接也不会长期持有旧的一致性读快照
+- 执行过非只读语句的连接归还时直接关闭，不复用：USE、SET、临时表等会话状态不会泄漏给其他线程的查询
+- 副本存在复制延迟，刚写入主库的数据可能暂时查不到
+- 故障转移只发生在建立连接阶段，查询执行中的错误不会自动重试
+"""
+
+from __future__ import annotations
+
+import itertools
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator
+
+from src_agent.config.datasource_config import (
+    DataSourceConfig,
+    DataSourceRoutingConfig,
+    Endpoint,
+)
+from src_agent.instrumentation import instrument, record_cache
+
+logger = logging.getLogger(__name__)
+
+# 建立连接的函数：(数据源, 实例, 路由配置) -> DB-API 连接
+Connector = Callable[[DataSourceConfig, Endpoint, DataSourceRoutingConfig], Any]
+
+
+class DataSourceError(Exception):
+    """未知的数据源、实例均不可用或连接池已满（消息直接返回给模型）"""
+
+
+def _close_quietly(conn: Any) -> None:
+    try:
+        conn.close()
+    except Exception:
+        pass
+
+
+def _is_alive(conn: Any) -> bool:
+    try:
+        conn.ping(reconnect=False)
+        return True
+    except Exception:
+        return False
+
+
+def pymysql_connector(
+    source: DataSourceConfig, endpoint: Endpoint, config: DataSourceRoutingConfig
+) -> Any:
+    """使用 pymysql 建立连接，并设置服务端执行超时"""
+    import pymysql
+
+    from src_agent.sql_guard import get_sql_guard
+
+    guard = get_sql_guard()
+    timeout = guard.config.execution_timeout_seconds
+    conn = pymysql.connect(
+        host=endpoint.host,
+        port=endpoint.port,
+        user=source.user,
+        password=source.password,
+        database=source.database,
+        charset="utf8",
+        autocommit=False,
+        connect_timeout=config.connect_timeout,
+        # 客户端读超时作为兜底：服务端超时未生效（如写语句）时也不会无限等待
+        read_timeout=timeout + 10 if timeout > 0 else None,
+    )
+    try:
+        guard.apply_timeout(conn)
+    except BaseException:
+        conn.close()
+        raise
+    return conn
+
+
+class ConnectionPool:
+    """单个实例的连接池：最多 size 个连接（活跃 + 空闲），空闲连接后进先出复用"""
+
+    def __init__(
+        self,
+        endpoint: Endpoint,
+        connect: Callable[[], Any],
+        size: int,
+        timeout: float,
+        recycle_seconds: float,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.endpoint = endpoint
+        self._connect = connect
+        self._timeout = timeout
+        self._recycle_seconds = recycle_seconds
+        self._clock = clock
+        self._slots = threading.BoundedSemaphore(size)
+        # (连接, 归还时间)
+        self._idle: list[tuple[Any, float]] = []
+        self._lock = threading.Lock()
+
+    def acquire(self) -> Any:
+        """借出一个连接；连接池已满且等待超时时抛出 DataSourceError，建立连接失败时抛出驱动的异常"""
+        if not self._slots.acquire(timeout=self._timeout):
+            raise DataSourceError(f"{self.endpoint} 的连接池已满，等待 {self._timeout:g} 秒后仍无空闲连接")
+        try:
+            while True:
+                with self._lock:
+                    if not self._idle:
+                        break
+                    conn, released_at = self._idle.pop()
+                if self._clock() - released_at < self._recycle_seconds or _is_alive(conn):
+                    record_cache("mysql_pool", True)
+                    return conn
+                _close_quietly(conn)
+            record_cache("mysql_pool", False)
+            with instrument("mysql.connect"):
+                return self._connect()
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def release(self, conn: Any, discard: bool = False) -> None:
+        """归还连接；复用前回滚未提交的事务，discard 为 True 时关闭连接（查询出错后或会话状态可能被修改）"""
+        # pymysql 在连接断开等致命错误后将 open 置为 False
+        if not discard and getattr(conn, "open", True):
+            try:
+                conn.rollback()
+            except Exception as e:
+                logger.debug("Rollback before returning connection to %s failed: %s", self.endpoint, e)
+                discard = True
+        if discard or not getattr(conn, "open", True):
+            _close_quietly(conn)
+        else:
+            with self._lock:
+                self._idle.append((conn, self._clock()))
+        self._slots.release()
+
+    def idle_count(self) -> int:
+        with self._lock:
+            return len(self._idle)
+
+    def close(self) -> None:
+        """关闭所有空闲连接"""
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn, _ in idle:
+            _close_quietly(conn)
+
+
+class DataSourceRouter:
+    """按数据源名称和读写类型路由到实例连接池"""
+
+    def __init__(
+        self,
+        config: DataSourceRoutingConfig | None = None,
+        connector: Connector = pymysql_connector,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """
+        Args:
+            config: 路由配置，如果为None则从环境变量读取
+            connector: 建立连接的函数（测试中可替换）
+            clock: 时间函数（测试中可替换）
+        """
+        self.config = config or DataSourceRoutingConfig.from_env()
+        self.config.validate()
+        self._connector = connector
+        self._clock = clock
+        self._pools: dict[tuple[str, Endpoint], ConnectionPool] = {}
+        # 实例 -> 恢复路由的时间
+        self._down_until: dict[Endpoint, float] = {}
+        self._round_robin: dict[str, itertools.count] = {}
+        self._lock = threading.Lock()
+
+    def source(self, name: str | None = None) -> DataSourceConfig:
+        """按名称获取数据源配置（大小写不敏感），为空时返回默认数据源"""
+        key = (name or self.config.default_source).strip().lower()
+        source = self.config.sources.get(key)
+        if source is None:
+            raise DataSourceError(
+                f"未知的数据源 {name!r}，可用的数据源: {', '.join(self.config.sources)}"
+            )
+        return source
+
+    def is_available(self, endpoint: Endpoint) -> bool:
+        with self._lock:
+            return self._down_until.get(endpoint, 0.0) <= self._clock()
+
+    def candidates(self, source: DataSourceConfig, read_only: bool = True) -> list[Endpoint]:
+        """按尝试顺序排列的实例：健康的副本（轮询起点）、主库，冷却中的实例排在最后"""
+        if read_only and source.replicas:
+            with self._lock:
+                counter = self._round_robin.setdefault(source.name, itertools.count())
+                start = next(counter) % len(source.replicas)
+            ordered = source.replicas[start:] + source.replicas[:start] + [source.primary]
+        else:
+            ordered = [source.primary]
+        healthy = [endpoint for endpoint in ordered if self.is_available(endpoint)]
+        return healthy + [endpoint for endpoint in ordered if endpoint not in healthy]
+
+    def _pool(self, source: DataSourceConfig, endpoint: Endpoint) -> ConnectionPool:
+        key = (source.name, endpoint)
+        with self._lock:
+            pool = self._pools.get(key)
+            if pool is None:
+                pool = self._pools[key] = ConnectionPool(
+                    endpoint,
+                    lambda: self._connector(source, endpoint, self.config),
+                    size=self.config.pool_size,
+                    timeout=self.config.pool_timeout,
+                    recycle_seconds=self.config.pool_recycle_seconds,
+                    clock=self._clock,
+                )
+            return pool
+
+    def _mark(self, endpoint: Endpoint, available: bool) -> None:
+        with self._lock:
+            if available:
+                self._down_until.pop(endpoint, None)
+            else:
+                self._down_until[endpoint] = self._clock() + self.config.failover_cooldown_seconds
+
+    @contextmanager
+    def connection(self, source: str | None = None, read_only: bool = True) -> Iterator[Any]:
+        """借出一个连接，退出时归还到连接池
+
+        Args:
+            source: 数据源名称，为空时使用默认数据源
+            read_only: 是否为只读查询；只读查询优先路由到副本，写语句只发往主库。
+                非只读的连接用完后关闭，不放回连接池（可能修改了当前数据库、会话变量或创建了临时表）
+
+        Raises:
+            DataSourceError: 未知的数据源，或所有候选实例都无法连接
+        """
+        config = self.source(source)
+        errors = []
+        for endpoint in self.candidates(config, read_only):
+            pool = self._pool(config, endpoint)
+            try:
+                conn = pool.acquire()
+            except DataSourceError as e:
+                # 连接池已满不代表实例故障，不进入冷却，直接尝试下一个实例
+                errors.append(str(e))
+                continue
+            except Exception as e:
+                logger.warning("MySQL endpoint %s of %s unavailable: %s", endpoint, config.name, e)
+                self._mark(endpoint, available=False)
+                errors.append(f"{endpoint}: {e}")
+                continue
+            self._mark(endpoint, available=True)
+
+            failed = False
+            try:
+                yield conn
+            except BaseException:
+                failed = True
+                raise
+            finally:
+                pool.release(conn, discard=failed or not read_only)
+            return
+        raise DataSourceError(f"数据源 {config.name} 的所有实例都无法连接: {'; '.join(errors)}")
+
+    def describe(self) -> list[dict[str, Any]]:
+        """数据源列表（名称、数据库、说明、实例状态），供模型选择数据源"""
+        sources = []
+        for source in self.config.sources.values():
+            endpoints = [source.primary, *source.replicas]
+            sources.append(
+                {
+                    "name": source.name,
+                    "default": source.name == self.config.default_source,
+                    "database": source.database,
+                    "description": source.description,
+                    "replicas": len(source.replicas),
+                    "unavailable": [
+                        str(endpoint) for endpoint in endpoints if not self.is_available(endpoint)
+                    ],
+                }
+            )
+        return sources
+
+    def close(self) -> None:
+        """关闭所有连接池中的空闲连接"""
+        with self._lock:
+            pools = list(self._pools.values())
+        for pool in pools:
+            pool.close()
+
+
+# 全局路由实例（首次查询时创建）
+_router: DataSourceRouter | None = None
+_router_lock = threading.Lock()
+
+
+def get_router() -> DataSourceRouter:
+    """获取全局数据源路由实例（创建前加载 .env）"""
+    global _router
+    if _router is None:
+        with _router_lock:
+            if _router is None:
+                from src_agent.env import load_env
+
+                load_env()
+                _router = DataSourceRouter()
+    return _router
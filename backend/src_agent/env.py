@@ -0,0 +1,25 @@
+"""
+环境变量加载模块
+
+.env 只需在进程内加载一次。原先在 tools.py 导入时即执行 load_dotenv，
+现在改为由入口（graph.py）或首次需要环境变量的工具按需调用。
+"""
+
+import threading
+
+_env_lock = threading.Lock()
+_env_loaded = False
+
+
+def load_env() -> None:
+    """加载 backend/.env（覆盖已存在的变量），重复调用无副作用。"""
+    global _env_loaded
+    if _env_loaded:
+        return
+    with _env_lock:
+        if _env_loaded:
+            return
+        from dotenv import load_dotenv
+
+        load_dotenv(override=True)
+        _env_loaded = True
@@ -0,0 +1,174 @@
+"""
+脚本化假模型模块
+
+压测和离线调试时不应调用付费的 LLM。本模块提供确定性的 ScriptedChatModel：
+- 按预置脚本依次返回工具调用（sql_inter / extract_data / python_inter / fig_inter），最后返回文字回答
+- 不保存内部状态：根据最后一条用户消息之后已有的 AI 消息数决定下一步，可被多个线程并发共享
+- 可模拟模型响应延迟（FAKE_MODEL_LATENCY_MS），便于评估真实负载下的并发能力
+
+通过 DEFAULT_MODEL=fake 接入 ModelFactory，脚本由 FAKE_MODEL_SCRIPT 选择（默认 mixed）。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import time
+from typing import Any, Sequence
+
+from langchain_core.callbacks import (
+    AsyncCallbackManagerForLLMRun,
+    CallbackManagerForLLMRun,
+)
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage
+from langchain_core.messages.utils import count_tokens_approximately
+from langchain_core.outputs import ChatGeneration, ChatResult
+from pydantic import Field
+
+# 脚本的一步：一组并行的工具调用 [(工具名, 参数)]，或最终回答文本
+ScriptStep = list[tuple[str, dict[str, Any]]] | str
+
+_BUILD_FRAME = (
+    "rng = np.random.default_rng(42)\n"
+    "sales_df = pd.DataFrame({\n"
+    "    'region': rng.choice(['华东', '华南', '华北', '西部'], 50_000),\n"
+    "    'month': rng.integers(1, 13, 50_000),\n"
+    "    'amount': rng.gamma(2.0, 150.0, 50_000),\n"
+    "})"
+)
+_AGGREGATE = (
+    "monthly_df = sales_df.groupby(['region', 'month'], as_index=False)['amount'].sum()\n"
+    "monthly_df.groupby('region')['amount'].describe()"
+)
+_PLOT = (
+    "fig, ax = plt.subplots(figsize=(10, 6))\n"
+    "for region, part in monthly_df.groupby('region'):\n"
+    "    ax.plot(part['month'], part['amount'], label=region)\n"
+    "ax.set_title('各地区月度销售额')\n"
+    "ax.legend()\n"
+    "fig.tight_layout()"
+)
+
+# 预置脚本：脚本名 -> 步骤列表
+SCRIPTS: dict[str, list[ScriptStep]] = {
+    "analysis": [
+        [("python_inter", {"python_code": _BUILD_FRAME})],
+        [("python_inter", {"python_code": _AGGREGATE})],
+        "已完成销售数据的分地区汇总。",
+    ],
+    "plot": [
+        [("python_inter", {"python_code": _BUILD_FRAME + "\n" + _AGGREGATE})],
+        [("fig_inter", {"py_code": _PLOT, "fname": "fig"})],
+        "已生成各地区月度销售额折线图。",
+    ],
+    # 需要可访问的 MySQL（MYSQL_* 环境变量）
+    "sql": [
+        [("describe_schema", {})],
+        [("sql_inter", {"sql_query": "SELECT TABLE_SCHEMA, COUNT(*) FROM information_schema.TABLES GROUP BY 1"})],
+        [
+            (
+                "extract_data",
+                {
+                    "sql_query": "SELECT * FROM information_schema.COLUMNS LIMIT 2000",
+                    "df_name": "columns_df",
+                },
+            )
+        ],
+        [("python_inter", {"python_code": "columns_df.groupby('TABLE_NAME').size().describe()"})],
+        "已完成数据库元数据查询与统计。",
+    ],
+    "mixed": [
+        [("python_inter", {"python_code": _BUILD_FRAME})],
+        [("python_inter", {"python_code": _AGGREGATE})],
+        [("fig_inter", {"py_code": _PLOT, "fname": "fig"})],
+        "已完成汇总分析并生成图表。",
+    ],
+}
+
+
+def _current_turn(messages: Sequence[BaseMessage]) -> tuple[int, int]:
+    """返回 (用户消息序号, 本轮已有的 AI 消息数)"""
+    human_index = -1
+    turn = 0
+    for index, message in enumerate(messages):
+        if isinstance(message, HumanMessage):
+            human_index = index
+            turn += 1
+    steps = sum(isinstance(m, AIMessage) for m in messages[human_index + 1 :])
+    return turn, steps
+
+
+class ScriptedChatModel(BaseChatModel):
+    """按脚本返回工具调用的确定性聊天模型"""
+
+    script: list[Any] = Field(default_factory=lambda: SCRIPTS["mixed"])
+    latency_ms: float = 0.0  # 每次调用模拟的响应延迟（毫秒）
+
+    @classmethod
+    def from_env(cls, script_name: str | None = None) -> "ScriptedChatModel":
+        """从环境变量创建（FAKE_MODEL_SCRIPT、FAKE_MODEL_LATENCY_MS）"""
+        name = script_name or os.getenv("FAKE_MODEL_SCRIPT") or "mixed"
+        if name not in SCRIPTS:
+            raise ValueError(f"未知的假模型脚本: {name}，可选: {', '.join(SCRIPTS)}")
+        return cls(
+            script=SCRIPTS[name],
+            latency_ms=float(os.getenv("FAKE_MODEL_LATENCY_MS", "0")),
+        )
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted-fake"
+
+    @property
+    def model_name(self) -> str:
+        return "scripted-fake"
+
+    def bind_tools(self, tools: Sequence[Any], **kwargs: Any) -> "ScriptedChatModel":
+        # 工具调用由脚本决定，不需要工具定义
+        return self
+
+    def _next_message(self, messages: list[BaseMessage]) -> AIMessage:
+        turn, step = _current_turn(messages)
+        planned = self.script[step] if step < len(self.script) else self.script[-1]
+        if isinstance(planned, str):
+            content, tool_calls = planned, []
+        else:
+            content = ""
+            tool_calls = [
+                {"name": name, "args": args, "id": f"call_{turn}_{step}_{index}"}
+                for index, (name, args) in enumerate(planned)
+            ]
+        input_tokens = count_tokens_approximately(messages)
+        output_tokens = max(len(content) // 2, 1) + 20 * len(tool_calls)
+        return AIMessage(
+            content=content,
+            tool_calls=tool_calls,
+            usage_metadata={
+                "input_tokens": input_tokens,
+                "output_tokens": output_tokens,
+                "total_tokens": input_tokens + output_tokens,
+            },
+        )
+
+    def _generate(
+        self,
+        messages: list[BaseMessage],
+        stop: list[str] | None = None,
+        run_manager: CallbackManagerForLLMRun | None = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+        return ChatResult(generations=[ChatGeneration(message=self._next_message(messages))])
+
+    async def _agenerate(
+        self,
+        messages: list[BaseMessage],
+        stop: list[str] | None = None,
+        run_manager: AsyncCallbackManagerForLLMRun | None = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        if self.latency_ms:
+            await asyncio.sleep(self.latency_ms / 1000)
+        return ChatResult(generations=[ChatGeneration(message=self._next_message(messages))])
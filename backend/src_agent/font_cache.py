@@ -0,0 +1,180 @@
+"""
+字体发现缓存模块
+
+每次构建 PythonSandbox 都会扫描 matplotlib 的全部字体来寻找中文字体；
+在全新容器中，matplotlib 首次导入还要花数秒重建字体列表缓存。本模块：
+- 将检测到的中文字体结果持久化到磁盘，缓存键由平台、matplotlib 版本和字体目录的修改时间组成
+- 进程内再做一层缓存，后续沙箱直接复用
+- 提供命令行预热入口（镜像构建或首次启动时执行），同时生成 matplotlib 自身的字体列表缓存：
+    python -m src_agent.font_cache
+"""
+
+import hashlib
+import json
+import logging
+import os
+import platform
+import threading
+from importlib import metadata
+from pathlib import Path
+from typing import Callable
+
+from src_agent.instrumentation import record_cache
+
+logger = logging.getLogger(__name__)
+
+# 缓存格式版本，结构变化时递增以使旧缓存失效
+CACHE_VERSION = 1
+CACHE_FILENAME = "chinese_font.json"
+
+# 与 matplotlib.font_manager 的系统字体目录保持一致（不导入 matplotlib 以保证计算缓存键足够快）
+_SYSTEM_FONT_DIRS = {
+    "Linux": [
+        "/usr/share/fonts",
+        "/usr/local/share/fonts",
+        "/usr/lib/X11/fonts/TrueType",
+        "/usr/X11R6/lib/X11/fonts/TTF",
+        "/usr/X11/lib/X11/fonts",
+        "~/.fonts",
+        "~/.local/share/fonts",
+    ],
+    "Darwin": [
+        "/Library/Fonts",
+        "/Network/Library/Fonts",
+        "/System/Library/Fonts",
+        "/opt/local/share/fonts",
+        "~/Library/Fonts",
+    ],
+    "Windows": [
+        os.path.join(os.environ.get("WINDIR", "C:\\Windows"), "Fonts"),
+        os.path.join(os.environ.get("LOCALAPPDATA", ""), "Microsoft", "Windows", "Fonts"),
+    ],
+}
+
+# 进程内缓存：缓存目录 -> 字体名称
+# matplotlib 的字体列表在进程内只加载一次，进程运行期间新增的字体本来也不可见，
+# 因此命中进程内缓存后无需再重新计算缓存键
+_memory_cache: dict[Path, str | None] = {}
+_cache_lock = threading.Lock()
+
+
+def default_cache_dir() -> Path:
+    """返回字体缓存目录，可通过 FONT_CACHE_DIR 环境变量覆盖"""
+    configured = os.getenv("FONT_CACHE_DIR")
+    if configured:
+        return Path(configured)
+    return Path(__file__).resolve().parents[1] / ".cache" / "fonts"
+
+
+def font_dirs() -> list[Path]:
+    """返回当前平台存在的系统字体目录"""
+    candidates = _SYSTEM_FONT_DIRS.get(platform.system(), [])
+    return [
+        Path(os.path.expanduser(directory))
+        for directory in candidates
+        if directory and os.path.isdir(os.path.expanduser(directory))
+    ]
+
+
+def _directory_mtimes(directories: list[Path]) -> list[tuple[str, int]]:
+    """收集字体目录及其子目录的修改时间（新增/删除字体文件会改变所在目录的 mtime）"""
+    mtimes: list[tuple[str, int]] = []
+    for directory in directories:
+        for root, _, _ in os.walk(directory):
+            try:
+                mtimes.append((root, os.stat(root).st_mtime_ns))
+            except OSError:
+                continue
+    return sorted(mtimes)
+
+
+def _matplotlib_version() -> str:
+    try:
+        return metadata.version("matplotlib")
+    except metadata.PackageNotFoundError:
+        return "unknown"
+
+
+def cache_key(directories: list[Path] | None = None) -> str:
+    """计算缓存键：平台 + matplotlib 版本 + 字体目录修改时间"""
+    directories = font_dirs() if directories is None else directories
+    payload = json.dumps(
+        [
+            CACHE_VERSION,
+            platform.system(),
+            platform.machine(),
+            _matplotlib_version(),
+            _directory_mtimes(directories),
+        ]
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def _read_disk_cache(cache_dir: Path, key: str) -> tuple[bool, str | None]:
+    """读取磁盘缓存，返回 (是否命中, 字体名称)"""
+    try:
+        data = json.loads((cache_dir / CACHE_FILENAME).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return False, None
+    if data.get("key") != key:
+        return False, None
+    return True, data.get("font")
+
+
+def _write_disk_cache(cache_dir: Path, key: str, font: str | None) -> None:
+    """原子写入磁盘缓存，写入失败时只记录警告"""
+    try:
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        tmp_path = cache_dir / f"{CACHE_FILENAME}.{os.getpid()}.tmp"
+        tmp_path.write_text(
+            json.dumps({"key": key, "font": font}, ensure_ascii=False), encoding="utf-8"
+        )
+        os.replace(tmp_path, cache_dir / CACHE_FILENAME)
+    except OSError as e:
+        logger.warning(f"写入字体缓存失败: {e}")
+
+
+def resolve_font(
+    detect: Callable[[], str | None], cache_dir: Path | None = None
+) -> str | None:
+    """返回缓存的中文字体，未命中时调用 detect 检测并写入缓存。
+
+    Args:
+        detect: 实际执行字体扫描的函数
+        cache_dir: 缓存目录，如果为None则使用 default_cache_dir()
+
+    Returns:
+        中文字体名称；系统没有可用中文字体时为 None（同样会被缓存）
+    """
+    cache_dir = cache_dir or default_cache_dir()
+
+    with _cache_lock:
+        if cache_dir in _memory_cache:
+            return _memory_cache[cache_dir]
+
+        key = cache_key()
+        hit, font = _read_disk_cache(cache_dir, key)
+        record_cache("font_disk", hit)
+        if hit:
+            logger.debug(f"命中字体缓存: {font}")
+        else:
+            font = detect()
+            _write_disk_cache(cache_dir, key, font)
+
+        _memory_cache[cache_dir] = font
+        return font
+
+
+def warm() -> str | None:
+    """预热字体缓存：构建 matplotlib 字体列表缓存，并持久化中文字体检测结果"""
+    # 导入 font_manager 会在 MPLCONFIGDIR 下生成（或复用）matplotlib 的 fontlist 缓存
+    import matplotlib.font_manager  # noqa: F401
+
+    from src_agent.sandbox import _detect_chinese_font
+
+    return resolve_font(_detect_chinese_font)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    print(f"中文字体: {warm()}（缓存目录: {default_cache_dir()}）")
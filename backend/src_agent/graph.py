@@ -5,33 +5,50 @@ LangGraph代理配置模块 (graph.py)
 - 导入所有可用的工具函数
 - 配置AI模型（主模型和摘要模型）
 - 设置系统提示词
-- 配置中间件（如消息摘要中间件）
+- 配置中间件（工具结果压缩中间件）
 - 创建代理实例
 
 代理可以使用以下工具：
 - sql_inter: SQL数据库查询
 - extract_data: 数据提取到pandas DataFrame
+- list_datasources: 列出可选的MySQL数据源（主库 + 只读副本）
+- describe_schema: 查看数据库表结构（共享缓存，后台刷新）
+- local_sql: 对 data/ 目录下的文件和内置数据集执行只读SQL（嵌入式 DuckDB）
 - python_inter: Python代码执行
 - fig_inter: 数据可视化绘图
 - search_tool: 网络搜索
+- read_artifact: 分页读取大体积工具输出
+- memory_report: 查看并释放会话变量占用的内存
 """
 
+from src_agent.env import load_env
 from src_agent.tools import (
     sql_inter,
     extract_data,
+    list_datasources,
+    describe_schema,
+    local_sql,
     python_inter,
     fig_inter,
     search_tool,
+    read_artifact,
+    memory_report,
 )
 from src_agent.prompt import prompt
 from src_agent.model import ModelFactory
+from src_agent.image_lifecycle import get_image_manager
+from src_agent.middleware import (
+    ModelCallInstrumentationMiddleware,
+    ToolResultCompactionMiddleware,
+)
 from langchain.agents import create_agent
 from langchain.agents.middleware import SummarizationMiddleware
 
-# from memory.pgmemory import PGMemory
-
 import os
 
+# 加载 .env（工具模块不再在导入时加载环境变量，由入口统一加载一次）
+load_env()
+
 # ==================== 模型配置 ====================
 # 从环境变量读取模型类型配置
 model_type = os.getenv("DEFAULT_MODEL")  # 主模型类型（用于对话和推理）
@@ -40,35 +57,67 @@ summary_model_type = os.getenv("SUMMARY_MODEL")  # 摘要模型类型（用于
 # ==================== 工具配置 ====================
 # 定义代理可用的所有工具列表
 # 这些工具将在代理需要时被自动调用
-tools = [sql_inter, extract_data, python_inter, fig_inter, search_tool]
+tools = [
+    sql_inter,
+    extract_data,
+    list_datasources,
+    describe_schema,
+    local_sql,
+    python_inter,
+    fig_inter,
+    search_tool,
+    read_artifact,
+    memory_report,
+]
 
 # ==================== 模型实例化 ====================
-# 使用ModelFactory创建主模型实例
-model = ModelFactory(model_type).model
-# 使用ModelFactory创建摘要模型实例（用于SummarizationMiddleware）
-summary_model = ModelFactory(model_type).get_summary_model(summary_model_type)
+# 使用ModelFactory创建主模型实例（模型与HTTP连接池由进程级注册表复用）
+model_factory = ModelFactory(model_type)
+model = model_factory.model
+# 使用同一个ModelFactory获取摘要模型实例（用于SummarizationMiddleware），与主模型共享连接池
+summary_model = model_factory.get_summary_model(summary_model_type)
 
-# ==================== 持久化内存配置（已注释） ====================
-# 如果需要启用对话历史持久化，可以取消注释以下代码
-# db_uri=os.getenv("CHECKERPOINTER_URI")
-# with PGMemory(db_uri).checkpointer as checkpointer:
-#     checkpointer.setup()
+# ==================== 持久化内存配置 ====================
+# LangGraph 服务由 langgraph.json 的 checkpointer 配置提供检查点（见 src_agent/memory/pgmemory.py，
+# 基于连接池的 AsyncPostgresSaver），编译后的图不能自带检查点。
+# 在脚本中独立运行代理时，可使用同一个连接池保存器：
+#     async with open_checkpointer() as checkpointer:
+#         graph = build_agent(checkpointer=checkpointer)
 
 # ==================== 代理创建 ====================
-# 创建LangGraph代理实例
-agent = create_agent(
-    model=model,  # 主AI模型，用于理解和生成回复
-    tools=tools,  # 代理可用的工具列表
-    system_prompt=prompt,  # 系统提示词，定义代理的行为和角色
-    middleware=[
-        # 消息摘要中间件：当对话历史过长时自动进行摘要
-        # ⚠️ 已禁用：前端 SDK 版本不支持 "remove" 类型消息，且可能导致通义千问 API 消息序列错误
-        # 等待前端升级到支持该消息类型的版本后可重新启用
-        # SummarizationMiddleware(
-        #     model=summary_model,  # 用于生成摘要的模型
-        #     max_tokens_before_summary=4000,  # 当消息达到4000 tokens时触发摘要
-        #     messages_to_keep=20,  # 摘要后保留最近20条消息
-        # )
-    ],
-    # checkpointer=checkpointer,  # 持久化检查点（已注释）
-)
+
+
+def build_agent(checkpointer=None):
+    """创建LangGraph代理实例
+
+    Args:
+        checkpointer: 持久化检查点，None 表示由 LangGraph 服务提供（或不持久化）
+    """
+    if checkpointer is not None:
+        # 图像清理需要检查点判断哪些图像仍被对话引用
+        get_image_manager().register_checkpointer(checkpointer)
+    return create_agent(
+        model=model,  # 主AI模型，用于理解和生成回复
+        tools=tools,  # 代理可用的工具列表
+        system_prompt=prompt,  # 系统提示词，定义代理的行为和角色
+        middleware=[
+            # 工具结果压缩中间件：只改写发送给模型的请求，把较早的大体积工具结果替换为摘要
+            # 不修改对话状态、不产生 RemoveMessage，tool_call 配对保持完整，兼容通义千问
+            ToolResultCompactionMiddleware(),
+            # 模型调用埋点中间件：记录模型调用耗时和 token 用量（/metrics 与 OpenTelemetry span）
+            ModelCallInstrumentationMiddleware(),
+            # 消息摘要中间件：当对话历史过长时自动进行摘要
+            # ⚠️ 已禁用：前端 SDK 版本不支持 "remove" 类型消息，且可能导致通义千问 API 消息序列错误
+            # 等待前端升级到支持该消息类型的版本后可重新启用
+            # SummarizationMiddleware(
+            #     model=summary_model,  # 用于生成摘要的模型
+            #     max_tokens_before_summary=4000,  # 当消息达到4000 tokens时触发摘要
+            #     messages_to_keep=20,  # 摘要后保留最近20条消息
+            # )
+        ],
+        checkpointer=checkpointer,  # 持久化检查点
+    )
+
+
+# LangGraph 服务加载的代理实例（检查点由服务按 langgraph.json 配置注入）
+agent = build_agent()
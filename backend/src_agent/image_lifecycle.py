@@ -0,0 +1,345 @@
+"""
+图像生命周期管理模块
+
+fig_inter 生成的图像只会不断写入 images/ 目录。本模块负责：
+- 记录每张图像的最后访问时间（通过 /images 路由访问或新生成时更新）
+- 按最长保留时间删除过期图像
+- 当目录总大小超出上限时按 LRU（最久未访问优先）淘汰
+- 跳过最近检查点中仍被引用的图像
+- 提供后台定时清理线程
+- 为 /images 路由生成基于文件元数据的强 ETag，并预压缩 SVG 图像
+"""
+
+import gzip
+import logging
+import os
+import re
+import shutil
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Iterable
+
+from src_agent.config.image_config import ImageLifecycleConfig
+
+logger = logging.getLogger(__name__)
+
+# 匹配工具返回内容中的图像链接，例如 http://localhost:2024/images/fig_xxx.png
+_IMAGE_URL_PATTERN = re.compile(r"/images/([\w\-.]+)")
+
+# 预压缩文件后缀（与原图放在同一目录，生命周期随原图）
+COMPRESSED_SUFFIX = ".gz"
+
+def file_etag(stat_result: os.stat_result) -> str:
+    """根据文件元数据 (inode, mtime_ns, 大小) 生成强 ETag。
+
+    图像文件名唯一且写入后不再修改，元数据足以标识内容；不读取文件，
+    可以直接在事件循环中调用。
+
+    Args:
+        stat_result: 文件的 stat 结果
+
+    Returns:
+        带双引号的强 ETag 字符串
+    """
+    return f'"{stat_result.st_ino:x}-{stat_result.st_mtime_ns:x}-{stat_result.st_size:x}"'
+
+
+def compressed_svg(path: str | os.PathLike[str]) -> str | None:
+    """返回 SVG 图像已有的最新预压缩文件路径，不存在或已过期时返回 None（不会生成压缩文件）"""
+    source = os.fspath(path)
+    target = source + COMPRESSED_SUFFIX
+    try:
+        if os.path.getmtime(target) >= os.path.getmtime(source):
+            return target
+    except OSError:
+        pass
+    return None
+
+
+def precompress_svg(path: str | os.PathLike[str]) -> str | None:
+    """为 SVG 图像生成 gzip 预压缩文件（已是最新时直接复用）。
+
+    压缩级别为 9 并写入磁盘，较慢，不要在事件循环中直接调用。
+
+    Args:
+        path: SVG 文件路径
+
+    Returns:
+        预压缩文件路径；压缩失败时返回 None
+    """
+    source = os.fspath(path)
+    target = source + COMPRESSED_SUFFIX
+    try:
+        if compressed_svg(source) is not None:
+            return target
+        # 先写临时文件再原子替换，避免并发请求读到半个文件
+        tmp_target = f"{target}.{threading.get_ident()}.tmp"
+        with open(source, "rb") as src, gzip.open(tmp_target, "wb", compresslevel=9) as dst:
+            shutil.copyfileobj(src, dst)
+        os.replace(tmp_target, target)
+        return target
+    except OSError as e:
+        logger.warning(f"预压缩 SVG {source} 失败: {e}")
+        return None
+
+
+@dataclass
+class SweepResult:
+    """单次清理的结果统计"""
+
+    deleted: list[str] = field(default_factory=list)  # 被删除的文件名
+    freed_bytes: int = 0  # 释放的字节数
+    total_bytes: int = 0  # 清理后目录总大小
+    protected: int = 0  # 因被检查点引用而保留的文件数
+
+
+def extract_image_names(text: str) -> set[str]:
+    """从文本中提取 /images/ 链接对应的文件名。"""
+    return set(_IMAGE_URL_PATTERN.findall(text or ""))
+
+
+def _message_text(message: Any) -> str:
+    """将消息对象（或字典）的 content 转换为可搜索的文本。"""
+    content = getattr(message, "content", None)
+    if content is None and isinstance(message, dict):
+        content = message.get("content")
+    if isinstance(content, list):
+        return " ".join(
+            part.get("text", "") if isinstance(part, dict) else str(part)
+            for part in content
+        )
+    return str(content or "")
+
+
+def referenced_images_from_checkpointer(checkpointer: Any, limit: int) -> set[str]:
+    """扫描最近 limit 个检查点，收集消息中仍被引用的图像文件名。
+
+    Args:
+        checkpointer: LangGraph 检查点保存器（需支持 list 方法）
+        limit: 扫描的检查点数量上限
+
+    Returns:
+        被引用的图像文件名集合
+    """
+    names: set[str] = set()
+    if checkpointer is None or limit <= 0:
+        return names
+    for checkpoint_tuple in checkpointer.list(None, limit=limit):
+        channel_values = checkpoint_tuple.checkpoint.get("channel_values", {})
+        for message in channel_values.get("messages", []) or []:
+            names |= extract_image_names(_message_text(message))
+    return names
+
+
+class ImageLifecycleManager:
+    """图像生命周期管理器
+
+    负责图像目录的容量控制与过期清理。线程安全，可在请求处理线程与后台清理线程间共享。
+    """
+
+    def __init__(
+        self,
+        config: ImageLifecycleConfig | None = None,
+        referenced_images_provider: Callable[[], Iterable[str]] | None = None,
+    ):
+        """
+        Args:
+            config: 生命周期配置，如果为None则从环境变量读取
+            referenced_images_provider: 返回仍被引用的图像文件名的回调，
+                如果为None则使用已注册的检查点保存器（未注册时改为保护最近访问过的图像）
+        """
+        self.config = config or ImageLifecycleConfig.from_env()
+        self.config.validate()
+
+        self.referenced_images_provider = (
+            referenced_images_provider or self._referenced_from_checkpointer
+        )
+        # 是否依赖已注册的检查点保存器确定引用关系
+        self._uses_checkpointer = referenced_images_provider is None
+        self.checkpointer: Any = None
+        self._warned_no_checkpointer = False
+
+        # 文件名 -> 最后访问时间（进程内记录，重启后回退为文件修改时间）
+        self._last_access: dict[str, float] = {}
+        self._lock = threading.Lock()
+
+        self._stop_event = threading.Event()
+        self._sweeper: threading.Thread | None = None
+
+    def register_checkpointer(self, checkpointer: Any) -> None:
+        """注册检查点保存器，用于保护最近检查点仍在引用的图像"""
+        self.checkpointer = checkpointer
+
+    def _without_checkpointer(self) -> bool:
+        return self._uses_checkpointer and self.checkpointer is None
+
+    def _warn_without_checkpointer(self) -> None:
+        if self._warned_no_checkpointer:
+            return
+        self._warned_no_checkpointer = True
+        logger.warning(
+            "图像清理未注册检查点保存器，无法判断对话引用的图像："
+            f"仍按保留时间和容量上限清理，最近 {self.config.unreferenced_grace_hours:g} 小时内访问过的图像不会被删除"
+        )
+
+    def _referenced_from_checkpointer(self) -> set[str]:
+        return referenced_images_from_checkpointer(
+            self.checkpointer, self.config.protected_checkpoints
+        )
+
+    def touch(self, name: str) -> None:
+        """记录图像被访问（或新生成）"""
+        with self._lock:
+            self._last_access[os.path.basename(name)] = time.time()
+
+    def last_access(self, name: str, mtime: float) -> float:
+        """返回图像的最后访问时间，没有访问记录时使用文件修改时间"""
+        with self._lock:
+            return max(self._last_access.get(name, 0.0), mtime)
+
+    def _scan(self) -> list[tuple[str, int, float]]:
+        """列出图像目录中的文件：(文件名, 大小, 最后访问时间)
+
+        预压缩文件（*.gz）的大小计入对应原图，不单独参与淘汰。
+        """
+        sizes: dict[str, int] = {}
+        mtimes: dict[str, float] = {}
+        try:
+            with os.scandir(self.config.images_dir) as iterator:
+                for entry in iterator:
+                    if not entry.is_file() or entry.name.startswith("."):
+                        continue
+                    stat_result = entry.stat()
+                    name = entry.name
+                    if name.endswith(COMPRESSED_SUFFIX):
+                        name = name[: -len(COMPRESSED_SUFFIX)]
+                    else:
+                        mtimes[name] = stat_result.st_mtime
+                    sizes[name] = sizes.get(name, 0) + stat_result.st_size
+        except FileNotFoundError:
+            pass
+        return [
+            (name, size, self.last_access(name, mtimes.get(name, 0.0)))
+            for name, size in sizes.items()
+        ]
+
+    def _delete(self, name: str) -> bool:
+        path = os.path.join(self.config.images_dir, name)
+        try:
+            for candidate in (path, path + COMPRESSED_SUFFIX):
+                if os.path.exists(candidate):
+                    os.remove(candidate)
+        except OSError as e:
+            logger.warning(f"删除图像 {name} 失败: {e}")
+            return False
+        with self._lock:
+            self._last_access.pop(name, None)
+        return True
+
+    def sweep(self, now: float | None = None) -> SweepResult:
+        """执行一次清理
+
+        先删除超过最长保留时间的图像，再在总大小超限时按最后访问时间从旧到新淘汰。
+        最近检查点中仍被引用的图像始终保留；没有注册检查点保存器时，
+        改为保留最近 unreferenced_grace_hours 内访问过的图像。
+
+        Args:
+            now: 当前时间戳，默认使用 time.time()（便于测试）
+
+        Returns:
+            SweepResult: 清理结果
+        """
+        now = time.time() if now is None else now
+        result = SweepResult()
+
+        # 按最后访问时间从旧到新排序
+        entries = sorted(self._scan(), key=lambda item: item[2])
+
+        if self._without_checkpointer():
+            # 无法判断哪些图像仍被对话引用：只保护宽限期内访问过的图像，容量和保留时间仍然生效
+            self._warn_without_checkpointer()
+            grace = self.config.unreferenced_grace_seconds
+            protected = {name for name, _, accessed in entries if now - accessed <= grace}
+        else:
+            try:
+                protected = set(self.referenced_images_provider())
+            except Exception as e:
+                # 检查点暂时不可用时宁可不删，避免破坏仍在展示的对话
+                logger.warning(f"读取检查点引用的图像失败，本次跳过清理: {e}")
+                result.total_bytes = sum(size for _, size, _ in entries)
+                return result
+
+        total = sum(size for _, size, _ in entries)
+        remaining: list[tuple[str, int, float]] = []
+
+        for name, size, accessed in entries:
+            if name in protected:
+                result.protected += 1
+                continue
+            if now - accessed > self.config.max_age_seconds and self._delete(name):
+                result.deleted.append(name)
+                result.freed_bytes += size
+                total -= size
+            else:
+                remaining.append((name, size, accessed))
+
+        for name, size, _ in remaining:
+            if total <= self.config.max_total_bytes:
+                break
+            if self._delete(name):
+                result.deleted.append(name)
+                result.freed_bytes += size
+                total -= size
+
+        result.total_bytes = total
+        if result.deleted:
+            logger.info(
+                f"图像清理完成: 删除 {len(result.deleted)} 个文件，"
+                f"释放 {result.freed_bytes / 1024 / 1024:.1f} MB，"
+                f"剩余 {total / 1024 / 1024:.1f} MB"
+            )
+        return result
+
+    def start_background_sweeper(self) -> None:
+        """启动后台定时清理线程（重复调用无副作用）"""
+        if not self.config.enabled:
+            logger.info("图像生命周期管理已禁用，不启动后台清理")
+            return
+        if self._sweeper is not None and self._sweeper.is_alive():
+            return
+        if self._without_checkpointer():
+            self._warn_without_checkpointer()
+
+        self._stop_event.clear()
+
+        def run() -> None:
+            while not self._stop_event.wait(self.config.sweep_interval_seconds):
+                try:
+                    self.sweep()
+                except Exception as e:
+                    logger.error(f"后台图像清理出错: {e}")
+
+        self._sweeper = threading.Thread(
+            target=run, name="image-lifecycle-sweeper", daemon=True
+        )
+        self._sweeper.start()
+
+    def stop_background_sweeper(self) -> None:
+        """停止后台清理线程"""
+        self._stop_event.set()
+        if self._sweeper is not None:
+            self._sweeper.join(timeout=5)
+            self._sweeper = None
+
+
+# 全局图像生命周期管理器（app 与工具层共享）
+_image_manager: ImageLifecycleManager | None = None
+
+
+def get_image_manager() -> ImageLifecycleManager:
+    """获取全局图像生命周期管理器实例"""
+    global _image_manager
+    if _image_manager is None:
+        _image_manager = ImageLifecycleManager()
+    return _image_manager
@@ -0,0 +1,161 @@
+"""
+增量数据提取模块
+
+extract_data 每次刷新都会重新拉取整张表，持续增长的事实表越刷越慢。本模块为 extract_data 提供增量模式：
+- 指定 incremental_column（自增主键或更新时间列）后，首次提取为全量，并记录该列的高水位
+- 之后以相同的 SQL、数据源和列再次提取时，只查询 incremental_column 超过水位的行，合并到沙箱中已有的 DataFrame
+- 同时指定 key_columns 时，变更行按主键替换旧行（水位条件使用 >=，边界上的行去重），否则直接追加（条件使用 >）
+
+提取状态（SQL、数据源、列、水位）保存在 DataFrame 的 attrs 中，随变量一起写入命名空间快照，
+因此按会话（线程）和变量名隔离，服务重启后仍可继续增量刷新。
+
+注意：
+- 增量 SQL 将原查询包装为派生表再加水位条件，MySQL 会把条件合并进原查询，水位列有索引时只扫描增量部分；
+  原查询含 LIMIT / GROUP BY 等无法合并的结构时仍会完整执行
+- 源表中删除的行不会同步；需要时改为全量提取（不指定 incremental_column）
+"""
+
+from __future__ import annotations
+
+from dataclasses import asdict, dataclass, field
+from datetime import date, datetime
+from decimal import Decimal
+from typing import TYPE_CHECKING, Any, Callable
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+# DataFrame.attrs 中保存提取状态的键
+STATE_ATTR = "incremental_extract"
+
+
+class IncrementalExtractError(Exception):
+    """增量提取参数与结果不匹配（消息直接返回给模型）"""
+
+
+def _encode_watermark(value: Any) -> tuple[Any, str]:
+    """将水位转换为可写入 JSON（Parquet 元数据）的值和类型标记"""
+    if hasattr(value, "to_pydatetime"):  # pandas.Timestamp
+        value = value.to_pydatetime()
+    if hasattr(value, "item") and not isinstance(value, (str, bytes)):  # numpy 标量
+        value = value.item()
+    if isinstance(value, datetime):
+        return value.isoformat(), "datetime"
+    if isinstance(value, date):
+        return value.isoformat(), "date"
+    if isinstance(value, Decimal):
+        return str(value), "decimal"
+    if isinstance(value, bool):
+        raise IncrementalExtractError("增量列不能是布尔类型")
+    if isinstance(value, (int, float, str)):
+        return value, type(value).__name__
+    raise IncrementalExtractError(f"不支持的增量列类型: {type(value).__name__}")
+
+
+def _decode_watermark(value: Any, kind: str) -> Any:
+    if kind == "datetime":
+        return datetime.fromisoformat(value)
+    if kind == "date":
+        return date.fromisoformat(value)
+    if kind == "decimal":
+        return Decimal(value)
+    return value
+
+
+@dataclass
+class ExtractState:
+    """一次增量提取的状态"""
+
+    df_name: str
+    sql: str
+    source: str
+    column: str
+    key_columns: list[str] = field(default_factory=list)
+    # 已提取数据中 column 的最大值（JSON 编码）及其类型标记
+    watermark: Any = None
+    watermark_type: str = ""
+
+    def matches(self, other: "ExtractState") -> bool:
+        """是否为同一提取任务（SQL、数据源、列、主键均相同）"""
+        return (self.df_name, self.sql.strip(), self.source, self.column, self.key_columns) == (
+            other.df_name, other.sql.strip(), other.source, other.column, other.key_columns,
+        )
+
+    @property
+    def watermark_value(self) -> Any:
+        return _decode_watermark(self.watermark, self.watermark_type)
+
+    def advance(self, df: "pd.DataFrame") -> None:
+        """用 df 中 column 的最大值推进水位（只增不减）"""
+        if self.column not in df.columns:
+            raise IncrementalExtractError(
+                f"查询结果中没有增量列 {self.column}，可用的列: {', '.join(map(str, df.columns))}"
+            )
+        values = df[self.column].dropna()
+        if values.empty:
+            return
+        latest = values.max()
+        if self.watermark is None or latest > self.watermark_value:
+            self.watermark, self.watermark_type = _encode_watermark(latest)
+
+    @classmethod
+    def from_frame(cls, value: Any) -> "ExtractState | None":
+        """读取沙箱变量中保存的提取状态，不存在或格式不符时返回 None"""
+        attrs = getattr(value, "attrs", None)
+        state = attrs.get(STATE_ATTR) if isinstance(attrs, dict) else None
+        if not isinstance(state, dict):
+            return None
+        try:
+            return cls(**state)
+        except TypeError:
+            return None
+
+    def attach(self, df: "pd.DataFrame") -> None:
+        df.attrs[STATE_ATTR] = asdict(self)
+
+
+def _quote_identifier(name: str) -> str:
+    return "`" + name.replace("`", "``") + "`"
+
+
+def incremental_sql(state: ExtractState, escape: Callable[[Any], str]) -> str:
+    """构造只查询水位之后数据的 SQL
+
+    Args:
+        state: 提取状态（需已有水位）
+        escape: 将水位转换为 SQL 字面量的函数（pymysql 的 Connection.escape）
+    """
+    operator = ">=" if state.key_columns else ">"
+    inner = state.sql.strip().rstrip(";").rstrip()
+    return (
+        f"SELECT * FROM (\n{inner}\n) AS _incremental\n"
+        f"WHERE {_quote_identifier(state.column)} {operator} {escape(state.watermark_value)}"
+    )
+
+
+def merge_delta(
+    existing: "pd.DataFrame", delta: "pd.DataFrame", key_columns: list[str]
+) -> tuple["pd.DataFrame", int]:
+    """将增量合并到已有数据：有主键时替换同主键的旧行，否则追加
+
+    Returns:
+        (合并后的 DataFrame, 被替换的旧行数)
+    """
+    import pandas as pd
+
+    missing = [column for column in key_columns if column not in delta.columns]
+    if missing:
+        raise IncrementalExtractError(f"查询结果中没有主键列: {', '.join(missing)}")
+    if delta.empty:
+        return existing, 0
+
+    replaced = 0
+    if key_columns:
+        # 增量内部同一主键只保留最后一行
+        delta = delta.drop_duplicates(subset=key_columns, keep="last")
+        existing_keys = pd.MultiIndex.from_frame(existing[key_columns])
+        changed = existing_keys.isin(pd.MultiIndex.from_frame(delta[key_columns]))
+        replaced = int(changed.sum())
+        existing = existing[~changed]
+    merged = pd.concat([existing, delta], ignore_index=True)
+    return merged, replaced
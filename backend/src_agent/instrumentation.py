@@ -0,0 +1,370 @@
+"""
+性能埋点模块
+
+一轮对话变慢时，过去无法判断耗时来自 MySQL 查询、沙箱执行、savefig、Tavily 还是模型调用。
+本模块为工具调用、PythonSandbox.execute 和模型调用提供统一的埋点：
+- instrument() 上下文管理器记录墙钟时间、CPU 时间、进程峰值 RSS、返回行数/字节数和缓存命中
+- 同时输出 OpenTelemetry span（安装 opentelemetry-api 即可；未配置 SDK 时 span 为空操作，
+  配置 OTLP 导出器后即可在链路追踪系统中查看），嵌套调用形成父子 span
+- 进程内聚合为 Prometheus 文本格式指标，由 app.py 的 /metrics 路由暴露
+
+注意：
+- CPU 时间使用 time.thread_time()，只统计当前线程；异步代码中的埋点不记录 CPU 时间
+- 峰值 RSS 是进程级的高水位，按操作记录的是该操作期间高水位的增长量
+- 指标保存在进程内，多工作进程部署时需要分别抓取
+"""
+
+from __future__ import annotations
+
+import functools
+import logging
+import sys
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Callable, Iterator, TypeVar
+
+from src_agent.config.instrumentation_config import InstrumentationConfig
+
+logger = logging.getLogger(__name__)
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+# Prometheus 文本格式的 Content-Type
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# 当前正在记录的操作（嵌套调用时为最内层）
+_current_measurement: ContextVar["Measurement | None"] = ContextVar(
+    "current_measurement", default=None
+)
+
+
+def peak_rss_bytes() -> int | None:
+    """返回进程的峰值常驻内存（字节），无法获取时返回 None"""
+    try:
+        import resource
+    except ImportError:  # Windows
+        try:
+            import psutil
+
+            info = psutil.Process().memory_info()
+            return int(getattr(info, "peak_wset", info.rss))
+        except Exception:
+            return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 的单位是 KB，macOS 是字节
+    return int(peak if sys.platform == "darwin" else peak * 1024)
+
+
+@dataclass
+class Measurement:
+    """一次操作的埋点数据，被包裹的代码可以补充行数、字节数和属性"""
+
+    operation: str
+    attributes: dict[str, Any] = field(default_factory=dict)
+    rows: int | None = None
+    bytes: int | None = None
+    cache_hit: bool | None = None
+    status: str = "ok"
+    wall_seconds: float = 0.0
+    cpu_seconds: float | None = None
+    peak_rss_bytes: int | None = None
+    peak_rss_growth_bytes: int = 0
+
+    def set(self, **attributes: Any) -> None:
+        """补充 span 属性"""
+        self.attributes.update(attributes)
+
+
+def _escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(**labels: str) -> str:
+    return ",".join(f'{key}="{_escape_label(value)}"' for key, value in labels.items())
+
+
+# 计数器：内部键 -> (指标名, 说明, 标签名)
+_COUNTERS: list[tuple[str, str, str, tuple[str, ...]]] = [
+    (
+        "cpu_seconds",
+        "agent_operation_cpu_seconds_total",
+        "CPU time spent in the calling thread.",
+        ("operation",),
+    ),
+    ("rows", "agent_operation_rows_total", "Rows returned by operations.", ("operation",)),
+    ("bytes", "agent_operation_bytes_total", "Bytes returned by operations.", ("operation",)),
+    (
+        "rss_growth",
+        "agent_operation_peak_rss_growth_bytes_total",
+        "Growth of the process peak RSS during operations.",
+        ("operation",),
+    ),
+    ("cache", "agent_cache_requests_total", "Cache lookups by result.", ("cache", "result")),
+]
+
+
+def _format_number(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class MetricsRegistry:
+    """进程内指标聚合（线程安全），按 Prometheus 文本格式输出"""
+
+    def __init__(self, buckets: tuple[float, ...]):
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        """清空全部指标（用于测试）"""
+        with self._lock:
+            # (operation, status) -> [各分桶计数..., 总和, 总数]
+            self._durations: dict[tuple[str, str], list[float]] = {}
+            self._counters: dict[str, dict[tuple[str, ...], float]] = defaultdict(
+                lambda: defaultdict(float)
+            )
+            self._peak_rss: int | None = None
+
+    def observe(self, measurement: Measurement) -> None:
+        """记录一次操作"""
+        operation = measurement.operation
+        with self._lock:
+            key = (operation, measurement.status)
+            histogram = self._durations.get(key)
+            if histogram is None:
+                histogram = self._durations[key] = [0.0] * (len(self.buckets) + 2)
+            for index, bound in enumerate(self.buckets):
+                if measurement.wall_seconds <= bound:
+                    histogram[index] += 1
+            histogram[-2] += measurement.wall_seconds
+            histogram[-1] += 1
+
+            if measurement.cpu_seconds is not None:
+                self._counters["cpu_seconds"][(operation,)] += measurement.cpu_seconds
+            if measurement.rows is not None:
+                self._counters["rows"][(operation,)] += measurement.rows
+            if measurement.bytes is not None:
+                self._counters["bytes"][(operation,)] += measurement.bytes
+            if measurement.peak_rss_growth_bytes:
+                self._counters["rss_growth"][(operation,)] += measurement.peak_rss_growth_bytes
+            if measurement.peak_rss_bytes is not None:
+                self._peak_rss = max(self._peak_rss or 0, measurement.peak_rss_bytes)
+
+    def record_cache(self, cache: str, hit: bool) -> None:
+        """记录一次缓存查询"""
+        with self._lock:
+            self._counters["cache"][(cache, "hit" if hit else "miss")] += 1
+
+    def counter(self, name: str, *labels: str) -> float:
+        """读取计数器当前值（用于测试和调试）"""
+        with self._lock:
+            return self._counters[name].get(tuple(labels), 0.0)
+
+    def duration_count(self, operation: str, status: str = "ok") -> int:
+        """读取某个操作的调用次数"""
+        with self._lock:
+            histogram = self._durations.get((operation, status))
+            return int(histogram[-1]) if histogram else 0
+
+    def render(self) -> str:
+        """输出 Prometheus 文本格式"""
+        lines: list[str] = []
+        with self._lock:
+            lines += [
+                "# HELP agent_operation_duration_seconds Wall-clock time of tool calls, sandbox runs and model calls.",
+                "# TYPE agent_operation_duration_seconds histogram",
+            ]
+            for (operation, status), histogram in sorted(self._durations.items()):
+                labels = _labels(operation=operation, status=status)
+                for bound, count in zip(self.buckets, histogram):
+                    lines.append(
+                        f'agent_operation_duration_seconds_bucket{{{labels},le="{bound}"}} {int(count)}'
+                    )
+                lines.append(
+                    f'agent_operation_duration_seconds_bucket{{{labels},le="+Inf"}} {int(histogram[-1])}'
+                )
+                lines.append(
+                    f"agent_operation_duration_seconds_sum{{{labels}}} {_format_number(histogram[-2])}"
+                )
+                lines.append(
+                    f"agent_operation_duration_seconds_count{{{labels}}} {int(histogram[-1])}"
+                )
+
+            for key, metric, help_text, label_names in _COUNTERS:
+                lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} counter"]
+                for label_values, value in sorted(self._counters[key].items()):
+                    labels = _labels(**dict(zip(label_names, label_values)))
+                    lines.append(f"{metric}{{{labels}}} {_format_number(value)}")
+
+            lines += [
+                "# HELP agent_process_peak_rss_bytes Peak resident set size of the process.",
+                "# TYPE agent_process_peak_rss_bytes gauge",
+            ]
+            peak = peak_rss_bytes() or self._peak_rss
+            if peak is not None:
+                lines.append(f"agent_process_peak_rss_bytes {peak}")
+        return "\n".join(lines) + "\n"
+
+
+# 全局配置与指标实例
+_config: InstrumentationConfig | None = None
+_registry: MetricsRegistry | None = None
+_tracer: Any = None
+
+
+def get_instrumentation_config() -> InstrumentationConfig:
+    """获取全局埋点配置"""
+    global _config
+    if _config is None:
+        config = InstrumentationConfig.from_env()
+        config.validate()
+        _config = config
+    return _config
+
+
+def get_metrics_registry() -> MetricsRegistry:
+    """获取全局指标实例"""
+    global _registry
+    if _registry is None:
+        _registry = MetricsRegistry(get_instrumentation_config().latency_buckets)
+    return _registry
+
+
+def _get_tracer() -> Any:
+    """返回 OpenTelemetry tracer，未安装或已关闭时返回 None"""
+    global _tracer
+    if _tracer is None:
+        try:
+            from opentelemetry import trace
+        except ImportError:
+            _tracer = False
+        else:
+            _tracer = trace.get_tracer("src_agent")
+    return _tracer or None
+
+
+def current_measurement() -> Measurement | None:
+    """返回当前正在记录的操作（不在埋点范围内时返回 None）"""
+    return _current_measurement.get()
+
+
+def record_cache(cache: str, hit: bool) -> None:
+    """记录一次缓存查询，同时标记到当前操作上"""
+    if not get_instrumentation_config().enabled:
+        return
+    get_metrics_registry().record_cache(cache, hit)
+    measurement = current_measurement()
+    if measurement is not None:
+        measurement.set(**{f"cache.{cache}.hit": hit})
+        if measurement.cache_hit is None or not hit:
+            measurement.cache_hit = hit
+
+
+def _span_attributes(measurement: Measurement) -> dict[str, Any]:
+    attributes = {
+        key: value
+        for key, value in measurement.attributes.items()
+        if isinstance(value, (str, bool, int, float))
+    }
+    attributes["agent.wall_seconds"] = measurement.wall_seconds
+    if measurement.cpu_seconds is not None:
+        attributes["agent.cpu_seconds"] = measurement.cpu_seconds
+    if measurement.rows is not None:
+        attributes["agent.rows"] = measurement.rows
+    if measurement.bytes is not None:
+        attributes["agent.bytes"] = measurement.bytes
+    if measurement.cache_hit is not None:
+        attributes["agent.cache_hit"] = measurement.cache_hit
+    if measurement.peak_rss_bytes is not None:
+        attributes["process.peak_rss_bytes"] = measurement.peak_rss_bytes
+        attributes["agent.peak_rss_growth_bytes"] = measurement.peak_rss_growth_bytes
+    return attributes
+
+
+@contextmanager
+def instrument(
+    operation: str, *, measure_cpu: bool = True, **attributes: Any
+) -> Iterator[Measurement]:
+    """记录一次操作的耗时和资源使用
+
+    Args:
+        operation: 操作名称（如 tool.sql_inter、sandbox.execute）
+        measure_cpu: 是否记录当前线程的 CPU 时间（异步代码中应关闭）
+        **attributes: 附加到 span 上的属性
+
+    Yields:
+        Measurement，被包裹的代码可以设置 rows/bytes/cache_hit 或补充属性
+    """
+    measurement = Measurement(operation, dict(attributes))
+    config = get_instrumentation_config()
+    if not config.enabled:
+        yield measurement
+        return
+
+    tracer = _get_tracer() if config.otel_enabled else None
+    span_context = None
+    span = None
+    if tracer is not None:
+        from opentelemetry import trace
+
+        span = tracer.start_span(operation)
+        span_context = trace.use_span(span, end_on_exit=True)
+        span_context.__enter__()
+
+    token = _current_measurement.set(measurement)
+    rss_before = peak_rss_bytes()
+    cpu_start = time.thread_time() if measure_cpu else None
+    started = time.perf_counter()
+    error: BaseException | None = None
+    try:
+        yield measurement
+    except BaseException as e:
+        measurement.status = "error"
+        error = e
+        raise
+    finally:
+        measurement.wall_seconds = time.perf_counter() - started
+        if cpu_start is not None:
+            measurement.cpu_seconds = time.thread_time() - cpu_start
+        measurement.peak_rss_bytes = peak_rss_bytes()
+        if rss_before is not None and measurement.peak_rss_bytes is not None:
+            measurement.peak_rss_growth_bytes = max(measurement.peak_rss_bytes - rss_before, 0)
+        _current_measurement.reset(token)
+
+        get_metrics_registry().observe(measurement)
+        if span is not None:
+            from opentelemetry.trace import Status, StatusCode
+
+            span.set_attributes(_span_attributes(measurement))
+            if error is not None:
+                span.record_exception(error)
+                span.set_status(Status(StatusCode.ERROR, str(error)))
+            span_context.__exit__(None, None, None)
+
+
+def instrumented(operation: str) -> Callable[[F], F]:
+    """同步函数的埋点装饰器；返回字符串时自动记录返回的字节数
+
+    放在 @tool 之下使用，保留函数签名和文档字符串：
+
+        @tool(args_schema=...)
+        @instrumented("tool.sql_inter")
+        def sql_inter(...): ...
+    """
+
+    def decorator(func: F) -> F:
+        @functools.wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            with instrument(operation) as measurement:
+                result = func(*args, **kwargs)
+                if measurement.bytes is None and isinstance(result, str):
+                    measurement.bytes = len(result.encode("utf-8"))
+                return result
+
+        return wrapper  # type: ignore[return-value]
+
+    return decorator
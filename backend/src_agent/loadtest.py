@@ -0,0 +1,241 @@
+"""
+代理端到端压测模块
+
+每次运行代理都要调用付费的 LLM，无法离线评估一个后端能承载多少并发线程。本模块用脚本化假模型
+（见 fake_model.py）驱动 graph.py 中的代理，在 N 个 LangGraph 线程上并发回放固定的工具调用序列，
+并报告每轮对话的 p50/p95/p99 延迟、吞吐量和进程内存，用于容量规划和验证并发相关的修复。
+
+运行（在 backend 目录下）：
+    python -m src_agent.loadtest --threads 20 --concurrency 8 --turns 2 --script mixed
+    python -m src_agent.loadtest --threads 50 --model-latency-ms 800 --json
+
+sql 脚本需要可访问的 MySQL（MYSQL_* 环境变量），其余脚本只使用沙箱和绘图工具。
+工作区、快照、artifact 和图像默认写入临时目录，运行结束后删除（--keep-files 保留）。
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import sys
+import tempfile
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Any, Sequence
+
+from langchain_core.messages import HumanMessage, ToolMessage
+
+
+def percentile(values: Sequence[float], q: float) -> float:
+    """按最近秩法计算百分位数（q 取 0~100），空序列返回 0"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(math.ceil(q / 100 * len(ordered)), 1)
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def _rss_bytes() -> int | None:
+    try:
+        import psutil
+
+        return int(psutil.Process().memory_info().rss)
+    except Exception:
+        return None
+
+
+@dataclass
+class LoadTestReport:
+    """一次压测的结果"""
+
+    threads: int
+    concurrency: int
+    turns: int
+    script: str
+    duration_seconds: float
+    latencies: list[float] = field(default_factory=list)  # 每轮对话的耗时（秒）
+    failed_turns: int = 0  # 抛出异常的轮次
+    tool_calls: int = 0
+    tool_errors: int = 0  # status="error" 的工具结果
+    rss_start_bytes: int | None = None
+    rss_end_bytes: int | None = None
+    peak_rss_bytes: int | None = None
+    errors: list[str] = field(default_factory=list)  # 前若干条异常信息
+
+    @property
+    def completed_turns(self) -> int:
+        return len(self.latencies)
+
+    @property
+    def throughput(self) -> float:
+        """每秒完成的对话轮数"""
+        return self.completed_turns / self.duration_seconds if self.duration_seconds > 0 else 0.0
+
+    def to_dict(self) -> dict[str, Any]:
+        data = asdict(self)
+        data.pop("latencies")
+        data.update(
+            completed_turns=self.completed_turns,
+            throughput_turns_per_second=round(self.throughput, 3),
+            latency_seconds={
+                "p50": round(percentile(self.latencies, 50), 4),
+                "p95": round(percentile(self.latencies, 95), 4),
+                "p99": round(percentile(self.latencies, 99), 4),
+                "max": round(max(self.latencies, default=0.0), 4),
+            },
+        )
+        return data
+
+    def format(self) -> str:
+        def mb(value: int | None) -> str:
+            return "n/a" if value is None else f"{value / 1024 / 1024:.1f} MB"
+
+        lines = [
+            f"脚本: {self.script}  线程: {self.threads}  并发: {self.concurrency}  每线程轮数: {self.turns}",
+            f"完成轮次: {self.completed_turns}  失败轮次: {self.failed_turns}  "
+            f"工具调用: {self.tool_calls}（失败 {self.tool_errors}）",
+            f"总耗时: {self.duration_seconds:.2f}s  吞吐量: {self.throughput:.2f} 轮/秒",
+            f"延迟: p50={percentile(self.latencies, 50):.3f}s  p95={percentile(self.latencies, 95):.3f}s  "
+            f"p99={percentile(self.latencies, 99):.3f}s  max={max(self.latencies, default=0.0):.3f}s",
+            f"内存: RSS {mb(self.rss_start_bytes)} -> {mb(self.rss_end_bytes)}  峰值 {mb(self.peak_rss_bytes)}",
+        ]
+        lines += [f"异常: {error}" for error in self.errors]
+        return "\n".join(lines)
+
+
+async def run_load_test(
+    graph: Any,
+    threads: int,
+    concurrency: int,
+    turns: int = 1,
+    script: str = "mixed",
+    prompt: str = "请分析销售数据并绘制图表",
+) -> LoadTestReport:
+    """在 threads 个线程上并发运行代理，同时运行的线程不超过 concurrency 个
+
+    Args:
+        graph: 带检查点的已编译代理（多轮对话依赖检查点保存历史）
+        threads: 线程（会话）数
+        concurrency: 同时运行的线程数上限
+        turns: 每个线程依次发送的用户消息数
+        script: 报告中记录的脚本名（脚本本身由假模型决定）
+        prompt: 每轮发送的用户消息
+    """
+    from src_agent.instrumentation import peak_rss_bytes
+
+    semaphore = asyncio.Semaphore(concurrency)
+    report = LoadTestReport(threads, concurrency, turns, script, 0.0, rss_start_bytes=_rss_bytes())
+    run_id = f"{int(time.time())}-{os.getpid()}"
+
+    async def run_thread(index: int) -> None:
+        config = {"configurable": {"thread_id": f"loadtest-{run_id}-{index}"}}
+        async with semaphore:
+            for turn in range(turns):
+                started = time.perf_counter()
+                try:
+                    result = await graph.ainvoke(
+                        {"messages": [HumanMessage(f"{prompt}（第 {turn + 1} 轮）")]}, config
+                    )
+                except Exception as e:
+                    report.failed_turns += 1
+                    if len(report.errors) < 5:
+                        report.errors.append(f"{type(e).__name__}: {e}")
+                    return
+                report.latencies.append(time.perf_counter() - started)
+                # 只统计本轮新增的工具结果
+                messages = result["messages"]
+                last_human = max(
+                    i for i, message in enumerate(messages) if isinstance(message, HumanMessage)
+                )
+                for message in messages[last_human + 1 :]:
+                    if isinstance(message, ToolMessage):
+                        report.tool_calls += 1
+                        report.tool_errors += message.status == "error"
+
+    started = time.perf_counter()
+    await asyncio.gather(*(run_thread(index) for index in range(threads)))
+    report.duration_seconds = time.perf_counter() - started
+    report.rss_end_bytes = _rss_bytes()
+    report.peak_rss_bytes = peak_rss_bytes()
+    return report
+
+
+def _isolate_files(directory: str) -> None:
+    """将沙箱工作区、快照、artifact 和图像目录指向 directory，避免污染开发目录"""
+    from src_agent import sandbox_sessions
+    from src_agent.config.sandbox_config import SandboxConfig
+    from src_agent.image_lifecycle import get_image_manager
+
+    os.environ["ARTIFACTS_DIR"] = os.path.join(directory, "artifacts")
+    config = SandboxConfig.from_env()
+    config.sandbox_workspace = os.path.join(directory, "workspace")
+    config.snapshot_dir = os.path.join(directory, "snapshots")
+    sandbox_sessions._session_manager = sandbox_sessions.SandboxSessionManager(config)
+    get_image_manager().config.images_dir = os.path.join(directory, "images")
+
+
+def _parse_args(argv: Sequence[str] | None) -> argparse.Namespace:
+    from src_agent.fake_model import SCRIPTS
+
+    parser = argparse.ArgumentParser(description="使用脚本化假模型对代理进行并发压测")
+    parser.add_argument("--threads", type=int, default=10, help="线程（会话）数")
+    parser.add_argument("--concurrency", type=int, default=None, help="同时运行的线程数，默认等于 --threads")
+    parser.add_argument("--turns", type=int, default=1, help="每个线程的对话轮数")
+    parser.add_argument("--script", choices=sorted(SCRIPTS), default="mixed", help="假模型回放的工具调用脚本")
+    parser.add_argument("--model-latency-ms", type=float, default=None, help="模拟的模型响应延迟（毫秒）")
+    parser.add_argument("--json", action="store_true", help="以 JSON 输出结果")
+    parser.add_argument("--keep-files", action="store_true", help="保留工作区、图像等临时文件")
+    args = parser.parse_args(argv)
+    if args.threads <= 0 or args.turns <= 0 or (args.concurrency or 1) <= 0:
+        parser.error("--threads、--concurrency 和 --turns 必须为正数")
+    return args
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    args = _parse_args(argv)
+
+    # 先加载 .env，再覆盖模型配置（graph 导入时不会再次加载 .env）
+    from src_agent.env import load_env
+
+    load_env()
+    os.environ["DEFAULT_MODEL"] = "fake"
+    os.environ["FAKE_MODEL_SCRIPT"] = args.script
+    os.environ.pop("SUMMARY_MODEL", None)
+    if args.model_latency_ms is not None:
+        os.environ["FAKE_MODEL_LATENCY_MS"] = str(args.model_latency_ms)
+
+    directory = tempfile.mkdtemp(prefix="agent-loadtest-")
+    _isolate_files(directory)
+
+    from langgraph.checkpoint.memory import InMemorySaver
+
+    from src_agent.graph import build_agent
+
+    graph = build_agent(checkpointer=InMemorySaver())
+    try:
+        report = asyncio.run(
+            run_load_test(
+                graph,
+                threads=args.threads,
+                concurrency=args.concurrency or args.threads,
+                turns=args.turns,
+                script=args.script,
+            )
+        )
+    finally:
+        if args.keep_files:
+            print(f"临时文件保留在: {directory}", file=sys.stderr)
+        else:
+            import shutil
+
+            shutil.rmtree(directory, ignore_errors=True)
+
+    print(json.dumps(report.to_dict(), ensure_ascii=False, indent=2) if args.json else report.format())
+    return 1 if report.failed_turns else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,348 @@
+"""
+本地 SQL 引擎模块
+
+过去 SQL 只能查询 MySQL，代理为了筛选、聚合 data/ 下的文件，只能用 pandas 把整个 CSV 读入内存。
+本模块基于嵌入式 DuckDB（向量化执行，超出内存上限时溢出到磁盘）提供只读 SQL 查询：
+- DATASET_CATALOG 中的每个数据集、共享数据目录中的每个 CSV / Parquet / JSON / Excel 文件都是一张表
+- 文件直接作为视图查询，不预先加载；数据集的数值/日期列转换、删除和重命名列在视图中用 SQL 表达
+- DuckDB 无法直接读取的数据集（Excel、多级表头、自定义 pandas 读取参数）在首次被查询时
+  通过 load_dataset 读取并物化为表
+- 只允许单条只读语句（SELECT / WITH / DESCRIBE / SHOW / SUMMARIZE / EXPLAIN），
+  文件访问限制在数据目录内，配置锁定后不能被查询修改
+
+数据目录中的文件新增、删除或修改后，下一次查询时自动刷新表。
+"""
+
+from __future__ import annotations
+
+import logging
+import re
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Callable
+
+from src_agent.config.local_sql_config import LocalSQLConfig
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# DuckDB 可直接读取的文件类型 -> 表函数
+_DIRECT_READERS = {
+    ".csv": "read_csv_auto",
+    ".tsv": "read_csv_auto",
+    ".parquet": "read_parquet",
+    ".json": "read_json_auto",
+    ".jsonl": "read_json_auto",
+    ".ndjson": "read_json_auto",
+}
+# 需要通过 pandas 读取并物化的文件类型
+_PANDAS_SUFFIXES = {".xlsx", ".xls"}
+
+
+class LocalSQLError(Exception):
+    """本地 SQL 查询被拒绝或执行失败"""
+
+
+@dataclass
+class LocalTable:
+    """本地 SQL 引擎中的一张表"""
+
+    name: str
+    path: Path
+    dataset: str | None = None  # 来自 DATASET_CATALOG 时为数据集名称
+    materialized: bool = False  # 是否需要经 pandas 读取并物化（否则为直接读取文件的视图）
+
+
+@dataclass
+class LocalQueryResult:
+    """查询结果（行数超过上限时只保留前 max_rows 行）"""
+
+    description: list[tuple[Any, ...]]
+    rows: list[tuple[Any, ...]]
+    truncated: bool
+
+
+def table_name(text: str) -> str:
+    """将数据集名或文件名转换为表名：小写，非字母数字（保留中文）替换为下划线"""
+    name = re.sub(r"[^0-9a-z_一-鿿]+", "_", text.lower()).strip("_") or "table"
+    return f"t_{name}" if name[0].isdigit() else name
+
+
+def _quote(identifier: str) -> str:
+    return '"' + identifier.replace('"', '""') + '"'
+
+
+def _literal(text: str) -> str:
+    return "'" + text.replace("'", "''") + "'"
+
+
+def _needs_pandas(config: Any, path: Path) -> bool:
+    """数据集配置中包含 DuckDB 读取函数无法表达的选项时，需要经 pandas 读取"""
+    return (
+        path.suffix.lower() not in _DIRECT_READERS
+        or bool(config.reader_kwargs)
+        or config.header_row is not None
+        or bool(config.header_rows)
+        or config.multiheader_depth is not None
+        or config.skiprows is not None
+        or config.drop_unnamed_columns
+    )
+
+
+def _file_signature(path: Path) -> tuple[int, int]:
+    try:
+        stat = path.stat()
+    except OSError:
+        return (0, 0)
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+class LocalSQLEngine:
+    """基于 DuckDB 的本地只读 SQL 引擎（线程安全，每次查询使用独立游标）"""
+
+    def __init__(self, config: LocalSQLConfig | None = None):
+        """
+        Args:
+            config: 引擎配置，如果为None则从环境变量读取
+        """
+        self.config = config or LocalSQLConfig.from_env()
+        self.config.validate()
+        self._lock = threading.RLock()
+        self._conn: Any = None
+        self._allowed_dirs: list[Path] = []
+        self._tables: dict[str, LocalTable] = {}
+        # 表名 -> 创建时的文件签名（视图和已物化的表）
+        self._created: dict[str, tuple[int, int]] = {}
+        self._signature: tuple | None = None
+
+    def _connect(self) -> Any:
+        """创建 DuckDB 连接，并将文件访问限制在数据目录（及数据集所在目录）内"""
+        import duckdb
+
+        from src_agent.data_loader import DATASET_CATALOG
+
+        settings: dict[str, Any] = {
+            "memory_limit": f"{self.config.memory_limit_mb}MB",
+            "temp_directory": self.config.temp_dir,
+        }
+        if self.config.threads:
+            settings["threads"] = self.config.threads
+        conn = duckdb.connect(":memory:", config=settings)
+
+        allowed = {Path(self.config.data_dir).resolve(), Path(self.config.temp_dir).resolve()}
+        allowed |= {dataset.resolve_path().parent for dataset in DATASET_CATALOG.values()}
+        self._allowed_dirs = sorted(allowed)
+        directories = ", ".join(_literal(str(directory)) for directory in self._allowed_dirs)
+        conn.execute(f"SET allowed_directories = [{directories}]")
+        conn.execute("SET enable_external_access = false")
+        # 锁定配置，查询中的 SET 语句无法重新打开文件访问或调整资源上限
+        conn.execute("SET lock_configuration = true")
+        return conn
+
+    def _is_allowed(self, path: Path) -> bool:
+        return any(path.is_relative_to(directory) for directory in self._allowed_dirs)
+
+    def _discover(self) -> dict[str, LocalTable]:
+        """列出数据集和数据目录中的文件，返回 表名 -> 表"""
+        from src_agent.data_loader import DATASET_CATALOG
+
+        tables: dict[str, LocalTable] = {}
+        covered: set[Path] = set()
+        for key, dataset in sorted(DATASET_CATALOG.items()):
+            path = dataset.resolve_path()
+            if not path.exists():
+                continue
+            materialized = _needs_pandas(dataset, path) or not self._is_allowed(path)
+            tables[table_name(key)] = LocalTable(table_name(key), path, key, materialized)
+            covered.add(path)
+
+        data_dir = Path(self.config.data_dir).resolve()
+        for path in sorted(data_dir.iterdir()) if data_dir.is_dir() else []:
+            suffix = path.suffix.lower()
+            if not path.is_file() or path in covered:
+                continue
+            if suffix not in _DIRECT_READERS and suffix not in _PANDAS_SUFFIXES:
+                continue
+            name = table_name(path.stem)
+            if name in tables:
+                # 同名不同后缀的文件（如 sales.csv 与 sales.xlsx）
+                name = f"{name}_{suffix.lstrip('.')}"
+            tables[name] = LocalTable(name, path, None, suffix in _PANDAS_SUFFIXES)
+        return tables
+
+    def _drop(self, name: str) -> None:
+        kind = "TABLE" if self._tables.get(name, LocalTable(name, Path())).materialized else "VIEW"
+        self._conn.execute(f"DROP {kind} IF EXISTS {_quote(name)}")
+        self._created.pop(name, None)
+
+    def _view_sql(self, table: LocalTable) -> str:
+        """生成直接读取文件的视图定义；数据集的列配置转换为 TRY_CAST、删除和重命名"""
+        reader = f"{_DIRECT_READERS[table.path.suffix.lower()]}({_literal(str(table.path))})"
+        if table.dataset is None:
+            return f"SELECT * FROM {reader}"
+
+        from src_agent.data_loader import DATASET_CATALOG
+
+        dataset = DATASET_CATALOG[table.dataset]
+        columns = [row[0] for row in self._conn.execute(f"DESCRIBE SELECT * FROM {reader}").fetchall()]
+        mapping = dict(dataset.column_mapping or {})
+        select = []
+        for column in columns:
+            if column in dataset.drop_columns:
+                continue
+            expression = _quote(column)
+            if column in dataset.numeric_columns:
+                expression = f"TRY_CAST({expression} AS DOUBLE)"
+            elif column in dataset.datetime_columns:
+                expression = f"TRY_CAST({expression} AS TIMESTAMP)"
+            select.append(f"{expression} AS {_quote(mapping.get(column, column))}")
+        return f"SELECT {', '.join(select) or '*'} FROM {reader}"
+
+    def _refresh(self) -> None:
+        """数据目录或数据集变化时重建视图（需持有锁）"""
+        if self._conn is None:
+            self._conn = self._connect()
+        tables = self._discover()
+        signature = tuple(
+            (name, str(table.path), _file_signature(table.path)) for name, table in tables.items()
+        )
+        if signature == self._signature:
+            return
+
+        for name in list(self._created):
+            table = tables.get(name)
+            if (
+                table is None
+                or table.path != self._tables[name].path
+                or table.materialized != self._tables[name].materialized
+                or _file_signature(table.path) != self._created[name]
+            ):
+                self._drop(name)
+        self._tables = tables
+        for name, table in tables.items():
+            if table.materialized or name in self._created:
+                continue
+            try:
+                self._conn.execute(f"CREATE OR REPLACE VIEW {_quote(name)} AS {self._view_sql(table)}")
+                self._created[name] = _file_signature(table.path)
+            except Exception as e:
+                logger.warning(f"无法将 {table.path} 注册为表 {name}: {e}")
+        self._signature = signature
+
+    def _materialize(self, sql: str) -> None:
+        """将查询中引用的、尚未物化的表经 pandas 读取后写入 DuckDB（需持有锁）"""
+        for name, table in self._tables.items():
+            if not table.materialized or name in self._created:
+                continue
+            if not re.search(rf"(?<![\w]){re.escape(name)}(?![\w])", sql, re.IGNORECASE):
+                continue
+            try:
+                df = self._read_with_pandas(table)
+            except Exception as e:
+                raise LocalSQLError(f"读取 {table.path.name} 失败: {e}") from e
+            self._conn.register("_local_sql_frame", df)
+            try:
+                self._conn.execute(
+                    f"CREATE OR REPLACE TABLE {_quote(name)} AS SELECT * FROM _local_sql_frame"
+                )
+            finally:
+                self._conn.unregister("_local_sql_frame")
+            self._created[name] = _file_signature(table.path)
+            logger.info(f"已将 {table.path.name} 物化为表 {name}（{len(df):,} 行）")
+
+    @staticmethod
+    def _read_with_pandas(table: LocalTable) -> "pd.DataFrame":
+        import pandas as pd
+
+        from src_agent.data_loader import load_dataset
+
+        if table.dataset is not None:
+            return load_dataset(table.dataset, copy=False)
+        return pd.read_excel(table.path)
+
+    @staticmethod
+    def _check_statement(sql: str) -> None:
+        """只允许单条只读语句"""
+        import duckdb
+
+        try:
+            statements = duckdb.extract_statements(sql)
+        except duckdb.Error as e:
+            raise LocalSQLError(str(e)) from e
+        if len(statements) != 1:
+            raise LocalSQLError("一次只能执行一条查询语句")
+        if statements[0].type not in (duckdb.StatementType.SELECT, duckdb.StatementType.EXPLAIN):
+            raise LocalSQLError("只允许只读查询（SELECT / WITH / DESCRIBE / SHOW / SUMMARIZE / EXPLAIN）")
+
+    def _run(self, sql: str, fetch: Callable[[Any], Any]) -> Any:
+        import duckdb
+
+        self._check_statement(sql)
+        with self._lock:
+            self._refresh()
+            self._materialize(sql)
+            cursor = self._conn.cursor()
+        # 超时后中断查询（DuckDB 在算子之间检查中断标志）
+        timer = threading.Timer(self.config.timeout_seconds, cursor.interrupt)
+        timer.daemon = True
+        timer.start()
+        try:
+            cursor.execute(sql)
+            return fetch(cursor)
+        except duckdb.InterruptException as e:
+            raise LocalSQLError(
+                f"查询超过 {self.config.timeout_seconds:g} 秒被中断，请缩小数据范围或先聚合"
+            ) from e
+        except duckdb.Error as e:
+            raise LocalSQLError(str(e)) from e
+        finally:
+            timer.cancel()
+            cursor.close()
+
+    def query(self, sql: str, max_rows: int | None = None) -> LocalQueryResult:
+        """执行查询，最多返回 max_rows 行（默认 max_result_rows）"""
+        limit = max_rows or self.config.max_result_rows
+
+        def fetch(cursor: Any) -> LocalQueryResult:
+            rows = cursor.fetchmany(limit + 1)
+            return LocalQueryResult(list(cursor.description or []), rows[:limit], len(rows) > limit)
+
+        return self._run(sql, fetch)
+
+    def query_df(self, sql: str) -> "pd.DataFrame":
+        """执行查询并以 DataFrame 返回完整结果"""
+        return self._run(sql, lambda cursor: cursor.df())
+
+    def tables(self) -> list[LocalTable]:
+        """返回当前可查询的表"""
+        with self._lock:
+            self._refresh()
+            return list(self._tables.values())
+
+    def close(self) -> None:
+        """关闭连接（下次查询时重新创建）"""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+            self._conn = None
+            self._tables = {}
+            self._created = {}
+            self._signature = None
+
+
+# 全局本地 SQL 引擎实例（首次查询时创建连接）
+_local_sql_engine: LocalSQLEngine | None = None
+_engine_lock = threading.Lock()
+
+
+def get_local_sql_engine() -> LocalSQLEngine:
+    """获取全局本地 SQL 引擎实例"""
+    global _local_sql_engine
+    if _local_sql_engine is None:
+        with _engine_lock:
+            if _local_sql_engine is None:
+                _local_sql_engine = LocalSQLEngine()
+    return _local_sql_engine
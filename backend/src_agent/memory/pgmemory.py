@@ -1,10 +1,135 @@
-from langgraph.checkpoint.postgres import PostgresSaver
+"""
+对话检查点持久化模块
+
+PostgresSaver.from_conn_string 只打开一条连接，所有运行的检查点读写都会在这条连接上串行。
+本模块提供生产可用的检查点保存器：
+- Postgres 后端使用 psycopg_pool.AsyncConnectionPool + AsyncPostgresSaver，连接池大小可配置
+- SQLite 后端（AsyncSqliteSaver）作为本地开发和测试的替身
+- 启动时执行建表/迁移，并把保存器登记到图像生命周期管理器（保护最近检查点引用的图像）
+
+在 LangGraph 服务中启用（langgraph.json）：
+    "checkpointer": {"backend": "custom", "path": "./src_agent/memory/pgmemory.py:make_checkpointer"}
+"""
+
+from __future__ import annotations
+
+import logging
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator
+
+from src_agent.config.checkpointer_config import CheckpointerConfig
+
+logger = logging.getLogger(__name__)
+
+# 当前进程中已打开的检查点保存器
+_active_checkpointer: Any = None
 
 
 class PGMemory:
+    """单连接的同步 Postgres 检查点（保留用于脚本和兼容旧代码）"""
+
     def __init__(self, connection_string: str):
         self.db_uri = connection_string
         self.checkpointer = self._get_checkpointer()
 
     def _get_checkpointer(self):
+        from langgraph.checkpoint.postgres import PostgresSaver
+
         return PostgresSaver.from_conn_string(self.db_uri)
+
+
+@asynccontextmanager
+async def _open_postgres(config: CheckpointerConfig) -> AsyncIterator[Any]:
+    """打开 Postgres 连接池并返回基于连接池的异步保存器"""
+    from langgraph.checkpoint.postgres.aio import AsyncPostgresSaver
+    from psycopg.rows import dict_row
+    from psycopg_pool import AsyncConnectionPool
+
+    pool = AsyncConnectionPool(
+        conninfo=config.uri,
+        min_size=config.pool_min_size,
+        max_size=config.pool_max_size,
+        timeout=config.pool_timeout,
+        max_idle=config.pool_max_idle,
+        # AsyncPostgresSaver 要求自动提交和字典行；关闭预编译语句以兼容 PgBouncer
+        kwargs={"autocommit": True, "prepare_threshold": 0, "row_factory": dict_row},
+        # 取出连接前检查连接是否仍然可用（数据库重启后自动替换失效连接）
+        check=AsyncConnectionPool.check_connection,
+        open=False,
+    )
+    await pool.open(wait=True, timeout=config.pool_timeout)
+    try:
+        yield AsyncPostgresSaver(pool)
+    finally:
+        await pool.close()
+
+
+@asynccontextmanager
+async def _open_sqlite(config: CheckpointerConfig) -> AsyncIterator[Any]:
+    """打开 SQLite 异步保存器（本地开发和测试替身）"""
+    from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+
+    async with AsyncSqliteSaver.from_conn_string(config.uri) as saver:
+        yield saver
+
+
+@asynccontextmanager
+async def open_checkpointer(
+    config: CheckpointerConfig | None = None,
+) -> AsyncIterator[Any]:
+    """打开检查点保存器，退出时关闭连接池。
+
+    Args:
+        config: 检查点配置，如果为None则从环境变量读取
+
+    Yields:
+        异步检查点保存器；backend 为 none 时为 None
+    """
+    global _active_checkpointer
+    from src_agent.env import load_env
+
+    if config is None:
+        load_env()
+        config = CheckpointerConfig.from_env()
+    config.validate()
+
+    if config.backend == "none":
+        yield None
+        return
+
+    opener = _open_postgres if config.backend == "postgres" else _open_sqlite
+    async with opener(config) as saver:
+        if config.setup_on_startup:
+            await saver.setup()
+        logger.info(f"已启用 {config.backend} 检查点持久化")
+
+        from src_agent.image_lifecycle import get_image_manager
+
+        # 图像清理任务会扫描最近检查点，保护仍被引用的图像
+        get_image_manager().register_checkpointer(saver)
+        _active_checkpointer = saver
+        try:
+            yield saver
+        finally:
+            _active_checkpointer = None
+            get_image_manager().register_checkpointer(None)
+
+
+def get_checkpointer() -> Any:
+    """返回当前进程中已打开的检查点保存器，未启用时为 None"""
+    return _active_checkpointer
+
+
+@asynccontextmanager
+async def make_checkpointer() -> AsyncIterator[Any]:
+    """LangGraph 服务的自定义检查点入口（langgraph.json 的 checkpointer.path）"""
+    from src_agent.env import load_env
+
+    load_env()
+    config = CheckpointerConfig.from_env()
+    if config.backend == "none":
+        raise ValueError(
+            "langgraph.json 启用了自定义检查点，但未配置 CHECKPOINTER_URI / CHECKPOINTER_BACKEND"
+        )
+    async with open_checkpointer(config) as saver:
+        yield saver
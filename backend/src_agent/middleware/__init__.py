@@ -0,0 +1,8 @@
+"""
+代理中间件包
+"""
+
+from src_agent.middleware.model_instrumentation import ModelCallInstrumentationMiddleware
+from src_agent.middleware.tool_compaction import ToolResultCompactionMiddleware
+
+__all__ = ["ModelCallInstrumentationMiddleware", "ToolResultCompactionMiddleware"]
@@ -0,0 +1,69 @@
+"""
+模型调用埋点中间件
+
+为每次模型调用记录耗时（见 instrumentation.py），与工具调用使用同一组指标和 span，
+从而可以直接比较一轮对话中模型与各工具的耗时占比。token 用量记录为 span 属性。
+"""
+
+from __future__ import annotations
+
+from typing import Awaitable, Callable
+
+from langchain.agents.middleware import AgentMiddleware, ModelRequest, ModelResponse
+from langchain_core.messages import AIMessage
+
+from src_agent.instrumentation import Measurement, instrument
+
+# 模型调用在指标中的操作名称
+MODEL_OPERATION = "model.call"
+
+
+def _model_name(request: ModelRequest) -> str:
+    model = request.model
+    for attribute in ("model_name", "model"):
+        value = getattr(model, attribute, None)
+        if isinstance(value, str):
+            return value
+    return type(model).__name__
+
+
+def _record_usage(measurement: Measurement, response: ModelResponse) -> None:
+    for message in response.result:
+        if isinstance(message, AIMessage) and message.usage_metadata:
+            usage = message.usage_metadata
+            measurement.set(
+                **{
+                    "gen_ai.usage.input_tokens": usage.get("input_tokens", 0),
+                    "gen_ai.usage.output_tokens": usage.get("output_tokens", 0),
+                }
+            )
+            measurement.bytes = len(message.text.encode("utf-8"))
+
+
+class ModelCallInstrumentationMiddleware(AgentMiddleware):
+    """记录模型调用耗时和 token 用量的中间件"""
+
+    def wrap_model_call(
+        self,
+        request: ModelRequest,
+        handler: Callable[[ModelRequest], ModelResponse],
+    ) -> ModelResponse:
+        with instrument(MODEL_OPERATION, **{"gen_ai.request.model": _model_name(request)}) as m:
+            response = handler(request)
+            _record_usage(m, response)
+            return response
+
+    async def awrap_model_call(
+        self,
+        request: ModelRequest,
+        handler: Callable[[ModelRequest], Awaitable[ModelResponse]],
+    ) -> ModelResponse:
+        # 事件循环线程上的 CPU 时间包含其他协程，异步调用不记录 CPU 时间
+        with instrument(
+            MODEL_OPERATION,
+            measure_cpu=False,
+            **{"gen_ai.request.model": _model_name(request)},
+        ) as m:
+            response = await handler(request)
+            _record_usage(m, response)
+            return response
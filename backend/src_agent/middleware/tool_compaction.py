@@ -0,0 +1,134 @@
+"""
+工具结果压缩中间件
+
+SummarizationMiddleware 通过 RemoveMessage 重写对话状态，会破坏 tool_call 与工具结果的配对，
+通义千问会直接拒绝这样的消息序列（见 doc/SUMMARIZATION_MIDDLEWARE_ANALYSIS.md）。
+本中间件只改写发送给模型的请求，不修改图状态：
+- 不删除、不插入、不重排任何消息，AIMessage 的 tool_calls 与 ToolMessage 的 tool_call_id 一一保留
+- 较早的大体积工具结果替换为简短摘要（工具名、原始长度、开头预览、图像链接）
+- 当前轮次（最后一条用户消息之后）以及最近若干条工具结果始终保留原文
+- 检查点和前端看到的仍是完整消息，永远不会产生 RemoveMessage
+"""
+
+from __future__ import annotations
+
+import logging
+import re
+from typing import Awaitable, Callable
+
+from langchain.agents.middleware import AgentMiddleware, ModelRequest, ModelResponse
+from langchain_core.messages import AnyMessage, HumanMessage, ToolMessage
+from langchain_core.messages.utils import count_tokens_approximately
+
+from src_agent.config.compaction_config import CompactionConfig
+
+logger = logging.getLogger(__name__)
+
+# 已压缩内容的标记，避免对同一条消息重复压缩
+COMPACTED_MARKER = "[已压缩的历史工具结果]"
+
+# 工具结果中的图像链接（fig_inter 返回的 /images/ 地址），压缩后仍保留，方便模型继续引用
+_IMAGE_LINK_PATTERN = re.compile(r"\S*/images/[\w\-.]+")
+
+
+def _content_text(message: ToolMessage) -> str:
+    """返回工具结果的文本内容"""
+    if isinstance(message.content, str):
+        return message.content
+    return message.text
+
+
+def summarize_tool_result(message: ToolMessage, preview_chars: int) -> str:
+    """将一条工具结果压缩为简短摘要文本。
+
+    Args:
+        message: 原始工具结果消息
+        preview_chars: 保留的开头预览字符数
+
+    Returns:
+        摘要文本
+    """
+    text = _content_text(message)
+    lines = [
+        f"{COMPACTED_MARKER} 工具 {message.name or 'unknown'} "
+        f"(tool_call_id={message.tool_call_id}) 原始输出 {len(text):,} 字符，已省略。",
+    ]
+    if preview_chars:
+        lines.append(f"开头预览:\n{text[:preview_chars]}…")
+    images = list(dict.fromkeys(_IMAGE_LINK_PATTERN.findall(text)))
+    if images:
+        lines.append("图像: " + " ".join(images))
+    lines.append("如需完整结果，请重新调用相应工具或直接使用沙箱中的变量。")
+    return "\n".join(lines)
+
+
+def compact_messages(
+    messages: list[AnyMessage], config: CompactionConfig
+) -> tuple[list[AnyMessage], int]:
+    """压缩较早的大体积工具结果，返回 (新消息列表, 被压缩的条数)。
+
+    输入列表不会被修改；返回的列表与输入等长、顺序一致，
+    被压缩的 ToolMessage 保留原来的 id、name、tool_call_id 和 status。
+    """
+    if count_tokens_approximately(messages) <= config.trigger_tokens:
+        return messages, 0
+
+    # 当前轮次：最后一条用户消息之后的工具结果是模型正在推理的依据，不压缩
+    current_turn_start = 0
+    for index in range(len(messages) - 1, -1, -1):
+        if isinstance(messages[index], HumanMessage):
+            current_turn_start = index
+            break
+
+    tool_indices = [
+        index for index, message in enumerate(messages) if isinstance(message, ToolMessage)
+    ]
+    keep_from = max(len(tool_indices) - config.keep_recent_tool_results, 0)
+    protected = set(tool_indices[keep_from:])
+
+    compacted = list(messages)
+    count = 0
+    for index in tool_indices:
+        if index >= current_turn_start or index in protected:
+            continue
+        message = messages[index]
+        text = _content_text(message)
+        if len(text) <= config.min_chars or text.startswith(COMPACTED_MARKER):
+            continue
+        compacted[index] = message.model_copy(
+            update={"content": summarize_tool_result(message, config.preview_chars)}
+        )
+        count += 1
+    return compacted, count
+
+
+class ToolResultCompactionMiddleware(AgentMiddleware):
+    """在调用模型前压缩历史工具结果的中间件（兼容通义千问）"""
+
+    def __init__(self, config: CompactionConfig | None = None):
+        super().__init__()
+        self.config = config or CompactionConfig.from_env()
+        self.config.validate()
+
+    def _compact_request(self, request: ModelRequest) -> ModelRequest:
+        if not self.config.enabled:
+            return request
+        messages, count = compact_messages(request.messages, self.config)
+        if not count:
+            return request
+        logger.info(f"上下文压缩: 本次请求压缩了 {count} 条历史工具结果")
+        return request.override(messages=messages)
+
+    def wrap_model_call(
+        self,
+        request: ModelRequest,
+        handler: Callable[[ModelRequest], ModelResponse],
+    ) -> ModelResponse:
+        return handler(self._compact_request(request))
+
+    async def awrap_model_call(
+        self,
+        request: ModelRequest,
+        handler: Callable[[ModelRequest], Awaitable[ModelResponse]],
+    ) -> ModelResponse:
+        return await handler(self._compact_request(request))
@@ -1,12 +1,182 @@
-from langchain_deepseek import ChatDeepSeek
-from langchain_community.chat_models.tongyi import ChatTongyi
-from langchain_community.chat_models.moonshot import MoonshotChat
+"""
+模型工厂模块 (model.py)
+
+按提供方（deepseek / tongyi / ANTHROPIC / moonshot / fake）构建聊天模型，并维护进程级注册表：
+- 同一 (提供方, 模型名) 的模型实例只构建一次，主模型与摘要模型重复请求时直接复用
+- 同一提供方的所有模型共享一组 keep-alive HTTP 连接池（OpenAI 兼容的提供方通过 httpx 客户端注入）
+- 支持在应用启动时预热连接，避免首次调用 LLM 时才进行 TCP/TLS 握手
+"""
+
+import logging
 import os
-from langchain_openai import ChatOpenAI
-from langchain_anthropic import ChatAnthropic
+import threading
+from typing import Any
+
+from src_agent.instrumentation import record_cache
+
+logger = logging.getLogger(__name__)
+
+# 各模型提供方的 SDK 体积较大，只在实际选用时才导入（见 _build_model）
 
 # from pydantic import SecretStr
 
+# OpenAI 兼容协议的提供方：可以注入共享的 httpx 客户端
+_HTTPX_PROVIDERS = {"deepseek", "moonshot"}
+
+# 各提供方默认模型名称对应的环境变量
+_DEFAULT_MODEL_ENV = {
+    "deepseek": "DEEPSEEK_MODEL",
+    "tongyi": "DASHSCOPE_MODEL",
+    "ANTHROPIC": "ANTHROPIC_MODEL",
+    "moonshot": "MOONSHOT_MODEL",
+    "fake": "FAKE_MODEL_SCRIPT",  # 假模型的“模型名”即脚本名
+}
+
+# (提供方, 模型名) -> 模型实例
+_model_registry: dict[tuple[str, str | None], Any] = {}
+# 提供方 -> (同步 httpx 客户端, 异步 httpx 客户端)
+_http_clients: dict[str, tuple[Any, Any]] = {}
+_registry_lock = threading.RLock()
+
+
+def _http_limits() -> dict[str, Any]:
+    """从环境变量读取连接池配置"""
+    import httpx
+
+    return {
+        "limits": httpx.Limits(
+            max_connections=int(os.getenv("MODEL_HTTP_MAX_CONNECTIONS", "20")),
+            max_keepalive_connections=int(
+                os.getenv("MODEL_HTTP_MAX_KEEPALIVE", "10")
+            ),
+            keepalive_expiry=float(os.getenv("MODEL_HTTP_KEEPALIVE_EXPIRY", "60")),
+        ),
+        "timeout": httpx.Timeout(
+            float(os.getenv("MODEL_HTTP_TIMEOUT", "120")),
+            connect=float(os.getenv("MODEL_HTTP_CONNECT_TIMEOUT", "10")),
+        ),
+    }
+
+
+def get_http_clients(provider: str) -> tuple[Any, Any]:
+    """获取提供方共享的 (同步, 异步) httpx 客户端，每个进程每个提供方只创建一次"""
+    with _registry_lock:
+        if provider not in _http_clients:
+            import httpx
+
+            options = _http_limits()
+            _http_clients[provider] = (
+                httpx.Client(**options),
+                httpx.AsyncClient(**options),
+            )
+        return _http_clients[provider]
+
+
+def _build_model(provider: str, model_name: str | None) -> Any:
+    """构建指定提供方的聊天模型"""
+    match provider:
+        case "deepseek":
+            from langchain_deepseek import ChatDeepSeek
+
+            http_client, http_async_client = get_http_clients(provider)
+            return ChatDeepSeek(
+                model=model_name,
+                temperature=0.0,
+                http_client=http_client,
+                http_async_client=http_async_client,
+            )
+        case "tongyi":
+            from langchain_community.chat_models.tongyi import ChatTongyi
+
+            return ChatTongyi(model=model_name, temperature=0.0)
+        case "ANTHROPIC":
+            from langchain_anthropic import ChatAnthropic
+
+            # langchain_anthropic 内部按 base_url 缓存 httpx 客户端，同一进程内已共享连接池
+            return ChatAnthropic(model=model_name, temperature=0.0)
+        case "moonshot":
+            from langchain_openai import ChatOpenAI
+
+            http_client, http_async_client = get_http_clients(provider)
+            return ChatOpenAI(
+                model=model_name,
+                base_url=os.getenv("MOONSHOT_BASE_URL"),
+                api_key=os.getenv("MOONSHOT_API_KEY"),
+                temperature=0.0,
+                http_client=http_client,
+                http_async_client=http_async_client,
+            )
+        case "fake":
+            # 压测/离线调试用的脚本化假模型，不发起网络请求
+            from src_agent.fake_model import SCRIPTS, ScriptedChatModel
+
+            # 摘要模型沿用其他提供方的模型名时，使用 FAKE_MODEL_SCRIPT 指定的脚本
+            return ScriptedChatModel.from_env(model_name if model_name in SCRIPTS else None)
+        case _:
+            raise ValueError(f"Invalid model type: {provider}")
+
+
+def get_model(provider: str, model_name: str | None = None) -> Any:
+    """从注册表获取模型实例，不存在时构建并登记
+
+    Args:
+        provider: 模型提供方（DEFAULT_MODEL 的取值）
+        model_name: 模型名称，None 表示使用提供方默认模型
+
+    Returns:
+        LangChain 聊天模型实例
+    """
+    if model_name is None and provider in _DEFAULT_MODEL_ENV:
+        model_name = os.getenv(_DEFAULT_MODEL_ENV[provider])
+    key = (provider, model_name)
+    with _registry_lock:
+        record_cache("model_registry", key in _model_registry)
+        if key not in _model_registry:
+            _model_registry[key] = _build_model(provider, model_name)
+        return _model_registry[key]
+
+
+def _base_url(model: Any) -> str | None:
+    """获取模型请求的基础 URL，用于预热连接"""
+    for attr in ("api_base", "openai_api_base", "anthropic_api_url"):
+        value = getattr(model, attr, None)
+        if value:
+            return str(value)
+    return None
+
+
+def _prewarm_targets() -> list[tuple[str, str]]:
+    """返回需要预热的 (提供方, 基础 URL) 列表（每个提供方只预热一次）"""
+    with _registry_lock:
+        targets: dict[str, str] = {}
+        for (provider, _), model in _model_registry.items():
+            base_url = _base_url(model)
+            if provider in _HTTPX_PROVIDERS and base_url:
+                targets.setdefault(provider, base_url)
+        return list(targets.items())
+
+
+def prewarm_models() -> None:
+    """使用同步连接池预先建立到已注册提供方的连接（失败只记录日志）"""
+    for provider, base_url in _prewarm_targets():
+        http_client, _ = get_http_clients(provider)
+        try:
+            http_client.head(base_url)
+            logger.info(f"已预热 {provider} 连接: {base_url}")
+        except Exception as e:
+            logger.warning(f"预热 {provider} 连接失败: {e}")
+
+
+async def aprewarm_models() -> None:
+    """使用异步连接池预先建立到已注册提供方的连接（LangGraph 服务以异步方式调用模型）"""
+    for provider, base_url in _prewarm_targets():
+        _, http_async_client = get_http_clients(provider)
+        try:
+            await http_async_client.head(base_url)
+            logger.info(f"已预热 {provider} 异步连接: {base_url}")
+        except Exception as e:
+            logger.warning(f"预热 {provider} 异步连接失败: {e}")
+
 
 class ModelFactory:
     def __init__(self, model_type: str):
@@ -15,37 +185,8 @@ class ModelFactory:
         # self.summary_model = self._get_summary_model()
 
     def _get_model(self):
-        match self.model_type:
-            case "deepseek":
-                return ChatDeepSeek(model=os.getenv("DEEPSEEK_MODEL"), temperature=0.0)
-            case "tongyi":
-                return ChatTongyi(model=os.getenv("DASHSCOPE_MODEL"), temperature=0.0)
-            case "ANTHROPIC":
-                return ChatAnthropic(model=os.getenv("ANTHROPIC_MODEL"), temperature=0.0)
-            case "moonshot":
-                return ChatOpenAI(
-                    model=os.getenv("MOONSHOT_MODEL"),
-                    base_url=os.getenv("MOONSHOT_BASE_URL"),
-                    api_key=os.getenv("MOONSHOT_API_KEY"),
-                    temperature=0.0,
-                )
-            case _:
-                raise ValueError(f"Invalid model type: {self.model_type}")
+        return get_model(self.model_type)
 
     def get_summary_model(self, model_type: str):
-        match self.model_type:
-            case "deepseek":
-                return ChatDeepSeek(model=model_type, temperature=0.0)
-            case "tongyi":
-                return ChatTongyi(model=model_type, temperature=0.0)
-            case "ANTHROPIC":
-                return ChatAnthropic(model=model_type, temperature=0.0)
-            case "moonshot":
-                return ChatOpenAI(
-                    model=model_type,
-                    base_url=os.getenv("MOONSHOT_BASE_URL"),
-                    api_key=os.getenv("MOONSHOT_API_KEY"),
-                    temperature=0.0,
-                )
-            case _:
-                raise ValueError(f"Invalid model type: {self.model_type}")
+        """获取摘要模型：与主模型同一提供方，复用注册表中的实例与连接池"""
+        return get_model(self.model_type, model_type)
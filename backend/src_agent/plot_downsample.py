@@ -0,0 +1,250 @@
+"""
+大数据量图表降采样模块
+
+当智能体直接用全部数据（上万甚至上百万行）绘制折线图或散点图时，
+matplotlib 会逐点绘制，savefig 耗时随数据量线性增长。本模块在保存前检测
+超大的图元并进行降采样，使渲染耗时与数据规模无关：
+- 折线（Line2D）：使用 LTTB（Largest-Triangle-Three-Buckets）算法保留视觉形状
+- 单色散点（PathCollection）：聚合为 hexbin 密度图
+- 多色/多尺寸散点：保留颜色映射的前提下随机抽样
+"""
+
+from __future__ import annotations
+
+import logging
+from dataclasses import dataclass
+from typing import Any
+
+import numpy as np
+
+from src_agent.config.render_config import RenderConfig
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Reduction:
+    """一次降采样的记录，用于回报给智能体"""
+
+    axes_index: int  # 所在子图序号
+    kind: str  # "line" 或 "scatter"
+    label: str  # 图元标签（图例名称）
+    original_points: int  # 原始点数
+    reduced_points: int  # 降采样后的点数（hexbin 时为非空网格数）
+    method: str  # "lttb" / "stride" / "hexbin" / "sample"
+
+    def describe(self) -> str:
+        kind_name = "折线" if self.kind == "line" else "散点"
+        label = f" '{self.label}'" if self.label else ""
+        return (
+            f"子图{self.axes_index} {kind_name}{label}: "
+            f"{self.original_points:,} → {self.reduced_points:,} ({self.method})"
+        )
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    """计算 LTTB 降采样保留的点的下标。
+
+    要求 x 单调递增。首尾两点始终保留，其余点按桶划分，
+    每个桶选取与前一选中点、下一桶均值构成的三角形面积最大的点。
+
+    Args:
+        x: 横坐标数组
+        y: 纵坐标数组
+        threshold: 目标点数
+
+    Returns:
+        保留点的下标数组（递增）
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    indices = np.empty(threshold, dtype=np.int64)
+    indices[0] = 0
+    indices[-1] = n - 1
+
+    every = (n - 2) / (threshold - 2)
+    selected = 0
+    for i in range(threshold - 2):
+        start = int(i * every) + 1
+        end = int((i + 1) * every) + 1
+        next_end = min(int((i + 2) * every) + 1, n)
+        if end >= next_end:
+            # 最后一个桶：下一“桶”只包含最后一个点
+            avg_x, avg_y = x[n - 1], y[n - 1]
+        else:
+            avg_x = x[end:next_end].mean()
+            avg_y = y[end:next_end].mean()
+
+        point_x, point_y = x[selected], y[selected]
+        areas = np.abs(
+            (point_x - avg_x) * (y[start:end] - point_y)
+            - (point_x - x[start:end]) * (avg_y - point_y)
+        )
+        selected = start + int(np.argmax(areas))
+        indices[i + 1] = selected
+    return indices
+
+
+def _artist_label(artist: Any) -> str:
+    label = artist.get_label() or ""
+    # matplotlib 自动生成的标签形如 "_child0" / "_line0"，不展示
+    return "" if label.startswith("_") else label
+
+
+def _finite_runs(finite: np.ndarray) -> list[tuple[int, int]]:
+    """连续有限点的区间列表 [(start, end), ...]（end 不含）"""
+    edges = np.diff(np.concatenate(([0], finite.astype(np.int8), [0])))
+    return list(zip(np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)))
+
+
+def _downsample_line(line: Any, max_points: int) -> tuple[int, str] | None:
+    """对单条折线降采样，返回 (保留点数, 方法)；无需处理时返回 None
+
+    NaN/inf 会使折线断开，因此按连续的有限点分段降采样，段与段之间保留一个 NaN 断点。
+    """
+    xy = np.asarray(line.get_xydata(), dtype=float)
+    n = len(xy)
+    if n <= max_points:
+        return None
+
+    finite = np.isfinite(xy).all(axis=1)
+    total = int(finite.sum())
+    if total < 2:
+        return None
+    runs = _finite_runs(finite)
+    # 非单调横坐标（例如轨迹图）无法分桶，退化为等距抽取
+    monotonic = bool(np.all(np.diff(xy[finite, 0]) >= 0))
+    method = "lttb" if monotonic else "stride"
+    # 断点也占用点数预算，按段长分配剩余预算
+    budget = max(max_points - (len(runs) - 1), 2 * len(runs))
+
+    pieces: list[np.ndarray] = []
+    kept = 0
+    for start, end in runs:
+        segment = xy[start:end]
+        length = end - start
+        target = min(length, max(2, length * budget // total))
+        if target < length:
+            if monotonic:
+                keep = lttb_indices(segment[:, 0], segment[:, 1], target)
+            else:
+                keep = np.linspace(0, length - 1, target).astype(np.int64)
+            segment = segment[keep]
+        if pieces:
+            pieces.append(np.array([[np.nan, np.nan]]))
+        pieces.append(segment)
+        kept += len(segment)
+
+    data = np.concatenate(pieces)
+    line.set_data(data[:, 0], data[:, 1])
+    return kept, method
+
+
+def _hexbin_cmap(color: np.ndarray) -> Any:
+    """根据原散点颜色构造由浅到深的单色渐变色图"""
+    from matplotlib.colors import LinearSegmentedColormap
+
+    rgb = tuple(color[:3])
+    return LinearSegmentedColormap.from_list("downsample", [(1, 1, 1), rgb])
+
+
+def _downsample_scatter(
+    ax: Any, collection: Any, config: RenderConfig, rng: np.random.Generator
+) -> tuple[int, str] | None:
+    """对单个散点集合降采样，返回 (保留点数, 方法)；无需处理时返回 None"""
+    offsets = np.asarray(collection.get_offsets(), dtype=float)
+    n = len(offsets)
+    if n <= config.max_scatter_points:
+        return None
+    # 只处理数据坐标系下的散点（图例句柄等其他集合保持不变）
+    if collection.get_offset_transform() != ax.transData:
+        return None
+
+    facecolors = collection.get_facecolors()
+    sizes = collection.get_sizes()
+    values = collection.get_array()
+    varying_style = values is not None or len(facecolors) > 1 or len(sizes) > 1
+
+    if varying_style:
+        # 颜色/尺寸承载了数据含义，随机抽样以保留映射关系
+        keep = np.sort(rng.choice(n, config.max_scatter_points, replace=False))
+        collection.set_offsets(offsets[keep])
+        if values is not None and len(values) == n:
+            collection.set_array(np.asarray(values)[keep])
+        if len(facecolors) == n:
+            collection.set_facecolor(facecolors[keep])
+        edgecolors = collection.get_edgecolors()
+        if len(edgecolors) == n:
+            collection.set_edgecolor(edgecolors[keep])
+        if len(sizes) == n:
+            collection.set_sizes(sizes[keep])
+        collection.set_rasterized(True)
+        return len(keep), "sample"
+
+    color = facecolors[0] if len(facecolors) else np.array([0.12, 0.47, 0.71, 1.0])
+    finite = np.isfinite(offsets).all(axis=1)
+    hexbin = ax.hexbin(
+        offsets[finite, 0],
+        offsets[finite, 1],
+        gridsize=config.hexbin_gridsize,
+        mincnt=1,
+        cmap=_hexbin_cmap(color),
+        zorder=collection.get_zorder(),
+        label=collection.get_label(),
+    )
+    hexbin.set_rasterized(True)
+    collection.remove()
+    return len(hexbin.get_offsets()), "hexbin"
+
+
+def downsample_figure(fig: Any, config: RenderConfig | None = None) -> list[Reduction]:
+    """在保存前检测并降采样图中所有超大的折线和散点。
+
+    Args:
+        fig: matplotlib Figure 对象（原地修改）
+        config: 渲染配置，如果为None则从环境变量读取
+
+    Returns:
+        降采样记录列表；没有超大图元时为空列表
+    """
+    from matplotlib.collections import PathCollection
+
+    config = config or RenderConfig.from_env()
+    config.validate()
+    # 固定随机种子，保证同样的数据得到同样的图
+    rng = np.random.default_rng(0)
+    reductions: list[Reduction] = []
+
+    for axes_index, ax in enumerate(fig.axes):
+        for line in list(ax.get_lines()):
+            original = len(line.get_xydata())
+            outcome = _downsample_line(line, config.max_line_points)
+            if outcome is not None:
+                reductions.append(
+                    Reduction(axes_index, "line", _artist_label(line), original, *outcome)
+                )
+
+        for collection in list(ax.collections):
+            if not isinstance(collection, PathCollection):
+                continue
+            original = len(collection.get_offsets())
+            label = _artist_label(collection)
+            outcome = _downsample_scatter(ax, collection, config, rng)
+            if outcome is not None:
+                reductions.append(
+                    Reduction(axes_index, "scatter", label, original, *outcome)
+                )
+
+    if reductions:
+        logger.info(f"图像降采样: {'; '.join(r.describe() for r in reductions)}")
+    return reductions
+
+
+def format_reductions(reductions: list[Reduction]) -> str:
+    """将降采样记录格式化为工具返回内容中的说明文字"""
+    if not reductions:
+        return ""
+    lines = "\n".join(f"- {reduction.describe()}" for reduction in reductions)
+    return f"📉 为控制渲染耗时，以下图元已降采样：\n{lines}"
@@ -0,0 +1,108 @@
+"""
+线程安全的图像渲染模块
+
+fig_inter 过去在每次调用时切换 matplotlib 后端（matplotlib.use("Agg")），
+并在结束时 plt.close("all")，多个线程同时绘图时会关闭彼此的图像。本模块：
+- 在进程内只选择一次非交互式 Agg 后端，不再按调用切换
+- 用一把锁串行化对 pyplot 全局状态机（gcf/gca）的使用
+- 通过每个沙箱会话独立的 FigureRegistry 记录本次调用创建的图像，只关闭自己的图像
+- 使用面向对象的 Figure/FigureCanvasAgg 接口保存图像，保存过程无需持有锁，可并行执行
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Any, Iterator
+
+logger = logging.getLogger(__name__)
+
+# pyplot 的“当前图像/当前坐标轴”是进程级全局状态，执行绘图代码时必须串行
+PYPLOT_LOCK = threading.RLock()
+
+_backend_lock = threading.Lock()
+_backend_ready = False
+
+
+def ensure_agg_backend() -> None:
+    """在进程内选择一次 Agg 后端（幂等）。
+
+    服务端没有图形界面，只需要 Agg；选定后不再切换，避免每次调用的后端切换开销。
+    """
+    global _backend_ready
+    if _backend_ready:
+        return
+    with _backend_lock:
+        if _backend_ready:
+            return
+        import matplotlib
+
+        if matplotlib.get_backend().lower() != "agg":
+            matplotlib.use("Agg")
+        _backend_ready = True
+
+
+class FigureRegistry:
+    """沙箱会话级的图像注册表
+
+    记录在 capture() 期间通过 pyplot 创建的图像，以及显式注册的 Figure 对象，
+    清理时只关闭本会话的图像，不影响其他线程/会话。
+    """
+
+    def __init__(self) -> None:
+        self._figures: dict[int, Any] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._figures)
+
+    def register(self, fig: Any) -> None:
+        """显式登记一个图像对象"""
+        with self._lock:
+            self._figures[id(fig)] = fig
+
+    @contextmanager
+    def capture(self) -> Iterator["FigureRegistry"]:
+        """在持有 pyplot 锁的情况下执行代码，并登记期间新建的 pyplot 图像"""
+        ensure_agg_backend()
+        import matplotlib.pyplot as plt
+
+        with PYPLOT_LOCK:
+            before = set(plt.get_fignums())
+            try:
+                yield self
+            finally:
+                for number in set(plt.get_fignums()) - before:
+                    self.register(plt.figure(number))
+
+    def close_all(self) -> None:
+        """关闭本会话登记的所有图像，释放内存"""
+        import matplotlib.pyplot as plt
+
+        with self._lock:
+            figures = list(self._figures.values())
+            self._figures.clear()
+        if not figures:
+            return
+        with PYPLOT_LOCK:
+            for fig in figures:
+                # 对不受 pyplot 管理的 Figure（面向对象接口创建）调用 close 也是安全的
+                plt.close(fig)
+
+
+def render_figure(fig: Any, path: str, **savefig_kwargs: Any) -> None:
+    """使用 Agg 画布将图像保存到文件，无需持有 pyplot 锁。
+
+    Args:
+        fig: matplotlib Figure 对象
+        path: 保存路径
+        **savefig_kwargs: 透传给 Figure.savefig 的参数（format、dpi、bbox_inches 等）
+    """
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+    if not isinstance(fig.canvas, FigureCanvasAgg):
+        # 面向对象创建的 Figure 默认挂在 FigureCanvasBase 上，显式绑定 Agg 画布
+        FigureCanvasAgg(fig)
+    fig.savefig(path, **savefig_kwargs)
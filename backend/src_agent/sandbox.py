@@ -6,16 +6,28 @@ Python 代码沙箱执行模块
 
 import logging
 import platform
+import random
 import signal
 import threading
 from contextlib import contextmanager
 from typing import Any
 
-import matplotlib.font_manager as fm
-
 import src_agent.data_loader as data_loader
+import src_agent.fast_ops as fast_ops
 from src_agent.config.sandbox_config import SandboxConfig
+from src_agent.font_cache import resolve_font
+from src_agent.instrumentation import instrumented
+from src_agent.rendering import FigureRegistry, ensure_agg_backend
 from src_agent.sandbox_filesystem import SandboxFileSystem, SecurityError
+from src_agent.sandbox_memory import (
+    MemoryReport,
+    VariableUsage,
+    deep_sizeof,
+    select_evictions,
+    size_signature,
+)
+from src_agent.sandbox_namespace import NamespaceChanges, NamespaceWatch, code_names
+from src_agent.sandbox_profiler import CodeProfiler, ProfileReport
 
 logger = logging.getLogger(__name__)
 
@@ -33,7 +45,8 @@ class SandboxTimeoutError(SandboxExecutionError):
 def _detect_chinese_font() -> str | None:
     """检测系统可用的中文字体
 
-    根据操作系统自动选择合适的中文字体。
+    根据操作系统自动选择合适的中文字体。结果由 font_cache 持久化，
+    沙箱构建时应通过 resolve_font(_detect_chinese_font) 调用以复用缓存。
 
     Returns:
         找到的第一个可用中文字体名称，如果没有找到则返回 None
@@ -64,6 +77,8 @@ def _detect_chinese_font() -> str | None:
     # 获取当前系统的候选字体列表
     candidates = font_candidates.get(system, [])
 
+    import matplotlib.font_manager as fm
+
     # 获取系统所有可用字体
     available_fonts = {f.name for f in fm.fontManager.ttflist}
 
@@ -100,20 +115,40 @@ class PythonSandbox:
             self.config.shared_data_dir,
         )
 
+        # 服务端统一使用 Agg 后端（进程内只设置一次）
+        ensure_agg_backend()
+
         # 配置 matplotlib 中文字体支持
         self._configure_matplotlib_fonts()
 
+        # 本会话创建的图像注册表（fig_inter 结束后只关闭本会话的图像）
+        self.figures = FigureRegistry()
+
         # 全局变量命名空间（在工具间共享）
         self.sandbox_globals: dict[str, Any] = {}
         self._init_globals()
 
+        # 最近一次执行的性能分析结果（未启用分析时为 None）
+        self.last_profile: ProfileReport | None = None
+
+        # 上次 consume_changes() 以来累计的命名空间改动（用于增量快照）
+        self.pending_changes = NamespaceChanges()
+
+        # 命名空间操作序号（每次执行、设置或删除变量加一）及每个变量最近一次被读写时的序号（用于 LRU 淘汰）
+        self.execution_count = 0
+        self._last_used: dict[str, int] = {}
+        # 变量名 -> 赋值版本（每次赋值加一），只读取变量不改变版本
+        self._versions: dict[str, int] = {}
+        # 变量名 -> ((赋值版本, 形状签名), 深度内存占用)；缓存键不变时复用上次的结果
+        self._size_cache: dict[str, tuple[tuple[Any, ...], int, set[int]]] = {}
+
     def _configure_matplotlib_fonts(self) -> None:
         """配置 matplotlib 以支持中文字体显示"""
         try:
             import matplotlib.pyplot as plt
 
-            # 检测可用的中文字体
-            chinese_font = _detect_chinese_font()
+            # 检测可用的中文字体（优先使用持久化的检测结果）
+            chinese_font = resolve_font(_detect_chinese_font)
 
             if chinese_font:
                 # 配置 matplotlib 使用检测到的中文字体
@@ -138,6 +173,7 @@ class PythonSandbox:
         import numpy as np
         import matplotlib.pyplot as plt
         import seaborn as sns
+        from matplotlib.figure import Figure
         import json
         import re
         import datetime
@@ -157,6 +193,7 @@ class PythonSandbox:
             "np": np,
             "plt": plt,
             "sns": sns,
+            "Figure": Figure,
             # 通用库
             "json": json,
             "re": re,
@@ -170,7 +207,11 @@ class PythonSandbox:
             "list_datasets": data_loader.list_datasets,
             "DATASET_CATALOG": data_loader.DATASET_CATALOG,
             "data_loader": data_loader,
+            # 向量化分析函数（分箱聚合、流失率、分组 Top-K、同期群、相关矩阵）
+            "fast_ops": fast_ops,
         }
+        # 预置名称（库、工具函数）不属于用户变量，不参与快照和清理
+        self._builtin_names = frozenset(self.sandbox_globals)
 
     def _create_safe_builtins(self) -> dict[str, Any]:
         """创建安全的内置函数字典"""
@@ -215,12 +256,37 @@ class PythonSandbox:
         finally:
             signal.alarm(0)  # 取消超时
 
-    def execute(self, code: str, timeout: int | None = None) -> Any:
+    @contextmanager
+    def _run_context(self, timeout: int, profile: bool):
+        """超时控制，以及按需启用的 cProfile 性能分析（结果保存到 last_profile）"""
+        with self._timeout_context(timeout):
+            if not profile:
+                yield
+                return
+            profiler = CodeProfiler(self.config.profile_top_n)
+            try:
+                with profiler:
+                    yield
+            finally:
+                self.last_profile = profiler.report
+
+    def _should_profile(self, profile: bool | None) -> bool:
+        if profile is not None:
+            return profile
+        rate = self.config.profile_sample_rate
+        return rate > 0 and random.random() < rate
+
+    @instrumented("sandbox.execute")
+    def execute(
+        self, code: str, timeout: int | None = None, profile: bool | None = None
+    ) -> Any:
         """执行 Python 代码
 
         Args:
             code: 要执行的 Python 代码
             timeout: 超时时间（秒），如果为None则使用配置的默认值
+            profile: 是否使用 cProfile 分析本次执行，None 表示按配置的抽样比例决定；
+                分析结果保存在 last_profile（执行失败时同样保存）
 
         Returns:
             代码执行结果
@@ -237,46 +303,35 @@ class PythonSandbox:
             return None
 
         timeout = timeout or self.config.max_execution_time
-        local_vars: dict[str, Any] = {}
-        result = None
+        self.last_profile = None
+        profile = self._should_profile(profile)
+        # 代码直接在全局命名空间（普通字典）中执行；执行前后按代码引用的名称比较对象标识得到改动
+        watch: NamespaceWatch | None = None
 
         try:
             # 尝试作为表达式执行（返回值）
             try:
-                expression_code = compile(
-                    f"__sandbox_result__ = ({code})",
-                    "<sandbox>",
-                    "exec",
-                )
-                # 使用超时执行
-                with self._timeout_context(timeout):
-                    exec(expression_code, self.sandbox_globals, local_vars)  # noqa: S102
-                result = local_vars.get("__sandbox_result__")
-                return result
+                expression_code = compile(f"({code})", "<sandbox>", "eval")
             except SyntaxError:
                 # 不是表达式，作为语句执行
-                pass
+                expression_code = None
+
+            if expression_code is not None:
+                watch = NamespaceWatch(self.sandbox_globals, code_names(expression_code))
+                # 使用超时执行
+                with self._run_context(timeout, profile):
+                    return eval(expression_code, self.sandbox_globals)  # noqa: S307
 
             # 作为语句执行
             compiled_code = compile(code, "<sandbox>", "exec")
+            watch = NamespaceWatch(self.sandbox_globals, code_names(compiled_code))
+            with self._run_context(timeout, profile):
+                exec(compiled_code, self.sandbox_globals)  # noqa: S102
 
-            # 记录执行前的全局变量
-            globals_before = set(self.sandbox_globals.keys())
-
-            with self._timeout_context(timeout):
-                exec(compiled_code, self.sandbox_globals, local_vars)  # noqa: S102
-
-            # 合并局部变量到全局变量（用于跨工具共享）
-            self.sandbox_globals.update(local_vars)
-
-            # 检测新创建的全局变量
-            globals_after = set(self.sandbox_globals.keys())
-            new_vars = globals_after - globals_before
-
-            if new_vars:
-                # 返回新变量的字典
-                result = {var: self.sandbox_globals[var] for var in new_vars}
-                return result
+            # 返回本次新建或重新赋值的变量（包括 df = df.dropna() 这类重新赋值）
+            assigned = watch.changes().assigned
+            if assigned:
+                return {var: self.sandbox_globals[var] for var in assigned}
 
             return None
 
@@ -286,6 +341,23 @@ class PythonSandbox:
             raise
         except Exception as e:
             raise SandboxExecutionError(f"代码执行失败: {str(e)}") from e
+        finally:
+            # 执行出错前完成的赋值同样已写入全局变量，需要一并记为脏变量
+            if watch is not None:
+                self._record_changes(watch.changes())
+
+    def _record_changes(self, changes: NamespaceChanges) -> None:
+        """累计命名空间改动，并更新变量的最近使用序号"""
+        self.execution_count += 1
+        self.pending_changes.merge(changes)
+        for name in changes.assigned | changes.accessed:
+            self._last_used[name] = self.execution_count
+        for name in changes.assigned:
+            self._versions[name] = self._versions.get(name, 0) + 1
+        for name in changes.deleted:
+            self._last_used.pop(name, None)
+            self._versions.pop(name, None)
+            self._size_cache.pop(name, None)
 
     def get_global(self, name: str) -> Any:
         """获取全局变量
@@ -320,26 +392,92 @@ class PythonSandbox:
                 f"禁止覆盖受保护的内置变量: {name}"
             )
 
+        changes = NamespaceChanges()
+        (changes.modified if name in self.sandbox_globals else changes.created).add(name)
         self.sandbox_globals[name] = value
+        self._record_changes(changes)
+
+    def user_variables(self) -> dict[str, Any]:
+        """返回用户创建的变量（不含预置的库、工具函数和双下划线名称）"""
+        return {
+            name: value
+            for name, value in self.sandbox_globals.items()
+            if name not in self._builtin_names and not name.startswith("__")
+        }
 
     def clear_user_variables(self) -> None:
         """清理用户创建的变量（保留内置变量）"""
-        protected_vars = {
-            "__builtins__",
-            "pd",
-            "np",
-            "plt",
-            "sns",
-            "json",
-            "re",
-            "datetime",
-            "math",
-            "collections",
-            "itertools",
-            "Path",
-        }
-
-        # 删除不在保护列表中的变量
-        user_vars = [k for k in self.sandbox_globals if k not in protected_vars]
+        # 删除不在预置名称中的变量（包括 load_dataset 等数据加载工具在内的预置名称都会保留）
+        user_vars = [k for k in self.sandbox_globals if k not in self._builtin_names]
         for var in user_vars:
             del self.sandbox_globals[var]
+        self._record_changes(NamespaceChanges(deleted=set(user_vars)))
+
+    def delete_variables(self, names: list[str]) -> list[str]:
+        """删除指定的用户变量（预置名称和不存在的变量会被忽略），返回实际删除的变量名"""
+        deleted = []
+        for name in names:
+            if name in self.sandbox_globals and name not in self._builtin_names:
+                del self.sandbox_globals[name]
+                deleted.append(name)
+        self._record_changes(NamespaceChanges(deleted=set(deleted)))
+        return deleted
+
+    def memory_report(self) -> MemoryReport:
+        """按变量统计用户变量的深度内存占用
+
+        DataFrame.memory_usage(deep=True) 需要遍历 object 列，因此按（赋值版本, 形状签名）缓存单个变量的
+        统计结果及其包含的对象：只读取变量时不重新统计；重新赋值或原地增删列、追加元素时重新统计。
+        形状不变的原地修改（如替换 object 列中的字符串）会沿用旧的估算值。
+        多个变量引用同一对象时（如 b = a），该对象只计入按命名空间顺序最先出现的变量。
+        """
+        usages = []
+        seen: set[int] = set()
+        for name, value in self.user_variables().items():
+            last_used = self._last_used.get(name, 0)
+            key = (self._versions.get(name, 0), size_signature(value))
+            cached = self._size_cache.get(name)
+            if cached is None or cached[0] != key:
+                owned: set[int] = set()
+                cached = (key, deep_sizeof(value, owned), owned)
+                self._size_cache[name] = cached
+            _, size, owned = cached
+            if owned.isdisjoint(seen):
+                seen |= owned
+            else:
+                # 与前面的变量共享对象，只统计尚未计入的部分
+                size = deep_sizeof(value, seen)
+            usages.append(VariableUsage(name, type(value).__name__, size, last_used))
+        usages.sort(key=lambda usage: usage.size_bytes, reverse=True)
+        return MemoryReport(
+            variables=usages,
+            budget_bytes=self.config.memory_budget_mb * 1024 * 1024,
+            policy=self.config.memory_eviction_policy,
+        )
+
+    def enforce_memory_budget(self) -> list[VariableUsage]:
+        """用户变量超出内存预算时按淘汰策略释放变量，返回被释放的变量
+
+        最近一次执行读写过的变量不会被释放。
+        """
+        report = self.memory_report()
+        protected = {
+            name
+            for name, used in self._last_used.items()
+            if used == self.execution_count
+        }
+        evicted = select_evictions(
+            report.variables, report.budget_bytes, report.policy, protected
+        )
+        if evicted:
+            self.delete_variables([usage.name for usage in evicted])
+            logger.info(
+                f"沙箱变量占用 {report.total_bytes:,} 字节，超出预算 {report.budget_bytes:,} 字节，"
+                f"已按 {report.policy} 策略释放: {', '.join(usage.name for usage in evicted)}"
+            )
+        return evicted
+
+    def consume_changes(self) -> NamespaceChanges:
+        """返回上次调用以来累计的命名空间改动，并重新开始累计"""
+        changes, self.pending_changes = self.pending_changes, NamespaceChanges()
+        return changes
@@ -0,0 +1,175 @@
+"""
+沙箱内存统计模块
+
+长期存活的沙箱会话会不断累积 DataFrame 等大对象，过去既看不到每个会话占用了多少内存，
+也只能通过 clear_user_variables 一次性清空。本模块提供：
+- deep_sizeof：按变量估算深度内存占用（DataFrame.memory_usage(deep=True)、numpy nbytes 等），
+  可在多个变量间共享已统计对象集合，避免别名重复计数
+- size_signature：廉价的形状签名，与变量版本一起作为 deep_sizeof 结果的缓存键
+- MemoryReport：按变量列出占用、类型和最近使用时间的报告
+- select_evictions：会话超出内存预算时，按最大优先或最近最少使用（LRU）选出要释放的变量
+"""
+
+from __future__ import annotations
+
+import sys
+from dataclasses import dataclass
+from typing import Any, Iterable
+
+# 支持的淘汰策略：lru（最近最少使用优先）、largest（占用最大优先）、none（只报告不淘汰）
+EVICTION_POLICIES = ("lru", "largest", "none")
+
+# 容器递归统计的最大元素数，超出部分按已统计元素的平均大小外推
+_MAX_CONTAINER_ITEMS = 10_000
+
+
+def deep_sizeof(value: Any, seen: set[int] | None = None) -> int:
+    """估算对象的深度内存占用（字节）
+
+    Args:
+        value: 要统计的对象
+        seen: 已统计过的对象 ID，统计过程中会加入新遇到的对象；在多个变量间共享时，
+            同一对象只计入最先统计到它的变量
+    """
+    return _sizeof(value, set() if seen is None else seen)
+
+
+def size_signature(value: Any) -> tuple[Any, ...]:
+    """不遍历数据的形状签名（对象 ID、形状或长度、dtype）
+
+    变量未重新赋值时，签名不变即沿用上次的 deep_sizeof 结果；原地增删列、追加元素等会改变签名。
+    """
+    module = type(value).__module__.split(".", 1)[0]
+    if module in ("pandas", "numpy"):
+        shape = getattr(value, "shape", None)
+        if isinstance(shape, tuple):
+            # DataFrame 没有 dtype 属性，增删列体现在 shape 中
+            return id(value), shape, str(getattr(value, "dtype", ""))
+    try:
+        return id(value), len(value)
+    except Exception:
+        return (id(value),)
+
+
+def _sizeof(value: Any, seen: set[int]) -> int:
+    if id(value) in seen:
+        return 0
+    seen.add(id(value))
+
+    module = type(value).__module__.split(".", 1)[0]
+    if module == "pandas":
+        import pandas as pd
+
+        if isinstance(value, pd.DataFrame):
+            return int(value.memory_usage(index=True, deep=True).sum())
+        if isinstance(value, (pd.Series, pd.Index)):
+            return int(value.memory_usage(deep=True))
+    if module == "numpy":
+        import numpy as np
+
+        if isinstance(value, np.ndarray):
+            if value.dtype == object:
+                return int(value.nbytes) + _items_sizeof(value.flat, value.size, seen)
+            return int(value.nbytes)
+
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += _items_sizeof(
+            (item for pair in value.items() for item in pair), 2 * len(value), seen
+        )
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        size += _items_sizeof(value, len(value), seen)
+    return size
+
+
+def _items_sizeof(items: Iterable[Any], count: int, seen: set[int]) -> int:
+    total = 0
+    counted = 0
+    for item in items:
+        if counted >= _MAX_CONTAINER_ITEMS:
+            return total + total * (count - counted) // counted
+        total += _sizeof(item, seen)
+        counted += 1
+    return total
+
+
+def _format_bytes(size: int) -> str:
+    for unit in ("B", "KB", "MB"):
+        if size < 1024:
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.2f} GB"
+
+
+@dataclass
+class VariableUsage:
+    """单个用户变量的内存占用"""
+
+    name: str
+    type_name: str
+    size_bytes: int
+    last_used: int  # 最近一次读写该变量的执行序号（从快照恢复且未使用过的变量为 0）
+
+
+@dataclass
+class MemoryReport:
+    """沙箱会话的内存报告"""
+
+    variables: list[VariableUsage]  # 按占用从大到小排序
+    budget_bytes: int
+    policy: str
+
+    @property
+    def total_bytes(self) -> int:
+        return sum(v.size_bytes for v in self.variables)
+
+    def format(self, limit: int = 50) -> str:
+        """格式化为适合返回给模型的文本"""
+        lines = [
+            f"用户变量 {len(self.variables)} 个，共 {_format_bytes(self.total_bytes)}"
+            f"（预算 {_format_bytes(self.budget_bytes)}，淘汰策略 {self.policy}）"
+        ]
+        for usage in self.variables[:limit]:
+            lines.append(
+                f"- {usage.name} ({usage.type_name}): {_format_bytes(usage.size_bytes)}"
+            )
+        if len(self.variables) > limit:
+            lines.append(f"... 其余 {len(self.variables) - limit} 个变量未列出")
+        return "\n".join(lines)
+
+
+def select_evictions(
+    variables: list[VariableUsage],
+    budget_bytes: int,
+    policy: str,
+    protected: set[str] | None = None,
+) -> list[VariableUsage]:
+    """选出需要释放的变量，使总占用回到预算以内。
+
+    Args:
+        variables: 当前全部用户变量的占用
+        budget_bytes: 内存预算
+        policy: 淘汰策略，见 EVICTION_POLICIES
+        protected: 不参与淘汰的变量（如本次执行刚读写过的变量）
+
+    Returns:
+        按淘汰顺序排列的变量；保护变量本身超出预算时可能仍无法回到预算以内
+    """
+    total = sum(v.size_bytes for v in variables)
+    if policy == "none" or total <= budget_bytes:
+        return []
+
+    protected = protected or set()
+    candidates = [v for v in variables if v.name not in protected]
+    if policy == "largest":
+        candidates.sort(key=lambda v: v.size_bytes, reverse=True)
+    else:
+        candidates.sort(key=lambda v: (v.last_used, -v.size_bytes))
+
+    evicted: list[VariableUsage] = []
+    for usage in candidates:
+        if total <= budget_bytes:
+            break
+        evicted.append(usage)
+        total -= usage.size_bytes
+    return evicted
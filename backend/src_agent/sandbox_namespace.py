@@ -0,0 +1,95 @@
+"""
+沙箱命名空间改动检测模块
+
+PythonSandbox.execute 过去在每次执行前后构造全局变量名集合并求差集，只能发现新建的变量，
+`df = df.dropna()` 这类重新赋值会被遗漏，且每次执行的开销与变量总数成正比。本模块：
+- code_names：静态收集编译后代码（含嵌套的函数、推导式）引用的全部名称（co_names）
+- NamespaceWatch：执行前按这些名称记录变量对象的标识，执行后对比得到新建、重新赋值、删除的名称
+- 代码引用过的已有变量记为读取过：原地修改（如 `df["x"] = 1`）不改变对象标识，读取过的可变对象视为可能被修改
+- 代码直接在普通字典上执行，变量读写不经过 Python 层的映射；开销只与代码引用的名称数成正比
+
+注意：通过 globals()[name] 等动态方式写入的名称不在 co_names 中，无法被检测。
+"""
+
+from __future__ import annotations
+
+import types
+from dataclasses import dataclass, field
+from typing import Any
+
+@dataclass
+class NamespaceChanges:
+    """一次执行对命名空间的改动"""
+
+    created: set[str] = field(default_factory=set)  # 新建的名称
+    modified: set[str] = field(default_factory=set)  # 重新赋值的已有名称
+    deleted: set[str] = field(default_factory=set)  # 删除的已有名称
+    accessed: set[str] = field(default_factory=set)  # 读取过的名称
+
+    @property
+    def assigned(self) -> set[str]:
+        """本次执行赋值过的名称（新建或修改）"""
+        return self.created | self.modified
+
+    def merge(self, other: "NamespaceChanges") -> None:
+        """合并后一次执行的改动（用于累计两次快照之间的脏变量）"""
+        for name in other.created:
+            if name in self.deleted:
+                # 先删除再新建，相对于上一次快照是修改
+                self.deleted.discard(name)
+                self.modified.add(name)
+            else:
+                self.created.add(name)
+        for name in other.modified:
+            if name not in self.created:
+                self.modified.add(name)
+        for name in other.deleted:
+            if name in self.created:
+                self.created.discard(name)
+            else:
+                self.modified.discard(name)
+                self.deleted.add(name)
+        self.accessed |= other.accessed
+
+
+def code_names(code: types.CodeType) -> set[str]:
+    """代码及其嵌套代码对象引用的名称（全局/模块级名称和属性名）"""
+    names = set(code.co_names)
+    for const in code.co_consts:
+        if isinstance(const, types.CodeType):
+            names |= code_names(const)
+    return names
+
+
+# 命名空间中不存在的名称
+_MISSING = object()
+
+
+class NamespaceWatch:
+    """记录执行前指定名称对应的对象，执行后按对象标识比较得到改动"""
+
+    def __init__(self, namespace: dict[str, Any], names: set[str]):
+        """
+        Args:
+            namespace: 执行代码使用的全局命名空间
+            names: 需要检测的名称（通常为 code_names 的结果）
+        """
+        self._namespace = namespace
+        self._before = {name: namespace.get(name, _MISSING) for name in names}
+
+    def changes(self) -> NamespaceChanges:
+        """与执行前相比的改动；执行前已存在且被代码引用的名称记为读取过"""
+        changes = NamespaceChanges()
+        namespace = self._namespace
+        for name, before in self._before.items():
+            after = namespace.get(name, _MISSING)
+            if before is _MISSING:
+                if after is not _MISSING:
+                    changes.created.add(name)
+                continue
+            changes.accessed.add(name)
+            if after is _MISSING:
+                changes.deleted.add(name)
+            elif after is not before:
+                changes.modified.add(name)
+        return changes
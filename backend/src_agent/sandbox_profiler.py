@@ -0,0 +1,215 @@
+"""
+沙箱代码性能分析模块
+
+代理编写的代码运行缓慢时，过去无法知道是哪一个 pandas 调用拖慢了执行。本模块使用 cProfile
+分析一次沙箱执行，并生成两部分结果：
+- 完整报告：总耗时、按自身耗时排序的热点函数，以及沙箱代码直接调用的各函数耗时（写入 artifact）
+- 简短摘要：如 “80% 在 DataFrame.apply（调用 1 次）”，附带常见慢操作的改写建议，
+  供代理据此优化代码
+
+只分析执行沙箱代码的线程；cProfile 会使被分析的代码整体变慢（通常 1.5~3 倍），因此只在
+按次指定或按比例抽样时启用。
+"""
+
+from __future__ import annotations
+
+import cProfile
+import logging
+import os
+import pstats
+import time
+from dataclasses import dataclass, field
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+# 沙箱代码编译时使用的文件名（见 PythonSandbox.execute）
+SANDBOX_FILENAME = "<sandbox>"
+
+# 沙箱自身的基础设施代码（命名空间跟踪），不计入报告
+_INTERNAL_FILES = (os.path.join("src_agent", "sandbox_namespace.py"),)
+
+# 常见慢操作的改写建议：函数名 -> 建议
+_REWRITE_HINTS = {
+    "apply": "apply 按行调用 Python 函数，尽量改写为向量化运算（算术/比较、np.where、.str/.dt 访问器），或使用 fast_ops 中的函数",
+    "iterrows": "iterrows 逐行构造 Series，改用向量化运算，或至少改用 itertuples",
+    "itertuples": "逐行遍历较慢，尽量改写为向量化运算",
+    "map": "map 逐元素调用 Python 函数，能用字典映射或向量化运算时优先使用",
+    "applymap": "逐元素调用 Python 函数，尽量改写为向量化运算",
+    "read_csv": "读取 CSV 耗时较多，可用 usecols/dtype 只读取需要的列，或复用已加载的 DataFrame",
+    "read_excel": "读取 Excel 较慢，可将结果保存为变量复用，避免重复读取",
+    "concat": "在循环中反复 concat 是平方复杂度，先收集到列表再一次性 concat",
+    "append": "在循环中反复 append 是平方复杂度，先收集到列表再一次性构造",
+    "merge": "merge 耗时较多，检查连接键是否有大量重复值，先过滤再连接",
+    "groupby": "groupby 耗时较多，聚合函数尽量使用内置名称（'sum'/'mean'）而不是 lambda；分组 Top-K 可用 fast_ops.top_k_by_group",
+    "agg": "聚合中使用 lambda 会退化为逐组 Python 调用，尽量使用内置聚合名称",
+    "sort_values": "排序耗时较多，只需要前 N 条时使用 nlargest/nsmallest",
+}
+
+
+@dataclass
+class FrameStat:
+    """一个函数的耗时统计"""
+
+    function: str  # 形如 DataFrame.apply 或 <sandbox>:3(<module>)
+    location: str  # 文件:行号
+    calls: int
+    self_seconds: float  # 自身耗时（不含调用的子函数）
+    cumulative_seconds: float  # 累计耗时（含子函数）
+
+
+@dataclass
+class ProfileReport:
+    """一次沙箱执行的性能分析结果"""
+
+    total_seconds: float
+    top_frames: list[FrameStat] = field(default_factory=list)  # 按自身耗时排序
+    hotspots: list[FrameStat] = field(default_factory=list)  # 沙箱代码直接调用的函数，按累计耗时排序
+
+    def summary(self, limit: int = 3) -> str:
+        """生成供代理改写代码的简短摘要"""
+        if self.total_seconds <= 0:
+            return "⏱️ 性能分析：执行耗时可忽略。"
+        parts = []
+        hints = []
+        for frame in self.hotspots[:limit]:
+            share = frame.cumulative_seconds / self.total_seconds
+            if share < 0.05:
+                break
+            parts.append(f"{share:.0%} 在 {frame.function}（调用 {frame.calls:,} 次）")
+            hint = _REWRITE_HINTS.get(frame.function.rsplit(".", 1)[-1])
+            if hint and share >= 0.2 and hint not in hints:
+                hints.append(hint)
+        text = f"⏱️ 性能分析：总耗时 {self.total_seconds:.2f}s"
+        if parts:
+            text += "；" + "，".join(parts)
+        for hint in hints:
+            text += f"\n- 建议：{hint}"
+        return text
+
+    def format(self) -> str:
+        """生成完整报告（写入 artifact）"""
+        lines = [f"总耗时: {self.total_seconds:.4f}s", "", "沙箱代码直接调用的函数（按累计耗时）:"]
+        lines += [_format_frame(frame, self.total_seconds) for frame in self.hotspots]
+        lines += ["", "热点函数（按自身耗时）:"]
+        lines += [_format_frame(frame, self.total_seconds) for frame in self.top_frames]
+        return "\n".join(lines)
+
+
+def _format_frame(frame: FrameStat, total: float) -> str:
+    share = frame.cumulative_seconds / total if total > 0 else 0.0
+    return (
+        f"{share:6.1%}  cum={frame.cumulative_seconds:.4f}s self={frame.self_seconds:.4f}s "
+        f"calls={frame.calls:<8,} {frame.function}  ({frame.location})"
+    )
+
+
+def _function_name(func: tuple[str, int, str], code_names: dict[tuple[str, int, str], str]) -> str:
+    filename, line, name = func
+    if filename == SANDBOX_FILENAME:
+        return f"{SANDBOX_FILENAME}:{line}({name})"
+    if filename == "~":
+        # 内置函数，名称形如 <method 'sort' of 'list' objects> 或 <built-in method builtins.sum>
+        return name
+    return code_names.get(func, name)
+
+
+def _location(func: tuple[str, int, str]) -> str:
+    filename, line, _ = func
+    if filename in (SANDBOX_FILENAME, "~"):
+        return filename if filename == "~" else f"{filename}:{line}"
+    parts = filename.replace("\\", "/").split("/")
+    # 只保留 site-packages 之后的路径，便于阅读
+    if "site-packages" in parts:
+        parts = parts[parts.index("site-packages") + 1 :]
+    return f"{os.path.join(*parts[-3:])}:{line}"
+
+
+def build_report(
+    profiler: cProfile.Profile,
+    total_seconds: float,
+    code_names: dict[tuple[str, int, str], str] | None = None,
+    top_n: int = 25,
+) -> ProfileReport:
+    """从 cProfile 结果构建报告
+
+    Args:
+        profiler: 已停止的 cProfile.Profile
+        total_seconds: 执行的墙钟耗时
+        code_names: 函数 -> 带类名的限定名称（如 DataFrame.apply），缺失时使用函数名
+        top_n: 热点函数和直接调用函数各保留的条数
+    """
+    stats = pstats.Stats(profiler).stats  # type: ignore[attr-defined]
+    code_names = code_names or {}
+
+    frames = []
+    direct: dict[tuple[str, int, str], list[float]] = {}
+    for func, (_, calls, self_time, cumulative, callers) in stats.items():
+        if func[0].endswith(_INTERNAL_FILES) or (
+            func[0] == "~" and func[2] == "<method 'disable' of '_lsprof.Profiler' objects>"
+        ):
+            continue
+        frames.append(
+            FrameStat(_function_name(func, code_names), _location(func), calls, self_time, cumulative)
+        )
+        # 沙箱代码直接调用的函数：统计来自 <sandbox> 调用方的那部分耗时
+        for caller, edge in callers.items():
+            if caller[0] == SANDBOX_FILENAME and func[0] != SANDBOX_FILENAME:
+                totals = direct.setdefault(func, [0, 0.0, 0.0])
+                totals[0] += edge[1]
+                totals[1] += edge[2]
+                totals[2] += edge[3]
+
+    frames.sort(key=lambda frame: frame.self_seconds, reverse=True)
+    hotspots = [
+        FrameStat(_function_name(func, code_names), _location(func), int(calls), self_time, cumulative)
+        for func, (calls, self_time, cumulative) in direct.items()
+    ]
+    hotspots.sort(key=lambda frame: frame.cumulative_seconds, reverse=True)
+    return ProfileReport(total_seconds, frames[:top_n], hotspots[:top_n])
+
+
+def _qualified_names(profiler: cProfile.Profile) -> dict[tuple[str, int, str], str]:
+    """从原始分析数据中取出代码对象的限定名称（co_qualname，如 DataFrame.apply）"""
+    names = {}
+    for entry in profiler.getstats():
+        code = entry.code
+        if not isinstance(code, str):
+            qualname = getattr(code, "co_qualname", code.co_name)
+            names[(code.co_filename, code.co_firstlineno, code.co_name)] = qualname
+    return names
+
+
+class CodeProfiler:
+    """cProfile 上下文管理器，退出时生成 report（被分析代码抛出异常时同样生成）
+
+    已有其他分析器在运行时（如调试器、外部 profiler）不进行分析，report 保持为 None。
+    """
+
+    def __init__(self, top_n: int = 25):
+        self.top_n = top_n
+        self.report: ProfileReport | None = None
+        self._profiler: cProfile.Profile | None = None
+        self._started = 0.0
+
+    def __enter__(self) -> "CodeProfiler":
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError as e:
+            logger.warning(f"无法启用 cProfile，跳过性能分析: {e}")
+            return self
+        self._profiler = profiler
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        if self._profiler is None:
+            return
+        self._profiler.disable()
+        self.report = build_report(
+            self._profiler,
+            time.perf_counter() - self._started,
+            _qualified_names(self._profiler),
+            self.top_n,
+        )
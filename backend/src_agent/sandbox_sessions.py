@@ -0,0 +1,242 @@
+"""
+沙箱会话管理模块
+
+过去所有对话共享一个全局 PythonSandbox，不同线程的变量相互覆盖，也无法随线程持久化。本模块：
+- 按 LangGraph 线程（configurable.thread_id）维护独立的沙箱会话，数量超出上限时按 LRU 淘汰
+- 每次工具调用后增量写入命名空间快照（见 sandbox_snapshot.py），只检查沙箱记录的脏变量
+- 线程在本进程中首次调用工具时（服务重启、被调度到其他工作进程），从快照恢复用户变量
+- 其他工作进程更新了同一线程的快照（manifest revision 变化）时，丢弃本进程中过时的会话并重新恢复
+- 不在 LangGraph 运行上下文中调用（脚本、测试）时使用默认会话，默认会话不写快照
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import TYPE_CHECKING
+
+from src_agent.config.sandbox_config import SandboxConfig
+from src_agent.sandbox_snapshot import SnapshotResult, SnapshotStore
+
+if TYPE_CHECKING:
+    from src_agent.sandbox import PythonSandbox
+
+logger = logging.getLogger(__name__)
+
+# 不在 LangGraph 运行上下文中时使用的会话
+DEFAULT_SESSION = "default"
+
+# 过期快照清理的最小间隔（秒）
+_PRUNE_INTERVAL_SECONDS = 3600
+
+
+def current_thread_id() -> str:
+    """返回当前工具调用所属的 LangGraph 线程 ID，不在运行上下文中时返回默认会话"""
+    from langgraph.config import get_config
+
+    try:
+        config = get_config()
+    except RuntimeError:
+        return DEFAULT_SESSION
+    thread_id = (config.get("configurable") or {}).get("thread_id")
+    return str(thread_id) if thread_id else DEFAULT_SESSION
+
+
+class SandboxSessionManager:
+    """按线程管理沙箱会话及其命名空间快照"""
+
+    def __init__(self, config: SandboxConfig | None = None):
+        """
+        Args:
+            config: 沙箱配置，如果为None则从环境变量读取
+        """
+        self.config = config or SandboxConfig.from_env()
+        self.config.validate()
+        self.snapshots = SnapshotStore(
+            self.config.snapshot_dir,
+            max_variable_bytes=self.config.snapshot_max_variable_mb * 1024 * 1024,
+            max_age_seconds=self.config.snapshot_max_age_hours * 3600,
+        )
+        self._sessions: OrderedDict[str, PythonSandbox] = OrderedDict()
+        # 全局锁只保护会话字典等共享状态的查找和修改，不在其中执行 I/O
+        self._lock = threading.RLock()
+        # 每个线程一把锁，串行化同一线程沙箱的创建和快照恢复
+        self._session_locks: dict[str, threading.Lock] = {}
+        # 每个线程一把锁，串行化同一线程的快照写入
+        self._snapshot_locks: dict[str, threading.Lock] = {}
+        # 正在淘汰（写入最终快照）的线程，快照写完后事件被置位
+        self._evicting: dict[str, threading.Event] = {}
+        # 线程 -> 会话对应的快照版本，与磁盘上的版本不同说明其他工作进程写入过
+        self._revisions: dict[str, str | None] = {}
+        self._last_prune = 0.0
+
+    def _snapshots_enabled(self, thread_id: str) -> bool:
+        return self.config.snapshot_enabled and thread_id != DEFAULT_SESSION
+
+    def get(self, thread_id: str = DEFAULT_SESSION) -> "PythonSandbox":
+        """获取线程的沙箱会话，不存在时创建并从快照恢复用户变量
+
+        创建沙箱和恢复快照只持有该线程自己的锁，淘汰其他会话时的快照写入在锁外进行，
+        不会阻塞其他线程的工具调用。
+        """
+        with self._lock:
+            sandbox = self._sessions.get(thread_id)
+            if sandbox is not None:
+                self._sessions.move_to_end(thread_id)
+            lock = self._session_locks.setdefault(thread_id, threading.Lock())
+        if sandbox is not None and not self._is_stale(thread_id):
+            return sandbox
+
+        with lock:
+            with self._lock:
+                current = self._sessions.get(thread_id)
+                stale = sandbox is not None and current is sandbox
+                if stale:
+                    # 不写入快照：磁盘上的版本比本进程的会话新
+                    self._sessions.pop(thread_id)
+                pending = self._evicting.get(thread_id)
+            if current is not None and not stale:
+                # 等待锁期间其他调用已经创建了会话
+                return current
+            if stale:
+                sandbox.figures.close_all()
+                logger.info(f"线程 {thread_id} 的快照已被其他工作进程更新，重新恢复沙箱会话")
+            if pending is not None:
+                # 该线程的会话刚被淘汰，等最终快照写完再恢复，避免读到旧版本
+                pending.wait()
+
+            sandbox = self._create(thread_id)
+            evicted = []
+            with self._lock:
+                current = self._sessions.get(thread_id)
+                if current is not None:
+                    return current
+                self._sessions[thread_id] = sandbox
+                while len(self._sessions) > self.config.max_sessions:
+                    evicted.append(self._detach(next(iter(self._sessions))))
+
+        for detached in evicted:
+            self._finish_eviction(*detached)
+        return sandbox
+
+    def _create(self, thread_id: str) -> "PythonSandbox":
+        from src_agent.sandbox import PythonSandbox
+
+        sandbox = PythonSandbox(self.config)
+        if self._snapshots_enabled(thread_id):
+            self._restore(thread_id, sandbox)
+        return sandbox
+
+    def _is_stale(self, thread_id: str) -> bool:
+        if not self._snapshots_enabled(thread_id):
+            return False
+        return self.snapshots.revision(thread_id) != self._revisions.get(thread_id)
+
+    def _restore(self, thread_id: str, sandbox: "PythonSandbox") -> None:
+        started = time.perf_counter()
+        self._revisions[thread_id] = self.snapshots.revision(thread_id)
+        variables = self.snapshots.load(thread_id)
+        for name, value in variables.items():
+            sandbox.sandbox_globals[name] = value
+        if variables:
+            logger.info(
+                f"已从快照恢复线程 {thread_id} 的 {len(variables)} 个沙箱变量 "
+                f"({time.perf_counter() - started:.2f}s): {', '.join(sorted(variables))}"
+            )
+
+    def snapshot(self, thread_id: str) -> SnapshotResult | None:
+        """增量写入线程沙箱的命名空间快照（未启用快照或会话不存在时返回 None）"""
+        if not self._snapshots_enabled(thread_id):
+            return None
+        with self._lock:
+            sandbox = self._sessions.get(thread_id)
+            lock = self._snapshot_locks.setdefault(thread_id, threading.Lock())
+        if sandbox is None:
+            return None
+        return self._write_snapshot(thread_id, sandbox, lock)
+
+    def _write_snapshot(
+        self, thread_id: str, sandbox: "PythonSandbox", lock: threading.Lock
+    ) -> SnapshotResult | None:
+        with lock:
+            # 只对上次快照以来赋值、读取（可能被原地修改）或删除过的变量计算指纹
+            changes = sandbox.consume_changes()
+            dirty = changes.assigned | changes.accessed | changes.deleted
+            try:
+                result = self.snapshots.save(thread_id, sandbox.user_variables(), names=dirty)
+                with self._lock:
+                    if self._sessions.get(thread_id) is sandbox:
+                        self._revisions[thread_id] = self.snapshots.revision(thread_id)
+            except OSError as e:
+                logger.warning(f"写入线程 {thread_id} 的沙箱快照失败: {e}")
+                # 放回本次的改动，下次快照时重新检查
+                changes.merge(sandbox.pending_changes)
+                sandbox.pending_changes = changes
+                return None
+        if result.written or result.removed:
+            logger.debug(
+                f"沙箱快照 {thread_id}: 写入 {result.written}，删除 {result.removed}，"
+                f"未变化 {len(result.unchanged)} 个"
+            )
+        self._maybe_prune()
+        return result
+
+    def evict(self, thread_id: str) -> None:
+        """淘汰线程的沙箱会话（淘汰前写入快照并关闭其图像）"""
+        with self._lock:
+            if thread_id not in self._sessions:
+                return
+            detached = self._detach(thread_id)
+        self._finish_eviction(*detached)
+
+    def _detach(
+        self, thread_id: str
+    ) -> tuple[str, "PythonSandbox", threading.Lock, threading.Event]:
+        """从会话字典中取出会话（调用方需持有全局锁），快照由 _finish_eviction 在锁外写入"""
+        sandbox = self._sessions.pop(thread_id)
+        self._session_locks.pop(thread_id, None)
+        self._revisions.pop(thread_id, None)
+        snapshot_lock = self._snapshot_locks.pop(thread_id, None) or threading.Lock()
+        done = threading.Event()
+        self._evicting[thread_id] = done
+        return thread_id, sandbox, snapshot_lock, done
+
+    def _finish_eviction(
+        self,
+        thread_id: str,
+        sandbox: "PythonSandbox",
+        snapshot_lock: threading.Lock,
+        done: threading.Event,
+    ) -> None:
+        try:
+            if self._snapshots_enabled(thread_id):
+                self._write_snapshot(thread_id, sandbox, snapshot_lock)
+        finally:
+            with self._lock:
+                if self._evicting.get(thread_id) is done:
+                    del self._evicting[thread_id]
+            done.set()
+        sandbox.figures.close_all()
+        logger.info(f"已淘汰线程 {thread_id} 的沙箱会话")
+
+    def _maybe_prune(self) -> None:
+        now = time.time()
+        with self._lock:
+            if now - self._last_prune < _PRUNE_INTERVAL_SECONDS:
+                return
+            self._last_prune = now
+        self.snapshots.prune(now)
+
+
+# 全局会话管理器实例（在工具间共享）
+_session_manager: SandboxSessionManager | None = None
+
+
+def get_session_manager() -> SandboxSessionManager:
+    """获取全局沙箱会话管理器实例"""
+    global _session_manager
+    if _session_manager is None:
+        _session_manager = SandboxSessionManager()
+    return _session_manager
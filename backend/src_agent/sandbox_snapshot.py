@@ -0,0 +1,579 @@
+"""
+沙箱命名空间快照模块
+
+PythonSandbox 的用户变量（extract_data 提取的 DataFrame、load_dataset 的结果等）只存在于内存，
+服务重启或线程被调度到其他工作进程后，智能体必须重新执行所有 SQL 提取和数据加载。本模块：
+- 按 LangGraph 线程把用户变量写入磁盘：DataFrame 使用 Parquet 列式格式（不可用时回退为 pickle），
+  其他对象仅在可安全 pickle 时保存（模块、函数、图像等跳过）
+- 增量写入：按变量记录内容指纹，未变化的变量不重复写入，已删除的变量同步删除
+- 安全：序列化时拒绝沙箱中定义的类型（不在宿主进程中执行其 __reduce__），写入前静态扫描 pickle 操作码
+  （不反序列化）；恢复时使用受限的 Unpickler，只允许 (模块, 名称) 白名单中的数据类型和重建函数
+- 多个工作进程共享快照目录：manifest 按文件状态缓存，每次写入生成新的 revision，
+  会话管理器据此发现其他进程更新了同一线程的快照
+"""
+
+from __future__ import annotations
+
+import abc
+import builtins
+import hashlib
+import importlib.util
+import io
+import json
+import logging
+import os
+import pickle
+import pickletools
+import re
+import shutil
+import sys
+import time
+import types
+import uuid
+from dataclasses import dataclass, field
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_FILENAME = "manifest.json"
+
+# 快照格式版本，结构变化时递增以使旧快照失效
+SNAPSHOT_VERSION = 1
+
+# 可能被保存的变量类型所在的顶层包（写入前的快速筛选，不是安全边界）
+_CANDIDATE_PACKAGES = frozenset(
+    {
+        "builtins",
+        "collections",
+        "datetime",
+        "decimal",
+        "fractions",
+        "uuid",
+        "zoneinfo",
+        "pytz",
+        "dateutil",
+        "numpy",
+        "pandas",
+        "pyarrow",
+    }
+)
+
+# pandas 时间偏移（DatetimeIndex.freq、DateOffset 等）
+_PANDAS_OFFSETS = (
+    "Day", "Hour", "Minute", "Second", "Milli", "Micro", "Nano", "Week", "WeekOfMonth",
+    "LastWeekOfMonth", "MonthEnd", "MonthBegin", "SemiMonthEnd", "SemiMonthBegin",
+    "BusinessDay", "BusinessHour", "BusinessMonthEnd", "BusinessMonthBegin",
+    "QuarterEnd", "QuarterBegin", "BQuarterEnd", "BQuarterBegin",
+    "YearEnd", "YearBegin", "BYearEnd", "BYearBegin", "DateOffset",
+)
+
+# 快照 pickle 中允许引用的全局对象：(模块, 名称) 精确白名单。
+# 只包含数据类型及其重建函数；eval、exec、__import__、pandas.read_pickle 等可执行代码或读写文件的对象都不在其中。
+# builtins.getattr 单独处理，只允许 zoneinfo.ZoneInfo._unpickle（见 _restricted_getattr）。
+SAFE_PICKLE_GLOBALS = frozenset(
+    {("builtins", name) for name in (
+        "bool", "bytearray", "bytes", "complex", "dict", "float", "frozenset", "int",
+        "list", "range", "set", "slice", "str", "tuple",
+    )}
+    | {("collections", name) for name in ("OrderedDict", "Counter", "defaultdict", "deque")}
+    | {("datetime", name) for name in ("date", "datetime", "time", "timedelta", "timezone")}
+    | {
+        ("decimal", "Decimal"),
+        ("fractions", "Fraction"),
+        ("uuid", "UUID"),
+        ("zoneinfo", "ZoneInfo"),
+        ("pytz", "_p"),
+        ("pytz", "_UTC"),
+        ("dateutil.relativedelta", "relativedelta"),
+        ("dateutil.tz.tz", "tzutc"),
+        ("dateutil.tz.tz", "tzoffset"),
+        ("numpy", "dtype"),
+        ("numpy", "ndarray"),
+        ("numpy.ma", "MaskedArray"),
+        ("numpy.ma.core", "_mareconstruct"),
+    }
+    # numpy 2.x 与 1.x 的模块路径
+    | {(f"{package}.multiarray", name) for package in ("numpy._core", "numpy.core") for name in ("_reconstruct", "scalar")}
+    | {(f"{package}.numeric", "_frombuffer") for package in ("numpy._core", "numpy.core")}
+    | {("pandas", name) for name in (
+        "DataFrame", "Series", "Index", "RangeIndex", "MultiIndex", "CategoricalIndex",
+        "DatetimeIndex", "TimedeltaIndex", "PeriodIndex", "IntervalIndex", "Categorical",
+        "Interval", "Period", "DateOffset", "NA", "ArrowDtype", "BooleanDtype", "CategoricalDtype",
+        "DatetimeTZDtype", "IntervalDtype", "PeriodDtype", "SparseDtype", "StringDtype",
+        "Float32Dtype", "Float64Dtype", "Int8Dtype", "Int16Dtype", "Int32Dtype", "Int64Dtype",
+        "UInt8Dtype", "UInt16Dtype", "UInt32Dtype", "UInt64Dtype",
+    )}
+    | {("pandas.arrays", name) for name in (
+        "ArrowExtensionArray", "ArrowStringArray", "BooleanArray", "Categorical", "DatetimeArray",
+        "FloatingArray", "IntegerArray", "IntervalArray", "NumpyExtensionArray", "PeriodArray",
+        "SparseArray", "StringArray", "TimedeltaArray",
+    )}
+    | {("pandas._libs.tslibs.offsets", name) for name in _PANDAS_OFFSETS}
+    | {
+        ("pandas._libs.arrays", "__pyx_unpickle_NDArrayBacked"),
+        ("pandas._libs.internals", "_unpickle_block"),
+        ("pandas._libs.interval", "__pyx_unpickle_IntervalMixin"),
+        ("pandas._libs.sparse", "IntIndex"),
+        ("pandas._libs.sparse", "BlockIndex"),
+        ("pandas._libs.tslibs.nattype", "_nat_unpickle"),
+        ("pandas._libs.tslibs.timedeltas", "_timedelta_unpickle"),
+        ("pandas._libs.tslibs.timestamps", "_unpickle_timestamp"),
+        ("pandas.core.indexes.base", "_new_Index"),
+        ("pandas.core.indexes.datetimes", "_new_DatetimeIndex"),
+        ("pandas.core.indexes.interval", "_new_IntervalIndex"),
+        ("pandas.core.internals.managers", "BlockManager"),
+        ("pandas.core.internals.managers", "SingleBlockManager"),
+        # pandas 的 Arrow 字符串等扩展类型在 pickle 中引用 pyarrow 的数组重建函数
+        ("pyarrow.lib", "_restore_array"),
+        ("pyarrow.lib", "py_buffer"),
+        ("pyarrow.lib", "type_for_alias"),
+    }
+)
+
+# zoneinfo.ZoneInfo 的 pickle 形如 getattr(ZoneInfo, "_unpickle")(key, from_cache)
+_GETATTR = ("builtins", "getattr")
+
+# 压入字符串的 pickle 操作码（STACK_GLOBAL 的模块名和名称）
+_STRING_OPCODES = frozenset(
+    {"SHORT_BINUNICODE", "BINUNICODE", "BINUNICODE8", "UNICODE", "SHORT_BINSTRING", "BINSTRING", "STRING"}
+)
+
+_SAFE_THREAD_ID = re.compile(r"^[\w\-]{1,128}$")
+
+
+class SnapshotSecurityError(pickle.UnpicklingError):
+    """快照中包含不允许保存或加载的类型"""
+
+
+def _restricted_getattr(obj: Any, name: str) -> Any:
+    from zoneinfo import ZoneInfo
+
+    if obj is ZoneInfo and name == "_unpickle":
+        return ZoneInfo._unpickle
+    raise SnapshotSecurityError(f"快照中包含不允许的属性访问: {getattr(obj, '__name__', obj)!r}.{name}")
+
+
+class _RestrictedUnpickler(pickle.Unpickler):
+    """只允许加载白名单中 (模块, 名称) 的 Unpickler"""
+
+    def find_class(self, module: str, name: str) -> Any:
+        if (module, name) == _GETATTR:
+            return _restricted_getattr
+        if (module, name) not in SAFE_PICKLE_GLOBALS:
+            raise SnapshotSecurityError(f"快照中包含不允许的类型: {module}.{name}")
+        return super().find_class(module, name)
+
+
+def restricted_loads(data: bytes) -> Any:
+    """使用受限 Unpickler 反序列化"""
+    return _RestrictedUnpickler(io.BytesIO(data)).load()
+
+
+def pickle_globals(data: bytes) -> set[tuple[str, str]]:
+    """静态扫描 pickle 操作码，返回引用的全局对象 (模块, 名称)，不执行其中的任何代码
+
+    Raises:
+        SnapshotSecurityError: STACK_GLOBAL 的模块名或名称无法静态确定
+    """
+    found: set[tuple[str, str]] = set()
+    # 只跟踪压栈的字符串（其余对象记为 None），足以确定 STACK_GLOBAL 的两个操作数
+    stack: list[str | None] = []
+    memo: dict[int, str | None] = {}
+    for opcode, arg, _ in pickletools.genops(data):
+        name = opcode.name
+        if name in _STRING_OPCODES:
+            stack.append(arg if isinstance(arg, str) else None)
+        elif name == "MEMOIZE":
+            memo[len(memo)] = stack[-1] if stack else None
+        elif name in ("PUT", "BINPUT", "LONG_BINPUT"):
+            memo[int(arg)] = stack[-1] if stack else None
+        elif name in ("GET", "BINGET", "LONG_BINGET"):
+            stack.append(memo.get(int(arg)))
+        elif name == "GLOBAL":
+            module, _, qualname = arg.partition(" ")
+            found.add((module, qualname))
+            stack.append(None)
+        elif name == "STACK_GLOBAL":
+            module, qualname = (stack[-2], stack[-1]) if len(stack) >= 2 else (None, None)
+            if module is None or qualname is None:
+                raise SnapshotSecurityError("无法确定 pickle 引用的全局对象")
+            found.add((module, qualname))
+            stack.append(None)
+        elif name not in ("PROTO", "FRAME", "STOP"):
+            stack.append(None)
+    return found
+
+
+def check_pickle(data: bytes) -> None:
+    """确认 pickle 只引用白名单中的全局对象（静态检查，不反序列化）"""
+    for module, name in pickle_globals(data):
+        if (module, name) != _GETATTR and (module, name) not in SAFE_PICKLE_GLOBALS:
+            raise SnapshotSecurityError(f"不支持保存的类型: {module}.{name}")
+
+
+# 直接读取类型的 __module__ / __qualname__，不经过沙箱代码可能自定义的元类
+_type_module = type.__dict__["__module__"].__get__
+_type_qualname = type.__dict__["__qualname__"].__get__
+
+
+# 可信的元类：白名单中类型（numpy.dtype 等）和 Cython 重建函数类型的元类，首次遇到时从已导入的模块中收集
+_trusted_metaclasses: set[type] = {type, abc.ABCMeta}
+
+
+def _is_trusted_metaclass(meta: type) -> bool:
+    if meta in _trusted_metaclasses:
+        return True
+    for module, name in SAFE_PICKLE_GLOBALS:
+        obj = getattr(sys.modules.get(module), name, None)
+        if obj is not None:
+            _trusted_metaclasses.add(type(obj) if isinstance(obj, type) else type(type(obj)))
+    return meta in _trusted_metaclasses
+
+
+def _type_name(cls: type) -> tuple[str, str] | None:
+    """返回类型的 (模块, 限定名)；元类不可信或名称不是字符串时返回 None"""
+    meta = type(cls)
+    if meta is type or meta is abc.ABCMeta:
+        module, qualname = _type_module(cls), _type_qualname(cls)
+    elif _is_trusted_metaclass(meta):
+        # Cython 等扩展类型的元类自行提供 __module__
+        module, qualname = cls.__module__, cls.__qualname__
+    else:
+        return None
+    if not isinstance(module, str) or not isinstance(qualname, str):
+        return None
+    return module, qualname
+
+
+def _is_importable_type(cls: type) -> bool:
+    """类型是否位于允许的包中，且能按 __module__ 和 __qualname__ 导入到同一个对象
+
+    沙箱代码中定义的类（即使伪造了 __module__）无法通过该检查。Cython 函数（pandas 的重建函数）
+    的类型位于 _cython_<版本> 模块中。
+    """
+    name = _type_name(cls)
+    if name is None:
+        return False
+    module_name, qualname = name
+    package = module_name.split(".", 1)[0]
+    if package not in _CANDIDATE_PACKAGES and not package.startswith("_cython_"):
+        return False
+    target: Any = sys.modules.get(module_name)
+    for part in qualname.split("."):
+        target = getattr(target, part, None)
+    return target is cls
+
+
+class _SnapshotPickler(pickle.Pickler):
+    """拒绝序列化沙箱中定义的类型，避免在宿主进程中执行其 __reduce__ 等方法"""
+
+    def reducer_override(self, obj: Any) -> Any:
+        # 使用 type() 而不是 isinstance()，后者会读取可被伪造的 __class__
+        cls = type(obj)
+        # 类和函数按全局引用保存，引用的名称由 check_pickle 检查
+        if issubclass(cls, type) or cls in (types.FunctionType, types.BuiltinFunctionType):
+            return NotImplemented
+        name = _type_qualname(cls)
+        if _type_module(cls) == "builtins":
+            if ("builtins", name) not in SAFE_PICKLE_GLOBALS or getattr(builtins, name, None) is not cls:
+                raise SnapshotSecurityError(f"不支持保存的类型: {name}")
+        elif not _is_importable_type(cls):
+            raise SnapshotSecurityError(f"不支持保存的类型: {name}")
+        return NotImplemented
+
+
+def safe_dumps(value: Any) -> bytes:
+    """序列化变量：只接受可导入的白名单包中的类型，且结果只引用白名单中的全局对象
+
+    Raises:
+        SnapshotSecurityError: 变量包含不支持保存的类型
+    """
+    buffer = io.BytesIO()
+    _SnapshotPickler(buffer, protocol=pickle.HIGHEST_PROTOCOL).dump(value)
+    data = buffer.getvalue()
+    check_pickle(data)
+    return data
+
+
+@dataclass
+class SnapshotResult:
+    """一次快照的统计结果"""
+
+    written: list[str] = field(default_factory=list)  # 新写入或更新的变量
+    unchanged: list[str] = field(default_factory=list)  # 未变化、跳过写入的变量
+    removed: list[str] = field(default_factory=list)  # 已从命名空间删除的变量
+    skipped: dict[str, str] = field(default_factory=dict)  # 无法保存的变量及原因
+
+
+def _parquet_available() -> bool:
+    return importlib.util.find_spec("pyarrow") is not None
+
+
+def _is_candidate(value: Any) -> bool:
+    """判断变量是否可能被安全保存（模块、函数、类以及非白名单类型直接跳过）"""
+    if isinstance(value, (types.ModuleType, type, types.FunctionType, types.MethodType)):
+        return False
+    if callable(value) and not hasattr(value, "__array__"):
+        return False
+    return type(value).__module__.split(".", 1)[0] in _CANDIDATE_PACKAGES
+
+
+def _nbytes(value: Any) -> int | None:
+    """估算数组类对象的内存大小，无法估算时返回 None"""
+    import numpy as np
+    import pandas as pd
+
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True, deep=False).sum())
+    if isinstance(value, (pd.Series, pd.Index)):
+        return int(value.memory_usage(deep=False))
+    if isinstance(value, np.ndarray):
+        return int(value.nbytes)
+    return None
+
+
+def fingerprint(value: Any) -> tuple[str, bytes | None]:
+    """计算变量的内容指纹，返回 (指纹, pickle 字节)。
+
+    pandas/numpy 对象使用向量化哈希，不需要序列化；其他对象对 pickle 字节（safe_dumps）取哈希，
+    同时返回 pickle 字节供写入时复用。
+
+    Raises:
+        SnapshotSecurityError: 变量包含不支持保存的类型
+    """
+    import numpy as np
+    import pandas as pd
+
+    digest = hashlib.sha1()
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        try:
+            hashed = pd.util.hash_pandas_object(value, index=True).to_numpy()
+        except TypeError:
+            # 包含不可哈希的单元格（如列表），回退到 pickle
+            hashed = None
+        if hashed is not None:
+            columns = list(map(str, value.columns)) if isinstance(value, pd.DataFrame) else []
+            dtypes = [str(dtype) for dtype in np.atleast_1d(value.dtypes)]
+            digest.update(repr((type(value).__name__, value.shape, columns, dtypes)).encode())
+            digest.update(hashed.tobytes())
+            return digest.hexdigest(), None
+    elif isinstance(value, np.ndarray) and value.dtype != object:
+        digest.update(repr((value.dtype.str, value.shape)).encode())
+        digest.update(np.ascontiguousarray(value).tobytes())
+        return digest.hexdigest(), None
+
+    data = safe_dumps(value)
+    digest.update(data)
+    return digest.hexdigest(), data
+
+
+class SnapshotStore:
+    """按线程保存沙箱用户变量的快照存储"""
+
+    def __init__(self, root_dir: str, max_variable_bytes: int, max_age_seconds: float):
+        """
+        Args:
+            root_dir: 快照根目录，每个线程一个子目录
+            max_variable_bytes: 单个变量的大小上限
+            max_age_seconds: 快照最长保留时间
+        """
+        self.root_dir = root_dir
+        self.max_variable_bytes = max_variable_bytes
+        self.max_age_seconds = max_age_seconds
+        # 线程 -> (manifest 文件状态, manifest)，文件状态不变时不重新读取磁盘
+        self._manifests: dict[str, tuple[tuple[int, int, int] | None, dict[str, Any]]] = {}
+
+    def thread_dir(self, thread_id: str) -> str:
+        """返回线程的快照目录（非常规字符的线程 ID 使用哈希作为目录名）"""
+        if _SAFE_THREAD_ID.match(thread_id):
+            name = thread_id
+        else:
+            name = "t_" + hashlib.sha256(thread_id.encode()).hexdigest()[:32]
+        return os.path.join(self.root_dir, name)
+
+    def _manifest_path(self, thread_id: str) -> str:
+        return os.path.join(self.thread_dir(thread_id), MANIFEST_FILENAME)
+
+    @staticmethod
+    def _stat_key(path: str) -> tuple[int, int, int] | None:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size, stat.st_ino
+
+    def _read_manifest(self, thread_id: str) -> dict[str, Any]:
+        path = self._manifest_path(thread_id)
+        key = self._stat_key(path)
+        cached = self._manifests.get(thread_id)
+        # 其他工作进程写入后文件状态会变化，此时重新读取
+        if cached is not None and cached[0] == key:
+            return cached[1]
+        try:
+            with open(path, encoding="utf-8") as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            manifest = {}
+        if manifest.get("version") != SNAPSHOT_VERSION:
+            manifest = {"version": SNAPSHOT_VERSION, "variables": {}}
+        self._manifests[thread_id] = (key, manifest)
+        return manifest
+
+    def _write_manifest(self, thread_id: str, manifest: dict[str, Any]) -> None:
+        directory = self.thread_dir(thread_id)
+        path = self._manifest_path(thread_id)
+        manifest["revision"] = uuid.uuid4().hex
+        tmp_path = os.path.join(directory, f"{MANIFEST_FILENAME}.{os.getpid()}.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+        self._manifests[thread_id] = (self._stat_key(path), manifest)
+
+    def revision(self, thread_id: str) -> str | None:
+        """返回线程快照的当前版本（每次写入 manifest 时生成），没有快照时返回 None"""
+        return self._read_manifest(thread_id).get("revision")
+
+    def _write_variable(
+        self, directory: str, name: str, value: Any, data: bytes | None
+    ) -> dict[str, Any]:
+        """写入单个变量，返回 manifest 条目"""
+        import pandas as pd
+
+        file_stem = hashlib.sha1(name.encode()).hexdigest()[:16]
+        if isinstance(value, pd.DataFrame) and _parquet_available():
+            path = os.path.join(directory, f"{file_stem}.parquet")
+            try:
+                value.to_parquet(path)
+                return {"format": "parquet", "file": os.path.basename(path)}
+            except Exception as e:
+                # 非字符串列名、混合类型的 object 列等无法写入 Parquet，回退为 pickle
+                logger.debug(f"变量 {name} 无法写入 Parquet，回退为 pickle: {e}")
+                self._remove_file(directory, os.path.basename(path))
+
+        if data is None:
+            data = safe_dumps(value)
+        if len(data) > self.max_variable_bytes:
+            raise ValueError(f"序列化后大小 {len(data):,} 字节超过上限")
+        path = os.path.join(directory, f"{file_stem}.pkl")
+        with open(path, "wb") as f:
+            f.write(data)
+        return {"format": "pickle", "file": os.path.basename(path)}
+
+    def save(
+        self,
+        thread_id: str,
+        variables: dict[str, Any],
+        names: set[str] | None = None,
+    ) -> SnapshotResult:
+        """增量保存线程的用户变量。
+
+        Args:
+            thread_id: LangGraph 线程 ID
+            variables: 当前的用户变量
+            names: 自上次快照以来可能变化的变量名（见 sandbox_namespace.py），
+                为 None 时对全部变量计算指纹
+
+        Returns:
+            快照统计结果
+        """
+        result = SnapshotResult()
+        manifest = self._read_manifest(thread_id)
+        entries: dict[str, Any] = manifest["variables"]
+        directory = self.thread_dir(thread_id)
+        os.makedirs(directory, exist_ok=True)
+
+        if names is None:
+            candidates = list(variables)
+        else:
+            # 只检查脏变量；快照中还没有的变量（如函数内通过 global 新建的）也一并检查
+            candidates = [name for name in variables if name in names or name not in entries]
+
+        for name in candidates:
+            value = variables[name]
+            if not _is_candidate(value):
+                result.skipped[name] = type(value).__name__
+                continue
+            size = _nbytes(value)
+            if size is not None and size > self.max_variable_bytes:
+                result.skipped[name] = f"超过大小上限 ({size:,} 字节)"
+                continue
+            try:
+                digest, data = fingerprint(value)
+                previous = entries.get(name)
+                if previous and previous["fingerprint"] == digest:
+                    result.unchanged.append(name)
+                    continue
+                entry = self._write_variable(directory, name, value, data)
+            except Exception as e:
+                result.skipped[name] = str(e)
+                continue
+            if previous and previous["file"] != entry["file"]:
+                self._remove_file(directory, previous["file"])
+            entry["fingerprint"] = digest
+            entries[name] = entry
+            result.written.append(name)
+
+        # 变量已删除或本次无法保存时，删除旧快照，避免恢复出过时的值
+        stale = [name for name in entries if name not in variables or name in result.skipped]
+        for name in stale:
+            self._remove_file(directory, entries.pop(name)["file"])
+            if name not in variables:
+                result.removed.append(name)
+
+        if result.written or stale or not os.path.exists(self._manifest_path(thread_id)):
+            self._write_manifest(thread_id, manifest)
+        return result
+
+    def load(self, thread_id: str) -> dict[str, Any]:
+        """加载线程快照中的全部变量，无法加载的变量记录警告后跳过"""
+        import pandas as pd
+
+        manifest = self._read_manifest(thread_id)
+        directory = self.thread_dir(thread_id)
+        variables: dict[str, Any] = {}
+        for name, entry in list(manifest["variables"].items()):
+            path = os.path.join(directory, entry["file"])
+            try:
+                if entry["format"] == "parquet":
+                    variables[name] = pd.read_parquet(path)
+                else:
+                    with open(path, "rb") as f:
+                        variables[name] = restricted_loads(f.read())
+            except Exception as e:
+                logger.warning(f"恢复沙箱变量 {name} 失败: {e}")
+                manifest["variables"].pop(name, None)
+        return variables
+
+    def delete(self, thread_id: str) -> None:
+        """删除线程的全部快照"""
+        self._manifests.pop(thread_id, None)
+        shutil.rmtree(self.thread_dir(thread_id), ignore_errors=True)
+
+    def prune(self, now: float | None = None) -> int:
+        """删除超过保留时长的线程快照，返回删除的线程目录数"""
+        now = now or time.time()
+        removed = 0
+        try:
+            entries = list(os.scandir(self.root_dir))
+        except FileNotFoundError:
+            return 0
+        for entry in entries:
+            manifest_path = os.path.join(entry.path, MANIFEST_FILENAME)
+            try:
+                if now - os.stat(manifest_path).st_mtime <= self.max_age_seconds:
+                    continue
+            except OSError:
+                continue
+            shutil.rmtree(entry.path, ignore_errors=True)
+            removed += 1
+        if removed:
+            self._manifests.clear()
+            logger.info(f"已清理 {removed} 个过期的沙箱快照")
+        return removed
+
+    @staticmethod
+    def _remove_file(directory: str, filename: str) -> None:
+        try:
+            os.remove(os.path.join(directory, filename))
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,323 @@
+"""
+数据库结构缓存模块
+
+编写 SQL 前，模型往往要先通过 sql_inter 执行 SHOW TABLES / DESCRIBE / information_schema 查询，
+每个对话线程都重复一遍，既多出几轮模型往返，也反复访问数据库。本模块按数据源缓存表结构：
+- 一次读取 information_schema 的 TABLES / COLUMNS / STATISTICS，得到表、列、类型、索引和预估行数
+- 缓存在所有线程间共享；过期后先返回旧结构，同时在后台刷新（stale-while-revalidate），
+  只有首次访问某个数据源时需要同步查询，且并发的首次访问只查询一次
+- sql_inter 执行写语句（可能包含 DDL）后使对应数据源的缓存失效
+- 由 describe_schema 工具以紧凑文本提供：不指定表时为全部表的概览，指定表时包含列注释和索引
+
+注意：TABLE_ROWS 对 InnoDB 只是统计估计值，可能与实际行数相差较大。
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Sequence
+
+from src_agent.config.schema_cache_config import SchemaCacheConfig
+from src_agent.datasources import DataSourceRouter, get_router
+from src_agent.instrumentation import instrument, record_cache
+
+logger = logging.getLogger(__name__)
+
+_TABLES_SQL = """
+SELECT TABLE_NAME AS name, TABLE_TYPE AS type, TABLE_ROWS AS approx_rows, TABLE_COMMENT AS comment
+FROM information_schema.TABLES
+WHERE TABLE_SCHEMA = DATABASE()
+ORDER BY TABLE_NAME
+"""
+
+_COLUMNS_SQL = """
+SELECT TABLE_NAME AS table_name, COLUMN_NAME AS name, COLUMN_TYPE AS type,
+       IS_NULLABLE AS nullable, COLUMN_KEY AS `key`, COLUMN_COMMENT AS comment
+FROM information_schema.COLUMNS
+WHERE TABLE_SCHEMA = DATABASE()
+ORDER BY TABLE_NAME, ORDINAL_POSITION
+"""
+
+_INDEXES_SQL = """
+SELECT TABLE_NAME AS table_name, INDEX_NAME AS name, NON_UNIQUE AS non_unique, COLUMN_NAME AS column_name
+FROM information_schema.STATISTICS
+WHERE TABLE_SCHEMA = DATABASE()
+ORDER BY TABLE_NAME, INDEX_NAME, SEQ_IN_INDEX
+"""
+
+
+@dataclass
+class ColumnInfo:
+    """列信息"""
+
+    name: str
+    type: str
+    nullable: bool = True
+    # PRI / UNI / MUL（COLUMN_KEY），无索引时为空
+    key: str = ""
+    comment: str = ""
+
+
+@dataclass
+class IndexInfo:
+    """索引信息"""
+
+    name: str
+    columns: list[str] = field(default_factory=list)
+    unique: bool = False
+
+
+@dataclass
+class TableSchema:
+    """表（或视图）结构"""
+
+    name: str
+    columns: list[ColumnInfo] = field(default_factory=list)
+    indexes: list[IndexInfo] = field(default_factory=list)
+    # 预估行数（information_schema.TABLES.TABLE_ROWS），视图为 None
+    approx_rows: int | None = None
+    comment: str = ""
+    is_view: bool = False
+
+
+@dataclass
+class DatabaseSchema:
+    """一个数据源的完整结构"""
+
+    source: str
+    database: str | None
+    tables: dict[str, TableSchema]
+    fetched_at: float
+
+
+def _fetch(cursor: Any, sql: str) -> list[dict[str, Any]]:
+    cursor.execute(sql)
+    names = [str(column[0]).lower() for column in cursor.description]
+    return [dict(zip(names, row)) for row in cursor.fetchall()]
+
+
+def introspect(conn: Any, source: str, clock: Callable[[], float] = time.monotonic) -> DatabaseSchema:
+    """读取连接当前数据库的表、列、索引和预估行数"""
+    with conn.cursor() as cursor, instrument("mysql.introspect") as measurement:
+        database = _fetch(cursor, "SELECT DATABASE() AS name")[0]["name"]
+        tables: dict[str, TableSchema] = {}
+        for row in _fetch(cursor, _TABLES_SQL):
+            is_view = str(row["type"]).upper() == "VIEW"
+            tables[row["name"]] = TableSchema(
+                name=row["name"],
+                approx_rows=None if is_view or row["approx_rows"] is None else int(row["approx_rows"]),
+                comment=row["comment"] or "",
+                is_view=is_view,
+            )
+        for row in _fetch(cursor, _COLUMNS_SQL):
+            table = tables.get(row["table_name"])
+            if table is not None:
+                table.columns.append(
+                    ColumnInfo(
+                        name=row["name"],
+                        type=str(row["type"]),
+                        nullable=str(row["nullable"]).upper() == "YES",
+                        key=row["key"] or "",
+                        comment=row["comment"] or "",
+                    )
+                )
+        for row in _fetch(cursor, _INDEXES_SQL):
+            table = tables.get(row["table_name"])
+            if table is None:
+                continue
+            if not table.indexes or table.indexes[-1].name != row["name"]:
+                table.indexes.append(IndexInfo(name=row["name"], unique=not int(row["non_unique"])))
+            table.indexes[-1].columns.append(row["column_name"])
+        measurement.rows = len(tables)
+    return DatabaseSchema(source=source, database=database, tables=tables, fetched_at=clock())
+
+
+def _rows_label(table: TableSchema) -> str:
+    if table.is_view:
+        return "视图"
+    if table.approx_rows is None:
+        return "行数未知"
+    return f"约 {table.approx_rows:,} 行"
+
+
+def format_overview(schema: DatabaseSchema, max_tables: int = 50) -> str:
+    """全部表的概览：每张表一行，列出列名和类型（表较多时只展开预估行数最大的 max_tables 张）"""
+    header = f"数据源 {schema.source}（数据库 {schema.database}）共 {len(schema.tables)} 张表/视图"
+    if not schema.tables:
+        return header
+    ranked = sorted(schema.tables.values(), key=lambda table: -(table.approx_rows or 0))
+    expanded = {table.name for table in ranked[:max_tables]}
+    lines = [header + "："]
+    for table in schema.tables.values():
+        if table.name not in expanded:
+            continue
+        columns = ", ".join(
+            f"{column.name} {column.type}{' PK' if column.key == 'PRI' else ''}" for column in table.columns
+        )
+        comment = f" {table.comment}" if table.comment else ""
+        lines.append(f"- {table.name}（{_rows_label(table)}）{comment}: {columns}")
+    rest = [name for name in schema.tables if name not in expanded]
+    if rest:
+        lines.append(f"其余 {len(rest)} 张表（指定表名查看结构）: {', '.join(rest)}")
+    return "\n".join(lines)
+
+
+def format_tables(schema: DatabaseSchema, names: Sequence[str]) -> str:
+    """指定表的详细结构：列（类型、可空、键、注释）和索引；表名大小写不敏感"""
+    by_lower = {name.lower(): table for name, table in schema.tables.items()}
+    sections, missing = [], []
+    for name in names:
+        table = by_lower.get(name.strip().strip("`").lower())
+        if table is None:
+            missing.append(name)
+            continue
+        comment = f" {table.comment}" if table.comment else ""
+        lines = [f"表 {table.name}（{_rows_label(table)}）{comment}", "列:"]
+        for column in table.columns:
+            flags = [column.type, "NULL" if column.nullable else "NOT NULL"]
+            if column.key:
+                flags.append(column.key)
+            note = f" — {column.comment}" if column.comment else ""
+            lines.append(f"  - {column.name} {' '.join(flags)}{note}")
+        if table.indexes:
+            lines.append("索引:")
+            for index in table.indexes:
+                unique = " UNIQUE" if index.unique else ""
+                lines.append(f"  - {index.name} ({', '.join(index.columns)}){unique}")
+        sections.append("\n".join(lines))
+    if missing:
+        sections.append(
+            f"未找到表: {', '.join(missing)}。数据源 {schema.source} 中的表: {', '.join(schema.tables)}"
+        )
+    return "\n\n".join(sections)
+
+
+def _start_thread(task: Callable[[], None]) -> None:
+    threading.Thread(target=task, name="schema-cache-refresh", daemon=True).start()
+
+
+class SchemaCache:
+    """按数据源缓存数据库结构，过期后在后台刷新"""
+
+    def __init__(
+        self,
+        router: DataSourceRouter | None = None,
+        config: SchemaCacheConfig | None = None,
+        clock: Callable[[], float] = time.monotonic,
+        runner: Callable[[Callable[[], None]], None] = _start_thread,
+    ):
+        """
+        Args:
+            router: 数据源路由，如果为None则使用全局路由
+            config: 缓存配置，如果为None则从环境变量读取
+            clock: 时间函数（测试中可替换）
+            runner: 执行后台刷新的函数，默认启动守护线程（测试中可替换为同步执行）
+        """
+        self._router = router
+        self.config = config or SchemaCacheConfig.from_env()
+        self.config.validate()
+        self._clock = clock
+        self._runner = runner
+        self._entries: dict[str, DatabaseSchema] = {}
+        # 失效代数：invalidate 时递增，开始查询前的代数与写入时不同说明查询期间缓存已失效，结果不再写入
+        self._generations: dict[str, int] = {}
+        self._epoch = 0
+        self._refreshing: set[str] = set()
+        self._source_locks: dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def router(self) -> DataSourceRouter:
+        return self._router or get_router()
+
+    def _fresh(self, entry: DatabaseSchema | None) -> bool:
+        return entry is not None and self._clock() - entry.fetched_at < self.config.ttl_seconds
+
+    def get(self, source: str | None = None) -> DatabaseSchema:
+        """获取数据源结构：新鲜时直接返回；过期时返回旧结构并在后台刷新；没有缓存时同步查询
+
+        Raises:
+            DataSourceError: 未知的数据源或无法连接
+        """
+        name = self.router.source(source).name
+        if self.config.enabled:
+            with self._lock:
+                entry = self._entries.get(name)
+            if entry is not None:
+                record_cache("schema", True)
+                if not self._fresh(entry):
+                    self._refresh_in_background(name)
+                return entry
+
+        record_cache("schema", False)
+        with self._lock:
+            source_lock = self._source_locks.setdefault(name, threading.Lock())
+        with source_lock:
+            # 等待期间其他线程可能已经完成查询
+            with self._lock:
+                entry = self._entries.get(name)
+            if self.config.enabled and self._fresh(entry):
+                return entry
+            return self.refresh(name)
+
+    def _generation(self, name: str) -> tuple[int, int]:
+        return self._epoch, self._generations.get(name, 0)
+
+    def refresh(self, source: str | None = None) -> DatabaseSchema:
+        """立即重新读取数据源结构并写入缓存（查询期间缓存被 invalidate 时只返回结果，不写入缓存）"""
+        name = self.router.source(source).name
+        with self._lock:
+            generation = self._generation(name)
+        with self.router.connection(name, read_only=True) as conn:
+            schema = introspect(conn, name, clock=self._clock)
+        with self._lock:
+            if self._generation(name) == generation:
+                self._entries[name] = schema
+        return schema
+
+    def _refresh_in_background(self, name: str) -> None:
+        with self._lock:
+            if name in self._refreshing:
+                return
+            self._refreshing.add(name)
+
+        def task() -> None:
+            try:
+                self.refresh(name)
+            except Exception as e:
+                # 刷新失败时继续使用旧结构，下次访问再重试
+                logger.warning("Failed to refresh schema of %s: %s", name, e)
+            finally:
+                with self._lock:
+                    self._refreshing.discard(name)
+
+        self._runner(task)
+
+    def invalidate(self, source: str | None = None) -> None:
+        """使数据源的缓存失效（source 为 None 时清空全部）"""
+        name = None if source is None else self.router.source(source).name
+        with self._lock:
+            if name is None:
+                self._entries.clear()
+                self._epoch += 1
+            else:
+                self._entries.pop(name, None)
+                self._generations[name] = self._generations.get(name, 0) + 1
+
+
+# 全局结构缓存实例（首次调用 describe_schema 时创建）
+_schema_cache: SchemaCache | None = None
+_schema_cache_lock = threading.Lock()
+
+
+def get_schema_cache() -> SchemaCache:
+    """获取全局数据库结构缓存实例"""
+    global _schema_cache
+    if _schema_cache is None:
+        with _schema_cache_lock:
+            if _schema_cache is None:
+                _schema_cache = SchemaCache()
+    return _schema_cache
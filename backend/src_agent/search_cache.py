@@ -0,0 +1,187 @@
+"""
+搜索结果缓存模块
+
+search_tool 每次调用都会请求 Tavily，包括重试和并行线程发出的相同查询。本模块在搜索后端外包一层：
+- 按规范化后的查询和参数缓存结果（TTL 过期 + LRU 容量上限），重复查询直接返回
+- 单飞（single-flight）：多个线程同时发出相同查询时只请求一次，其余线程等待并共享结果
+- 后端可替换：默认使用 TavilySearch，测试可传入本地桩实现
+
+出错的结果（异常或 Tavily 返回的 {"error": ...}）不会被缓存。
+"""
+
+from __future__ import annotations
+
+import copy
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Protocol
+
+from src_agent.config.search_config import SearchCacheConfig
+from src_agent.instrumentation import instrument, record_cache
+
+
+class SearchBackend(Protocol):
+    """搜索后端：接收 Tavily 格式的参数字典，返回搜索结果"""
+
+    def search(self, params: dict[str, Any]) -> Any: ...
+
+
+class TavilyBackend:
+    """基于 langchain_tavily.TavilySearch 的搜索后端（首次搜索时创建实例）
+
+    max_results: 最大返回结果数量
+    topic: 搜索主题类型（general表示通用搜索）
+    """
+
+    def __init__(self, max_results: int = 5, topic: str = "general"):
+        self.max_results = max_results
+        self.topic = topic
+        self._tavily = None
+        self._lock = threading.Lock()
+
+    def _client(self):
+        with self._lock:
+            if self._tavily is None:
+                from langchain_tavily import TavilySearch
+
+                from src_agent.env import load_env
+
+                load_env()
+                self._tavily = TavilySearch(max_results=self.max_results, topic=self.topic)
+            return self._tavily
+
+    def search(self, params: dict[str, Any]) -> Any:
+        with instrument("tavily.search") as measurement:
+            response = self._client().invoke(params)
+            if isinstance(response, dict):
+                measurement.rows = len(response.get("results") or [])
+        return response
+
+
+def cache_key(params: dict[str, Any]) -> str:
+    """规范化查询参数：查询词去除首尾空白、合并连续空白并转小写，域名列表去重排序"""
+    normalized: dict[str, Any] = {}
+    for name, value in params.items():
+        if value is None or value == [] or value == "":
+            continue
+        if name == "query":
+            value = " ".join(str(value).split()).lower()
+        elif isinstance(value, (list, tuple, set)):
+            value = sorted({str(item).strip().lower() for item in value})
+        normalized[name] = value
+    return json.dumps(normalized, ensure_ascii=False, sort_keys=True, default=str)
+
+
+def _is_error(response: Any) -> bool:
+    return isinstance(response, dict) and "error" in response
+
+
+class _Flight:
+    """一次进行中的搜索，等待者共享其结果"""
+
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: BaseException | None = None
+
+
+class CachedSearch:
+    """带 TTL/LRU 缓存和并发查询合并的搜索包装器（线程安全）"""
+
+    def __init__(
+        self,
+        backend: SearchBackend,
+        config: SearchCacheConfig | None = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """
+        Args:
+            backend: 搜索后端
+            config: 缓存配置，如果为None则从环境变量读取
+            clock: 时间函数（测试中可替换）
+        """
+        self.backend = backend
+        self.config = config or SearchCacheConfig.from_env()
+        self.config.validate()
+        self._clock = clock
+        # 缓存键 -> (过期时间, 结果)
+        self._entries: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+        self._flights: dict[str, _Flight] = {}
+        self._lock = threading.Lock()
+
+    def search(self, params: dict[str, Any]) -> Any:
+        """搜索，命中缓存或合并到进行中的相同查询时不请求后端"""
+        key = cache_key(params)
+        with self._lock:
+            cached = self._get(key)
+            if cached is not None:
+                record_cache("search", True)
+                return copy.deepcopy(cached)
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+        # 合并到进行中的查询同样计为命中（没有请求后端）
+        record_cache("search", not leader)
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return copy.deepcopy(flight.result)
+
+        try:
+            flight.result = self.backend.search(params)
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+                if flight.error is None and self.config.enabled and not _is_error(flight.result):
+                    self._put(key, flight.result)
+            flight.done.set()
+        return copy.deepcopy(flight.result)
+
+    def _get(self, key: str) -> Any:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, result = entry
+        if expires_at <= self._clock():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return result
+
+    def _put(self, key: str, result: Any) -> None:
+        self._entries[key] = (self._clock() + self.config.ttl_seconds, result)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.config.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        """清空缓存"""
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+
+# 全局搜索缓存实例（首次搜索时创建）
+_search_cache: CachedSearch | None = None
+_search_cache_lock = threading.Lock()
+
+
+def get_search_cache() -> CachedSearch:
+    """获取全局搜索缓存实例（后端为 Tavily）"""
+    global _search_cache
+    if _search_cache is None:
+        with _search_cache_lock:
+            if _search_cache is None:
+                _search_cache = CachedSearch(TavilyBackend())
+    return _search_cache
@@ -0,0 +1,288 @@
+"""
+SQL 查询成本防护模块
+
+sql_inter / extract_data 过去把模型生成的 SQL 原样发给共享的 MySQL，全表扫描或缺少连接条件的笛卡尔积
+会长时间占用数据库。本模块在执行前做预检：
+- 对 SELECT / WITH / TABLE 查询先执行 EXPLAIN，按 rows × filtered 估算嵌套循环连接的扫描行数
+- 超出预算时：可流式返回的简单查询（无排序、分组、聚合、DISTINCT、UNION，执行计划无临时表、文件排序、
+  连接缓冲）自动添加 LIMIT；其他查询拒绝执行，并提示改为带索引条件的过滤或在 SQL 中聚合
+- 为连接设置服务端执行超时（MySQL 的 max_execution_time，MariaDB 回退为 max_statement_time）
+
+注意：
+- EXPLAIN 的 rows 是优化器基于统计信息的估计，可能与实际扫描行数相差较大
+- 相关子查询按执行一次估算；SHOW / DESCRIBE 等元数据语句和写语句不做预检
+- max_execution_time 只对 SELECT 生效
+"""
+
+from __future__ import annotations
+
+import logging
+import re
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Sequence
+
+from src_agent.config.sql_guard_config import SQLGuardConfig
+from src_agent.instrumentation import instrument
+
+logger = logging.getLogger(__name__)
+
+# MySQL 3024 ER_QUERY_TIMEOUT；MariaDB 1969 ER_STATEMENT_TIMEOUT
+_TIMEOUT_ERROR_CODES = {3024, 1969}
+
+# MySQL 1193 ER_UNKNOWN_SYSTEM_VARIABLE（MariaDB 没有 max_execution_time）
+_UNKNOWN_VARIABLE = 1193
+
+_COMMENT_RE = re.compile(r"/\*.*?\*/|--[^\n]*|#[^\n]*", re.S)
+_QUOTED_RE = re.compile(r"'(?:[^'\\]|\\.|'')*'|\"(?:[^\"\\]|\\.|\"\")*\"|`[^`]*`", re.S)
+_TRAILING_LIMIT_RE = re.compile(r"\blimit\s+(\d+)\s*(?:,\s*(\d+)|\boffset\s+(\d+))?\s*$", re.I)
+# 超出预算时不能追加 LIMIT 的结构（直接拒绝）：
+# - 需要读完全部匹配行才能返回第一行，LIMIT 无法减少扫描量
+# - 锁定读（FOR UPDATE / FOR SHARE / LOCK IN SHARE MODE）和 INTO 子句必须位于 LIMIT 之后，末尾追加 LIMIT 会产生语法错误
+_BLOCKING_RE = re.compile(
+    r"\b(?:group\s+by|order\s+by|distinct|union|having|over)\b"
+    r"|\b(?:count|sum|avg|min|max|group_concat|std|stddev|variance)\s*\("
+    r"|\bfor\s+(?:update|share)\b|\block\s+in\s+share\s+mode\b|\binto\b",
+    re.I,
+)
+# 括号与单词，用于跳过 WITH 子句中的 CTE 定义
+_TOKEN_RE = re.compile(r"[()]|\w+")
+# 语句主体可能的起始关键字
+_STATEMENT_KEYWORDS = ("select", "table", "update", "delete", "insert", "replace")
+_BLOCKING_EXTRA = ("using temporary", "using filesort", "join buffer", "hash join")
+
+
+class QueryRejected(Exception):
+    """查询预估成本超出预算，拒绝执行（消息直接返回给模型）"""
+
+
+@dataclass
+class PlanStep:
+    """EXPLAIN 输出的一行（一个表的访问方式）"""
+
+    select_id: int | None
+    table: str | None
+    access_type: str | None
+    key: str | None
+    rows: float
+    filtered: float
+    extra: str
+
+
+@dataclass
+class Preflight:
+    """预检结果"""
+
+    # 实际执行的 SQL（可能已添加 LIMIT）
+    sql: str
+    # 预估扫描行数，未做预检时为 None
+    estimated_rows: float | None = None
+    # 需要告知模型的说明（如自动添加了 LIMIT）
+    notes: list[str] = field(default_factory=list)
+
+
+def _normalize(sql: str) -> str:
+    """去掉注释、用占位符替换字符串和引用的标识符、去掉末尾分号，用于关键字判断"""
+    text = _COMMENT_RE.sub(" ", _QUOTED_RE.sub("''", sql))
+    return text.strip().rstrip(";").strip()
+
+
+def _strip_terminator(sql: str) -> str:
+    return sql.strip().rstrip(";").rstrip()
+
+
+def _first_keyword(normalized: str) -> str:
+    first = normalized.lstrip("(").split(None, 1)
+    return first[0].lower() if first else ""
+
+
+def _statement_keyword(normalized: str) -> str:
+    """语句主体的关键字：WITH 语句跳过 CTE 定义，返回括号外第一个语句关键字（如 WITH … UPDATE 返回 update）"""
+    first = _first_keyword(normalized)
+    if first != "with":
+        return first
+    depth = 0
+    for match in _TOKEN_RE.finditer(normalized.lstrip("(")):
+        token = match.group().lower()
+        if token == "(":
+            depth += 1
+        elif token == ")":
+            depth -= 1
+        elif depth <= 0 and token in _STATEMENT_KEYWORDS:
+            return token
+    return first
+
+
+def _needs_preflight(normalized: str) -> bool:
+    return _statement_keyword(normalized) in ("select", "table")
+
+
+def is_read_statement(sql: str) -> bool:
+    """是否为只读语句（查询或元数据语句），只读语句可以路由到只读副本"""
+    return _statement_keyword(_normalize(sql)) in (
+        "select", "table", "show", "describe", "desc", "explain",
+    )
+
+
+def _trailing_limit(normalized: str) -> int | None:
+    """末尾 LIMIT 子句需要读取的行数（OFFSET + 行数），没有时返回 None"""
+    match = _TRAILING_LIMIT_RE.search(normalized)
+    if match is None:
+        return None
+    first, count, offset = match.groups()
+    if count is not None:  # LIMIT offset, count
+        return int(first) + int(count)
+    return int(first) + int(offset or 0)
+
+
+def parse_plan(rows: Sequence[Sequence[Any]], description: Sequence[Sequence[Any]]) -> list[PlanStep]:
+    """解析传统表格格式的 EXPLAIN 输出"""
+    names = [str(column[0]).lower() for column in description]
+    steps = []
+    for row in rows:
+        record = dict(zip(names, row))
+        filtered = record.get("filtered")
+        steps.append(
+            PlanStep(
+                select_id=record.get("id"),
+                table=record.get("table"),
+                access_type=record.get("type"),
+                key=record.get("key"),
+                rows=float(record.get("rows") or 0),
+                filtered=float(filtered) if filtered is not None else 100.0,
+                extra=str(record.get("extra") or ""),
+            )
+        )
+    return steps
+
+
+def estimate_examined_rows(steps: Sequence[PlanStep]) -> float:
+    """估算扫描行数
+
+    同一 select_id 内按嵌套循环连接计算：第 k 张表的扫描行数 = 前面各表输出行数（rows × filtered%）之积 × rows_k；
+    不同 select_id（子查询、派生表、UNION 分支）的扫描行数相加。
+    """
+    total = 0.0
+    fanout: dict[Any, float] = {}
+    for step in steps:
+        prefix = fanout.get(step.select_id, 1.0)
+        total += prefix * step.rows
+        fanout[step.select_id] = prefix * step.rows * step.filtered / 100.0
+    return total
+
+
+def _suggestion(steps: Sequence[PlanStep]) -> str:
+    hints = []
+    full_scans = [step.table for step in steps if step.access_type == "ALL" and step.table]
+    if full_scans:
+        hints.append(f"表 {', '.join(full_scans)} 为全表扫描，请在 WHERE 中添加带索引列的过滤条件")
+    if any("join buffer" in step.extra.lower() or "hash join" in step.extra.lower() for step in steps[1:]):
+        hints.append("连接未使用索引，请检查是否缺少连接条件（笛卡尔积）")
+    hints.append("如只需统计结果，请在 SQL 中用 GROUP BY / COUNT / SUM 等聚合后再返回")
+    hints.append("如只需查看样例，请添加 LIMIT")
+    return "；".join(hints)
+
+
+class SQLGuard:
+    """MySQL 查询预检与执行超时"""
+
+    def __init__(self, config: SQLGuardConfig | None = None):
+        """
+        Args:
+            config: 防护配置，如果为None则从环境变量读取
+        """
+        self.config = config or SQLGuardConfig.from_env()
+        self.config.validate()
+
+    def apply_timeout(self, conn: Any) -> None:
+        """为连接设置服务端执行超时（MySQL 不支持时回退为 MariaDB 的变量，均失败时只记录警告）"""
+        seconds = self.config.execution_timeout_seconds
+        if seconds <= 0:
+            return
+        import pymysql
+
+        with conn.cursor() as cursor:
+            try:
+                cursor.execute(f"SET SESSION max_execution_time = {int(seconds * 1000)}")
+            except pymysql.Error as e:
+                if not e.args or e.args[0] != _UNKNOWN_VARIABLE:
+                    logger.warning("Failed to set max_execution_time: %s", e)
+                    return
+                try:
+                    cursor.execute(f"SET SESSION max_statement_time = {seconds:g}")
+                except pymysql.Error as e:
+                    logger.warning("Failed to set max_statement_time: %s", e)
+
+    def preflight(self, conn: Any, sql: str, allow_rewrite: bool = True) -> Preflight:
+        """执行 EXPLAIN 预检
+
+        Args:
+            conn: 数据库连接
+            sql: 待执行的 SQL
+            allow_rewrite: 超出预算时是否允许自动添加 LIMIT；extract_data 需要完整结果，不允许截断
+
+        Returns:
+            Preflight: 实际执行的 SQL 和预估扫描行数
+
+        Raises:
+            QueryRejected: 预估扫描行数超出预算且无法通过 LIMIT 限制
+        """
+        normalized = _normalize(sql)
+        if not self.config.enabled or not _needs_preflight(normalized):
+            return Preflight(sql=sql)
+
+        with conn.cursor() as cursor, instrument("mysql.explain"):
+            cursor.execute(f"EXPLAIN {_strip_terminator(sql)}")
+            steps = parse_plan(cursor.fetchall(), cursor.description)
+        estimated = estimate_examined_rows(steps)
+        budget = self.config.max_examined_rows
+        if estimated <= budget:
+            return Preflight(sql=sql, estimated_rows=estimated)
+
+        limit = self.config.default_limit
+        streamable = not _BLOCKING_RE.search(normalized) and not any(
+            marker in step.extra.lower() for step in steps for marker in _BLOCKING_EXTRA
+        )
+        if streamable:
+            limited = _trailing_limit(normalized)
+            if limited is not None:
+                # 已有 LIMIT 的流式查询读到足够的行就会停止，EXPLAIN 的估计偏高
+                if limited <= limit:
+                    return Preflight(sql=sql, estimated_rows=estimated)
+            elif allow_rewrite:
+                rewritten = f"{_strip_terminator(sql)}\nLIMIT {limit}"
+                note = (
+                    f"预估扫描 {estimated:,.0f} 行，超出预算 {budget:,} 行，已自动添加 LIMIT {limit}，"
+                    "结果可能不完整；如需完整统计请在 SQL 中聚合。"
+                )
+                return Preflight(sql=rewritten, estimated_rows=estimated, notes=[note])
+
+        raise QueryRejected(
+            f"查询已被拒绝：预估扫描 {estimated:,.0f} 行，超出预算 {budget:,} 行。{_suggestion(steps)}。"
+        )
+
+
+def timeout_message(error: Exception) -> str | None:
+    """若错误为服务端执行超时，返回给模型的提示；否则返回 None"""
+    if error.args and error.args[0] in _TIMEOUT_ERROR_CODES:
+        seconds = get_sql_guard().config.execution_timeout_seconds
+        return (
+            f"查询执行超过 {seconds:g} 秒，已被数据库中止。"
+            "请添加带索引列的过滤条件、缩小时间范围或在 SQL 中先聚合。"
+        )
+    return None
+
+
+# 全局防护实例（首次查询时创建）
+_sql_guard: SQLGuard | None = None
+_sql_guard_lock = threading.Lock()
+
+
+def get_sql_guard() -> SQLGuard:
+    """获取全局 SQL 防护实例"""
+    global _sql_guard
+    if _sql_guard is None:
+        with _sql_guard_lock:
+            if _sql_guard is None:
+                _sql_guard = SQLGuard()
+    return _sql_guard
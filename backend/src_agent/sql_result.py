@@ -0,0 +1,67 @@
+"""
+SQL 查询结果序列化模块
+
+sql_inter 过去用 json.dumps(rows, default=_json_default) 序列化结果：每个 Decimal / datetime 单元格都要
+回调一次 Python 函数，宽数值结果中这部分开销占主导；输出带空格分隔符，且只是不带列名的二维数组。本模块：
+- 输出紧凑 JSON：{"columns": [...], "rows": [[...], ...]}，列名取自游标描述（cursor.description）且只出现一次
+- 优先使用 orjson：日期时间由其原生编码，只有 Decimal、TIME（timedelta）、二进制等少数类型进入回调；
+  未安装 orjson 时回退到标准库 json
+
+按列转换（先转置为列、整列转换后再转置回行）实测比逐单元格回调更慢：转置会创建大量元组并频繁触发垃圾回收。
+因此保持行式编码，由编码器在 C 层完成遍历。
+"""
+
+from __future__ import annotations
+
+import json
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from typing import Any, Sequence
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson 为可选依赖
+    orjson = None
+
+
+def _json_default(value: Any) -> Any:
+    """JSON 序列化回退函数，处理数据库中常见的特殊类型。"""
+    if isinstance(value, Decimal):
+        # 将 Decimal 转换为浮点数，保持数值语义
+        return float(value)
+    if isinstance(value, (datetime, date, time)):
+        # 日期 / 时间类型使用 ISO8601 字符串
+        return value.isoformat()
+    if isinstance(value, timedelta):
+        # pymysql 将 TIME 列返回为 timedelta
+        return str(value)
+    if isinstance(value, (bytes, bytearray)):
+        return bytes(value).decode("utf-8", errors="replace")
+    # 其他无法识别的类型转换为字符串
+    return str(value)
+
+
+def _dumps(payload: Any) -> str:
+    if orjson is not None:
+        return orjson.dumps(payload, default=_json_default).decode("utf-8")
+    return json.dumps(payload, ensure_ascii=False, separators=(",", ":"), default=_json_default)
+
+
+def serialize_sql_result(
+    rows: Sequence[Sequence[Any]],
+    description: Sequence[Sequence[Any]] | None = None,
+) -> str:
+    """将 SQL 查询结果序列化为紧凑 JSON 字符串（中文字符原样输出）
+
+    Args:
+        rows: cursor.fetchall() 的结果（元组列表）
+        description: cursor.description，提供列名；为 None 时列名为 col_0、col_1…
+
+    Returns:
+        str: {"columns": [列名...], "rows": [[值...], ...]}
+    """
+    if description:
+        names = [str(column[0]) for column in description]
+    else:
+        names = [f"col_{index}" for index in range(len(rows[0]) if rows else 0)]
+    return _dumps({"columns": names, "rows": rows})
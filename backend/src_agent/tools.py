@@ -4,63 +4,142 @@
 本模块定义了AI代理可以使用的各种工具函数，包括：
 - 数据库查询工具 (sql_inter): 执行SQL查询并返回结果
 - 数据提取工具 (extract_data): 从MySQL数据库提取数据到pandas DataFrame
+- 数据源列表工具 (list_datasources): 列出可按名称选择的MySQL数据源
+- 数据库结构工具 (describe_schema): 从共享缓存返回表、列、索引和预估行数
+- 本地SQL工具 (local_sql): 用嵌入式 DuckDB 对 data/ 目录下的文件和内置数据集执行只读SQL
 - Python代码执行工具 (python_inter): 执行Python代码
 - 数据可视化工具 (fig_inter): 执行Python绘图代码并保存图像
 - 网络搜索工具 (search_tool): 使用Tavily进行网络搜索
+- 输出读取工具 (read_artifact): 分页读取被写入 artifact 存储的大体积工具输出
+- 内存报告工具 (memory_report): 查看并释放当前会话中用户变量占用的内存
 
 这些工具通过LangChain的@tool装饰器注册，供AI代理在对话过程中调用。
 """
 
+import logging
 import os
-from datetime import date, datetime
-from decimal import Decimal
-from dotenv import load_dotenv
+from typing import TYPE_CHECKING, Literal
+
 from langchain.tools import tool
 from pydantic import BaseModel, Field
-import matplotlib
-import matplotlib.pyplot as plt
-import seaborn as sns
-import json
-import pandas as pd
-import pymysql
-from langchain_tavily import TavilySearch
 
-# 加载环境变量（覆盖已存在的变量）
-load_dotenv(override=True)
+# 注意：pandas、pymysql、matplotlib、langchain_tavily 以及沙箱模块体积较大，
+# 统一在工具首次调用时再导入，避免拖慢 graph.py 的冷启动和 `langgraph dev` 的热重载。
+from src_agent.artifact_store import (
+    ArtifactNotFoundError,
+    format_page,
+    get_artifact_store,
+    offload,
+)
+from src_agent.config.render_config import RenderConfig
+from src_agent.env import load_env
+from src_agent.image_lifecycle import get_image_manager, precompress_svg
+from src_agent.instrumentation import instrument, instrumented
+from src_agent.sql_result import serialize_sql_result
+
+if TYPE_CHECKING:
+    from src_agent.sandbox import PythonSandbox
+
+logger = logging.getLogger(__name__)
+
+def get_sandbox() -> "PythonSandbox":
+    """获取当前 LangGraph 线程的沙箱会话（首次调用时才导入沙箱及其数据分析依赖）
+
+    每个线程拥有独立的沙箱；线程在本进程中首次调用工具时，会从命名空间快照恢复用户变量。
+    """
+    from src_agent.sandbox_sessions import current_thread_id, get_session_manager
 
-# 导入沙箱模块
-from src_agent.sandbox import PythonSandbox, SandboxExecutionError
-from src_agent.config.sandbox_config import SandboxConfig
+    load_env()
+    return get_session_manager().get(current_thread_id())
 
-# 创建全局沙箱实例（在工具间共享）
-_sandbox_instance = None
 
+def _snapshot_sandbox() -> None:
+    """工具调用结束后，增量保存当前线程沙箱的命名空间快照"""
+    from src_agent.sandbox_sessions import current_thread_id, get_session_manager
 
-def get_sandbox() -> PythonSandbox:
-    """获取全局沙箱实例"""
-    global _sandbox_instance
-    if _sandbox_instance is None:
-        config = SandboxConfig.from_env()
-        _sandbox_instance = PythonSandbox(config)
-    return _sandbox_instance
+    get_session_manager().snapshot(current_thread_id())
 
 
-def _json_default(value):
-    """JSON 序列化回退函数，处理数据库中常见的特殊类型。"""
-    if isinstance(value, Decimal):
-        # 将 Decimal 转换为浮点数，保持数值语义
-        return float(value)
-    if isinstance(value, (datetime, date)):
-        # 日期 / 时间类型使用 ISO8601 字符串
-        return value.isoformat()
-    # 其他无法识别的类型转换为字符串
-    return str(value)
+def _release_sandbox_memory(sandbox: "PythonSandbox") -> str:
+    """会话变量超出内存预算时按淘汰策略释放变量，返回需要告知模型的提示（未释放或统计失败时为空）"""
+    try:
+        evicted = sandbox.enforce_memory_budget()
+    except Exception as e:
+        # 统计或释放失败不影响工具结果（用户代码已经执行成功）
+        logger.warning(f"沙箱内存预算检查失败: {e}", exc_info=True)
+        return ""
+    if not evicted:
+        return ""
+    names = "、".join(f"{usage.name} ({usage.size_bytes / 1024 / 1024:.1f} MB)" for usage in evicted)
+    return f"\n⚠️ 会话内存超出预算，已释放变量: {names}。如仍需使用，请重新加载。"
+
+
+def _profile_note(sandbox: "PythonSandbox") -> str:
+    """将最近一次执行的性能分析报告写入 artifact，返回附加到工具结果的摘要（未分析时为空）"""
+    report = sandbox.last_profile
+    if report is None:
+        return ""
+    note = "\n" + report.summary()
+    try:
+        info = get_artifact_store().put(report.format(), "python_inter.profile")
+    except OSError:
+        return note
+    return note + f"\n完整性能分析报告: artifact `{info.artifact_id}`（可用 read_artifact 查看）"
 
 
-# 初始化Tavily网络搜索工具
-# max_results: 最大返回结果数量
-# topic: 搜索主题类型（general表示通用搜索）
-search_tool = TavilySearch(max_results=5, topic="general")
+class SearchSchema(BaseModel):
+    """
+    网络搜索工具的参数模式定义
+
+    用于验证和描述search_tool工具所需的输入参数。
+    """
+    query: str = Field(description="搜索关键词或问题")
+    time_range: Literal["day", "week", "month", "year"] | None = Field(
+        default=None, description="限定结果的发布时间范围，不需要时留空"
+    )
+    include_domains: list[str] | None = Field(
+        default=None, description="仅在这些域名中搜索，不需要时留空"
+    )
+    exclude_domains: list[str] | None = Field(
+        default=None, description="排除这些域名，不需要时留空"
+    )
+
+
+@tool(args_schema=SearchSchema)
+@instrumented("tool.search_tool")
+def search_tool(
+    query: str,
+    time_range: str | None = None,
+    include_domains: list[str] | None = None,
+    exclude_domains: list[str] | None = None,
+):
+    """
+    网络搜索工具
+
+    当用户提出与数据分析无关的问题（如最新新闻、实时信息）时，请调用该方法，
+    使用 Tavily 搜索引擎返回相关网页的标题、链接和摘要。
+    相同查询的结果会在一段时间内复用，重复搜索不会得到更新的结果。
+
+    Args:
+        query: 搜索关键词或问题
+        time_range: 发布时间范围（day/week/month/year）
+        include_domains: 仅搜索的域名列表
+        exclude_domains: 排除的域名列表
+
+    Returns:
+        dict: Tavily 搜索结果；结果过大时为 artifact 句柄和预览
+    """
+    params = {"query": query}
+    if time_range:
+        params["time_range"] = time_range
+    if include_domains:
+        params["include_domains"] = include_domains
+    if exclude_domains:
+        params["exclude_domains"] = exclude_domains
+    from src_agent.search_cache import get_search_cache
+
+    response = get_search_cache().search(params)
+    return offload(response, "search_tool")
 
 
 # ==================== 数据库查询工具 ====================
@@ -71,7 +150,7 @@ description = """
 该函数用户在指定的MYSQL服务器上运行一段SQL代码，完成数据查询工作。
 并且当前方法使用pymysql进行数据库连接。
 ⚠️ 仅在用户明确提到“数据库 / SQL / MySQL”等需求时才可调用本工具；当用户提到 CSV、Excel、JSON 或 telco_data.csv
-等本地文件时，必须改用 python_inter 读取 data/ 目录下的文件，本工具无法访问本地文件。
+等本地文件时，必须改用 local_sql 查询或 python_inter 读取 data/ 目录下的文件，本工具无法访问本地文件。
 本函数只负责执行SQL代码进行数据查询，如果需要进行数据提取数据分析，请使用另外一个方法 extract_data 进行数据提取和分析。
 """
 
@@ -83,10 +162,15 @@ class SQLQuerySchema(BaseModel):
     用于验证和描述sql_inter工具所需的输入参数。
     """
     sql_query: str = Field(description=description)
+    source: str | None = Field(
+        default=None,
+        description="数据源名称（见 list_datasources），留空使用默认数据库",
+    )
 
 
 @tool(args_schema=SQLQuerySchema)
-def sql_inter(sql_query: str) -> str:
+@instrumented("tool.sql_inter")
+def sql_inter(sql_query: str, source: str | None = None) -> str:
     """
     SQL数据库查询工具
     
@@ -96,34 +180,52 @@ def sql_inter(sql_query: str) -> str:
     
     Args:
         sql_query: 需要执行的SQL查询语句
+        source: 数据源名称，为空时使用默认数据源；只读查询会路由到该数据源的只读副本
         
     Returns:
-        str: SQL查询结果的JSON字符串格式，如果查询失败则返回错误信息
-    """
-    # 从环境变量读取MySQL数据库连接配置
-    conn = pymysql.connect(
-        host=os.getenv("MYSQL_HOST"),  # MySQL主机地址
-        port=int(os.getenv("MYSQL_PORT") or "3306"),  # MySQL端口，默认3306
-        user=os.getenv("MYSQL_USER"),  # MySQL用户名
-        password=os.getenv("MYSQL_PASSWORD"),  # MySQL密码
-        database=os.getenv("MYSQL_DATABASE"),  # 数据库名称
-        charset="utf8",  # 字符集编码
+        str: SQL查询结果的JSON字符串，格式为 {"columns": [列名...], "rows": [[值...], ...]}
+            （结果过大时为 artifact 句柄和预览），如果查询失败则返回错误信息
+    """
+    import pymysql
+
+    from src_agent.datasources import DataSourceError, get_router
+    from src_agent.sql_guard import (
+        QueryRejected,
+        get_sql_guard,
+        is_read_statement,
+        timeout_message,
     )
-    
+
     try:
-        # 使用上下文管理器确保游标正确关闭
-        with conn.cursor() as cursor:
-            cursor.execute(sql_query)  # 执行SQL查询
-            result = cursor.fetchall()  # 获取所有查询结果
+        # 从数据源连接池借出连接（只读查询优先使用只读副本），退出时归还
+        with get_router().connection(source, read_only=is_read_statement(sql_query)) as conn:
+            # 先用 EXPLAIN 预检：超出扫描行数预算的简单查询自动添加 LIMIT，其他查询拒绝执行
+            preflight = get_sql_guard().preflight(conn, sql_query)
+            # 使用上下文管理器确保游标正确关闭
+            with conn.cursor() as cursor, instrument("mysql.query") as measurement:
+                cursor.execute(preflight.sql)  # 执行SQL查询
+                result = cursor.fetchall()  # 获取所有查询结果
+                description = cursor.description  # 列名与字段类型，用于按列序列化
+                measurement.rows = len(result)
+    except (QueryRejected, DataSourceError) as e:
+        return str(e)
     except pymysql.Error as e:
         # 捕获数据库错误并返回错误信息
-        return f"SQL查询失败: {str(e)}"
-    finally:
-        # 确保数据库连接被关闭
-        conn.close()
+        return timeout_message(e) or f"SQL查询失败: {str(e)}"
+
+    if not is_read_statement(sql_query):
+        # 写语句可能修改了表结构（DDL），使该数据源的结构缓存失效
+        from src_agent.schema_cache import get_schema_cache
 
-    # 将查询结果转换为JSON字符串返回（确保中文字符正确显示）
-    return json.dumps(result, ensure_ascii=False, default=_json_default)
+        # 先解析数据源名称：source 为空表示默认数据源，直接传 None 会清空所有数据源的缓存
+        get_schema_cache().invalidate(get_router().source(source).name)
+
+    # 将查询结果转换为列式JSON字符串返回（列名只出现一次，确保中文字符正确显示）
+    # 结果过大时写入 artifact 存储，消息中只保留句柄和预览
+    output = offload(serialize_sql_result(result, description), "sql_inter")
+    if preflight.notes:
+        output += "\n\n" + "\n".join(preflight.notes)
+    return output
 
 
 class ExtractDataSchema(BaseModel):
@@ -136,10 +238,33 @@ class ExtractDataSchema(BaseModel):
     df_name: str = Field(
         description="指定用户保存结果的 pandas DataFrame 的名称 (字符串形式)."
     )
+    source: str | None = Field(
+        default=None,
+        description="数据源名称（见 list_datasources），留空使用默认数据库",
+    )
+    incremental_column: str | None = Field(
+        default=None,
+        description=(
+            "增量刷新使用的单调递增列（自增主键或更新时间列）。首次提取为全量并记录该列的最大值；"
+            "之后以相同的 sql_query / df_name / source 再次调用时只提取新增或变更的行并合并到已有的 DataFrame。"
+            "只提取一次时留空"
+        ),
+    )
+    key_columns: list[str] | None = Field(
+        default=None,
+        description="增量刷新时用于识别变更行的主键列；指定后变更行替换旧行，留空时增量行直接追加",
+    )
 
 
 @tool(args_schema=ExtractDataSchema)
-def extract_data(sql_query: str, df_name: str) -> str:
+@instrumented("tool.extract_data")
+def extract_data(
+    sql_query: str,
+    df_name: str,
+    source: str | None = None,
+    incremental_column: str | None = None,
+    key_columns: list[str] | None = None,
+) -> str:
     """
     用于在MySQL数据库中提取一张表到当前Python环境中，注意，本函数只负责数据表的提取，
     并不负责数据查询，若需要在MySQL中进行数据查询，请使用sql_inter函数。
@@ -147,30 +272,245 @@ def extract_data(sql_query: str, df_name: str) -> str:
     同时需要注意，编写外部函数的参数消息时，必须是满足json格式的字符串，
     :param sql_query: 字符串形式的SQL查询语句，用于提取MySQL中的某张表。
     :param df_name: 将MySQL数据库中提取的表格进行本地保存时的变量名，以字符串形式表示。
+    :param source: 数据源名称，为空时使用默认数据源；提取始终从只读副本（如有）读取。
+    :param incremental_column: 增量刷新的水位列，为空时每次全量提取。
+    :param key_columns: 增量刷新时识别变更行的主键列，为空时增量行直接追加。
     :return：表格读取和保存结果
     """
-    # 从环境变量读取MySQL数据库连接配置
-    conn = pymysql.connect(
-        host=os.getenv("MYSQL_HOST"),
-        port=int(os.getenv("MYSQL_PORT") or "3306"),
-        user=os.getenv("MYSQL_USER"),
-        password=os.getenv("MYSQL_PASSWORD"),
-        database=os.getenv("MYSQL_DATABASE"),
-        charset="utf8",
+    import pandas as pd
+    import pymysql
+
+    from src_agent.datasources import DataSourceError, get_router
+    from src_agent.incremental_extract import (
+        ExtractState,
+        IncrementalExtractError,
+        incremental_sql,
+        merge_delta,
     )
+    from src_agent.sql_guard import QueryRejected, get_sql_guard, timeout_message
+
+    router = get_router()
     try:
-        # 使用pandas读取SQL查询结果到DataFrame
-        df = pd.read_sql(sql_query, conn)
-        # 将DataFrame保存到沙箱全局变量，以便后续Python代码使用
         sandbox = get_sandbox()
-        sandbox.set_global(df_name, df)
-        return f"成功将表格 {df_name} 保存到当前Python环境中。"
-    except (pymysql.Error, pd.errors.DatabaseError) as e:
-        # 捕获数据库或pandas错误
-        return f"表格读取和保存失败: {str(e)}"
-    finally:
-        # 确保数据库连接被关闭
-        conn.close()
+        state = previous = existing = None
+        reset = False
+        if incremental_column:
+            state = ExtractState(
+                df_name=df_name,
+                sql=sql_query,
+                source=router.source(source).name,
+                column=incremental_column,
+                key_columns=list(key_columns or []),
+            )
+            existing = sandbox.sandbox_globals.get(df_name)
+            previous = ExtractState.from_frame(existing)
+            usable = (
+                previous is not None
+                and previous.matches(state)
+                and previous.watermark is not None
+                and isinstance(existing, pd.DataFrame)
+                and set(state.key_columns) <= set(existing.columns)
+            )
+            # 参数变化或已有变量被替换时重新全量提取
+            reset = previous is not None and not usable
+            previous = previous if usable else None
+
+        with router.connection(source, read_only=True) as conn:
+            sql = incremental_sql(previous, conn.escape) if previous else sql_query
+            # 提取的数据用于后续分析，超出预算时不截断而是拒绝执行
+            preflight = get_sql_guard().preflight(conn, sql, allow_rewrite=False)
+            # 使用pandas读取SQL查询结果到DataFrame
+            with instrument("mysql.read_sql") as measurement:
+                df = pd.read_sql(preflight.sql, conn)
+                measurement.rows = len(df)
+                measurement.bytes = int(df.memory_usage(index=True, deep=False).sum())
+
+        if previous is not None:
+            # 增量刷新：合并到已有的 DataFrame 并推进水位
+            old_watermark = previous.watermark_value
+            merged, replaced = merge_delta(existing, df, previous.key_columns)
+            previous.advance(df)
+            previous.attach(merged)
+            sandbox.set_global(df_name, merged)
+            message = (
+                f"已增量刷新 {df_name}：提取 {len(df):,} 行（新增 {len(df) - replaced:,}，更新 {replaced:,}），"
+                f"当前共 {len(merged):,} 行；{incremental_column} 水位 {old_watermark} → {previous.watermark_value}。"
+            )
+        else:
+            if state is not None:
+                state.advance(df)
+                state.attach(df)
+            # 将DataFrame保存到沙箱全局变量，以便后续Python代码使用
+            sandbox.set_global(df_name, df)
+            message = f"成功将表格 {df_name} 保存到当前Python环境中。"
+            if state is not None:
+                prefix = "参数与上次增量提取不同，已重新全量提取。" if reset else ""
+                message = (
+                    f"{prefix}{message}共 {len(df):,} 行，已记录 {incremental_column} 的水位 "
+                    f"{state.watermark_value}，之后以相同参数调用只提取新增或变更的行。"
+                )
+        note = _release_sandbox_memory(sandbox)
+        _snapshot_sandbox()
+        return f"{message}{note}"
+    except (QueryRejected, DataSourceError, IncrementalExtractError) as e:
+        return str(e)
+    except pymysql.Error as e:
+        return timeout_message(e) or f"表格读取和保存失败: {str(e)}"
+    except pd.errors.DatabaseError as e:
+        # 捕获pandas错误（pandas 会把驱动异常包装为 DatabaseError，原异常保存在 __cause__ 中）
+        cause = e.__cause__
+        message = timeout_message(cause) if isinstance(cause, pymysql.Error) else None
+        return message or f"表格读取和保存失败: {str(e)}"
+
+
+@tool
+@instrumented("tool.list_datasources")
+def list_datasources() -> str:
+    """
+    列出可用的 MySQL 数据源
+
+    返回每个数据源的名称、数据库名、说明、只读副本数量和当前不可用的实例。
+    用户提到某个业务库（如销售库、人事库）或默认数据库中找不到需要的表时，先调用本工具，
+    再在 sql_inter / extract_data 的 source 参数中指定数据源名称。
+    """
+    import json
+
+    from src_agent.datasources import get_router
+
+    return json.dumps(get_router().describe(), ensure_ascii=False)
+
+
+class DescribeSchemaSchema(BaseModel):
+    """
+    数据库结构查看工具的参数模式定义
+
+    用于验证和描述describe_schema工具所需的输入参数。
+    """
+    tables: list[str] | None = Field(
+        default=None,
+        description="需要查看详细结构（列类型、可空、键、注释、索引）的表名列表；留空返回全部表的概览",
+    )
+    source: str | None = Field(
+        default=None,
+        description="数据源名称（见 list_datasources），留空使用默认数据库",
+    )
+
+
+@tool(args_schema=DescribeSchemaSchema)
+@instrumented("tool.describe_schema")
+def describe_schema(tables: list[str] | None = None, source: str | None = None) -> str:
+    """
+    查看MySQL数据库的表结构（带缓存）
+
+    返回表名、列名与类型、主键、索引和预估行数。编写SQL前请先调用本工具了解表结构，
+    不要通过 sql_inter 执行 SHOW TABLES / DESCRIBE / information_schema 查询。
+    结构在所有对话间共享缓存，调用本工具通常不会访问数据库。
+
+    Args:
+        tables: 需要详细结构的表名，为空时返回全部表的概览
+        source: 数据源名称，为空时使用默认数据源
+
+    Returns:
+        str: 表结构文本（结果过大时为 artifact 句柄和预览），失败时返回错误信息
+    """
+    import pymysql
+
+    from src_agent.datasources import DataSourceError
+    from src_agent.schema_cache import format_overview, format_tables, get_schema_cache
+
+    cache = get_schema_cache()
+    try:
+        schema = cache.get(source)
+    except DataSourceError as e:
+        return str(e)
+    except pymysql.Error as e:
+        return f"读取数据库结构失败: {str(e)}"
+    if tables:
+        text = format_tables(schema, tables)
+    else:
+        text = format_overview(schema, cache.config.max_overview_tables)
+    return offload(text, "describe_schema")
+
+
+class LocalSQLSchema(BaseModel):
+    """
+    本地SQL工具的参数模式定义
+
+    用于验证和描述local_sql工具所需的输入参数。
+    """
+    sql_query: str = Field(
+        description="只读SQL查询语句（DuckDB 语法），表名为 data/ 目录下的文件名或内置数据集名称"
+    )
+    df_name: str | None = Field(
+        default=None,
+        description="如需将完整查询结果保存为 pandas DataFrame 供后续 python_inter / fig_inter 使用，指定变量名；只查看结果时留空",
+    )
+
+
+@tool(args_schema=LocalSQLSchema)
+@instrumented("tool.local_sql")
+def local_sql(sql_query: str, df_name: str | None = None) -> str:
+    """
+    本地SQL查询工具（嵌入式 DuckDB，只读）
+
+    当需要对 data/ 目录下的 CSV、Parquet、JSON、Excel 文件或内置数据集（如 telco）进行筛选、分组聚合、
+    连接、排序、统计时，请优先调用该方法，而不是用 python_inter 把整个文件读入 pandas 再处理：
+    DuckDB 按需读取文件的列，向量化执行，速度更快、占用内存更少。
+
+    表名规则：
+    1. 内置数据集使用数据集名称，如 telco（已完成数值/日期类型转换）
+    2. data/ 下的文件使用小写文件名（不含后缀），非字母数字替换为下划线，如 sales_2024.csv → sales_2024
+    不确定有哪些表或列时，先执行 `SHOW TABLES` 或 `DESCRIBE 表名`；`SUMMARIZE 表名` 可快速查看各列统计。
+
+    注意：
+    1. 只能执行一条只读语句（SELECT / WITH / DESCRIBE / SHOW / SUMMARIZE / EXPLAIN）。
+    2. 本工具无法访问 MySQL 数据库，数据库查询请使用 sql_inter。
+    3. 直接返回的结果有行数上限；需要完整结果做后续分析或绘图时，请设置 df_name 保存为 DataFrame。
+
+    Args:
+        sql_query: 只读SQL查询语句
+        df_name: 保存完整结果的 DataFrame 变量名，None 表示直接返回结果
+
+    Returns:
+        str: 查询结果的JSON字符串（{"columns": [...], "rows": [...]}，结果过大时为 artifact 句柄和预览），
+            或 DataFrame 保存结果，查询失败时返回错误信息
+    """
+    from src_agent.local_sql import LocalSQLError, get_local_sql_engine
+
+    load_env()
+    engine = get_local_sql_engine()
+    try:
+        if df_name:
+            with instrument("duckdb.query_df") as measurement:
+                df = engine.query_df(sql_query)
+                measurement.rows = len(df)
+                measurement.bytes = int(df.memory_usage(index=True, deep=False).sum())
+            # 将完整结果保存到沙箱全局变量，以便后续Python代码使用
+            sandbox = get_sandbox()
+            sandbox.set_global(df_name, df)
+            note = _release_sandbox_memory(sandbox)
+            _snapshot_sandbox()
+            return (
+                f"成功将查询结果（{len(df):,} 行 × {len(df.columns)} 列）保存为 {df_name}。"
+                f"列: {', '.join(map(str, df.columns))}{note}"
+            )
+
+        with instrument("duckdb.query") as measurement:
+            result = engine.query(sql_query)
+            measurement.rows = len(result.rows)
+    except LocalSQLError as e:
+        message = f"本地SQL查询失败: {e}"
+        if "does not exist" in str(e):
+            message += f"\n可用的表: {', '.join(table.name for table in engine.tables()) or '（无）'}"
+        return message
+
+    output = offload(serialize_sql_result(result.rows, result.description), "local_sql")
+    if result.truncated:
+        output += (
+            f"\n⚠️ 结果超过 {len(result.rows):,} 行，只返回了前 {len(result.rows):,} 行。"
+            "请使用聚合或 LIMIT 缩小结果，或设置 df_name 将完整结果保存为 DataFrame。"
+        )
+    return output
 
 
 class PythonCodeInputSchema(BaseModel):
@@ -182,10 +522,15 @@ class PythonCodeInputSchema(BaseModel):
     python_code: str = Field(
         description="用于执行的Python代码。该代码必须满足Python代码的语法规则，并且必须使用Python 3.10 或更高版本。"
     )
+    profile: bool = Field(
+        default=False,
+        description="是否对本次执行进行性能分析。代码运行缓慢、需要找出耗时最多的调用并改写时设为 true。",
+    )
 
 
 @tool(args_schema=PythonCodeInputSchema)
-def python_inter(python_code: str):
+@instrumented("tool.python_inter")
+def python_inter(python_code: str, profile: bool = False):
     """
     Python代码执行工具（沙箱模式）
     当用户需要执行一段Python代码时，请调用该方法。
@@ -204,26 +549,36 @@ def python_inter(python_code: str):
 
     3. 禁止访问系统其他目录（如 /etc/, /usr/ 等）
 
+    4. 代码运行缓慢时，可设置 profile=true 重新执行，结果会附带耗时分布摘要（如“80% 在 DataFrame.apply”）
+       和改写建议，完整报告保存为 artifact。
+
     Args:
         python_code: 需要执行的Python代码字符串
+        profile: 是否对本次执行进行性能分析
 
     Returns:
-        str: 代码执行结果或错误信息
+        str: 代码执行结果（结果过大时为 artifact 句柄和预览）或错误信息
     """
+    sandbox = None
     try:
         # 获取全局沙箱实例
         sandbox = get_sandbox()
 
-        # 在沙箱中执行代码
-        result = sandbox.execute(python_code)
-
-        # 返回结果
-        if result is None:
-            return "Python代码执行成功。"
-        return str(result)
-
+        # 在沙箱中执行代码（未显式要求时按配置的抽样比例进行性能分析）
+        result = sandbox.execute(python_code, profile=profile or None)
+        output = "Python代码执行成功。" if result is None else offload(str(result), "python_inter")
     except Exception as e:
-        return f"Python代码执行失败: {str(e)}"
+        output = f"Python代码执行失败: {str(e)}"
+
+    try:
+        if sandbox is not None:
+            # 在用户代码的异常处理之外释放内存：统计出错不会被报告为代码执行失败；
+            # 超时或报错的代码同样附带性能分析摘要，便于定位慢调用
+            output += _release_sandbox_memory(sandbox) + _profile_note(sandbox)
+        return output
+    finally:
+        # 代码执行失败时也可能已修改了部分变量，同样写入快照
+        _snapshot_sandbox()
 
 
 def _format_fig_inter_error(message: str) -> str:
@@ -256,10 +611,16 @@ class FigCodeInput(BaseModel):
         description="用于执行的Python绘图代码，必须使用 matplotlib/seaborn 创建图像并赋值给变量 fig。该代码必须满足Python代码的语法规则，并且必须使用Python 3.10 或更高版本。支持中文和英文文本内容。"
     )
     fname: str = Field(description="图像对象的变量名，用户从代码中提取并保存为图片")
+    downsample: bool | None = Field(
+        default=None,
+        description="是否在保存前对超大折线（LTTB）和散点（hexbin 聚合/抽样）自动降采样。"
+        "直接绘制上万行以上的原始数据时建议设为 true；不指定时使用服务端默认配置。",
+    )
 
 
 @tool(args_schema=FigCodeInput)
-def fig_inter(py_code: str, fname: str) -> str:
+@instrumented("tool.fig_inter")
+def fig_inter(py_code: str, fname: str, downsample: bool | None = None) -> str:
     """
     数据可视化工具 - 执行Python绘图代码并保存图像（双层架构）
 
@@ -268,12 +629,13 @@ def fig_inter(py_code: str, fname: str) -> str:
 
     注意：
     1. 所有绘图代码必须创建一个图像对象，并将其赋值为指定变量名（例如 `fig`）。
-    2. 必须使用 `fig = plt.figure()` 或 `fig, ax = plt.subplots()`。
+    2. 必须使用 `fig = plt.figure()`、`fig, ax = plt.subplots()`，或面向对象接口 `fig = Figure(figsize=(10, 6)); ax = fig.subplots()`（推荐，线程安全）。
     3. 不要使用 `plt.show()`。
     4. 不要在代码中使用 `fig.savefig()`，工具会自动保存。
     5. 请确保代码最后调用 `fig.tight_layout()`。
     6. 支持中文和英文文本：坐标轴标签（xlabel、ylabel）、标题（title）、图例（legend）等文本内容可以使用中文或英文。
     7. 在绘图前确保数据已经清洗：可在 `python_inter` 中使用 `load_dataset` 或自定义逻辑创建 `*_df` 变量，再在绘图代码中引用该变量；不要直接对尚未转换为数值类型的列执行数学运算。
+    8. 直接绘制大量原始数据点（如上万行以上的折线/散点）时，可设置 `downsample=true`，工具会在保存前自动降采样并在返回结果中说明。
 
     示例代码：
     fig = plt.figure(figsize=(10,6))
@@ -283,25 +645,25 @@ def fig_inter(py_code: str, fname: str) -> str:
     Args:
         py_code: 需要执行的Python绘图代码字符串
         fname: 图像对象的变量名，用于从沙箱中提取图像
+        downsample: 是否在保存前对超大图元降采样，None 表示使用服务端默认配置
 
     Returns:
-        str: 图像生成结果，包含Markdown格式的图片链接，或错误信息
+        str: 图像生成结果，包含Markdown格式的图片链接（以及降采样说明），或错误信息
     """
-    # 保存当前matplotlib后端，以便后续恢复
-    current_backend = matplotlib.get_backend()
-    # 切换到非交互式后端（Agg），用于生成图像文件
-    matplotlib.use("Agg")
-
-    # 获取图像保存目录路径（工具层，沙箱外）
-    base_dir = os.path.dirname(os.path.abspath(__file__))
-    img_dir = os.path.join(base_dir, "images")
+    # 获取图像保存目录路径（工具层，沙箱外），由图像生命周期管理器统一管理
+    image_manager = get_image_manager()
+    img_dir = image_manager.config.images_dir
     # 确保图像目录存在
     os.makedirs(img_dir, exist_ok=True)
 
+    sandbox = get_sandbox()
+    fig = None
+
     try:
         # === 第1步: 在沙箱内执行绘图代码 ===
-        sandbox = get_sandbox()
-        sandbox.execute(py_code)
+        # 执行期间持有 pyplot 锁，并登记本次新建的图像，结束后只关闭本会话的图像
+        with sandbox.figures.capture():
+            sandbox.execute(py_code)
 
         # === 第2步: 从沙箱提取图像对象（可信层）===
         try:
@@ -320,29 +682,144 @@ def fig_inter(py_code: str, fname: str) -> str:
 
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")  # 时间戳格式：YYYYMMDD_HHMMSS
             unique_id = str(uuid.uuid4())[:8]  # UUID的前8位作为唯一标识
-            images_filename = f"{fname}_{timestamp}_{unique_id}.png"
+            image_format = image_manager.config.image_format
+            images_filename = f"{fname}_{timestamp}_{unique_id}.{image_format}"
+
+            # 保存前检测超大图元并降采样，使渲染耗时与数据量无关
+            render_config = RenderConfig.from_env()
+            if downsample is None:
+                downsample = render_config.auto_downsample
+            reductions = []
+            if downsample:
+                from src_agent.plot_downsample import downsample_figure
+
+                reductions = downsample_figure(fig, render_config)
 
             # 构建图像的绝对保存路径
             abs_path = os.path.join(img_dir, images_filename)
-            # 保存图像：bbox_inches="tight"确保图像边界紧凑，dpi=300提供高分辨率
-            fig.savefig(abs_path, bbox_inches="tight", dpi=300)
+            # 保存图像：使用 Agg 画布渲染，无需持有 pyplot 锁，可与其他会话并行
+            # bbox_inches="tight"确保图像边界紧凑，dpi=300提供高分辨率
+            from src_agent.rendering import render_figure
+
+            with instrument("render.savefig", format=image_format) as measurement:
+                render_figure(
+                    fig, abs_path, bbox_inches="tight", dpi=300, format=image_format
+                )
+                measurement.bytes = os.path.getsize(abs_path)
+            if image_format == "svg":
+                # SVG 为文本格式，预先生成 gzip 版本供 /images 路由直接返回
+                precompress_svg(abs_path)
+            # 记录新图像的访问时间，参与 LRU 淘汰
+            image_manager.touch(images_filename)
 
             # 生成完整的图像访问URL
             api_url = os.getenv("API_URL", "http://localhost:2024")
             image_url = f"{api_url}/images/{images_filename}"
 
             # 返回 Markdown 格式的图片引用，便于在对话中显示图像
-            return f"✅ 图像已生成: ![{fname}]({image_url})"
+            message = f"✅ 图像已生成: ![{fname}]({image_url})"
+            if reductions:
+                from src_agent.plot_downsample import format_reductions
+
+                message += "\n" + format_reductions(reductions)
+            return message
         else:
             return "⚠️ 图像对象未找到，请确认变量名正确并为 matplotlib 图对象。"
 
-    except SandboxExecutionError as e:
-        return _format_fig_inter_error(str(e))
     except Exception as e:
+        from src_agent.sandbox import SandboxExecutionError
+
+        if isinstance(e, SandboxExecutionError):
+            return _format_fig_inter_error(str(e))
         # 捕获所有其他异常并返回错误信息
         return f"❌ 绘图代码执行失败: {str(e)}"
     finally:
-        # 清理所有matplotlib图形，释放内存
-        plt.close("all")
-        # 恢复原来的matplotlib后端
-        matplotlib.use(current_backend)
+        # 只关闭本会话登记的图像（包括变量 fname 指向的图像），释放内存
+        if fig is not None and hasattr(fig, "savefig"):
+            sandbox.figures.register(fig)
+        sandbox.figures.close_all()
+        # 绘图代码也可能创建或修改数据变量
+        _snapshot_sandbox()
+
+
+class ReadArtifactSchema(BaseModel):
+    """
+    输出读取工具的参数模式定义
+
+    用于验证和描述read_artifact工具所需的输入参数。
+    """
+    artifact_id: str = Field(description="工具返回的 artifact 句柄，形如 art_20250101_120000_1a2b3c4d")
+    offset: int = Field(default=0, description="起始行号（从 0 开始）；指定 pattern 时为匹配结果的偏移")
+    limit: int = Field(default=50, description="最多返回的行数")
+    pattern: str | None = Field(
+        default=None, description="可选的过滤文本，只返回包含该文本的行（普通子串匹配，不支持正则），不需要时留空"
+    )
+
+
+@tool(args_schema=ReadArtifactSchema)
+@instrumented("tool.read_artifact")
+def read_artifact(
+    artifact_id: str, offset: int = 0, limit: int = 50, pattern: str | None = None
+) -> str:
+    """
+    分页读取大体积工具输出
+
+    当 sql_inter、python_inter 或 search_tool 的结果过大时，工具只返回 artifact 句柄和预览，
+    完整内容可以通过本工具按行分页读取，或按文本过滤出需要的行。
+    SQL 查询结果按一行一条记录存储；只能读取当前对话线程产生的 artifact。
+
+    Args:
+        artifact_id: artifact 句柄
+        offset: 起始行号
+        limit: 最多返回的行数
+        pattern: 可选的过滤文本（子串匹配）
+
+    Returns:
+        str: 带行号的内容片段，或错误信息
+    """
+    try:
+        info, page = get_artifact_store().read(artifact_id, offset, limit, pattern)
+    except ArtifactNotFoundError as e:
+        return f"⚠️ {e.args[0]}"
+    return format_page(info, page, pattern)
+
+
+class MemoryReportSchema(BaseModel):
+    """
+    内存报告工具的参数模式定义
+
+    用于验证和描述memory_report工具所需的输入参数。
+    """
+    release: list[str] | None = Field(
+        default=None, description="可选，需要释放（删除）的变量名列表，不需要时留空"
+    )
+
+
+@tool(args_schema=MemoryReportSchema)
+@instrumented("tool.memory_report")
+def memory_report(release: list[str] | None = None) -> str:
+    """
+    查看当前Python环境中用户变量的内存占用
+
+    按变量列出深度内存占用（DataFrame 包含字符串等对象列的实际大小）、类型，以及会话的内存预算。
+    会话变量超出预算时，python_inter 和 extract_data 会自动释放最久未使用（或占用最大）的变量；
+    也可以通过 release 参数主动删除不再需要的中间变量。
+
+    Args:
+        release: 可选，需要释放的变量名列表
+
+    Returns:
+        str: 内存报告文本
+    """
+    sandbox = get_sandbox()
+    lines = []
+    if release:
+        deleted = sandbox.delete_variables(release)
+        missing = [name for name in release if name not in deleted]
+        if deleted:
+            lines.append(f"已释放变量: {', '.join(deleted)}")
+        if missing:
+            lines.append(f"⚠️ 以下变量不存在或不可删除: {', '.join(missing)}")
+        _snapshot_sandbox()
+    lines.append(sandbox.memory_report().format())
+    return "\n".join(lines)
@@ -0,0 +1,128 @@
+"""
+工具热路径性能基准（pytest-benchmark，默认不运行）
+
+覆盖 load_dataset、多级表头 Excel 读取、PythonSandbox.execute、文件分组聚合（pandas 与 local_sql 对比）、
+fig_inter 渲染和 SQL 结果序列化。数据集由 src_agent/data/telco_data.csv 按倍数放大生成（默认 1x、100x，
+可通过 BENCHMARK_SCALES 加入 1000x）；SQL 结果从内存 SQLite 读取（替代 MySQL，
+DECIMAL、DATETIME 列按 pymysql 的类型转换为 Decimal、datetime），同时对比原有的标准库实现与 orjson 紧凑实现。
+每个基准记录耗时、吞吐量（行/秒）和峰值内存（tracemalloc 统计的 Python 分配）。
+
+运行（在 backend 目录下）：
+    RUN_BENCHMARKS=1 python -m pytest tests/benchmarks --benchmark-storage=tests/benchmarks/.baselines --benchmark-autosave
+与已保存的基线对比（平均耗时退化超过 20% 时失败）：
+    RUN_BENCHMARKS=1 python -m pytest tests/benchmarks --benchmark-storage=tests/benchmarks/.baselines \
+        --benchmark-compare --benchmark-compare-fail=mean:20%
+峰值内存基线保存在 tests/benchmarks/memory_baseline.json：设置 BENCHMARK_UPDATE_BASELINE=1 时写入，
+否则超过基线 BENCHMARK_MEMORY_TOLERANCE（默认 0.2）时失败。
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+import tracemalloc
+from pathlib import Path
+from typing import Any, Callable
+
+import pandas as pd
+import pytest
+
+if os.getenv("RUN_BENCHMARKS", "").lower() not in ("1", "true"):
+    # 基准测试耗时较长，默认不收集
+    collect_ignore_glob = ["test_*.py"]
+
+TELCO_CSV = Path(__file__).resolve().parents[2] / "src_agent" / "data" / "telco_data.csv"
+MEMORY_BASELINE = Path(__file__).resolve().parent / "memory_baseline.json"
+
+_baseline_lock = threading.Lock()
+
+
+def benchmark_scales() -> list[int]:
+    """返回数据放大倍数（BENCHMARK_SCALES，逗号分隔，默认 1,100）"""
+    values = os.getenv("BENCHMARK_SCALES", "1,100").split(",")
+    return [int(value) for value in values if value.strip()]
+
+
+@pytest.fixture(scope="session")
+def telco_df() -> pd.DataFrame:
+    return pd.read_csv(TELCO_CSV)
+
+
+def scale_dataframe(df: pd.DataFrame, scale: int) -> pd.DataFrame:
+    """将数据集重复 scale 次，customerID 追加批次后缀以保持唯一"""
+    if scale == 1:
+        return df.copy()
+    scaled = pd.concat([df] * scale, ignore_index=True)
+    batch = (pd.Series(range(len(scaled))) // len(df)).astype(str)
+    scaled["customerID"] = scaled["customerID"] + "-" + batch
+    return scaled
+
+
+@pytest.fixture(scope="session")
+def scaled_csv(tmp_path_factory, telco_df) -> Callable[[int], Path]:
+    """按倍数生成（并缓存）放大后的 telco CSV"""
+    directory = tmp_path_factory.mktemp("telco")
+    cache: dict[int, Path] = {}
+
+    def build(scale: int) -> Path:
+        if scale not in cache:
+            path = directory / f"telco_x{scale}.csv"
+            scale_dataframe(telco_df, scale).to_csv(path, index=False)
+            cache[scale] = path
+        return cache[scale]
+
+    return build
+
+
+def _peak_memory(func: Callable[[], Any]) -> int:
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def _check_memory_baseline(name: str, peak: int) -> None:
+    tolerance = float(os.getenv("BENCHMARK_MEMORY_TOLERANCE", "0.2"))
+    with _baseline_lock:
+        baseline = json.loads(MEMORY_BASELINE.read_text()) if MEMORY_BASELINE.exists() else {}
+        if os.getenv("BENCHMARK_UPDATE_BASELINE", "").lower() in ("1", "true"):
+            baseline[name] = peak
+            MEMORY_BASELINE.write_text(json.dumps(baseline, indent=2, sort_keys=True) + "\n")
+            return
+    expected = baseline.get(name)
+    if expected is not None and peak > expected * (1 + tolerance):
+        pytest.fail(
+            f"{name} 峰值内存 {peak / 1024 / 1024:.1f} MB 超过基线 "
+            f"{expected / 1024 / 1024:.1f} MB 的 {tolerance:.0%}"
+        )
+
+
+@pytest.fixture
+def measure(benchmark, request) -> Callable[..., Any]:
+    """运行基准并记录吞吐量与峰值内存
+
+    用法：measure(func, rows=处理的行数)；每轮调用 func()，返回最后一次的结果。
+    """
+
+    def run(func: Callable[[], Any], rows: int | None = None) -> Any:
+        peak = _peak_memory(func)
+        result = benchmark.pedantic(
+            func,
+            rounds=int(os.getenv("BENCHMARK_ROUNDS", "5")),
+            iterations=1,
+            warmup_rounds=1,
+        )
+        benchmark.extra_info["peak_memory_mb"] = round(peak / 1024 / 1024, 2)
+        if rows is not None:
+            benchmark.extra_info["rows"] = rows
+            # --benchmark-disable 时只运行一次、不统计耗时，stats 为 None
+            if benchmark.stats is not None:
+                benchmark.extra_info["rows_per_second"] = round(rows / benchmark.stats.stats.mean)
+        module = request.node.module.__name__.rsplit(".", 1)[-1]
+        _check_memory_baseline(f"{module}::{request.node.name}", peak)
+        return result
+
+    return run
@@ -0,0 +1,216 @@
+from __future__ import annotations
+
+import json
+import os
+import sqlite3
+from datetime import datetime, timedelta
+from decimal import Decimal
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import src_agent.data_loader as data_loader
+import src_agent.fast_ops as fast_ops
+from src_agent.config.sandbox_config import SandboxConfig
+from src_agent.config.local_sql_config import LocalSQLConfig
+from src_agent.data_loader import DatasetConfig, load_dataset, load_multiheader_excel
+from src_agent.local_sql import LocalSQLEngine
+from src_agent.rendering import render_figure
+from src_agent.sandbox import PythonSandbox
+from src_agent.sql_result import _json_default, serialize_sql_result
+
+from .conftest import benchmark_scales, scale_dataframe
+
+SCALES = benchmark_scales()
+
+TELCO_CONFIG = dict(
+    description="telco 基准数据",
+    numeric_columns=("tenure", "MonthlyCharges", "TotalCharges"),
+)
+
+
+@pytest.mark.parametrize("scale", SCALES)
+def test_load_dataset(measure, scaled_csv, scale: int) -> None:
+    path = scaled_csv(scale)
+    config = DatasetConfig(filename=path.name, **TELCO_CONFIG)
+    with mock.patch.object(data_loader, "DATA_DIR", path.parent), mock.patch.dict(
+        data_loader.DATASET_CATALOG, {"telco_bench": config}
+    ):
+        df = measure(lambda: load_dataset("telco_bench"), rows=7043 * scale)
+    assert df["TotalCharges"].dtype.kind == "f"
+
+
+@pytest.fixture(scope="module")
+def multiheader_excel(tmp_path_factory, telco_df):
+    """带 2 行说明和 2 级表头的 Excel（与 test_multiheader.xlsx 的结构一致）"""
+    pytest.importorskip("openpyxl")
+    df = scale_dataframe(telco_df, 5)
+    groups = ["客户"] * 5 + ["服务"] * 11 + ["账单"] * 5
+    df.columns = pd.MultiIndex.from_arrays([groups, df.columns])
+    path = tmp_path_factory.mktemp("excel") / "telco_multiheader.xlsx"
+    with pd.ExcelWriter(path) as writer:
+        pd.DataFrame([["客户流失数据（基准）"], ["单位：元"]]).to_excel(
+            writer, header=False, index=False
+        )
+        df.to_excel(writer, startrow=2)
+    return path, len(df)
+
+
+def test_load_multiheader_excel(measure, multiheader_excel) -> None:
+    path, rows = multiheader_excel
+    df = measure(lambda: load_multiheader_excel(path, header_rows=(2, 3)), rows=rows)
+    assert "账单_MonthlyCharges" in df.columns
+
+
+@pytest.mark.parametrize("scale", SCALES)
+def test_sandbox_execute_groupby(measure, tmp_path, telco_df, scale: int) -> None:
+    sandbox = PythonSandbox(SandboxConfig(sandbox_workspace=str(tmp_path / "workspace")))
+    sandbox.set_global("telco", scale_dataframe(telco_df, scale))
+    code = (
+        "summary = telco.groupby(['Contract', 'Churn'])['MonthlyCharges']"
+        ".agg(['mean', 'count']).reset_index()"
+    )
+    measure(lambda: sandbox.execute(code), rows=7043 * scale)
+    assert len(sandbox.get_global("summary")) == 6
+
+
+@pytest.mark.parametrize("engine", ["pandas", "duckdb"])
+@pytest.mark.parametrize("scale", SCALES)
+def test_file_groupby(measure, tmp_path, scaled_csv, scale: int, engine: str) -> None:
+    """同一 CSV 上的分组聚合：pandas 读入全部列后 groupby，对比 local_sql（DuckDB 只读取需要的列）"""
+    path = scaled_csv(scale)
+    if engine == "pandas":
+
+        def run():
+            df = pd.read_csv(path)
+            return df.groupby(["Contract", "Churn"])["MonthlyCharges"].agg(["mean", "count"])
+
+    else:
+        sql_engine = LocalSQLEngine(
+            LocalSQLConfig(data_dir=str(path.parent), temp_dir=str(tmp_path / "duckdb_tmp"))
+        )
+        table = path.stem.lower()
+
+        def run():
+            return sql_engine.query(
+                f"SELECT Contract, Churn, avg(MonthlyCharges), count(*) FROM {table} GROUP BY 1, 2"
+            ).rows
+
+    with mock.patch.dict(data_loader.DATASET_CATALOG, {}, clear=True):
+        result = measure(run, rows=7043 * scale)
+    assert len(result) == 6
+
+
+@pytest.mark.parametrize("points", [10_000, 1_000_000])
+def test_fig_render(measure, tmp_path, points: int) -> None:
+    from matplotlib.figure import Figure
+
+    rng = np.random.default_rng(0)
+    fig = Figure(figsize=(10, 6))
+    ax = fig.subplots()
+    ax.plot(np.arange(points), rng.standard_normal(points).cumsum())
+    ax.set_title("基准折线图")
+    fig.tight_layout()
+
+    path = os.path.join(tmp_path, "bench.png")
+    measure(lambda: render_figure(fig, path, bbox_inches="tight", dpi=300), rows=points)
+    assert os.path.getsize(path) > 0
+
+
+# 以 MySQL 驱动（pymysql）的返回类型读取：DECIMAL 列为 Decimal，DATETIME 列为 datetime
+sqlite3.register_adapter(Decimal, str)
+sqlite3.register_adapter(datetime, lambda value: value.isoformat(" "))
+sqlite3.register_converter("DECIMAL", lambda raw: Decimal(raw.decode()))
+sqlite3.register_converter("DATETIME", lambda raw: datetime.fromisoformat(raw.decode()))
+
+
+@pytest.fixture(scope="module")
+def sqlite_telco(telco_df):
+    """内存 SQLite 中的 telco 表（替代 MySQL），金额列为 DECIMAL，附加 DATETIME 列，返回按倍数构建连接的函数"""
+    cache: dict[int, sqlite3.Connection] = {}
+    column_types = {
+        "SeniorCitizen": "INTEGER",
+        "tenure": "INTEGER",
+        "MonthlyCharges": "DECIMAL(10, 2)",
+        "TotalCharges": "DECIMAL(10, 2)",
+        "created_at": "DATETIME",
+    }
+
+    def build(scale: int) -> sqlite3.Connection:
+        if scale not in cache:
+            df = scale_dataframe(telco_df, scale)
+            df["TotalCharges"] = pd.to_numeric(df["TotalCharges"], errors="coerce").fillna(0)
+            for column in ("MonthlyCharges", "TotalCharges"):
+                df[column] = [Decimal(f"{value:.2f}") for value in df[column]]
+            columns = [*df.columns, "created_at"]
+            start = datetime(2024, 1, 1)
+            rows = [
+                row + (start + timedelta(minutes=index),)
+                for index, row in enumerate(df.astype(object).itertuples(index=False, name=None))
+            ]
+
+            conn = sqlite3.connect(":memory:", detect_types=sqlite3.PARSE_DECLTYPES)
+            definition = ", ".join(f'"{name}" {column_types.get(name, "TEXT")}' for name in columns)
+            conn.execute(f"CREATE TABLE telco ({definition})")
+            placeholders = ", ".join("?" * len(columns))
+            conn.executemany(f"INSERT INTO telco VALUES ({placeholders})", rows)
+            conn.commit()
+            cache[scale] = conn
+        return cache[scale]
+
+    yield build
+    for conn in cache.values():
+        conn.close()
+
+
+def _serialize_per_cell(rows, description) -> str:
+    """原实现：标准库 json.dumps 逐单元格回调，输出不带列名的二维数组"""
+    return json.dumps(rows, ensure_ascii=False, default=_json_default)
+
+
+SQL_SERIALIZERS = {"per_cell": _serialize_per_cell, "compact": serialize_sql_result}
+
+
+@pytest.mark.parametrize("serializer", sorted(SQL_SERIALIZERS))
+@pytest.mark.parametrize("scale", SCALES)
+def test_sql_result_serialization(
+    measure, benchmark, sqlite_telco, scale: int, serializer: str
+) -> None:
+    """查询 + fetchall + 序列化，与 sql_inter 的路径一致"""
+    conn = sqlite_telco(scale)
+    serialize = SQL_SERIALIZERS[serializer]
+
+    def run() -> str:
+        cursor = conn.execute("SELECT * FROM telco")
+        return serialize(cursor.fetchall(), cursor.description)
+
+    text = measure(run, rows=7043 * scale)
+    benchmark.extra_info["payload_mb"] = round(len(text.encode("utf-8")) / 1024 / 1024, 2)
+    assert text.startswith('{"columns"' if serializer == "compact" else "[[")
+
+
+def _naive_churn_and_top_k(df: pd.DataFrame) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """模型常写的实现：apply 逐行打标记、逐组 nlargest"""
+    flags = df["Churn"].apply(lambda value: 1 if value == "Yes" else 0)
+    rates = flags.groupby(df["Contract"]).agg(["size", "sum", "mean"])
+    top = df.groupby(["Contract", "tenure"], group_keys=False).apply(
+        lambda group: group.nlargest(5, "MonthlyCharges")
+    )
+    return rates, top
+
+
+def _fast_churn_and_top_k(df: pd.DataFrame) -> tuple[pd.DataFrame, pd.DataFrame]:
+    return fast_ops.churn_rate(df, by="Contract"), fast_ops.top_k_by_group(df, ["Contract", "tenure"], "MonthlyCharges", k=5)
+
+
+ANALYSIS_IMPLEMENTATIONS = {"naive": _naive_churn_and_top_k, "fast_ops": _fast_churn_and_top_k}
+
+
+@pytest.mark.parametrize("implementation", sorted(ANALYSIS_IMPLEMENTATIONS))
+@pytest.mark.parametrize("scale", SCALES)
+def test_churn_and_top_k(measure, telco_df, scale: int, implementation: str) -> None:
+    df = scale_dataframe(telco_df, scale)
+    rates, top = measure(lambda: ANALYSIS_IMPLEMENTATIONS[implementation](df), rows=len(df))
+    assert len(rates) == 3 and len(top) == len(df.groupby(["Contract", "tenure"]).head(5))
@@ -0,0 +1,138 @@
+from __future__ import annotations
+
+import json
+import os
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+from src_agent import artifact_store as artifact_module
+from src_agent.artifact_store import ArtifactNotFoundError, ArtifactStore, format_page, offload
+from src_agent.config.artifact_config import ArtifactConfig
+
+
+class ArtifactStoreTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self._tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self._tmp.cleanup)
+        self.config = ArtifactConfig(
+            artifacts_dir=self._tmp.name, inline_max_chars=200, preview_chars=50
+        )
+        self.store = ArtifactStore(self.config)
+
+    def test_small_output_is_returned_inline(self) -> None:
+        self.assertEqual(self.store.offload("short", "python_inter"), "short")
+        self.assertEqual(os.listdir(self._tmp.name), [])
+
+    def test_artifacts_are_scoped_to_thread(self) -> None:
+        info = self.store.put("secret rows", "sql_inter", thread_id="thread-a")
+        self.assertEqual(self.store.read(info.artifact_id, thread_id="thread-a")[1], [(0, "secret rows")])
+        with self.assertRaises(ArtifactNotFoundError):
+            self.store.read(info.artifact_id, thread_id="thread-b")
+        # 不在运行上下文中时使用默认会话，同样看不到其他线程的 artifact
+        with self.assertRaises(ArtifactNotFoundError):
+            self.store.info(info.artifact_id)
+
+    def test_large_rows_are_stored_one_record_per_line(self) -> None:
+        rows = [{"id": i, "城市": f"城市{i}"} for i in range(100)]
+        message = self.store.offload(json.dumps(rows, ensure_ascii=False), "sql_inter")
+
+        artifact_id = message.split("`")[1]
+        self.assertIn("read_artifact", message)
+        self.assertLess(len(message), 600)
+
+        info, page = self.store.read(artifact_id, offset=10, limit=3)
+        self.assertEqual(info.kind, "rows")
+        self.assertEqual(info.lines, 100)
+        self.assertEqual([number for number, _ in page], [10, 11, 12])
+        self.assertEqual(json.loads(page[0][1]), rows[10])
+
+    def test_columnar_rows_keep_column_names_in_metadata(self) -> None:
+        payload = {"columns": ["id", "城市"], "rows": [[i, f"城市{i}"] for i in range(300)]}
+        message = self.store.offload(json.dumps(payload, ensure_ascii=False), "sql_inter")
+
+        artifact_id = message.split("`")[1]
+        info, page = self.store.read(artifact_id, offset=5, limit=2)
+        self.assertEqual(info.kind, "rows")
+        self.assertEqual(info.lines, 300)
+        self.assertEqual(info.columns, ["id", "城市"])
+        self.assertEqual(json.loads(page[0][1]), [5, "城市5"])
+        self.assertIn('列: ["id", "城市"]', format_page(info, page, None))
+
+    def test_pattern_filters_lines_by_substring(self) -> None:
+        text = "\n".join(f"line {i}" for i in range(100)) + "\n(a+)+$"
+        info = self.store.put(text, "python_inter")
+
+        _, page = self.store.read(info.artifact_id, pattern="line 9")
+        self.assertEqual([number for number, _ in page], [9] + list(range(90, 100)))
+        _, page = self.store.read(info.artifact_id, offset=9, pattern="line 9")
+        self.assertEqual([line for _, line in page], ["line 98", "line 99"])
+        # 正则元字符按普通文本匹配
+        _, page = self.store.read(info.artifact_id, pattern="(a+)+$")
+        self.assertEqual([number for number, _ in page], [100])
+
+    def test_limit_is_capped(self) -> None:
+        info = self.store.put("\n".join("x" * 5 for _ in range(500)), "python_inter")
+        _, page = self.store.read(info.artifact_id, limit=10_000)
+        self.assertEqual(len(page), self.config.max_page_lines)
+
+    def test_rejects_invalid_or_unknown_ids(self) -> None:
+        with self.assertRaises(ArtifactNotFoundError):
+            self.store.read("../../etc/passwd")
+        with self.assertRaises(ArtifactNotFoundError):
+            self.store.read("art_20250101_000000_deadbeef")
+
+    def test_prune_removes_expired_artifacts(self) -> None:
+        info = self.store.put("x" * 500, "python_inter")
+        self.assertEqual(self.store.prune(time.time()), 0)
+        self.assertEqual(
+            self.store.prune(time.time() + self.config.max_age_seconds + 1), 2
+        )
+        with self.assertRaises(ArtifactNotFoundError):
+            self.store.info(info.artifact_id)
+
+    def test_offload_keeps_small_structured_results(self) -> None:
+        with mock.patch.object(artifact_module, "_artifact_store", self.store):
+            small = {"results": [1, 2]}
+            self.assertIs(offload(small, "search_tool"), small)
+            large = {"results": ["内容" * 200]}
+            self.assertIn("📦", offload(large, "search_tool"))
+
+
+class ReadArtifactToolTests(unittest.TestCase):
+    def test_reads_page_through_tool(self) -> None:
+        from src_agent.tools import read_artifact
+
+        with tempfile.TemporaryDirectory() as tmp:
+            store = ArtifactStore(ArtifactConfig(artifacts_dir=tmp))
+            info = store.put("\n".join(f"row {i}" for i in range(10)), "python_inter")
+            with mock.patch("src_agent.tools.get_artifact_store", return_value=store):
+                result = read_artifact.invoke(
+                    {"artifact_id": info.artifact_id, "offset": 2, "limit": 2}
+                )
+                self.assertIn("2: row 2", result)
+                self.assertIn("3: row 3", result)
+                self.assertNotIn("row 4", result)
+
+                literal = read_artifact.invoke(
+                    {"artifact_id": info.artifact_id, "pattern": "("}
+                )
+                self.assertIn("没有更多内容", literal)
+
+    def test_tool_only_reads_current_thread(self) -> None:
+        from src_agent.tools import read_artifact
+
+        with tempfile.TemporaryDirectory() as tmp:
+            store = ArtifactStore(ArtifactConfig(artifacts_dir=tmp))
+            info = store.put("订单明细", "sql_inter", thread_id="owner")
+            args = {"artifact_id": info.artifact_id}
+            with mock.patch("src_agent.tools.get_artifact_store", return_value=store):
+                owner = read_artifact.invoke(args, config={"configurable": {"thread_id": "owner"}})
+                other = read_artifact.invoke(args, config={"configurable": {"thread_id": "other"}})
+            self.assertIn("0: 订单明细", owner)
+            self.assertIn("不存在或已过期", other)
+
+
+if __name__ == "__main__":
+    unittest.main()
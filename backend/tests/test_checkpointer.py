@@ -0,0 +1,119 @@
+from __future__ import annotations
+
+import asyncio
+import os
+import tempfile
+import unittest
+from unittest import mock
+from typing import TypedDict
+
+from langgraph.graph import END, START, StateGraph
+
+from src_agent.config.checkpointer_config import CheckpointerConfig
+from src_agent.image_lifecycle import get_image_manager
+from src_agent.memory.pgmemory import get_checkpointer, open_checkpointer
+
+
+class CounterState(TypedDict):
+    count: int
+
+
+def _counter_graph(checkpointer):
+    builder = StateGraph(CounterState)
+    builder.add_node("increment", lambda state: {"count": state["count"] + 1})
+    builder.add_edge(START, "increment")
+    builder.add_edge("increment", END)
+    return builder.compile(checkpointer=checkpointer)
+
+
+async def _run_twice_with_restart(config: CheckpointerConfig, thread_id: str) -> int:
+    """在两次独立打开的保存器上运行同一线程，模拟服务重启"""
+    run_config = {"configurable": {"thread_id": thread_id}}
+    async with open_checkpointer(config) as checkpointer:
+        await _counter_graph(checkpointer).ainvoke({"count": 1}, run_config)
+    async with open_checkpointer(config) as checkpointer:
+        snapshot = await _counter_graph(checkpointer).aget_state(run_config)
+        return snapshot.values["count"]
+
+
+class CheckpointerConfigTests(unittest.TestCase):
+    def test_backend_defaults_to_postgres_when_uri_set(self) -> None:
+        with mock.patch.dict(
+            os.environ, {"CHECKERPOINTER_URI": "postgresql://localhost/db"}, clear=True
+        ):
+            config = CheckpointerConfig.from_env()
+        self.assertEqual(config.backend, "postgres")
+        self.assertEqual(config.uri, "postgresql://localhost/db")
+
+    def test_validate_rejects_bad_pool(self) -> None:
+        with self.assertRaises(ValueError):
+            CheckpointerConfig(backend="postgres", uri="x", pool_min_size=5, pool_max_size=2).validate()
+        with self.assertRaises(ValueError):
+            CheckpointerConfig(backend="sqlite").validate()
+
+
+class SqliteCheckpointerTests(unittest.TestCase):
+    def test_state_survives_restart(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            config = CheckpointerConfig(
+                backend="sqlite", uri=os.path.join(tmp, "checkpoints.sqlite")
+            )
+            self.assertEqual(asyncio.run(_run_twice_with_restart(config, "t1")), 2)
+
+    def test_registers_with_image_manager(self) -> None:
+        async def scenario() -> tuple[object, object]:
+            async with open_checkpointer(
+                CheckpointerConfig(backend="sqlite", uri=":memory:")
+            ) as checkpointer:
+                inside = (get_image_manager().checkpointer, get_checkpointer())
+                self.assertIs(inside[0], checkpointer)
+                self.assertIs(inside[1], checkpointer)
+            return get_image_manager().checkpointer, get_checkpointer()
+
+        self.assertEqual(asyncio.run(scenario()), (None, None))
+
+    def test_none_backend_yields_nothing(self) -> None:
+        async def scenario():
+            async with open_checkpointer(CheckpointerConfig(backend="none")) as saver:
+                return saver
+
+        self.assertIsNone(asyncio.run(scenario()))
+
+
+@unittest.skipUnless(
+    os.getenv("TEST_POSTGRES_URI"), "设置 TEST_POSTGRES_URI 以运行 Postgres 连接池测试"
+)
+class PostgresCheckpointerTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.config = CheckpointerConfig(
+            backend="postgres",
+            uri=os.environ["TEST_POSTGRES_URI"],
+            pool_min_size=1,
+            pool_max_size=4,
+        )
+
+    def test_state_survives_restart(self) -> None:
+        self.assertEqual(
+            asyncio.run(_run_twice_with_restart(self.config, f"pg-{os.getpid()}")), 2
+        )
+
+    def test_concurrent_threads_share_pool(self) -> None:
+        async def scenario() -> list[int]:
+            async with open_checkpointer(self.config) as checkpointer:
+                graph = _counter_graph(checkpointer)
+                results = await asyncio.gather(
+                    *(
+                        graph.ainvoke(
+                            {"count": i},
+                            {"configurable": {"thread_id": f"pg-{os.getpid()}-{i}"}},
+                        )
+                        for i in range(16)
+                    )
+                )
+            return [result["count"] for result in results]
+
+        self.assertEqual(asyncio.run(scenario()), [i + 1 for i in range(16)])
+
+
+if __name__ == "__main__":
+    unittest.main()
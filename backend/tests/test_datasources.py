@@ -0,0 +1,208 @@
+from __future__ import annotations
+
+import json
+import os
+import threading
+import unittest
+from unittest import mock
+
+from src_agent.config.datasource_config import (
+    DataSourceConfig,
+    DataSourceRoutingConfig,
+    Endpoint,
+    parse_endpoints,
+)
+from src_agent.datasources import DataSourceError, DataSourceRouter
+
+PRIMARY = Endpoint("db-primary")
+REPLICAS = [Endpoint("db-replica-1"), Endpoint("db-replica-2", 3307)]
+
+
+class FakeConnection:
+    def __init__(self, endpoint: Endpoint):
+        self.endpoint = endpoint
+        self.open = True
+        self.pings = 0
+        self.rollbacks = 0
+
+    def ping(self, reconnect: bool = False) -> None:
+        self.pings += 1
+        if not self.open:
+            raise ConnectionError("gone")
+
+    def rollback(self) -> None:
+        self.rollbacks += 1
+
+    def close(self) -> None:
+        self.open = False
+
+
+class FakeConnector:
+    """记录建立过的连接；down 中的实例连接失败"""
+
+    def __init__(self) -> None:
+        self.down: set[Endpoint] = set()
+        self.connections: list[FakeConnection] = []
+
+    def __call__(self, source, endpoint, config) -> FakeConnection:
+        if endpoint in self.down:
+            raise ConnectionRefusedError(f"{endpoint} refused")
+        conn = FakeConnection(endpoint)
+        self.connections.append(conn)
+        return conn
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class DataSourceRouterTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.connector = FakeConnector()
+        self.clock = FakeClock()
+        self.router = self._router()
+
+    def _router(self, **overrides) -> DataSourceRouter:
+        sources = {
+            "default": DataSourceConfig(name="default", primary=PRIMARY, replicas=list(REPLICAS)),
+            "hr": DataSourceConfig(name="hr", primary=Endpoint("hr-db"), database="hr"),
+        }
+        config = DataSourceRoutingConfig(sources=sources, failover_cooldown_seconds=30, **overrides)
+        return DataSourceRouter(config, connector=self.connector, clock=self.clock)
+
+    def _endpoint(self, source=None, read_only=True) -> Endpoint:
+        with self.router.connection(source, read_only=read_only) as conn:
+            return conn.endpoint
+
+    def test_reads_round_robin_over_replicas_and_writes_go_to_primary(self) -> None:
+        self.assertEqual([self._endpoint() for _ in range(4)], REPLICAS * 2)
+        self.assertEqual(self._endpoint(read_only=False), PRIMARY)
+        self.assertEqual(self._endpoint("HR"), Endpoint("hr-db"))
+        with self.assertRaisesRegex(DataSourceError, "可用的数据源: default, hr"):
+            self._endpoint("sales")
+
+    def test_failover_and_recovery_after_cooldown(self) -> None:
+        self.connector.down = {REPLICAS[0]}
+        self.assertEqual([self._endpoint() for _ in range(3)], [REPLICAS[1]] * 3)
+        self.assertFalse(self.router.is_available(REPLICAS[0]))
+
+        self.connector.down = set(REPLICAS)
+        self.router.close()
+        self.assertEqual(self._endpoint(), PRIMARY)
+
+        self.connector.down = set(REPLICAS) | {PRIMARY}
+        self.router.close()
+        with self.assertRaisesRegex(DataSourceError, "所有实例都无法连接"):
+            self._endpoint()
+
+        # 冷却期结束后恢复路由
+        self.connector.down = set()
+        self.clock.now = 31
+        self.assertIn(self._endpoint(), REPLICAS)
+        self.assertEqual(self.router.describe()[0]["unavailable"], [])
+
+    def test_pool_reuses_connections_and_discards_failed_ones(self) -> None:
+        for _ in range(3):
+            self._endpoint("hr")
+        self.assertEqual(len(self.connector.connections), 1)
+        # 每次归还前回滚，不保留未提交的写入和一致性读快照
+        self.assertEqual(self.connector.connections[0].rollbacks, 3)
+
+        with self.assertRaises(RuntimeError):
+            with self.router.connection("hr"):
+                raise RuntimeError("query failed")
+        self.assertFalse(self.connector.connections[0].open)
+        self._endpoint("hr")
+        self.assertEqual(len(self.connector.connections), 2)
+
+        # 空闲超过 recycle 时间的连接借出前先 ping，失效则重建
+        self.clock.now = 120
+        self.connector.connections[1].open = False
+        self._endpoint("hr")
+        self.assertEqual(self.connector.connections[1].pings, 1)
+        self.assertEqual(len(self.connector.connections), 3)
+
+    def test_connections_used_for_writes_are_not_reused(self) -> None:
+        # 写语句、SET、USE 等可能修改会话状态，连接用完即关闭
+        for _ in range(2):
+            self._endpoint(read_only=False)
+        self.assertEqual(len(self.connector.connections), 2)
+        self.assertFalse(any(conn.open for conn in self.connector.connections))
+        self.assertEqual(self.router._pool(self.router.source(), PRIMARY).idle_count(), 0)
+
+        # 回滚失败的连接同样不放回连接池
+        with self.router.connection("hr") as conn:
+            conn.rollback = mock.Mock(side_effect=ConnectionError("lost"))
+        self.assertFalse(conn.open)
+
+    def test_pool_size_bounds_concurrent_connections(self) -> None:
+        self.router = self._router(pool_size=1, pool_timeout=0.05)
+        release = threading.Event()
+        acquired = threading.Event()
+
+        def hold() -> None:
+            with self.router.connection(read_only=False):
+                acquired.set()
+                release.wait(5)
+
+        worker = threading.Thread(target=hold)
+        worker.start()
+        acquired.wait(5)
+        with self.assertRaisesRegex(DataSourceError, "连接池已满"):
+            self._endpoint(read_only=False)
+        release.set()
+        worker.join()
+        self.assertEqual(self._endpoint(read_only=False), PRIMARY)
+        # 连接池已满不代表实例故障
+        self.assertTrue(self.router.is_available(PRIMARY))
+
+
+class DataSourceConfigTests(unittest.TestCase):
+    def test_from_env(self) -> None:
+        env = {
+            "MYSQL_HOST": "primary",
+            "MYSQL_PORT": "3307",
+            "MYSQL_USER": "agent",
+            "MYSQL_PASSWORD": "secret",
+            "MYSQL_DATABASE": "classicmodels",
+            "MYSQL_REPLICAS": "r1, r2:3310",
+            "MYSQL_DATASOURCES": "Sales",
+            "MYSQL_SALES_HOST": "sales-db",
+            "MYSQL_SALES_DATABASE": "sales",
+            "MYSQL_SALES_DESCRIPTION": "订单与回款",
+            "MYSQL_POOL_SIZE": "8",
+        }
+        with mock.patch.dict(os.environ, env):
+            config = DataSourceRoutingConfig.from_env()
+        config.validate()
+        default, sales = config.sources["default"], config.sources["sales"]
+        self.assertEqual(default.primary, Endpoint("primary", 3307))
+        self.assertEqual(default.replicas, [Endpoint("r1", 3307), Endpoint("r2", 3310)])
+        self.assertEqual((sales.primary, sales.database, sales.user), (Endpoint("sales-db"), "sales", "agent"))
+        self.assertEqual(sales.description, "订单与回款")
+        self.assertEqual(config.pool_size, 8)
+        self.assertEqual(parse_endpoints(" , a:1"), [Endpoint("a", 1)])
+
+    def test_list_datasources_tool(self) -> None:
+        from src_agent import datasources
+        from src_agent.tools import list_datasources
+
+        sources = {
+            "default": DataSourceConfig(name="default", primary=PRIMARY, replicas=list(REPLICAS)),
+            "hr": DataSourceConfig(name="hr", primary=Endpoint("hr-db"), description="人事库"),
+        }
+        router = DataSourceRouter(DataSourceRoutingConfig(sources=sources), connector=FakeConnector())
+        with mock.patch.object(datasources, "_router", router):
+            listed = json.loads(list_datasources.invoke({}))
+        self.assertEqual([source["name"] for source in listed], ["default", "hr"])
+        self.assertTrue(listed[0]["default"])
+        self.assertEqual(listed[0]["replicas"], 2)
+        self.assertEqual(listed[1]["description"], "人事库")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,162 @@
+from __future__ import annotations
+
+import os
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from src_agent import fast_ops
+from src_agent.config.sandbox_config import SandboxConfig
+from src_agent.sandbox import PythonSandbox
+
+
+def customers(rows: int = 500) -> pd.DataFrame:
+    rng = np.random.default_rng(7)
+    return pd.DataFrame(
+        {
+            "customerID": [f"C{i:04d}" for i in range(rows)],
+            "Contract": rng.choice(["Month-to-month", "One year", "Two year"], rows),
+            "tenure": rng.integers(0, 73, rows),
+            "MonthlyCharges": rng.uniform(18, 120, rows).round(2),
+            "SeniorCitizen": rng.integers(0, 2, rows),
+            "Churn": rng.choice(["Yes", "No"], rows, p=[0.3, 0.7]),
+        }
+    )
+
+
+class FastOpsTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.df = customers()
+
+    def test_binned_agg_matches_groupby_of_cut(self) -> None:
+        bins = [0, 12, 24, 48, 72]
+        result = fast_ops.binned_agg(
+            self.df, "tenure", bins=bins, values="MonthlyCharges", agg=["mean", "max"], by="Contract"
+        )
+        expected = (
+            self.df.assign(bin=pd.cut(self.df["tenure"], bins, include_lowest=True))
+            .groupby(["Contract", "bin"], observed=True)["MonthlyCharges"]
+            .agg(["size", "mean", "max"])
+        )
+        self.assertEqual(list(result.columns), ["Contract", "tenure_bin", "count", "MonthlyCharges_mean", "MonthlyCharges_max"])
+        self.assertEqual(result["count"].tolist(), expected["size"].tolist())
+        np.testing.assert_allclose(result["MonthlyCharges_mean"], expected["mean"])
+        np.testing.assert_allclose(result["MonthlyCharges_max"], expected["max"])
+
+        quartiles = fast_ops.binned_agg(self.df, "MonthlyCharges", bins=4, quantiles=True)
+        self.assertEqual(len(quartiles), 4)
+        self.assertEqual(quartiles["count"].sum(), len(self.df))
+
+    def test_churn_rate_matches_row_by_row_count(self) -> None:
+        result = fast_ops.churn_rate(self.df, by="Contract").set_index("Contract")
+        for contract, group in self.df.groupby("Contract"):
+            churned = sum(1 for value in group["Churn"] if value == "Yes")
+            self.assertEqual(result.loc[contract, "count"], len(group))
+            self.assertEqual(result.loc[contract, "churned"], churned)
+            self.assertAlmostEqual(result.loc[contract, "churn_rate"], churned / len(group))
+        self.assertTrue(result["churn_rate"].is_monotonic_decreasing)
+
+        overall = fast_ops.churn_rate(self.df)
+        self.assertAlmostEqual(overall.loc["all", "churn_rate"], (self.df["Churn"] == "Yes").mean())
+        # 0/1、是/否标记和指定正类
+        senior = fast_ops.churn_rate(self.df, flag="SeniorCitizen")
+        self.assertEqual(senior.loc["all", "churned"], self.df["SeniorCitizen"].sum())
+        chinese = self.df.assign(流失=self.df["Churn"].map({"Yes": "是", "No": "否"}))
+        self.assertEqual(
+            fast_ops.churn_rate(chinese, flag="流失").loc["all", "churned"], overall.loc["all", "churned"]
+        )
+        self.assertEqual(
+            fast_ops.churn_rate(self.df, flag="Churn", positive="No").loc["all", "churned"],
+            (self.df["Churn"] == "No").sum(),
+        )
+
+    def test_top_k_by_group_matches_nlargest(self) -> None:
+        result = fast_ops.top_k_by_group(self.df, "Contract", "MonthlyCharges", k=3)
+        for contract, group in result.groupby("Contract"):
+            expected = self.df[self.df["Contract"] == contract].nlargest(3, "MonthlyCharges")
+            self.assertEqual(group["MonthlyCharges"].tolist(), expected["MonthlyCharges"].tolist())
+            self.assertEqual(group["rank"].tolist(), [1, 2, 3])
+
+        smallest = fast_ops.top_k_by_group(self.df, ["Contract", "Churn"], "tenure", k=1, ascending=True)
+        self.assertEqual(len(smallest), 6)
+        expected = self.df.groupby(["Contract", "Churn"])["tenure"].min()
+        self.assertEqual(smallest.set_index(["Contract", "Churn"])["tenure"].to_dict(), expected.to_dict())
+
+        # 空值不参与排名；日期列按时间排序
+        events = pd.DataFrame(
+            {
+                "group": ["a", "a", "a", "b", None],
+                "score": [1.0, None, 3.0, 2.0, 9.0],
+                "at": pd.to_datetime(["2024-01-03", "2024-01-01", "2024-01-02", "2024-01-05", "2024-01-04"]),
+            }
+        )
+        self.assertEqual(fast_ops.top_k_by_group(events, "group", "score", k=5)["score"].tolist(), [3.0, 1.0, 2.0])
+        latest = fast_ops.top_k_by_group(events, "group", "at", k=1)
+        self.assertEqual(latest["at"].dt.day.tolist(), [3, 5])
+
+    def test_cohort_table(self) -> None:
+        orders = pd.DataFrame(
+            {
+                "customer": [1, 1, 1, 2, 2, 3, 4],
+                "orderDate": [
+                    "2024-01-05", "2024-01-20", "2024-03-02", "2024-01-15",
+                    "2024-02-10", "2024-02-01", None,
+                ],
+            }
+        )
+        counts = fast_ops.cohort_table(orders, "customer", "orderDate", normalize=False)
+        self.assertEqual([str(period) for period in counts.index], ["2024-01", "2024-02"])
+        self.assertEqual(counts.loc["2024-01"].tolist(), [2, 1, 1])
+        # 数据截止到 2024-03，2024-02 同期群的第 2 期（2024-04）尚未观察到
+        self.assertEqual(counts.loc["2024-02", [0, 1]].tolist(), [1, 0])
+        self.assertTrue(np.isnan(counts.loc["2024-02", 2]))
+
+        rates = fast_ops.cohort_table(orders, "customer", "orderDate")
+        self.assertEqual(rates.loc["2024-01", "cohort_size"], 2)
+        self.assertEqual(rates.loc["2024-01", [0, 1, 2]].tolist(), [1.0, 0.5, 0.5])
+        self.assertEqual(rates.loc["2024-02", 1], 0.0)
+        self.assertTrue(np.isnan(rates.loc["2024-02", 2]))
+
+        weekly = fast_ops.cohort_table(orders, "customer", "orderDate", freq="W", max_periods=2)
+        self.assertTrue(set(weekly.columns) <= {"cohort_size", 0, 1})
+
+        # 所有用户都未活跃的周期（第 1 期）保留为 0 列
+        gapped = pd.DataFrame({"customer": [1, 1, 2], "orderDate": ["2024-01-05", "2024-03-02", "2024-01-09"]})
+        counts = fast_ops.cohort_table(gapped, "customer", "orderDate", normalize=False)
+        self.assertEqual(list(counts.columns), [0, 1, 2])
+        self.assertEqual(counts.loc["2024-01"].tolist(), [2, 0, 1])
+        rates = fast_ops.cohort_table(gapped, "customer", "orderDate", max_periods=2)
+        self.assertEqual(list(rates.columns), ["cohort_size", 0, 1])
+        self.assertEqual(rates.loc["2024-01", 1], 0.0)
+
+    def test_corr_matrix(self) -> None:
+        numeric = self.df[["tenure", "MonthlyCharges", "SeniorCitizen"]]
+        pd.testing.assert_frame_equal(fast_ops.corr_matrix(self.df), numeric.astype(float).corr())
+
+        with_missing = self.df.assign(MonthlyCharges=self.df["MonthlyCharges"].where(self.df["tenure"] > 3))
+        pd.testing.assert_frame_equal(
+            fast_ops.corr_matrix(with_missing, method="spearman"),
+            with_missing[numeric.columns].astype(float).corr(method="spearman"),
+        )
+
+        ranked = fast_ops.corr_matrix(self.df.assign(double=self.df["tenure"] * 2), target="tenure")
+        self.assertEqual(ranked.index[0], "double")
+        self.assertNotIn("tenure", ranked.index)
+
+    def test_available_in_sandbox_without_import(self) -> None:
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        sandbox = PythonSandbox(SandboxConfig(sandbox_workspace=os.path.join(tmp.name, "workspace")))
+        sandbox.set_global("df", self.df)
+        sandbox.execute("summary = fast_ops.churn_rate(df, by='Contract')")
+        self.assertEqual(len(sandbox.get_global("summary")), 3)
+        # 预置模块不属于用户变量
+        self.assertNotIn("fast_ops", sandbox.user_variables())
+        sandbox.clear_user_variables()
+        self.assertIs(sandbox.get_global("fast_ops"), fast_ops)
+
+
+if __name__ == "__main__":
+    unittest.main()
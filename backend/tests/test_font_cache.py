@@ -0,0 +1,65 @@
+from __future__ import annotations
+
+import json
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from src_agent import font_cache
+
+
+class FontCacheTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self._tmp = tempfile.TemporaryDirectory()
+        self.cache_dir = Path(self._tmp.name) / "cache"
+        self.font_dir = Path(self._tmp.name) / "fonts"
+        self.font_dir.mkdir()
+        patcher = mock.patch.object(font_cache, "font_dirs", lambda: [self.font_dir])
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        font_cache._memory_cache.clear()
+        self.addCleanup(font_cache._memory_cache.clear)
+
+    def tearDown(self) -> None:
+        self._tmp.cleanup()
+
+    def test_persists_detected_font_for_later_processes(self) -> None:
+        detect = mock.Mock(return_value="Noto Sans CJK SC")
+        self.assertEqual(font_cache.resolve_font(detect, self.cache_dir), "Noto Sans CJK SC")
+
+        # 模拟新进程：清空进程内缓存后应命中磁盘缓存，不再扫描字体
+        font_cache._memory_cache.clear()
+        second_detect = mock.Mock(return_value="other")
+        self.assertEqual(
+            font_cache.resolve_font(second_detect, self.cache_dir), "Noto Sans CJK SC"
+        )
+        detect.assert_called_once()
+        second_detect.assert_not_called()
+
+    def test_caches_missing_font_result(self) -> None:
+        detect = mock.Mock(return_value=None)
+        font_cache.resolve_font(detect, self.cache_dir)
+        font_cache._memory_cache.clear()
+        self.assertIsNone(font_cache.resolve_font(detect, self.cache_dir))
+        detect.assert_called_once()
+
+    def test_font_directory_change_invalidates_cache(self) -> None:
+        font_cache.resolve_font(lambda: None, self.cache_dir)
+        before = json.loads((self.cache_dir / font_cache.CACHE_FILENAME).read_text())["key"]
+
+        new_dir = self.font_dir / "noto"
+        new_dir.mkdir()
+        (new_dir / "NotoSansCJK.ttc").write_bytes(b"")
+
+        font_cache._memory_cache.clear()
+        self.assertEqual(
+            font_cache.resolve_font(lambda: "Noto Sans CJK SC", self.cache_dir),
+            "Noto Sans CJK SC",
+        )
+        after = json.loads((self.cache_dir / font_cache.CACHE_FILENAME).read_text())["key"]
+        self.assertNotEqual(before, after)
+
+
+if __name__ == "__main__":
+    unittest.main()
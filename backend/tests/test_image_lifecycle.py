@@ -0,0 +1,128 @@
+from __future__ import annotations
+
+import os
+import tempfile
+import time
+import unittest
+from pathlib import Path
+from types import SimpleNamespace
+
+from src_agent.config.image_config import ImageLifecycleConfig
+from src_agent.image_lifecycle import (
+    ImageLifecycleManager,
+    extract_image_names,
+    referenced_images_from_checkpointer,
+)
+
+
+def _write_image(directory: Path, name: str, size: int, mtime: float) -> None:
+    path = directory / name
+    path.write_bytes(b"\0" * size)
+    os.utime(path, (mtime, mtime))
+
+
+class ImageLifecycleSweepTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self._tmp = tempfile.TemporaryDirectory()
+        self.images_dir = Path(self._tmp.name)
+        self.now = time.time()
+
+    def tearDown(self) -> None:
+        self._tmp.cleanup()
+
+    def _manager(self, protected: set[str] | None = None, **overrides) -> ImageLifecycleManager:
+        config = ImageLifecycleConfig(images_dir=str(self.images_dir), **overrides)
+        return ImageLifecycleManager(config, lambda: protected or set())
+
+    def test_deletes_images_older_than_max_age(self) -> None:
+        _write_image(self.images_dir, "old.png", 10, self.now - 3 * 3600)
+        _write_image(self.images_dir, "new.png", 10, self.now - 60)
+
+        result = self._manager(max_age_hours=1).sweep(now=self.now)
+
+        self.assertEqual(result.deleted, ["old.png"])
+        self.assertEqual(sorted(os.listdir(self.images_dir)), ["new.png"])
+
+    def test_evicts_least_recently_accessed_when_over_budget(self) -> None:
+        mb = 1024 * 1024
+        _write_image(self.images_dir, "a.png", mb, self.now - 300)
+        _write_image(self.images_dir, "b.png", mb, self.now - 200)
+        _write_image(self.images_dir, "c.png", mb, self.now - 100)
+        manager = self._manager(max_total_mb=2)
+        # 访问 a.png 后它变成最近使用，应淘汰 b.png
+        manager.touch("a.png")
+
+        result = manager.sweep(now=self.now)
+
+        self.assertEqual(result.deleted, ["b.png"])
+        self.assertEqual(result.total_bytes, 2 * mb)
+
+    def test_keeps_images_referenced_by_checkpoints(self) -> None:
+        _write_image(self.images_dir, "kept.png", 10, self.now - 3 * 3600)
+        _write_image(self.images_dir, "gone.png", 10, self.now - 3 * 3600)
+
+        result = self._manager({"kept.png"}, max_age_hours=1).sweep(now=self.now)
+
+        self.assertEqual(result.deleted, ["gone.png"])
+        self.assertEqual(result.protected, 1)
+        self.assertTrue((self.images_dir / "kept.png").exists())
+
+    def test_skips_sweep_when_references_unavailable(self) -> None:
+        _write_image(self.images_dir, "old.png", 10, self.now - 3 * 3600)
+
+        def failing_provider() -> set[str]:
+            raise RuntimeError("checkpointer offline")
+
+        config = ImageLifecycleConfig(images_dir=str(self.images_dir), max_age_hours=1)
+        result = ImageLifecycleManager(config, failing_provider).sweep(now=self.now)
+
+        self.assertEqual(result.deleted, [])
+        self.assertTrue((self.images_dir / "old.png").exists())
+
+    def test_sweeps_with_grace_window_without_registered_checkpointer(self) -> None:
+        _write_image(self.images_dir, "old.png", 10, self.now - 3 * 3600)
+        _write_image(self.images_dir, "shown.png", 10, self.now - 3 * 3600)
+        config = ImageLifecycleConfig(
+            images_dir=str(self.images_dir), max_age_hours=1, unreferenced_grace_hours=0.5
+        )
+        manager = ImageLifecycleManager(config)
+        manager.touch("shown.png")
+
+        with self.assertLogs("src_agent.image_lifecycle", "WARNING"):
+            result = manager.sweep()
+        # 没有检查点时仍按保留时间清理，宽限期内访问过的图像不删除
+        self.assertEqual(result.deleted, ["old.png"])
+        self.assertEqual(result.protected, 1)
+
+        _write_image(self.images_dir, "shown.png", 10, self.now - 3 * 3600)
+        message = SimpleNamespace(content="![fig](http://host/images/shown.png)")
+        checkpoint = SimpleNamespace(checkpoint={"channel_values": {"messages": [message]}})
+        manager.register_checkpointer(SimpleNamespace(list=lambda config, *, limit=None: [checkpoint]))
+        result = manager.sweep(now=self.now + 3 * 3600)
+        self.assertEqual(result.deleted, [])
+        self.assertEqual(result.protected, 1)
+
+
+class CheckpointReferenceTests(unittest.TestCase):
+    def test_extracts_image_names_from_markdown(self) -> None:
+        text = "✅ 图像已生成: ![fig](http://localhost:2024/images/fig_20251118_1a2b.png)"
+        self.assertEqual(extract_image_names(text), {"fig_20251118_1a2b.png"})
+
+    def test_collects_references_from_recent_checkpoints(self) -> None:
+        message = SimpleNamespace(content="![fig](http://host/images/fig_a.png)")
+        checkpoint = SimpleNamespace(
+            checkpoint={"channel_values": {"messages": [message]}}
+        )
+
+        class FakeCheckpointer:
+            def list(self, config, *, limit=None):
+                return [checkpoint][:limit]
+
+        self.assertEqual(
+            referenced_images_from_checkpointer(FakeCheckpointer(), limit=5),
+            {"fig_a.png"},
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
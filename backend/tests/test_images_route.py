@@ -0,0 +1,82 @@
+from __future__ import annotations
+
+import gzip
+import tempfile
+import unittest
+from pathlib import Path
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from src_agent.app import IMMUTABLE_CACHE_CONTROL, LifecycleStaticFiles
+
+SVG_CONTENT = b'<svg xmlns="http://www.w3.org/2000/svg">' + b"<g/>" * 500 + b"</svg>"
+
+
+class ImagesRouteCachingTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self._tmp = tempfile.TemporaryDirectory()
+        self.images_dir = Path(self._tmp.name)
+        (self.images_dir / "fig.png").write_bytes(bytes(range(256)) * 4)
+        (self.images_dir / "fig.svg").write_bytes(SVG_CONTENT)
+
+        app = FastAPI()
+        app.mount("/images", LifecycleStaticFiles(directory=self.images_dir), name="images")
+        self.client = TestClient(app)
+
+    def tearDown(self) -> None:
+        self._tmp.cleanup()
+
+    def test_sets_immutable_cache_control_and_strong_etag(self) -> None:
+        response = self.client.get("/images/fig.png")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers["cache-control"], IMMUTABLE_CACHE_CONTROL)
+        etag = response.headers["etag"]
+        self.assertFalse(etag.startswith("W/"))
+
+        repeated = self.client.get("/images/fig.png", headers={"If-None-Match": etag})
+        self.assertEqual(repeated.status_code, 304)
+        self.assertEqual(repeated.headers["etag"], etag)
+
+    def test_etag_changes_when_file_is_replaced(self) -> None:
+        etag = self.client.get("/images/fig.png").headers["etag"]
+        (self.images_dir / "fig.png").write_bytes(b"replaced")
+
+        response = self.client.get("/images/fig.png", headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.headers["etag"], etag)
+
+    def test_supports_range_requests(self) -> None:
+        response = self.client.get("/images/fig.png", headers={"Range": "bytes=0-9"})
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response.content, bytes(range(10)))
+
+    def test_serves_precompressed_svg(self) -> None:
+        # 缺少压缩文件时先返回原图，响应发送后再生成 .svg.gz
+        first = self.client.get("/images/fig.svg", headers={"Accept-Encoding": "gzip"})
+        self.assertEqual(first.status_code, 200)
+        self.assertNotIn("content-encoding", first.headers)
+        self.assertEqual(first.content, SVG_CONTENT)
+
+        response = self.client.get(
+            "/images/fig.svg", headers={"Accept-Encoding": "gzip"}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers["content-encoding"], "gzip")
+        self.assertEqual(response.headers["content-type"], "image/svg+xml")
+        self.assertEqual(response.content, SVG_CONTENT)
+        self.assertTrue((self.images_dir / "fig.svg.gz").exists())
+        self.assertEqual(
+            gzip.decompress((self.images_dir / "fig.svg.gz").read_bytes()), SVG_CONTENT
+        )
+
+    def test_serves_plain_svg_without_gzip_support(self) -> None:
+        response = self.client.get(
+            "/images/fig.svg", headers={"Accept-Encoding": "identity"}
+        )
+        self.assertNotIn("content-encoding", response.headers)
+        self.assertEqual(response.content, SVG_CONTENT)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,136 @@
+"""
+导入耗时基准测试
+
+使用 `python -X importtime` 在全新子进程中导入入口模块，检查：
+- 重量级依赖（pandas、matplotlib、pymysql、langchain_tavily、未选用的模型 SDK 等）不会在导入时加载
+- 累计导入耗时不超过预算（可通过环境变量调整，例如 IMPORT_BUDGET_GRAPH_MS=8000）
+
+直接运行本文件会打印各入口模块导入耗时最高的依赖：
+    python -m tests.test_import_time
+"""
+
+from __future__ import annotations
+
+import os
+import subprocess
+import sys
+import unittest
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+
+# 任何入口模块都不应在导入时加载的依赖
+HEAVY_MODULES = (
+    "pandas",
+    "numpy",
+    "matplotlib",
+    "seaborn",
+    "pymysql",
+    "langchain_tavily",
+    "src_agent.sandbox",
+)
+
+# 未选用的模型提供方 SDK
+PROVIDER_MODULES = (
+    "langchain_deepseek",
+    "langchain_anthropic",
+    "langchain_openai",
+    "langchain_community.chat_models.tongyi",
+    "langchain_community.chat_models.moonshot",
+)
+
+# 默认预算（毫秒），留有余量以适应较慢的 CI 机器
+DEFAULT_BUDGETS_MS = {
+    "src_agent.model": 200,
+    "src_agent.tools": 4_000,
+    "src_agent.app": 2_000,
+    "src_agent.graph": 8_000,
+}
+
+GRAPH_ENV = {
+    "DEFAULT_MODEL": "deepseek",
+    "DEEPSEEK_MODEL": "deepseek-chat",
+    "SUMMARY_MODEL": "deepseek-chat",
+    "DEEPSEEK_API_KEY": "sk-import-time-test",
+}
+
+
+def import_profile(module: str, env: dict[str, str] | None = None) -> dict[str, int]:
+    """在子进程中导入模块，返回 {模块名: 累计导入耗时(微秒)}。"""
+    process_env = {**os.environ, **(env or {})}
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=BACKEND_DIR,
+        env=process_env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    profile: dict[str, int] = {}
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        profile[name.strip()] = int(cumulative)
+    return profile
+
+
+def budget_ms(module: str) -> int:
+    env_key = "IMPORT_BUDGET_" + module.rsplit(".", 1)[-1].upper() + "_MS"
+    return int(os.getenv(env_key, str(DEFAULT_BUDGETS_MS[module])))
+
+
+class ImportTimeTests(unittest.TestCase):
+    def assert_not_imported(self, profile: dict[str, int], modules: tuple[str, ...]) -> None:
+        loaded = sorted(name for name in modules if name in profile)
+        self.assertEqual(loaded, [], f"导入时加载了重量级模块: {loaded}")
+
+    def assert_within_budget(self, profile: dict[str, int], module: str) -> None:
+        elapsed_ms = profile[module] / 1000
+        self.assertLessEqual(
+            elapsed_ms, budget_ms(module), f"{module} 导入耗时 {elapsed_ms:.0f}ms 超出预算"
+        )
+
+    def test_model_factory_imports_no_provider_sdk(self) -> None:
+        profile = import_profile("src_agent.model")
+        self.assert_not_imported(profile, PROVIDER_MODULES + HEAVY_MODULES)
+        self.assert_within_budget(profile, "src_agent.model")
+
+    def test_tools_defer_heavy_dependencies(self) -> None:
+        profile = import_profile("src_agent.tools")
+        self.assert_not_imported(profile, HEAVY_MODULES)
+        self.assert_within_budget(profile, "src_agent.tools")
+
+    def test_app_defers_heavy_dependencies(self) -> None:
+        profile = import_profile("src_agent.app")
+        self.assert_not_imported(profile, HEAVY_MODULES)
+        self.assert_within_budget(profile, "src_agent.app")
+
+    def test_graph_imports_only_selected_provider(self) -> None:
+        profile = import_profile("src_agent.graph", GRAPH_ENV)
+        self.assertIn("langchain_deepseek", profile)
+        # langchain_deepseek 基于 langchain_openai 实现，二者会一起加载
+        selected = {"langchain_deepseek", "langchain_openai"}
+        self.assert_not_imported(
+            profile,
+            HEAVY_MODULES + tuple(m for m in PROVIDER_MODULES if m not in selected),
+        )
+        self.assert_within_budget(profile, "src_agent.graph")
+
+
+if __name__ == "__main__":
+    for entry, env in (
+        ("src_agent.model", None),
+        ("src_agent.tools", None),
+        ("src_agent.app", None),
+        ("src_agent.graph", GRAPH_ENV),
+    ):
+        profile = import_profile(entry, env)
+        print(f"{entry}: {profile[entry] / 1000:.0f}ms (预算 {budget_ms(entry)}ms)")
+        top = sorted(
+            ((name, cumulative) for name, cumulative in profile.items() if name != entry),
+            key=lambda item: item[1],
+            reverse=True,
+        )[:10]
+        for name, cumulative in top:
+            print(f"    {cumulative / 1000:8.1f}ms  {name}")
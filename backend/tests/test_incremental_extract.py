@@ -0,0 +1,165 @@
+from __future__ import annotations
+
+import os
+import sqlite3
+import tempfile
+import unittest
+from datetime import datetime
+from decimal import Decimal
+from unittest import mock
+
+import pandas as pd
+from pymysql.converters import escape_item
+
+from src_agent.config.datasource_config import DataSourceConfig, DataSourceRoutingConfig, Endpoint
+from src_agent.config.sandbox_config import SandboxConfig
+from src_agent.config.sql_guard_config import SQLGuardConfig
+from src_agent.incremental_extract import (
+    ExtractState,
+    IncrementalExtractError,
+    incremental_sql,
+    merge_delta,
+)
+from src_agent.sandbox_snapshot import SnapshotStore
+
+
+class EscapingConnection(sqlite3.Connection):
+    """SQLite 替身，提供 pymysql 的 Connection.escape"""
+
+    def escape(self, value):
+        return escape_item(value, "utf8")
+
+
+class IncrementalStateTests(unittest.TestCase):
+    def test_watermark_roundtrip_through_snapshot(self) -> None:
+        df = pd.DataFrame(
+            {"id": [1, 2], "updated_at": [datetime(2024, 5, 1, 8), datetime(2024, 5, 2, 9, 30)]}
+        )
+        state = ExtractState("orders", "SELECT * FROM orders", "default", "updated_at", ["id"])
+        state.advance(df)
+        state.attach(df)
+        self.assertEqual(state.watermark_value, datetime(2024, 5, 2, 9, 30))
+
+        with tempfile.TemporaryDirectory() as tmp:
+            store = SnapshotStore(tmp, max_variable_bytes=1 << 20, max_age_seconds=3600)
+            store.save("t1", {"orders": df})
+            restored = ExtractState.from_frame(SnapshotStore(tmp, 1 << 20, 3600).load("t1")["orders"])
+        self.assertTrue(restored.matches(state))
+        self.assertEqual(restored.watermark_value, datetime(2024, 5, 2, 9, 30))
+        self.assertEqual(
+            incremental_sql(restored, lambda value: escape_item(value, "utf8")),
+            "SELECT * FROM (\nSELECT * FROM orders\n) AS _incremental\n"
+            "WHERE `updated_at` >= '2024-05-02 09:30:00'",
+        )
+
+        # 水位只增不减；Decimal 保留精度
+        state.advance(df.iloc[:1])
+        self.assertEqual(state.watermark_value, datetime(2024, 5, 2, 9, 30))
+        decimal_state = ExtractState("t", "SELECT 1", "default", "seq")
+        decimal_state.advance(pd.DataFrame({"seq": [Decimal("10.50"), Decimal("2")]}))
+        self.assertEqual(decimal_state.watermark_value, Decimal("10.50"))
+        with self.assertRaises(IncrementalExtractError):
+            decimal_state.advance(pd.DataFrame({"other": [1]}))
+
+    def test_merge_replaces_changed_rows(self) -> None:
+        existing = pd.DataFrame({"id": [1, 2, 3], "status": ["new", "new", "new"]})
+        delta = pd.DataFrame({"id": [2, 4, 4], "status": ["paid", "new", "paid"]})
+        merged, replaced = merge_delta(existing, delta, ["id"])
+        self.assertEqual(replaced, 1)
+        self.assertEqual(merged.to_dict("list"), {"id": [1, 3, 2, 4], "status": ["new", "new", "paid", "paid"]})
+
+        appended, replaced = merge_delta(existing, delta.iloc[:1], [])
+        self.assertEqual((len(appended), replaced), (4, 0))
+
+
+class IncrementalExtractToolTests(unittest.TestCase):
+    def setUp(self) -> None:
+        from src_agent import datasources, sandbox_sessions, sql_guard
+        from src_agent.datasources import DataSourceRouter
+        from src_agent.sandbox_sessions import SandboxSessionManager
+
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.db = sqlite3.connect(":memory:", factory=EscapingConnection)
+        self.addCleanup(self.db.close)
+        self.db.execute("CREATE TABLE events (id INTEGER PRIMARY KEY, status TEXT, updated_at TEXT)")
+        self.db.executemany(
+            "INSERT INTO events VALUES (?, ?, ?)",
+            [(1, "new", "2024-05-01 08:00:00"), (2, "new", "2024-05-01 09:00:00")],
+        )
+        # 连接池归还连接前会回滚，测试数据需要提交
+        self.db.commit()
+        self.executed: list[str] = []
+        # 只记录查询语句（连接归还时的 ROLLBACK 不计入）
+        self.db.set_trace_callback(lambda sql: sql.startswith("ROLLBACK") or self.executed.append(sql))
+
+        sources = {"default": DataSourceConfig(name="default", primary=Endpoint("db"))}
+        router = DataSourceRouter(DataSourceRoutingConfig(sources=sources), connector=lambda *args: self.db)
+        self.manager = SandboxSessionManager(
+            SandboxConfig(sandbox_workspace=os.path.join(tmp.name, "workspace"), snapshot_enabled=False)
+        )
+        guard = sql_guard.SQLGuard(SQLGuardConfig(enabled=False, execution_timeout_seconds=0))
+        for patch in (
+            mock.patch.object(datasources, "_router", router),
+            mock.patch.object(sql_guard, "_sql_guard", guard),
+            mock.patch.object(sandbox_sessions, "_session_manager", self.manager),
+        ):
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def _extract(self, **overrides) -> str:
+        from src_agent.tools import extract_data
+
+        args = {
+            "sql_query": "SELECT id, status, updated_at FROM events",
+            "df_name": "events_df",
+            "incremental_column": "updated_at",
+            "key_columns": ["id"],
+        }
+        args.update(overrides)
+        return extract_data.invoke(args)
+
+    def _frame(self) -> pd.DataFrame:
+        return self.manager.get().get_global("events_df")
+
+    def test_incremental_refresh_upserts_delta(self) -> None:
+        first = self._extract()
+        self.assertIn("已记录 updated_at 的水位 2024-05-01 09:00:00", first)
+
+        self.db.execute("UPDATE events SET status = 'paid', updated_at = '2024-05-02 10:00:00' WHERE id = 1")
+        self.db.execute("INSERT INTO events VALUES (3, 'new', '2024-05-02 11:00:00')")
+        self.db.commit()
+        self.executed.clear()
+        second = self._extract()
+
+        self.assertIn("WHERE `updated_at` >= '2024-05-01 09:00:00'", self.executed[-1])
+        # 水位边界上的行 (id=2) 被重新读取并去重
+        self.assertIn("提取 3 行（新增 1，更新 2），当前共 3 行", second)
+        self.assertIn("水位 2024-05-01 09:00:00 → 2024-05-02 11:00:00", second)
+        frame = self._frame().sort_values("id")
+        self.assertEqual(frame["status"].tolist(), ["paid", "new", "new"])
+
+        third = self._extract()
+        self.assertIn("提取 1 行（新增 0，更新 1），当前共 3 行", third)
+
+    def test_append_only_and_parameter_changes(self) -> None:
+        self._extract(incremental_column="id", key_columns=None)
+        self.db.execute("INSERT INTO events VALUES (3, 'new', '2024-05-02 11:00:00')")
+        self.db.commit()
+        output = self._extract(incremental_column="id", key_columns=None)
+        self.assertIn("提取 1 行（新增 1，更新 0），当前共 3 行", output)
+
+        changed = self._extract(sql_query="SELECT id, status, updated_at FROM events WHERE status = 'new'")
+        self.assertIn("参数与上次增量提取不同，已重新全量提取", changed)
+
+        missing = self._extract(incremental_column="created_at", df_name="other_df")
+        self.assertIn("查询结果中没有增量列 created_at", missing)
+
+        # 不指定增量列时保持原来的全量提取
+        full = self._extract(incremental_column=None, key_columns=None)
+        self.assertEqual(full, "成功将表格 events_df 保存到当前Python环境中。")
+        self.assertNotIn("incremental_extract", self._frame().attrs)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,122 @@
+from __future__ import annotations
+
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from fastapi.testclient import TestClient
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+
+from src_agent import instrumentation
+from src_agent.config.instrumentation_config import InstrumentationConfig
+from src_agent.instrumentation import (
+    MetricsRegistry,
+    get_metrics_registry,
+    instrument,
+    instrumented,
+    record_cache,
+)
+
+
+class InstrumentTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.registry = MetricsRegistry((0.1, 1.0))
+        self.exporter = InMemorySpanExporter()
+        provider = TracerProvider()
+        provider.add_span_processor(SimpleSpanProcessor(self.exporter))
+        patches = [
+            mock.patch.object(instrumentation, "_registry", self.registry),
+            mock.patch.object(instrumentation, "_config", InstrumentationConfig()),
+            mock.patch.object(instrumentation, "_tracer", provider.get_tracer("test")),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def test_records_metrics_and_nested_spans(self) -> None:
+        @instrumented("tool.demo")
+        def demo() -> str:
+            with instrument("mysql.query") as measurement:
+                sum(range(10_000))
+                measurement.rows = 3
+            record_cache("demo_cache", True)
+            return "结果"
+
+        self.assertEqual(demo(), "结果")
+
+        self.assertEqual(self.registry.duration_count("tool.demo"), 1)
+        self.assertEqual(self.registry.counter("rows", "mysql.query"), 3)
+        self.assertEqual(self.registry.counter("bytes", "tool.demo"), len("结果".encode()))
+        self.assertEqual(self.registry.counter("cache", "demo_cache", "hit"), 1)
+        self.assertGreater(self.registry.counter("cpu_seconds", "mysql.query"), 0)
+
+        spans = {span.name: span for span in self.exporter.get_finished_spans()}
+        self.assertEqual(spans["mysql.query"].parent.span_id, spans["tool.demo"].context.span_id)
+        self.assertEqual(spans["mysql.query"].attributes["agent.rows"], 3)
+        self.assertTrue(spans["tool.demo"].attributes["agent.cache_hit"])
+
+    def test_errors_are_labelled(self) -> None:
+        with self.assertRaises(ValueError):
+            with instrument("sandbox.execute"):
+                raise ValueError("boom")
+        self.assertEqual(self.registry.duration_count("sandbox.execute", "error"), 1)
+        (span,) = self.exporter.get_finished_spans()
+        self.assertFalse(span.status.is_ok)
+
+    def test_disabled_config_skips_recording(self) -> None:
+        with mock.patch.object(
+            instrumentation, "_config", InstrumentationConfig(enabled=False)
+        ):
+            with instrument("tool.demo"):
+                pass
+        self.assertEqual(self.registry.duration_count("tool.demo"), 0)
+        self.assertEqual(self.exporter.get_finished_spans(), ())
+
+    def test_prometheus_rendering(self) -> None:
+        with instrument("tool.demo") as measurement:
+            measurement.bytes = 10
+        text = self.registry.render()
+        self.assertIn('agent_operation_duration_seconds_bucket{operation="tool.demo",status="ok",le="0.1"} 1', text)
+        self.assertIn('agent_operation_duration_seconds_count{operation="tool.demo",status="ok"} 1', text)
+        self.assertIn('agent_operation_bytes_total{operation="tool.demo"} 10', text)
+        self.assertIn("agent_process_peak_rss_bytes ", text)
+
+
+class WiringTests(unittest.TestCase):
+    def setUp(self) -> None:
+        get_metrics_registry().reset()
+
+    def test_sandbox_execute_and_tools_are_instrumented(self) -> None:
+        from src_agent.config.sandbox_config import SandboxConfig
+        from src_agent.sandbox import PythonSandbox
+        from src_agent.tools import read_artifact
+
+        with tempfile.TemporaryDirectory() as tmp:
+            sandbox = PythonSandbox(SandboxConfig(sandbox_workspace=os.path.join(tmp, "ws")))
+            sandbox.execute("x = 1")
+            # 计时覆盖代码执行本身，用户代码的异常按 error 记录
+            with self.assertRaises(Exception):
+                sandbox.execute("raise ValueError('boom')")
+        read_artifact.invoke({"artifact_id": "art_missing"})
+
+        registry = get_metrics_registry()
+        self.assertEqual(registry.duration_count("sandbox.execute"), 1)
+        self.assertEqual(registry.duration_count("sandbox.execute", "error"), 1)
+        self.assertEqual(registry.duration_count("tool.read_artifact"), 1)
+
+    def test_metrics_route(self) -> None:
+        from src_agent.app import app
+
+        with instrument("tool.demo"):
+            pass
+        response = TestClient(app).get("/metrics")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.headers["content-type"].startswith("text/plain; version=0.0.4"))
+        self.assertIn('operation="tool.demo"', response.text)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,105 @@
+from __future__ import annotations
+
+import asyncio
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from langchain.agents import create_agent
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+from langgraph.checkpoint.memory import InMemorySaver
+
+from src_agent.config.sandbox_config import SandboxConfig
+from src_agent.fake_model import SCRIPTS, ScriptedChatModel
+from src_agent.loadtest import percentile, run_load_test
+
+
+class ScriptedChatModelTests(unittest.TestCase):
+    def test_replays_script_per_turn(self) -> None:
+        model = ScriptedChatModel(script=SCRIPTS["analysis"])
+        history = [HumanMessage("第一轮")]
+        first = model.invoke(history)
+        self.assertEqual(first.tool_calls[0]["name"], "python_inter")
+
+        history += [first, ToolMessage("ok", tool_call_id=first.tool_calls[0]["id"])]
+        second = model.invoke(history)
+        history += [second, ToolMessage("ok", tool_call_id=second.tool_calls[0]["id"])]
+        final = model.invoke(history)
+        self.assertEqual(final.tool_calls, [])
+        self.assertEqual(final.content, SCRIPTS["analysis"][-1])
+
+        # 新一轮用户消息从脚本开头重新回放，工具调用 ID 不与上一轮重复
+        restarted = model.invoke(history + [final, HumanMessage("第二轮")])
+        self.assertEqual(restarted.tool_calls[0]["name"], "python_inter")
+        self.assertNotEqual(restarted.tool_calls[0]["id"], first.tool_calls[0]["id"])
+
+    def test_model_factory_provider(self) -> None:
+        from src_agent import model as model_module
+
+        with mock.patch.dict(os.environ, {"FAKE_MODEL_SCRIPT": "plot"}), \
+                mock.patch.object(model_module, "_model_registry", {}):
+            fake = model_module.get_model("fake")
+            self.assertIsInstance(fake, ScriptedChatModel)
+            self.assertEqual(fake.script, SCRIPTS["plot"])
+            # 摘要模型沿用其他提供方的模型名时回退到同一脚本
+            self.assertEqual(model_module.get_model("fake", "qwen-turbo").script, SCRIPTS["plot"])
+
+    def test_unknown_script(self) -> None:
+        with self.assertRaises(ValueError):
+            ScriptedChatModel.from_env("unknown")
+
+
+class LoadTestTests(unittest.TestCase):
+    def test_percentile(self) -> None:
+        values = [float(v) for v in range(1, 101)]
+        self.assertEqual(percentile(values, 50), 50.0)
+        self.assertEqual(percentile(values, 95), 95.0)
+        self.assertEqual(percentile(values, 99), 99.0)
+        self.assertEqual(percentile([3.0], 99), 3.0)
+        self.assertEqual(percentile([], 50), 0.0)
+
+    def test_concurrent_threads_drive_real_tools(self) -> None:
+        from src_agent import sandbox_sessions
+        from src_agent.image_lifecycle import get_image_manager
+        from src_agent.sandbox_sessions import SandboxSessionManager
+        from src_agent.tools import fig_inter, python_inter
+
+        with tempfile.TemporaryDirectory() as tmp:
+            manager = SandboxSessionManager(
+                SandboxConfig(
+                    sandbox_workspace=os.path.join(tmp, "workspace"),
+                    snapshot_enabled=False,
+                )
+            )
+            graph = create_agent(
+                model=ScriptedChatModel(script=SCRIPTS["plot"]),
+                tools=[python_inter, fig_inter],
+                checkpointer=InMemorySaver(),
+            )
+            images_dir = os.path.join(tmp, "images")
+            with mock.patch.object(sandbox_sessions, "_session_manager", manager), \
+                    mock.patch.object(get_image_manager().config, "images_dir", images_dir):
+                report = asyncio.run(
+                    run_load_test(graph, threads=3, concurrency=2, turns=2, script="plot")
+                )
+                thread_id = next(iter(manager._sessions))
+                state = asyncio.run(graph.aget_state({"configurable": {"thread_id": thread_id}}))
+
+            self.assertEqual(report.failed_turns, 0, report.errors)
+            self.assertEqual(report.completed_turns, 6)
+            self.assertEqual(report.tool_calls, 12)
+            self.assertEqual(report.tool_errors, 0)
+            self.assertEqual(len(os.listdir(images_dir)), 6)
+            self.assertGreater(report.throughput, 0)
+            self.assertIn("p95", report.to_dict()["latency_seconds"])
+            # 每个线程使用独立的沙箱会话，并由检查点保存两轮完整对话
+            self.assertEqual(len(manager._sessions), 3)
+            messages = state.values["messages"]
+            self.assertEqual(sum(isinstance(m, HumanMessage) for m in messages), 2)
+            self.assertIsInstance(messages[-1], AIMessage)
+            self.assertEqual(messages[-1].content, SCRIPTS["plot"][-1])
+
+
+if __name__ == "__main__":
+    unittest.main()
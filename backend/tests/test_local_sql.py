@@ -0,0 +1,160 @@
+from __future__ import annotations
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import pandas as pd
+
+import src_agent.data_loader as data_loader
+from src_agent.config.local_sql_config import LocalSQLConfig
+from src_agent.config.sandbox_config import SandboxConfig
+from src_agent.data_loader import DatasetConfig
+from src_agent.local_sql import LocalSQLEngine, LocalSQLError, table_name
+
+TELCO_CSV = Path(__file__).resolve().parents[1] / "src_agent" / "data" / "telco_data.csv"
+
+
+class LocalSQLEngineTests(unittest.TestCase):
+    def setUp(self) -> None:
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.data_dir = Path(tmp.name) / "data"
+        self.data_dir.mkdir()
+        shutil.copy(TELCO_CSV, self.data_dir / "telco_data.csv")
+        pd.DataFrame({"id": [1, 2], "城市": ["北京", "上海"]}).to_parquet(
+            self.data_dir / "2024 Cities.parquet"
+        )
+        catalog = {
+            "telco": DatasetConfig(
+                filename="telco_data.csv",
+                numeric_columns=("TotalCharges",),
+                drop_columns=("customerID",),
+                column_mapping={"Churn": "churned"},
+            ),
+            # 自定义 pandas 读取参数，需要物化
+            "telco_head": DatasetConfig(filename="telco_data.csv", reader_kwargs={"nrows": 10}),
+        }
+        patches = [
+            mock.patch.object(data_loader, "DATA_DIR", self.data_dir),
+            mock.patch.dict(data_loader.DATASET_CATALOG, catalog, clear=True),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+        self.engine = LocalSQLEngine(
+            LocalSQLConfig(
+                data_dir=str(self.data_dir),
+                temp_dir=os.path.join(tmp.name, "tmp"),
+                max_result_rows=100,
+            )
+        )
+        self.addCleanup(self.engine.close)
+
+    def test_tables_from_catalog_and_files(self) -> None:
+        tables = {table.name: table for table in self.engine.tables()}
+        # telco_data.csv 已被数据集覆盖，不再重复注册
+        self.assertEqual(set(tables), {"telco", "telco_head", "t_2024_cities"})
+        self.assertFalse(tables["telco"].materialized)
+        self.assertTrue(tables["telco_head"].materialized)
+        self.assertEqual(table_name("Sales 2024-Q1"), "sales_2024_q1")
+
+    def test_catalog_column_config_applied_in_view(self) -> None:
+        result = self.engine.query("DESCRIBE telco")
+        columns = {row[0]: row[1] for row in result.rows}
+        self.assertNotIn("customerID", columns)
+        self.assertIn("churned", columns)
+        self.assertEqual(columns["TotalCharges"], "DOUBLE")
+
+        expected = pd.read_csv(TELCO_CSV)
+        total = pd.to_numeric(expected["TotalCharges"], errors="coerce").sum()
+        result = self.engine.query("SELECT sum(TotalCharges), count(*) FROM telco")
+        self.assertAlmostEqual(result.rows[0][0], total, places=2)
+        self.assertEqual(result.rows[0][1], len(expected))
+
+    def test_files_and_materialized_datasets(self) -> None:
+        result = self.engine.query('SELECT "城市" FROM t_2024_cities ORDER BY id')
+        self.assertEqual(result.rows, [("北京",), ("上海",)])
+        self.assertEqual(self.engine.query("SELECT count(*) FROM telco_head").rows, [(10,)])
+
+    def test_refreshes_when_files_change(self) -> None:
+        self.engine.tables()
+        (self.data_dir / "new_table.csv").write_text("a,b\n1,x\n2,y\n")
+        self.assertEqual(self.engine.query("SELECT sum(a) FROM new_table").rows, [(3,)])
+        (self.data_dir / "new_table.csv").unlink()
+        with self.assertRaises(LocalSQLError):
+            self.engine.query("SELECT * FROM new_table")
+
+    def test_truncates_and_returns_dataframe(self) -> None:
+        result = self.engine.query("SELECT * FROM telco")
+        self.assertEqual(len(result.rows), 100)
+        self.assertTrue(result.truncated)
+        self.assertEqual(result.description[0][0], "gender")
+
+        df = self.engine.query_df("SELECT * FROM telco WHERE tenure > 12")
+        self.assertGreater(len(df), 100)
+        self.assertIn("churned", df.columns)
+
+    def test_read_only_and_file_access_restricted(self) -> None:
+        outside = tempfile.NamedTemporaryFile("w", suffix=".csv", delete=False)
+        outside.write("secret\n1\n")
+        outside.close()
+        self.addCleanup(os.unlink, outside.name)
+
+        for sql in (
+            "CREATE TABLE t AS SELECT 1",
+            f"COPY telco TO '{self.data_dir / 'copy.csv'}'",
+            "SELECT 1; SELECT 2",
+            "SET enable_external_access = true",
+            f"SELECT * FROM read_csv_auto('{outside.name}')",
+        ):
+            with self.subTest(sql=sql), self.assertRaises(LocalSQLError):
+                self.engine.query(sql)
+        self.assertFalse((self.data_dir / "copy.csv").exists())
+
+
+class LocalSQLToolTests(unittest.TestCase):
+    def test_tool_returns_rows_and_saves_dataframe(self) -> None:
+        from src_agent import local_sql, sandbox_sessions
+        from src_agent.sandbox_sessions import SandboxSessionManager
+        from src_agent.tools import local_sql as local_sql_tool
+
+        with tempfile.TemporaryDirectory() as tmp:
+            data_dir = Path(tmp) / "data"
+            data_dir.mkdir()
+            pd.DataFrame({"region": ["华东", "华南", "华东"], "amount": [1.5, 2.0, 3.0]}).to_csv(
+                data_dir / "sales.csv", index=False
+            )
+            engine = LocalSQLEngine(
+                LocalSQLConfig(data_dir=str(data_dir), temp_dir=os.path.join(tmp, "tmp"))
+            )
+            manager = SandboxSessionManager(
+                SandboxConfig(sandbox_workspace=os.path.join(tmp, "workspace"), snapshot_enabled=False)
+            )
+            with mock.patch.dict(data_loader.DATASET_CATALOG, {}, clear=True), \
+                    mock.patch.object(local_sql, "_local_sql_engine", engine), \
+                    mock.patch.object(sandbox_sessions, "_session_manager", manager):
+                output = local_sql_tool.invoke(
+                    {"sql_query": "SELECT region, sum(amount) AS total FROM sales GROUP BY 1 ORDER BY 1"}
+                )
+                saved = local_sql_tool.invoke(
+                    {"sql_query": "SELECT * FROM sales WHERE amount > 1.8", "df_name": "big_sales"}
+                )
+                missing = local_sql_tool.invoke({"sql_query": "SELECT * FROM nope"})
+            engine.close()
+
+            self.assertEqual(
+                json.loads(output),
+                {"columns": ["region", "total"], "rows": [["华东", 4.5], ["华南", 2.0]]},
+            )
+            self.assertIn("2 行 × 2 列", saved)
+            self.assertEqual(len(manager.get().get_global("big_sales")), 2)
+            self.assertIn("可用的表: sales", missing)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,57 @@
+from __future__ import annotations
+
+import os
+import unittest
+from unittest import mock
+
+from src_agent import model as model_module
+from src_agent.model import ModelFactory, get_http_clients, get_model
+
+DEEPSEEK_ENV = {
+    "DEEPSEEK_API_KEY": "sk-registry-test",
+    "DEEPSEEK_MODEL": "deepseek-chat",
+}
+
+
+class ModelRegistryTests(unittest.TestCase):
+    def setUp(self) -> None:
+        patcher = mock.patch.dict(os.environ, DEEPSEEK_ENV)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        model_module._model_registry.clear()
+        model_module._http_clients.clear()
+        self.addCleanup(model_module._model_registry.clear)
+        self.addCleanup(model_module._http_clients.clear)
+
+    def test_reuses_model_instances(self) -> None:
+        first = get_model("deepseek")
+        self.assertIs(get_model("deepseek"), first)
+        # 显式传入与默认模型相同的名称时也命中同一实例
+        self.assertIs(get_model("deepseek", "deepseek-chat"), first)
+
+    def test_main_and_summary_models_share_connection_pool(self) -> None:
+        factory = ModelFactory("deepseek")
+        summary = factory.get_summary_model("deepseek-reasoner")
+
+        self.assertIsNot(summary, factory.model)
+        http_client, http_async_client = get_http_clients("deepseek")
+        self.assertIs(factory.model.http_client, http_client)
+        self.assertIs(summary.http_client, http_client)
+        self.assertIs(summary.http_async_client, http_async_client)
+        self.assertIs(factory.model.root_client._client, summary.root_client._client)
+
+    def test_second_factory_does_not_rebuild_models(self) -> None:
+        with mock.patch.object(
+            model_module, "_build_model", wraps=model_module._build_model
+        ) as build:
+            ModelFactory("deepseek")
+            ModelFactory("deepseek").get_summary_model("deepseek-chat")
+        build.assert_called_once()
+
+    def test_invalid_model_type_raises(self) -> None:
+        with self.assertRaises(ValueError):
+            ModelFactory("unknown")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,106 @@
+from __future__ import annotations
+
+import unittest
+
+import matplotlib
+import numpy as np
+from matplotlib.collections import PathCollection
+
+from src_agent.config.render_config import RenderConfig
+from src_agent.plot_downsample import downsample_figure, format_reductions, lttb_indices
+
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt  # noqa: E402
+
+
+class LttbTests(unittest.TestCase):
+    def test_keeps_endpoints_and_peaks(self) -> None:
+        x = np.arange(10_000, dtype=float)
+        y = np.zeros_like(x)
+        y[5_000] = 100.0
+        indices = lttb_indices(x, y, 100)
+
+        self.assertEqual(len(indices), 100)
+        self.assertEqual(indices[0], 0)
+        self.assertEqual(indices[-1], 9_999)
+        self.assertIn(5_000, indices)
+        self.assertTrue(np.all(np.diff(indices) > 0))
+
+    def test_returns_all_points_below_threshold(self) -> None:
+        x = np.arange(10, dtype=float)
+        self.assertEqual(len(lttb_indices(x, x, 100)), 10)
+
+
+class DownsampleFigureTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.config = RenderConfig(max_line_points=500, max_scatter_points=1_000)
+
+    def tearDown(self) -> None:
+        plt.close("all")
+
+    def test_reduces_large_line(self) -> None:
+        fig, ax = plt.subplots()
+        x = np.linspace(0, 100, 50_000)
+        ax.plot(x, np.sin(x), label="sin")
+
+        reductions = downsample_figure(fig, self.config)
+
+        self.assertEqual(len(reductions), 1)
+        self.assertEqual(reductions[0].method, "lttb")
+        self.assertEqual(len(ax.get_lines()[0].get_xdata()), 500)
+        self.assertIn("'sin'", format_reductions(reductions))
+
+    def test_keeps_nan_gaps_and_skips_all_nan_lines(self) -> None:
+        fig, ax = plt.subplots()
+        x = np.linspace(0, 100, 50_000)
+        y = np.sin(x)
+        y[20_000:30_000] = np.nan
+        ax.plot(x, y)
+        ax.plot(x, np.full_like(x, np.nan))
+
+        reductions = downsample_figure(fig, self.config)
+
+        self.assertEqual(len(reductions), 1)
+        gapped, empty = ax.get_lines()
+        ydata = np.asarray(gapped.get_ydata())
+        self.assertLessEqual(len(ydata), 500)
+        # 两段之间只有一个 NaN 断点，段内没有跨越缺口的连线
+        self.assertEqual(int(np.isnan(ydata).sum()), 1)
+        gap = int(np.flatnonzero(np.isnan(ydata))[0])
+        xdata = np.asarray(gapped.get_xdata())
+        self.assertLess(xdata[gap - 1], x[20_000])
+        self.assertGreater(xdata[gap + 1], x[29_999])
+        self.assertEqual(len(empty.get_xdata()), 50_000)
+
+    def test_aggregates_uniform_scatter_into_hexbin(self) -> None:
+        fig, ax = plt.subplots()
+        rng = np.random.default_rng(1)
+        ax.scatter(rng.normal(size=20_000), rng.normal(size=20_000))
+
+        reductions = downsample_figure(fig, self.config)
+
+        self.assertEqual(reductions[0].method, "hexbin")
+        self.assertEqual(len(ax.collections), 1)
+        self.assertNotIsInstance(ax.collections[0], PathCollection)
+
+    def test_samples_colored_scatter(self) -> None:
+        fig, ax = plt.subplots()
+        rng = np.random.default_rng(2)
+        values = rng.uniform(size=5_000)
+        ax.scatter(rng.normal(size=5_000), rng.normal(size=5_000), c=values)
+
+        reductions = downsample_figure(fig, self.config)
+
+        self.assertEqual(reductions[0].method, "sample")
+        self.assertEqual(len(ax.collections[0].get_offsets()), 1_000)
+        self.assertEqual(len(ax.collections[0].get_array()), 1_000)
+
+    def test_leaves_small_figures_untouched(self) -> None:
+        fig, ax = plt.subplots()
+        ax.plot([1, 2, 3], [4, 5, 6])
+        ax.scatter([1, 2], [3, 4])
+        self.assertEqual(downsample_figure(fig, self.config), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,71 @@
+from __future__ import annotations
+
+import os
+import tempfile
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from src_agent.rendering import FigureRegistry, ensure_agg_backend, render_figure
+from src_agent.sandbox import PythonSandbox
+
+ensure_agg_backend()
+import matplotlib  # noqa: E402
+import matplotlib.pyplot as plt  # noqa: E402
+from matplotlib.figure import Figure  # noqa: E402
+
+PLOT_CODE = """
+fig, ax = plt.subplots(figsize=(4, 3))
+ax.plot(range(100), [i * i for i in range(100)])
+fig.tight_layout()
+"""
+
+
+class FigureRegistryTests(unittest.TestCase):
+    def test_close_all_only_closes_own_figures(self) -> None:
+        foreign = plt.figure()
+        registry = FigureRegistry()
+        with registry.capture():
+            plt.figure()
+            plt.figure()
+        self.assertEqual(len(registry), 2)
+
+        registry.close_all()
+
+        self.assertEqual(plt.get_fignums(), [foreign.number])
+        plt.close(foreign)
+
+    def test_renders_object_oriented_figure(self) -> None:
+        fig = Figure(figsize=(3, 2))
+        fig.subplots().bar(["a", "b"], [1, 2])
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "fig.png")
+            render_figure(fig, path, dpi=50)
+            self.assertGreater(os.path.getsize(path), 0)
+        self.assertEqual(plt.get_fignums(), [])
+
+
+class ParallelRenderingTests(unittest.TestCase):
+    def test_concurrent_sessions_do_not_close_each_other(self) -> None:
+        self.assertEqual(matplotlib.get_backend().lower(), "agg")
+
+        def render(index: int) -> int:
+            sandbox = PythonSandbox()
+            with sandbox.figures.capture():
+                sandbox.execute(PLOT_CODE)
+            fig = sandbox.get_global("fig")
+            with tempfile.TemporaryDirectory() as tmp:
+                path = os.path.join(tmp, f"fig_{index}.png")
+                render_figure(fig, path, dpi=50)
+                size = os.path.getsize(path)
+            sandbox.figures.close_all()
+            return size
+
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            sizes = list(pool.map(render, range(8)))
+
+        self.assertTrue(all(size > 0 for size in sizes))
+        self.assertEqual(plt.get_fignums(), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,163 @@
+from __future__ import annotations
+
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+
+from src_agent.config.sandbox_config import SandboxConfig
+from src_agent.sandbox import PythonSandbox
+from src_agent.sandbox_memory import VariableUsage, deep_sizeof, select_evictions
+
+MB = 1024 * 1024
+
+
+class DeepSizeofTests(unittest.TestCase):
+    def test_dataframe_counts_object_columns(self) -> None:
+        df = pd.DataFrame({"text": ["x" * 1000] * 100}, dtype=object)
+        self.assertEqual(deep_sizeof(df), int(df.memory_usage(index=True, deep=True).sum()))
+        self.assertGreater(deep_sizeof(df), 100 * 1000)
+
+    def test_numpy_and_containers(self) -> None:
+        arr = np.zeros(1000)
+        self.assertEqual(deep_sizeof(arr), arr.nbytes)
+        nested = {"a": arr, "b": [arr, arr]}
+        self.assertGreater(deep_sizeof(nested), arr.nbytes)
+        self.assertLess(deep_sizeof(nested), 2 * arr.nbytes)  # 同一对象只统计一次
+
+
+    def test_shared_seen_counts_aliases_once(self) -> None:
+        arr = np.zeros(10_000)
+        seen: set[int] = set()
+        self.assertEqual(deep_sizeof(arr, seen), arr.nbytes)
+        self.assertEqual(deep_sizeof(arr, seen), 0)
+        self.assertLess(deep_sizeof([arr, arr], seen), arr.nbytes)
+
+
+class SelectEvictionsTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.variables = [
+            VariableUsage("old_small", "list", 2 * MB, last_used=1),
+            VariableUsage("big", "DataFrame", 6 * MB, last_used=3),
+            VariableUsage("recent", "DataFrame", 3 * MB, last_used=5),
+        ]
+
+    def test_lru_evicts_least_recently_used_first(self) -> None:
+        evicted = select_evictions(self.variables, 5 * MB, "lru")
+        self.assertEqual([v.name for v in evicted], ["old_small", "big"])
+
+    def test_largest_evicts_biggest_first(self) -> None:
+        evicted = select_evictions(self.variables, 5 * MB, "largest")
+        self.assertEqual([v.name for v in evicted], ["big"])
+
+    def test_protected_and_none_policy(self) -> None:
+        evicted = select_evictions(self.variables, 5 * MB, "largest", protected={"big"})
+        self.assertEqual([v.name for v in evicted], ["recent", "old_small"])
+        self.assertEqual(select_evictions(self.variables, 5 * MB, "none"), [])
+
+
+class SandboxBudgetTests(unittest.TestCase):
+    def _sandbox(self, policy: str) -> PythonSandbox:
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        return PythonSandbox(
+            SandboxConfig(
+                sandbox_workspace=os.path.join(tmp.name, "workspace"),
+                memory_budget_mb=3,
+                memory_eviction_policy=policy,
+            )
+        )
+
+    def test_report_lists_user_variables_by_size(self) -> None:
+        sandbox = self._sandbox("lru")
+        sandbox.execute("a = np.zeros(100_000)\nb = 1")
+        report = sandbox.memory_report()
+        self.assertEqual([v.name for v in report.variables], ["a", "b"])
+        self.assertEqual(report.variables[0].size_bytes, 800_000)
+        self.assertIn("a (ndarray)", report.format())
+
+    def test_lru_budget_keeps_variables_from_latest_call(self) -> None:
+        sandbox = self._sandbox("lru")
+        sandbox.execute("first = np.zeros(150_000)")
+        sandbox.execute("second = np.zeros(150_000)")
+        sandbox.execute("third = np.zeros(150_000)")
+        sandbox.execute("first.sum()")  # first 变为最近使用
+        sandbox.consume_changes()  # 模拟已写入快照
+
+        evicted = sandbox.enforce_memory_budget()
+        # 预算 3MB，三个变量共约 3.4MB：释放最久未使用的 second
+        self.assertEqual([v.name for v in evicted], ["second"])
+        self.assertNotIn("second", sandbox.sandbox_globals)
+        self.assertIn("second", sandbox.consume_changes().deleted)
+
+    def test_oversized_current_variable_is_not_evicted(self) -> None:
+        sandbox = self._sandbox("largest")
+        sandbox.execute("huge = np.zeros(500_000)")
+        self.assertEqual(sandbox.enforce_memory_budget(), [])
+        self.assertIn("huge", sandbox.sandbox_globals)
+
+    def test_sizes_are_cached_per_variable_version(self) -> None:
+        sandbox = self._sandbox("lru")
+        sandbox.execute("df = pd.DataFrame({'text': ['x' * 100] * 1000})")
+        with mock.patch("src_agent.sandbox.deep_sizeof", wraps=deep_sizeof) as sizeof:
+            sandbox.memory_report()
+            sandbox.execute("df.head()")
+            sandbox.execute("len(df)")
+            sandbox.memory_report()
+            self.assertEqual(sizeof.call_count, 1)
+
+            # 原地增加列、重新赋值时重新统计
+            sandbox.execute("df['more'] = df['text'] + 'y'")
+            first = sandbox.memory_report().variables[0].size_bytes
+            sandbox.execute("df = df[['text']]")
+            second = sandbox.memory_report().variables[0].size_bytes
+        self.assertEqual(sizeof.call_count, 3)
+        self.assertGreater(first, second)
+
+    def test_aliases_are_attributed_to_first_variable(self) -> None:
+        sandbox = self._sandbox("largest")
+        sandbox.execute("a = np.zeros(150_000)\nb = a\nc = [a, np.ones(10)]")
+        report = sandbox.memory_report()
+        sizes = {v.name: v.size_bytes for v in report.variables}
+        self.assertEqual(sizes["a"], 1_200_000)
+        self.assertEqual(sizes["b"], 0)
+        self.assertLess(sizes["c"], 10_000)
+        self.assertLess(report.total_bytes, 1_300_000)
+
+        # 别名不会让会话看起来超出预算（3MB）
+        self.assertEqual(sandbox.enforce_memory_budget(), [])
+
+        # 删除最先出现的变量后，共享对象计入下一个引用它的变量
+        sandbox.execute("del a")
+        sizes = {v.name: v.size_bytes for v in sandbox.memory_report().variables}
+        self.assertEqual(sizes["b"], 1_200_000)
+        self.assertLess(sizes["c"], 10_000)
+
+    def test_python_inter_reports_success_when_budget_check_fails(self) -> None:
+        from src_agent import sandbox_sessions
+        from src_agent.sandbox_sessions import SandboxSessionManager
+        from src_agent.tools import python_inter
+
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        manager = SandboxSessionManager(
+            SandboxConfig(sandbox_workspace=os.path.join(tmp.name, "workspace"), snapshot_enabled=False)
+        )
+        with mock.patch.object(sandbox_sessions, "_session_manager", manager), \
+                mock.patch.object(PythonSandbox, "enforce_memory_budget", side_effect=RuntimeError("boom")), \
+                self.assertLogs("src_agent.tools", "WARNING"):
+            output = python_inter.invoke({"python_code": "x = 1"})
+        self.assertEqual(output, "{'x': 1}")
+
+    def test_delete_variables_ignores_builtins(self) -> None:
+        sandbox = self._sandbox("lru")
+        sandbox.execute("x = 1")
+        self.assertEqual(sandbox.delete_variables(["x", "pd", "missing"]), ["x"])
+        self.assertIn("pd", sandbox.sandbox_globals)
+
+
+if __name__ == "__main__":
+    unittest.main()
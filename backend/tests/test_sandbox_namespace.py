@@ -0,0 +1,118 @@
+from __future__ import annotations
+
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from src_agent.config.sandbox_config import SandboxConfig
+from src_agent.sandbox import PythonSandbox, SandboxExecutionError
+from src_agent.sandbox_namespace import NamespaceChanges, NamespaceWatch, code_names
+from src_agent.sandbox_sessions import SandboxSessionManager
+
+
+class NamespaceWatchTests(unittest.TestCase):
+    def test_records_created_modified_deleted(self) -> None:
+        namespace = {"a": 1, "b": 2, "unused": []}
+        code = compile("a = a + 1\nc = 3\ndel b\nd = 4\ndel d", "<test>", "exec")
+        watch = NamespaceWatch(namespace, code_names(code))
+        exec(code, namespace)  # noqa: S102
+
+        changes = watch.changes()
+        self.assertEqual(changes.created, {"c"})
+        self.assertEqual(changes.modified, {"a"})
+        self.assertEqual(changes.deleted, {"b"})
+        self.assertEqual(changes.accessed, {"a", "b"})
+
+    def test_code_names_include_nested_functions(self) -> None:
+        code = compile(
+            "def grow():\n    global total\n    total = [x for x in items]\n", "<test>", "exec"
+        )
+        self.assertTrue({"grow", "total", "items"} <= code_names(code))
+
+    def test_merge_delete_then_recreate_is_modification(self) -> None:
+        changes = NamespaceChanges(deleted={"x"})
+        changes.merge(NamespaceChanges(created={"x"}, accessed={"y"}))
+        self.assertEqual(changes.modified, {"x"})
+        self.assertEqual(changes.deleted, set())
+        self.assertEqual(changes.accessed, {"y"})
+
+
+class SandboxExecuteTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self._tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self._tmp.cleanup)
+        self.sandbox = PythonSandbox(
+            SandboxConfig(sandbox_workspace=os.path.join(self._tmp.name, "workspace"))
+        )
+
+    def test_reassignment_is_reported(self) -> None:
+        self.sandbox.execute("df = pd.DataFrame({'a': [1, None, 3]})")
+        result = self.sandbox.execute("df = df.dropna()\nrows = len(df)")
+        self.assertEqual(set(result), {"df", "rows"})
+        self.assertEqual(result["rows"], 2)
+
+    def test_global_writes_inside_functions_are_detected(self) -> None:
+        result = self.sandbox.execute("def load():\n    global cache\n    cache = {'rows': 3}\n\nload()")
+        self.assertEqual(set(result), {"load", "cache"})
+
+    def test_expression_returns_value_without_new_globals(self) -> None:
+        self.sandbox.execute("x = 20")
+        self.assertEqual(self.sandbox.execute("x * 2 + 2"), 42)
+        self.assertNotIn("__sandbox_result__", self.sandbox.sandbox_globals)
+
+    def test_top_level_names_visible_in_functions_and_comprehensions(self) -> None:
+        result = self.sandbox.execute(
+            "factor = 3\n"
+            "def scale(v):\n"
+            "    return v * factor\n"
+            "values = [scale(i) for i in range(3)]"
+        )
+        self.assertEqual(result["values"], [0, 3, 6])
+
+    def test_pending_changes_accumulate_and_reset(self) -> None:
+        self.sandbox.execute("a = 1\nb = 2")
+        self.sandbox.execute("del a")
+        with self.assertRaises(SandboxExecutionError):
+            self.sandbox.execute("c = b\nraise ValueError('boom')")
+
+        changes = self.sandbox.consume_changes()
+        self.assertEqual(changes.created, {"b", "c"})
+        self.assertEqual(changes.deleted, set())
+        self.assertEqual(self.sandbox.consume_changes(), NamespaceChanges())
+
+
+class DirtySnapshotTests(unittest.TestCase):
+    def test_snapshot_fingerprints_only_dirty_variables(self) -> None:
+        from src_agent import sandbox_snapshot
+
+        with tempfile.TemporaryDirectory() as tmp:
+            manager = SandboxSessionManager(
+                SandboxConfig(
+                    snapshot_dir=os.path.join(tmp, "snapshots"),
+                    sandbox_workspace=os.path.join(tmp, "workspace"),
+                )
+            )
+            sandbox = manager.get("t")
+            sandbox.execute("big = list(range(1000))\nsmall = 1\nlog = []")
+            manager.snapshot("t")
+
+            sandbox.execute("log.append('x')\nsmall = 2")
+            with mock.patch.object(
+                sandbox_snapshot, "fingerprint", wraps=sandbox_snapshot.fingerprint
+            ) as spy:
+                result = manager.snapshot("t")
+
+            # big 未被读写，不重新计算指纹
+            self.assertEqual(spy.call_count, 2)
+            self.assertEqual(sorted(result.written), ["log", "small"])
+            self.assertEqual(result.unchanged, [])
+
+            sandbox.execute("del small")
+            result = manager.snapshot("t")
+            self.assertEqual(result.removed, ["small"])
+            self.assertEqual(set(manager.snapshots.load("t")), {"big", "log"})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,91 @@
+from __future__ import annotations
+
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from src_agent.config.artifact_config import ArtifactConfig
+from src_agent.config.sandbox_config import SandboxConfig
+from src_agent.sandbox import PythonSandbox, SandboxExecutionError
+
+SLOW_APPLY = (
+    "df = pd.DataFrame({'a': range(50_000)})\n"
+    "df['b'] = df['a'].apply(lambda v: v * 2)\n"
+)
+
+
+class SandboxProfilingTests(unittest.TestCase):
+    def _sandbox(self, **overrides) -> PythonSandbox:
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        return PythonSandbox(
+            SandboxConfig(sandbox_workspace=os.path.join(tmp.name, "workspace"), **overrides)
+        )
+
+    def test_profile_attributes_time_to_library_calls(self) -> None:
+        sandbox = self._sandbox()
+        sandbox.execute(SLOW_APPLY, profile=True)
+
+        report = sandbox.last_profile
+        self.assertIsNotNone(report)
+        self.assertEqual(report.hotspots[0].function, "Series.apply")
+        self.assertGreater(report.hotspots[0].cumulative_seconds / report.total_seconds, 0.5)
+        summary = report.summary()
+        self.assertIn("在 Series.apply", summary)
+        self.assertIn("向量化", summary)
+        self.assertIn("热点函数", report.format())
+
+    def test_not_profiled_by_default(self) -> None:
+        sandbox = self._sandbox()
+        sandbox.execute("x = 1", profile=True)
+        self.assertIsNotNone(sandbox.last_profile)
+        sandbox.execute("y = 2")
+        self.assertIsNone(sandbox.last_profile)
+
+    def test_sampling_rate(self) -> None:
+        sandbox = self._sandbox(profile_sample_rate=1.0)
+        sandbox.execute("x = 1")
+        self.assertIsNotNone(sandbox.last_profile)
+        sandbox.execute("x = 2", profile=False)
+        self.assertIsNone(sandbox.last_profile)
+
+    def test_failed_execution_keeps_profile(self) -> None:
+        sandbox = self._sandbox()
+        with self.assertRaises(SandboxExecutionError):
+            sandbox.execute("sorted(range(10_000))\nraise ValueError('boom')", profile=True)
+        self.assertIsNotNone(sandbox.last_profile)
+
+    def test_invalid_sample_rate(self) -> None:
+        with self.assertRaises(ValueError):
+            SandboxConfig(profile_sample_rate=1.5).validate()
+
+
+class PythonInterProfileTests(unittest.TestCase):
+    def test_tool_returns_summary_and_artifact(self) -> None:
+        from src_agent import artifact_store, sandbox_sessions
+        from src_agent.artifact_store import ArtifactStore
+        from src_agent.sandbox_sessions import SandboxSessionManager
+        from src_agent.tools import python_inter
+
+        with tempfile.TemporaryDirectory() as tmp:
+            manager = SandboxSessionManager(
+                SandboxConfig(
+                    sandbox_workspace=os.path.join(tmp, "workspace"),
+                    snapshot_enabled=False,
+                )
+            )
+            store = ArtifactStore(ArtifactConfig(artifacts_dir=os.path.join(tmp, "artifacts")))
+            with mock.patch.object(sandbox_sessions, "_session_manager", manager), \
+                    mock.patch.object(artifact_store, "_artifact_store", store):
+                output = python_inter.invoke({"python_code": SLOW_APPLY, "profile": True})
+
+            self.assertIn("性能分析", output)
+            self.assertIn("Series.apply", output)
+            artifact_id = output.split("artifact `")[1].split("`")[0]
+            _, page = store.read(artifact_id, 0, 50, None)
+            self.assertTrue(any("Series.apply" in line for _, line in page))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,302 @@
+from __future__ import annotations
+
+import os
+import pickle
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+
+from src_agent.config.sandbox_config import SandboxConfig
+from src_agent.sandbox_sessions import DEFAULT_SESSION, SandboxSessionManager
+from src_agent.sandbox_snapshot import (
+    SnapshotSecurityError,
+    SnapshotStore,
+    check_pickle,
+    restricted_loads,
+    safe_dumps,
+)
+
+
+class _Exploit:
+    def __reduce__(self):
+        return (os.system, ("echo unsafe",))
+
+
+class _Disguised:
+    """伪装成 pandas 类型的沙箱类，序列化时不应调用其 __reduce__"""
+
+    reduced = False
+
+    def __reduce__(self):
+        type(self).reduced = True
+        return (eval, ("1 + 1",))
+
+
+_Disguised.__module__ = "pandas"
+_Disguised.__qualname__ = "DataFrame"
+
+
+class _GetattrPayload:
+    def __reduce__(self):
+        return (getattr, (pd.DataFrame, "to_pickle"))
+
+
+class _EvalPayload:
+    def __init__(self, expression: str):
+        self.expression = expression
+
+    def __reduce__(self):
+        return (eval, (self.expression,))
+
+
+class SnapshotStoreTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self._tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self._tmp.cleanup)
+        self.store = SnapshotStore(
+            self._tmp.name, max_variable_bytes=10 * 1024 * 1024, max_age_seconds=3600
+        )
+
+    def test_round_trip_supported_types(self) -> None:
+        variables = {
+            "df": pd.DataFrame({"a": range(5), "b": list("abcde")}),
+            "arr": np.arange(10.0),
+            "summary": {"rows": 5, "cols": ["a", "b"]},
+            "mixed": pd.DataFrame({"x": [1, "two", 3.0]}),
+        }
+        result = self.store.save("thread-1", variables)
+        self.assertEqual(sorted(result.written), sorted(variables))
+
+        restored = SnapshotStore(self._tmp.name, 10 * 1024 * 1024, 3600).load("thread-1")
+        pd.testing.assert_frame_equal(restored["df"], variables["df"])
+        np.testing.assert_array_equal(restored["arr"], variables["arr"])
+        self.assertEqual(restored["summary"], variables["summary"])
+        self.assertEqual(restored["mixed"]["x"].tolist(), [1, "two", 3.0])
+
+    def test_skips_unsafe_values(self) -> None:
+        from matplotlib.figure import Figure
+
+        result = self.store.save(
+            "thread-1",
+            {
+                "module": os,
+                "func": len,
+                "fig": Figure(),
+                "nested": {"x": _Exploit()},
+                "evaluated": [{"x": _EvalPayload("1 + 1")}],
+                "disguised": {"df": _Disguised()},
+            },
+        )
+        self.assertEqual(result.written, [])
+        self.assertEqual(
+            set(result.skipped), {"module", "func", "fig", "nested", "evaluated", "disguised"}
+        )
+        self.assertFalse(_Disguised.reduced)
+
+    def test_round_trip_timezones_and_extension_types(self) -> None:
+        from zoneinfo import ZoneInfo
+
+        variables = {
+            "tz": ZoneInfo("Asia/Shanghai"),
+            "stamps": pd.Series(pd.date_range("2024-01-01", periods=3, freq="D", tz="UTC")),
+            "ints": pd.array([1, None, 3], dtype="Int64"),
+            "cats": pd.Categorical(["a", "b", "a"]),
+        }
+        result = self.store.save("t", variables)
+        self.assertEqual(sorted(result.written), sorted(variables))
+
+        restored = SnapshotStore(self._tmp.name, 10 * 1024 * 1024, 3600).load("t")
+        self.assertEqual(restored["tz"], variables["tz"])
+        pd.testing.assert_series_equal(restored["stamps"], variables["stamps"])
+        pd.testing.assert_extension_array_equal(restored["ints"], variables["ints"])
+        pd.testing.assert_extension_array_equal(restored["cats"], variables["cats"])
+
+    def test_incremental_writes(self) -> None:
+        df = pd.DataFrame({"a": range(100)})
+        self.store.save("t", {"df": df, "n": 1})
+
+        result = self.store.save("t", {"df": df, "n": 1})
+        self.assertEqual(result.written, [])
+        self.assertEqual(sorted(result.unchanged), ["df", "n"])
+
+        df.loc[0, "a"] = -1
+        result = self.store.save("t", {"df": df})
+        self.assertEqual(result.written, ["df"])
+        self.assertEqual(result.removed, ["n"])
+        self.assertEqual(set(self.store.load("t")), {"df"})
+
+    def test_restricted_unpickler_rejects_arbitrary_globals(self) -> None:
+        with self.assertRaises(SnapshotSecurityError):
+            restricted_loads(pickle.dumps(_Exploit()))
+        # 只按顶层包判断时会放行的全局对象
+        for payload in (
+            pickle.dumps(_EvalPayload("1 + 1")),
+            pickle.dumps((pd.read_pickle, ("x.pkl",))),
+            pickle.dumps(_GetattrPayload()),
+        ):
+            with self.assertRaises(SnapshotSecurityError):
+                restricted_loads(payload)
+
+    def test_check_pickle_does_not_execute_payload(self) -> None:
+        marker = os.path.join(self._tmp.name, "executed")
+        payload = pickle.dumps(_EvalPayload(f"open({marker!r}, 'w')"))
+        with self.assertRaises(SnapshotSecurityError):
+            check_pickle(payload)
+        self.assertFalse(os.path.exists(marker))
+        check_pickle(safe_dumps({"df": pd.DataFrame({"a": [1, 2]})}))
+
+    def test_tampered_snapshot_is_not_loaded(self) -> None:
+        self.store.save("t", {"values": [1, 2, 3]})
+        directory = self.store.thread_dir("t")
+        pickle_file = next(name for name in os.listdir(directory) if name.endswith(".pkl"))
+        with open(os.path.join(directory, pickle_file), "wb") as f:
+            f.write(pickle.dumps(_Exploit()))
+
+        fresh = SnapshotStore(self._tmp.name, 10 * 1024 * 1024, 3600)
+        self.assertEqual(fresh.load("t"), {})
+
+    def test_oversized_variables_are_skipped(self) -> None:
+        store = SnapshotStore(self._tmp.name, max_variable_bytes=1024, max_age_seconds=3600)
+        result = store.save("t", {"big": np.zeros(10_000)})
+        self.assertIn("big", result.skipped)
+
+    def test_unsafe_thread_ids_are_hashed(self) -> None:
+        directory = self.store.thread_dir("../../etc")
+        self.assertEqual(os.path.dirname(directory), self._tmp.name)
+
+
+class SessionManagerTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self._tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self._tmp.cleanup)
+        self.config = SandboxConfig(
+            snapshot_dir=os.path.join(self._tmp.name, "snapshots"),
+            sandbox_workspace=os.path.join(self._tmp.name, "workspace"),
+            max_sessions=2,
+        )
+
+    def test_threads_have_isolated_namespaces(self) -> None:
+        manager = SandboxSessionManager(self.config)
+        manager.get("a").execute("x = 1")
+        manager.get("b").execute("x = 2")
+        self.assertEqual(manager.get("a").get_global("x"), 1)
+        self.assertEqual(manager.get("b").get_global("x"), 2)
+
+    def test_restores_after_restart(self) -> None:
+        manager = SandboxSessionManager(self.config)
+        manager.get("a").execute("df = pd.DataFrame({'v': [1, 2, 3]})\ntotal = int(df.v.sum())")
+        manager.snapshot("a")
+
+        restarted = SandboxSessionManager(self.config)
+        sandbox = restarted.get("a")
+        self.assertEqual(sandbox.get_global("total"), 6)
+        self.assertEqual(sandbox.get_global("df")["v"].tolist(), [1, 2, 3])
+
+    def test_eviction_snapshots_session(self) -> None:
+        manager = SandboxSessionManager(self.config)
+        manager.get("a").execute("kept = 'value'")
+        manager.get("b")
+        manager.get("c")  # 超出 max_sessions=2，淘汰最久未使用的 a
+
+        self.assertEqual(manager.get("a").get_global("kept"), "value")
+
+    def test_slow_restore_does_not_block_other_threads(self) -> None:
+        manager = SandboxSessionManager(self.config)
+        restoring = threading.Event()
+        release = threading.Event()
+        original_restore = manager._restore
+
+        def slow_restore(thread_id, sandbox):
+            if thread_id == "slow":
+                restoring.set()
+                release.wait(5)
+            original_restore(thread_id, sandbox)
+
+        with mock.patch.object(manager, "_restore", side_effect=slow_restore):
+            worker = threading.Thread(target=manager.get, args=("slow",))
+            worker.start()
+            self.assertTrue(restoring.wait(5))
+            try:
+                manager.get("fast").execute("x = 1")
+                self.assertEqual(manager.get("fast").get_global("x"), 1)
+            finally:
+                release.set()
+                worker.join(5)
+        self.assertIn("slow", manager._sessions)
+
+    def test_eviction_snapshot_is_written_outside_global_lock(self) -> None:
+        manager = SandboxSessionManager(self.config)
+        manager.get("a").execute("kept = 'value'")
+        manager.get("b")
+        original_save = manager.snapshots.save
+        lock_free = []
+
+        def save(*args, **kwargs):
+            def try_lock():
+                acquired = manager._lock.acquire(timeout=1)
+                lock_free.append(acquired)
+                if acquired:
+                    manager._lock.release()
+
+            # 写入淘汰快照时，其他线程可以获取全局锁
+            acquired = threading.Thread(target=try_lock)
+            acquired.start()
+            acquired.join()
+            return original_save(*args, **kwargs)
+
+        with mock.patch.object(manager.snapshots, "save", side_effect=save):
+            manager.get("c")
+        self.assertEqual(lock_free, [True])
+        self.assertEqual(manager.get("a").get_global("kept"), "value")
+
+    def test_refreshes_session_updated_by_another_worker(self) -> None:
+        worker_a = SandboxSessionManager(self.config)
+        worker_b = SandboxSessionManager(self.config)
+        worker_a.get("t").execute("x = 1")
+        worker_a.snapshot("t")
+
+        # 同一线程被调度到另一个工作进程
+        worker_b.get("t").execute("x = x + 1\ny = 'b'")
+        worker_b.snapshot("t")
+
+        sandbox = worker_a.get("t")
+        self.assertEqual(sandbox.get_global("x"), 2)
+        self.assertEqual(sandbox.get_global("y"), "b")
+        # 没有新的写入时继续复用会话
+        self.assertIs(worker_a.get("t"), sandbox)
+
+    def test_default_session_is_not_snapshotted(self) -> None:
+        manager = SandboxSessionManager(self.config)
+        manager.get(DEFAULT_SESSION).execute("x = 1")
+        self.assertIsNone(manager.snapshot(DEFAULT_SESSION))
+        self.assertFalse(os.path.exists(self.config.snapshot_dir))
+
+
+class ToolSessionTests(unittest.TestCase):
+    def test_python_inter_uses_thread_session(self) -> None:
+        from src_agent import sandbox_sessions
+        from src_agent.tools import python_inter
+
+        with tempfile.TemporaryDirectory() as tmp:
+            config = SandboxConfig(
+                snapshot_dir=os.path.join(tmp, "snapshots"),
+                sandbox_workspace=os.path.join(tmp, "workspace"),
+            )
+            manager = SandboxSessionManager(config)
+            with mock.patch.object(sandbox_sessions, "_session_manager", manager):
+                python_inter.invoke(
+                    {"python_code": "answer = 42"},
+                    config={"configurable": {"thread_id": "tool-thread"}},
+                )
+                self.assertEqual(manager.get("tool-thread").get_global("answer"), 42)
+                self.assertEqual(
+                    manager.snapshots.load("tool-thread"), {"answer": 42}
+                )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,204 @@
+from __future__ import annotations
+
+import threading
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+from src_agent.config.datasource_config import DataSourceConfig, DataSourceRoutingConfig, Endpoint
+from src_agent.config.schema_cache_config import SchemaCacheConfig
+from src_agent.datasources import DataSourceRouter
+from src_agent.schema_cache import SchemaCache, format_overview, format_tables
+
+TABLES = [
+    ("customers", "BASE TABLE", 122, "客户"),
+    ("orders", "BASE TABLE", 326, ""),
+    ("order_summary", "VIEW", None, "VIEW"),
+]
+COLUMNS = [
+    ("customers", "customerNumber", "int", "NO", "PRI", ""),
+    ("customers", "customerName", "varchar(50)", "NO", "", "客户名称"),
+    ("orders", "orderNumber", "int", "NO", "PRI", ""),
+    ("orders", "customerNumber", "int", "NO", "MUL", ""),
+    ("orders", "orderDate", "date", "YES", "", ""),
+    ("order_summary", "total", "decimal(32,2)", "YES", "", ""),
+]
+INDEXES = [
+    ("customers", "PRIMARY", 0, "customerNumber"),
+    ("orders", "PRIMARY", 0, "orderNumber"),
+    ("orders", "idx_customer_date", 1, "customerNumber"),
+    ("orders", "idx_customer_date", 1, "orderDate"),
+]
+
+
+class FakeCursor:
+    def __init__(self, conn: "FakeConnection"):
+        self.conn = conn
+        self.description = None
+        self._rows: list[tuple] = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql: str) -> None:
+        self.conn.queries.append(sql)
+        if self.conn.gate is not None:
+            self.conn.gate.wait(5)
+        if "DATABASE() AS name" in sql:
+            self.description, self._rows = [("name",)], [(self.conn.database,)]
+        elif "information_schema.TABLES" in sql:
+            self.description = [("name",), ("type",), ("approx_rows",), ("comment",)]
+            self._rows = self.conn.tables
+        elif "information_schema.COLUMNS" in sql:
+            self.description = [("table_name",), ("name",), ("type",), ("nullable",), ("key",), ("comment",)]
+            self._rows = COLUMNS
+        else:
+            self.description = [("table_name",), ("name",), ("non_unique",), ("column_name",)]
+            self._rows = INDEXES
+
+    def fetchall(self):
+        return self._rows
+
+
+class FakeConnection:
+    def __init__(self, database: str = "classicmodels", gate: threading.Event | None = None):
+        self.database = database
+        self.tables = list(TABLES)
+        self.gate = gate
+        self.queries: list[str] = []
+        self.open = True
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def close(self) -> None:
+        self.open = False
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def introspections(conn: FakeConnection) -> int:
+    return sum("DATABASE() AS name" in sql for sql in conn.queries)
+
+
+class SchemaCacheTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.conn = FakeConnection()
+        sources = {
+            "default": DataSourceConfig(name="default", primary=Endpoint("db")),
+            "hr": DataSourceConfig(name="hr", primary=Endpoint("hr-db"), database="hr"),
+        }
+        self.router = DataSourceRouter(
+            DataSourceRoutingConfig(sources=sources), connector=lambda *args: self.conn
+        )
+        self.clock = FakeClock()
+        self.background: list = []
+        self.cache = SchemaCache(
+            self.router,
+            SchemaCacheConfig(ttl_seconds=60),
+            clock=self.clock,
+            runner=self.background.append,
+        )
+
+    def test_introspection(self) -> None:
+        schema = self.cache.get()
+        self.assertEqual(schema.database, "classicmodels")
+        orders = schema.tables["orders"]
+        self.assertEqual(orders.approx_rows, 326)
+        self.assertEqual([column.name for column in orders.columns], ["orderNumber", "customerNumber", "orderDate"])
+        self.assertEqual(
+            [(index.name, index.columns, index.unique) for index in orders.indexes],
+            [("PRIMARY", ["orderNumber"], True), ("idx_customer_date", ["customerNumber", "orderDate"], False)],
+        )
+        self.assertTrue(schema.tables["order_summary"].is_view)
+        self.assertIsNone(schema.tables["order_summary"].approx_rows)
+
+    def test_stale_entries_served_while_refreshing_in_background(self) -> None:
+        first = self.cache.get()
+        self.assertIs(self.cache.get("DEFAULT"), first)
+        self.assertEqual(introspections(self.conn), 1)
+
+        self.clock.now = 61
+        self.conn.tables.append(("payments", "BASE TABLE", 273, ""))
+        self.assertIs(self.cache.get(), first)
+        self.cache.get()
+        self.assertEqual(len(self.background), 1)  # 同一数据源只调度一次刷新
+        self.background.pop()()
+        self.assertIn("payments", self.cache.get().tables)
+        self.assertEqual(introspections(self.conn), 2)
+
+        self.cache.invalidate("default")
+        self.cache.get()
+        self.assertEqual(introspections(self.conn), 3)
+
+    def test_refresh_started_before_invalidation_is_not_cached(self) -> None:
+        gate = threading.Event()
+        self.conn.gate = gate
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            future = pool.submit(self.cache.refresh, "default")
+            while not self.conn.queries:
+                pass
+            # 查询进行中执行了 DDL：旧结果只返回给调用方，不写入缓存
+            self.cache.invalidate("default")
+            gate.set()
+            future.result(timeout=5)
+        self.conn.gate = None
+        self.cache.get()
+        self.assertEqual(introspections(self.conn), 2)
+
+    def test_concurrent_cold_reads_query_once(self) -> None:
+        gate = threading.Event()
+        self.conn.gate = gate
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            futures = [pool.submit(self.cache.get) for _ in range(4)]
+            while not self.conn.queries:
+                pass
+            gate.set()
+            results = [future.result(timeout=5) for future in futures]
+        self.assertEqual(introspections(self.conn), 1)
+        self.assertTrue(all(result is results[0] for result in results))
+
+    def test_formatting(self) -> None:
+        schema = self.cache.get()
+        overview = format_overview(schema, max_tables=2)
+        self.assertIn("- customers（约 122 行） 客户: customerNumber int PK, customerName varchar(50)", overview)
+        self.assertIn("其余 1 张表（指定表名查看结构）: order_summary", overview)
+
+        detail = format_tables(schema, ["Orders", "`customers`", "nope"])
+        self.assertIn("  - orderDate date NULL", detail)
+        self.assertIn("  - idx_customer_date (customerNumber, orderDate)", detail)
+        self.assertIn("  - customerName varchar(50) NOT NULL — 客户名称", detail)
+        self.assertIn("未找到表: nope", detail)
+
+    def test_describe_schema_tool_and_ddl_invalidation(self) -> None:
+        from src_agent import datasources, schema_cache, sql_guard
+        from src_agent.config.sql_guard_config import SQLGuardConfig
+        from src_agent.tools import describe_schema, sql_inter
+
+        with mock.patch.object(schema_cache, "_schema_cache", self.cache), \
+                mock.patch.object(datasources, "_router", self.router), \
+                mock.patch.object(sql_guard, "_sql_guard", sql_guard.SQLGuard(SQLGuardConfig(enabled=False))):
+            overview = describe_schema.invoke({})
+            detail = describe_schema.invoke({"tables": ["customers"]})
+            describe_schema.invoke({"source": "hr"})
+            self.assertEqual(introspections(self.conn), 2)
+            # 未指定 source 的写语句只使默认数据源的缓存失效
+            sql_inter.invoke({"sql_query": "ALTER TABLE customers ADD COLUMN vip TINYINT"})
+            describe_schema.invoke({})
+            describe_schema.invoke({"source": "hr"})
+        self.assertIn("共 3 张表/视图", overview)
+        self.assertIn("表 customers（约 122 行） 客户", detail)
+        self.assertEqual(introspections(self.conn), 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
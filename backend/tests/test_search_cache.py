@@ -0,0 +1,124 @@
+from __future__ import annotations
+
+import threading
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+from unittest import mock
+
+from src_agent.config.search_config import SearchCacheConfig
+from src_agent.search_cache import CachedSearch, cache_key
+
+
+class StubBackend:
+    """本地搜索桩：记录调用次数，可阻塞到放行以模拟慢请求"""
+
+    def __init__(self, response: Any = None, gate: threading.Event | None = None):
+        self.calls: list[dict[str, Any]] = []
+        self.response = response
+        self.gate = gate
+        self._lock = threading.Lock()
+
+    def search(self, params: dict[str, Any]) -> Any:
+        with self._lock:
+            self.calls.append(params)
+        if self.gate is not None:
+            self.gate.wait(5)
+        if isinstance(self.response, Exception):
+            raise self.response
+        return self.response or {"query": params["query"], "results": [{"title": "t"}]}
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class CachedSearchTests(unittest.TestCase):
+    def _cache(self, backend, clock=None, **overrides) -> CachedSearch:
+        return CachedSearch(backend, SearchCacheConfig(**overrides), clock=clock or FakeClock())
+
+    def test_normalized_key(self) -> None:
+        self.assertEqual(
+            cache_key({"query": "  Python   3.13 ", "include_domains": ["b.com", "A.com"]}),
+            cache_key({"query": "python 3.13", "include_domains": ["a.com", "b.com", "a.com"]}),
+        )
+        self.assertNotEqual(
+            cache_key({"query": "python"}), cache_key({"query": "python", "time_range": "day"})
+        )
+
+    def test_hit_until_ttl_expires(self) -> None:
+        backend = StubBackend()
+        clock = FakeClock()
+        cache = self._cache(backend, clock, ttl_seconds=60)
+
+        first = cache.search({"query": "LangGraph"})
+        first["results"].append("mutated")
+        self.assertEqual(cache.search({"query": "langgraph "})["results"], [{"title": "t"}])
+        self.assertEqual(len(backend.calls), 1)
+
+        clock.now = 61
+        cache.search({"query": "LangGraph"})
+        self.assertEqual(len(backend.calls), 2)
+
+    def test_lru_eviction(self) -> None:
+        backend = StubBackend()
+        cache = self._cache(backend, max_entries=2)
+        cache.search({"query": "a"})
+        cache.search({"query": "b"})
+        cache.search({"query": "a"})  # a 变为最近使用
+        cache.search({"query": "c"})  # 淘汰 b
+        cache.search({"query": "a"})
+        self.assertEqual(len(backend.calls), 3)
+        cache.search({"query": "b"})
+        self.assertEqual(len(backend.calls), 4)
+
+    def test_concurrent_identical_queries_coalesced(self) -> None:
+        gate = threading.Event()
+        backend = StubBackend(gate=gate)
+        cache = self._cache(backend)
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            futures = [pool.submit(cache.search, {"query": "same"}) for _ in range(8)]
+            # 等待所有线程进入缓存后再放行后端请求
+            while len(cache._flights) == 0:
+                pass
+            gate.set()
+            results = [future.result(timeout=5) for future in futures]
+        self.assertEqual(len(backend.calls), 1)
+        self.assertTrue(all(result == results[0] for result in results))
+
+    def test_errors_are_shared_but_not_cached(self) -> None:
+        backend = StubBackend(response=RuntimeError("quota exceeded"))
+        cache = self._cache(backend)
+        with self.assertRaises(RuntimeError):
+            cache.search({"query": "x"})
+        backend.response = {"error": "timeout"}
+        self.assertEqual(cache.search({"query": "x"}), {"error": "timeout"})
+        cache.search({"query": "x"})
+        self.assertEqual(len(backend.calls), 3)
+        self.assertEqual(len(cache), 0)
+
+    def test_disabled_cache(self) -> None:
+        backend = StubBackend()
+        cache = self._cache(backend, enabled=False)
+        cache.search({"query": "x"})
+        cache.search({"query": "x"})
+        self.assertEqual(len(backend.calls), 2)
+
+    def test_search_tool_uses_cache(self) -> None:
+        from src_agent import search_cache
+        from src_agent.tools import search_tool
+
+        backend = StubBackend()
+        with mock.patch.object(search_cache, "_search_cache", self._cache(backend)):
+            search_tool.invoke({"query": "天气", "include_domains": ["weather.com"]})
+            result = search_tool.invoke({"query": "天气 ", "include_domains": ["WEATHER.com"]})
+        self.assertEqual(result["results"], [{"title": "t"}])
+        self.assertEqual(backend.calls, [{"query": "天气", "include_domains": ["weather.com"]}])
+
+
+if __name__ == "__main__":
+    unittest.main()
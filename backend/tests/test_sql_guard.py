@@ -0,0 +1,237 @@
+from __future__ import annotations
+
+import json
+import unittest
+from typing import Any
+from unittest import mock
+
+import pymysql
+
+from src_agent.config.datasource_config import DataSourceConfig, DataSourceRoutingConfig, Endpoint
+from src_agent.config.sql_guard_config import SQLGuardConfig
+from src_agent.sql_guard import (
+    QueryRejected,
+    SQLGuard,
+    estimate_examined_rows,
+    is_read_statement,
+    parse_plan,
+)
+
+EXPLAIN_COLUMNS = (
+    "id", "select_type", "table", "partitions", "type", "possible_keys",
+    "key", "key_len", "ref", "rows", "filtered", "Extra",
+)
+
+
+def plan_row(table, rows, access_type="ALL", key=None, filtered=100.0, extra="", select_id=1):
+    return (select_id, "SIMPLE", table, None, access_type, key, key, None, None, rows, filtered, extra)
+
+
+class FakeCursor:
+    def __init__(self, conn: "FakeConnection"):
+        self.conn = conn
+        self.description = None
+        self._rows: list[tuple] = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql: str, args: Any = None) -> int:
+        self.conn.executed.append(sql)
+        if sql.startswith("SET SESSION"):
+            error = self.conn.set_errors.get(sql.split()[2])
+            if error is not None:
+                raise error
+            return 0
+        if sql.startswith("EXPLAIN"):
+            self.description = [(name,) for name in EXPLAIN_COLUMNS]
+            self._rows = self.conn.plan
+        else:
+            if self.conn.query_error is not None:
+                raise self.conn.query_error
+            self.description = [("id",), ("name",)]
+            self._rows = [(1, "张三"), (2, "李四")]
+        return len(self._rows)
+
+    def fetchall(self):
+        return self._rows
+
+    def close(self) -> None:
+        pass
+
+
+class FakeConnection:
+    """MySQL 替身：EXPLAIN 返回预设的执行计划，记录执行过的语句"""
+
+    def __init__(self, plan=(), set_errors=None, query_error=None):
+        self.plan = list(plan)
+        self.set_errors = set_errors or {}
+        self.query_error = query_error
+        self.executed: list[str] = []
+        self.closed = False
+        self.rollbacks = 0
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def rollback(self) -> None:
+        self.rollbacks += 1
+
+    def close(self) -> None:
+        self.closed = True
+
+
+class SQLGuardTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.guard = SQLGuard(SQLGuardConfig(max_examined_rows=10_000, default_limit=100))
+
+    def test_estimate_nested_loop_and_subqueries(self) -> None:
+        steps = parse_plan(
+            [
+                plan_row("orders", 1000, filtered=10.0),
+                plan_row("users", 1, access_type="eq_ref", key="PRIMARY"),
+                plan_row("items", 500, select_id=2),
+            ],
+            [(name,) for name in EXPLAIN_COLUMNS],
+        )
+        # 1000 + (1000 × 10%) × 1 + 500
+        self.assertEqual(estimate_examined_rows(steps), 1600)
+
+    def test_within_budget_runs_unchanged(self) -> None:
+        conn = FakeConnection([plan_row("users", 50, access_type="ref", key="idx_city")])
+        result = self.guard.preflight(conn, "SELECT * FROM users WHERE city = 'a;b' ;")
+        self.assertEqual(result.sql, "SELECT * FROM users WHERE city = 'a;b' ;")
+        self.assertEqual(result.estimated_rows, 50)
+        self.assertEqual(conn.executed, ["EXPLAIN SELECT * FROM users WHERE city = 'a;b'"])
+
+    def test_simple_scan_over_budget_gets_limit(self) -> None:
+        conn = FakeConnection([plan_row("events", 2_000_000)])
+        result = self.guard.preflight(conn, "SELECT * FROM events -- 全部事件")
+        self.assertEqual(result.sql, "SELECT * FROM events -- 全部事件\nLIMIT 100")
+        self.assertIn("LIMIT 100", result.notes[0])
+
+        # 已有足够小的 LIMIT 时直接执行
+        result = self.guard.preflight(conn, "SELECT * FROM events LIMIT 20 OFFSET 10")
+        self.assertEqual(result.notes, [])
+
+    def test_rejects_aggregates_cross_joins_and_extraction(self) -> None:
+        cases = [
+            ("SELECT city, COUNT(*) FROM events GROUP BY city", [plan_row("events", 2_000_000)]),
+            (
+                "SELECT * FROM a, b",
+                [plan_row("a", 5000), plan_row("b", 5000, extra="Using join buffer (hash join)")],
+            ),
+            ("SELECT * FROM events ORDER BY ts LIMIT 10", [plan_row("events", 2_000_000, extra="Using filesort")]),
+            # LIMIT 必须位于锁定读和 INTO 子句之前，不能在末尾追加
+            ("SELECT * FROM events FOR UPDATE", [plan_row("events", 2_000_000)]),
+            ("SELECT * FROM events LIMIT 10 FOR SHARE NOWAIT", [plan_row("events", 2_000_000)]),
+            ("SELECT * FROM events LOCK IN SHARE MODE", [plan_row("events", 2_000_000)]),
+            ("SELECT id FROM events INTO OUTFILE '/tmp/events.csv'", [plan_row("events", 2_000_000)]),
+        ]
+        for sql, plan in cases:
+            with self.subTest(sql=sql), self.assertRaises(QueryRejected) as ctx:
+                self.guard.preflight(FakeConnection(plan), sql)
+            self.assertIn("全表扫描", str(ctx.exception))
+        with self.assertRaises(QueryRejected) as ctx:
+            self.guard.preflight(FakeConnection(cases[1][1]), cases[1][0])
+        self.assertIn("笛卡尔积", str(ctx.exception))
+
+        with self.assertRaises(QueryRejected):
+            self.guard.preflight(
+                FakeConnection([plan_row("events", 2_000_000)]), "SELECT * FROM events", allow_rewrite=False
+            )
+
+    def test_metadata_statements_and_disabled_guard_skip_explain(self) -> None:
+        conn = FakeConnection()
+        self.assertIsNone(self.guard.preflight(conn, "SHOW TABLES").estimated_rows)
+        SQLGuard(SQLGuardConfig(enabled=False)).preflight(conn, "SELECT * FROM events")
+        self.assertEqual(conn.executed, [])
+
+    def test_read_statement_classification(self) -> None:
+        self.assertTrue(is_read_statement("SELECT * FROM events"))
+        self.assertTrue(is_read_statement("SHOW TABLES"))
+        self.assertTrue(
+            is_read_statement("WITH recent AS (SELECT id FROM events WHERE ts > '2024-01-01') SELECT * FROM recent")
+        )
+        self.assertTrue(
+            is_read_statement("WITH RECURSIVE n (i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n) SELECT i FROM n")
+        )
+        # CTE 之后的主体是写语句
+        self.assertFalse(
+            is_read_statement(
+                "WITH stale AS (SELECT id FROM events WHERE ts < '2020-01-01') "
+                "DELETE FROM events WHERE id IN (SELECT id FROM stale)"
+            )
+        )
+        self.assertFalse(
+            is_read_statement("WITH s AS (SELECT id FROM users) UPDATE users JOIN s USING (id) SET active = 0")
+        )
+        self.assertFalse(is_read_statement("INSERT INTO archive WITH s AS (SELECT 1) SELECT * FROM s"))
+
+    def test_with_write_statement_skips_explain(self) -> None:
+        conn = FakeConnection()
+        preflight = self.guard.preflight(
+            conn, "WITH s AS (SELECT id FROM users) DELETE FROM users WHERE id IN (SELECT id FROM s)"
+        )
+        self.assertIsNone(preflight.estimated_rows)
+        self.assertEqual(conn.executed, [])
+
+    def test_execution_timeout_falls_back_to_mariadb(self) -> None:
+        conn = FakeConnection()
+        SQLGuard(SQLGuardConfig(execution_timeout_seconds=2.5)).apply_timeout(conn)
+        self.assertEqual(conn.executed, ["SET SESSION max_execution_time = 2500"])
+
+        unknown = pymysql.err.InternalError(1193, "Unknown system variable 'max_execution_time'")
+        conn = FakeConnection(set_errors={"max_execution_time": unknown})
+        SQLGuard(SQLGuardConfig(execution_timeout_seconds=2.5)).apply_timeout(conn)
+        self.assertEqual(conn.executed[-1], "SET SESSION max_statement_time = 2.5")
+
+
+class GuardedToolTests(unittest.TestCase):
+    def _invoke(self, tool, args, conn: FakeConnection) -> str:
+        from src_agent import datasources, sql_guard
+
+        guard = SQLGuard(SQLGuardConfig(max_examined_rows=10_000, default_limit=100))
+        source = DataSourceConfig(name="default", primary=Endpoint("127.0.0.1"))
+        router = datasources.DataSourceRouter(DataSourceRoutingConfig(sources={"default": source}))
+        with mock.patch.object(sql_guard, "_sql_guard", guard), \
+                mock.patch.object(datasources, "_router", router), \
+                mock.patch.object(pymysql, "connect", return_value=conn) as connect:
+            output = tool.invoke(args)
+        self.assertEqual(connect.call_args.kwargs["read_timeout"], 40)
+        # 不使用 autocommit：归还连接池前回滚，写语句不会被提交
+        self.assertFalse(connect.call_args.kwargs["autocommit"])
+        router.close()
+        self.assertTrue(conn.closed)
+        return output
+
+    def test_sql_inter_rewrites_and_reports(self) -> None:
+        from src_agent.tools import sql_inter
+
+        conn = FakeConnection([plan_row("users", 50_000)])
+        output = self._invoke(sql_inter, {"sql_query": "SELECT id, name FROM users"}, conn)
+        payload, note = output.split("\n\n", 1)
+        self.assertEqual(json.loads(payload)["rows"], [[1, "张三"], [2, "李四"]])
+        self.assertIn("已自动添加 LIMIT 100", note)
+        self.assertEqual(conn.executed[0], "SET SESSION max_execution_time = 30000")
+        self.assertEqual(conn.executed[-1], "SELECT id, name FROM users\nLIMIT 100")
+
+    def test_tools_report_rejection_and_timeout(self) -> None:
+        from src_agent.tools import extract_data, sql_inter
+
+        conn = FakeConnection([plan_row("users", 50_000)])
+        output = self._invoke(extract_data, {"sql_query": "SELECT * FROM users", "df_name": "users"}, conn)
+        self.assertIn("查询已被拒绝", output)
+        self.assertFalse(any(sql.startswith("SELECT") for sql in conn.executed))
+
+        timeout = pymysql.err.OperationalError(3024, "Query execution was interrupted")
+        conn = FakeConnection([plan_row("users", 10)], query_error=timeout)
+        output = self._invoke(sql_inter, {"sql_query": "SELECT * FROM users"}, conn)
+        self.assertIn("已被数据库中止", output)
+
+
+if __name__ == "__main__":
+    unittest.main()
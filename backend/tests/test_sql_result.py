@@ -0,0 +1,70 @@
+from __future__ import annotations
+
+import json
+import sqlite3
+import unittest
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from unittest import mock
+
+from src_agent import sql_result
+from src_agent.sql_result import serialize_sql_result
+
+# pymysql 游标描述：(列名, 字段类型, ...)
+DESCRIPTION = (
+    ("id", 3, None, 11, 11, 0, False),
+    ("金额", 246, None, 12, 12, 2, True),
+    ("下单时间", 12, None, 19, 19, 0, True),
+    ("日期", 10, None, 10, 10, 0, True),
+    ("时长", 11, None, 10, 10, 0, True),
+    ("城市", 253, None, 40, 40, 0, True),
+)
+ROWS = [
+    (1, Decimal("12.50"), datetime(2024, 5, 1, 8, 30), date(2024, 5, 1), timedelta(hours=1), "上海"),
+    (2, None, None, None, None, None),
+]
+EXPECTED = {
+    "columns": ["id", "金额", "下单时间", "日期", "时长", "城市"],
+    "rows": [
+        [1, 12.5, "2024-05-01T08:30:00", "2024-05-01", "1:00:00", "上海"],
+        [2, None, None, None, None, None],
+    ],
+}
+
+
+class SerializeSqlResultTests(unittest.TestCase):
+    def test_columns_from_description(self) -> None:
+        text = serialize_sql_result(ROWS, DESCRIPTION)
+        self.assertEqual(json.loads(text), EXPECTED)
+        self.assertIn("上海", text)
+        self.assertNotIn(", ", text)
+
+    def test_without_description(self) -> None:
+        data = json.loads(serialize_sql_result(ROWS))
+        self.assertEqual(data["columns"], [f"col_{i}" for i in range(6)])
+        self.assertEqual(data["rows"], EXPECTED["rows"])
+
+    def test_standard_library_fallback(self) -> None:
+        with mock.patch.object(sql_result, "orjson", None):
+            text = serialize_sql_result(ROWS, DESCRIPTION)
+        self.assertEqual(json.loads(text), EXPECTED)
+        self.assertIn("上海", text)
+
+    def test_empty_result_keeps_columns(self) -> None:
+        self.assertEqual(
+            json.loads(serialize_sql_result([], DESCRIPTION[:2])),
+            {"columns": ["id", "金额"], "rows": []},
+        )
+
+    def test_sqlite_cursor(self) -> None:
+        conn = sqlite3.connect(":memory:")
+        conn.execute("CREATE TABLE t (a INTEGER, b TEXT, c BLOB)")
+        conn.execute("INSERT INTO t VALUES (1, '北京', x'6869')")
+        cursor = conn.execute("SELECT * FROM t")
+        data = json.loads(serialize_sql_result(cursor.fetchall(), cursor.description))
+        conn.close()
+        self.assertEqual(data, {"columns": ["a", "b", "c"], "rows": [[1, "北京", "hi"]]})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,136 @@
+from __future__ import annotations
+
+import unittest
+
+from langchain.agents.middleware import ModelRequest
+from langchain_core.messages import (
+    AIMessage,
+    HumanMessage,
+    RemoveMessage,
+    ToolMessage,
+)
+
+from src_agent.config.compaction_config import CompactionConfig
+from src_agent.middleware.tool_compaction import (
+    COMPACTED_MARKER,
+    ToolResultCompactionMiddleware,
+    compact_messages,
+)
+
+CONFIG = CompactionConfig(
+    trigger_tokens=1_000, keep_recent_tool_results=1, min_chars=500, preview_chars=50
+)
+
+
+def _tool_round(index: int, size: int) -> list:
+    call_id = f"call_{index}"
+    return [
+        AIMessage(
+            content="",
+            tool_calls=[{"name": "sql_inter", "args": {"sql_query": "SELECT 1"}, "id": call_id}],
+        ),
+        ToolMessage(
+            content=f"结果{index}:" + "x" * size,
+            tool_call_id=call_id,
+            name="sql_inter",
+            id=f"tool_{index}",
+        ),
+        AIMessage(content=f"第{index}步分析完成"),
+    ]
+
+
+def _conversation(rounds: int, size: int = 5_000) -> list:
+    messages: list = []
+    for index in range(rounds):
+        messages.append(HumanMessage(content=f"问题{index}"))
+        messages.extend(_tool_round(index, size))
+    return messages
+
+
+class CompactMessagesTests(unittest.TestCase):
+    def test_short_history_is_untouched(self) -> None:
+        messages = _conversation(2, size=10)
+        compacted, count = compact_messages(messages, CONFIG)
+        self.assertEqual(count, 0)
+        self.assertIs(compacted, messages)
+
+    def test_old_tool_results_are_compacted_and_pairs_kept(self) -> None:
+        messages = _conversation(4)
+        compacted, count = compact_messages(messages, CONFIG)
+
+        # 最后一轮（当前轮次）保留原文，前三轮被压缩
+        self.assertEqual(count, 3)
+        self.assertEqual(len(compacted), len(messages))
+        for original, new in zip(messages, compacted):
+            self.assertIs(type(new), type(original))
+            self.assertNotIsInstance(new, RemoveMessage)
+            if isinstance(original, ToolMessage):
+                self.assertEqual(new.tool_call_id, original.tool_call_id)
+                self.assertEqual(new.id, original.id)
+                self.assertEqual(new.name, original.name)
+            else:
+                self.assertIs(new, original)
+
+        self.assertTrue(compacted[2].content.startswith(COMPACTED_MARKER))
+        self.assertIn("sql_inter", compacted[2].content)
+        self.assertEqual(compacted[-2].content, messages[-2].content)
+        # 输入消息不会被修改
+        self.assertFalse(messages[2].content.startswith(COMPACTED_MARKER))
+
+    def test_current_turn_is_never_compacted(self) -> None:
+        messages = [HumanMessage(content="分析全部数据")]
+        for index in range(4):
+            messages.extend(_tool_round(index, 5_000))
+        _, count = compact_messages(messages, CONFIG)
+        self.assertEqual(count, 0)
+
+    def test_keeps_image_links(self) -> None:
+        messages = _conversation(3)
+        messages[2] = messages[2].model_copy(
+            update={
+                "content": "图像已保存 ![图](http://localhost:8002/images/plot_1.png)"
+                + "y" * 5_000
+            }
+        )
+        compacted, _ = compact_messages(messages, CONFIG)
+        self.assertIn("/images/plot_1.png", compacted[2].content)
+
+    def test_compaction_is_idempotent(self) -> None:
+        first, _ = compact_messages(_conversation(4), CONFIG)
+        second, count = compact_messages(first, CONFIG)
+        self.assertEqual(count, 0)
+        self.assertEqual(
+            [m.content for m in first], [m.content for m in second]
+        )
+
+
+class MiddlewareTests(unittest.TestCase):
+    def test_rewrites_request_only(self) -> None:
+        messages = _conversation(4)
+        request = ModelRequest(model=None, messages=messages, state={"messages": messages})
+        seen: list[ModelRequest] = []
+
+        ToolResultCompactionMiddleware(CONFIG).wrap_model_call(
+            request, lambda req: seen.append(req) or "ok"
+        )
+
+        self.assertTrue(seen[0].messages[2].content.startswith(COMPACTED_MARKER))
+        # 图状态中的消息保持原样
+        self.assertIs(seen[0].state["messages"], messages)
+        self.assertFalse(messages[2].content.startswith(COMPACTED_MARKER))
+
+    def test_disabled(self) -> None:
+        messages = _conversation(4)
+        request = ModelRequest(model=None, messages=messages)
+        config = CompactionConfig(**{**CONFIG.__dict__, "enabled": False})
+        seen: list[ModelRequest] = []
+
+        ToolResultCompactionMiddleware(config).wrap_model_call(
+            request, lambda req: seen.append(req) or "ok"
+        )
+
+        self.assertIs(seen[0], request)
+
+
+if __name__ == "__main__":
+    unittest.main()